@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # Generated by the protocol buffer compiler.  DO NOT EDIT!
 # source: TrackNet.proto
-# Protobuf Python Version: 4.25.3
+# Protobuf Python Version: 4.25.1
 """Generated protocol buffer code."""
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import descriptor_pool as _descriptor_pool
@@ -14,17 +14,17 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0eTrackNet.proto\x12\x08TrackNet\"\xa6\x01\n\x05Track\x12\x0f\n\x02id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x11\n\ttrain_ids\x18\x02 \x03(\t\x12\x30\n\tcondition\x18\x03 \x01(\x0e\x32\x18.TrackNet.TrackConditionH\x01\x88\x01\x01\x12(\n\x05speed\x18\x04 \x01(\x0e\x32\x14.TrackNet.TrainSpeedH\x02\x88\x01\x01\x42\x05\n\x03_idB\x0c\n\n_conditionB\x08\n\x06_speed\"=\n\x08Junction\x12\x0f\n\x02id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x19\n\x11parked_trains_ids\x18\x02 \x03(\tB\x05\n\x03_id\"]\n\x05Route\x12\x14\n\x0cjunction_ids\x18\x01 \x03(\t\x12#\n\x16\x63urrent_junction_index\x18\x02 \x01(\x05H\x00\x88\x01\x01\x42\x19\n\x17_current_junction_index\"\xb0\x02\n\x08Location\x12\x1e\n\x11\x66ront_junction_id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x1b\n\x0e\x66ront_track_id\x18\x02 \x01(\tH\x01\x88\x01\x01\x12\x1b\n\x0e\x66ront_position\x18\x03 \x01(\x02H\x02\x88\x01\x01\x12\x1d\n\x10\x62\x61\x63k_junction_id\x18\x04 \x01(\tH\x03\x88\x01\x01\x12\x1a\n\rback_track_id\x18\x05 \x01(\tH\x04\x88\x01\x01\x12\x1a\n\rback_position\x18\x06 \x01(\x02H\x05\x88\x01\x01\x42\x14\n\x12_front_junction_idB\x11\n\x0f_front_track_idB\x11\n\x0f_front_positionB\x13\n\x11_back_junction_idB\x10\n\x0e_back_track_idB\x10\n\x0e_back_position\"\xc0\x03\n\x05Train\x12\x0f\n\x02id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x13\n\x06length\x18\x02 \x01(\x02H\x01\x88\x01\x01\x12.\n\x05state\x18\x03 \x01(\x0e\x32\x1a.TrackNet.Train.TrainStateH\x02\x88\x01\x01\x12)\n\x08location\x18\x04 \x01(\x0b\x32\x12.TrackNet.LocationH\x03\x88\x01\x01\x12#\n\x05route\x18\x05 \x01(\x0b\x32\x0f.TrackNet.RouteH\x04\x88\x01\x01\x12\x12\n\x05speed\x18\x06 \x01(\x05H\x05\x88\x01\x01\x12\x1d\n\x10next_junction_id\x18\x07 \x01(\tH\x06\x88\x01\x01\x12\x1d\n\x10prev_junction_id\x18\x08 \x01(\tH\x07\x88\x01\x01\"X\n\nTrainState\x12\x0b\n\x07RUNNING\x10\x00\x12\x08\n\x04SLOW\x10\x01\x12\x0b\n\x07STOPPED\x10\x02\x12\n\n\x06PARKED\x10\x03\x12\x0b\n\x07PARKING\x10\x04\x12\r\n\tUNPARKING\x10\x05\x42\x05\n\x03_idB\t\n\x07_lengthB\x08\n\x06_stateB\x0b\n\t_locationB\x08\n\x06_routeB\x08\n\x06_speedB\x13\n\x11_next_junction_idB\x13\n\x11_prev_junction_id\"Q\n\x07Railmap\x12%\n\tjunctions\x18\x01 \x03(\x0b\x32\x12.TrackNet.Junction\x12\x1f\n\x06tracks\x18\x02 \x03(\x0b\x32\x0f.TrackNet.Track\"\x85\x01\n\x07Railway\x12#\n\x03map\x18\x01 \x01(\x0b\x32\x11.TrackNet.RailmapH\x00\x88\x01\x01\x12\x1f\n\x06trains\x18\x02 \x03(\x0b\x32\x0f.TrackNet.Train\x12\x1a\n\rtrain_counter\x18\x03 \x01(\x05H\x01\x88\x01\x01\x42\x06\n\x04_mapB\x10\n\x0e_train_counter\"\xbc\x01\n\x16LastHandledClientState\x12\x15\n\x08train_id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x1e\n\x11\x63lient_state_hash\x18\x02 \x01(\tH\x01\x88\x01\x01\x12\x35\n\x0eserverResponse\x18\x03 \x01(\x0b\x32\x18.TrackNet.ServerResponseH\x02\x88\x01\x01\x42\x0b\n\t_train_idB\x14\n\x12_client_state_hashB\x11\n\x0f_serverResponse\"\xb0\x01\n\rRailwayUpdate\x12\'\n\x07railway\x18\x01 \x01(\x0b\x32\x11.TrackNet.RailwayH\x00\x88\x01\x01\x12\x16\n\ttimestamp\x18\x02 \x01(\x02H\x01\x88\x01\x01\x12\x44\n\x1alast_handled_client_states\x18\x03 \x03(\x0b\x32 .TrackNet.LastHandledClientStateB\n\n\x08_railwayB\x0c\n\n_timestamp\"\xe2\x02\n\x0eServerResponse\x12,\n\x06\x63lient\x18\x01 \x01(\x0b\x32\x17.TrackNet.ServerDetailsH\x00\x88\x01\x01\x12#\n\x05train\x18\x02 \x01(\x0b\x32\x0f.TrackNet.TrainH\x01\x88\x01\x01\x12:\n\x06status\x18\x03 \x01(\x0e\x32%.TrackNet.ServerResponse.UpdateStatusH\x02\x88\x01\x01\x12\'\n\tnew_route\x18\x04 \x01(\x0b\x32\x0f.TrackNet.RouteH\x03\x88\x01\x01\x12\x12\n\x05speed\x18\x05 \x01(\x05H\x04\x88\x01\x01\"L\n\x0cUpdateStatus\x12\x10\n\x0c\x43HANGE_SPEED\x10\x00\x12\x0b\n\x07REROUTE\x10\x01\x12\x08\n\x04STOP\x10\x02\x12\x08\n\x04PARK\x10\x03\x12\t\n\x05\x43LEAR\x10\x04\x42\t\n\x07_clientB\x08\n\x06_trainB\t\n\x07_statusB\x0c\n\n_new_routeB\x08\n\x06_speed\"\xba\x02\n\x0b\x43lientState\x12,\n\x06\x63lient\x18\x01 \x01(\x0b\x32\x17.TrackNet.ServerDetailsH\x00\x88\x01\x01\x12#\n\x05train\x18\x02 \x01(\x0b\x32\x0f.TrackNet.TrainH\x01\x88\x01\x01\x12\x12\n\x05speed\x18\x03 \x01(\x02H\x02\x88\x01\x01\x12)\n\x08location\x18\x04 \x01(\x0b\x32\x12.TrackNet.LocationH\x03\x88\x01\x01\x12\x30\n\tcondition\x18\x05 \x01(\x0e\x32\x18.TrackNet.TrackConditionH\x04\x88\x01\x01\x12#\n\x05route\x18\x06 \x01(\x0b\x32\x0f.TrackNet.RouteH\x05\x88\x01\x01\x42\t\n\x07_clientB\x08\n\x06_trainB\x08\n\x06_speedB\x0b\n\t_locationB\x0c\n\n_conditionB\x08\n\x06_route\"+\n\rServerDetails\x12\x0c\n\x04host\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\x05\"b\n\x10ServerAssignment\x12\x16\n\tis_master\x18\x01 \x01(\x08H\x00\x88\x01\x01\x12(\n\x07servers\x18\x02 \x03(\x0b\x32\x17.TrackNet.ServerDetailsB\x0c\n\n_is_master\"\xe7\x01\n\x08Response\x12*\n\x04\x63ode\x18\x01 \x01(\x0e\x32\x17.TrackNet.Response.CodeH\x00\x88\x01\x01\x12\x18\n\x0bmaster_host\x18\x02 \x01(\tH\x01\x88\x01\x01\x12(\n\x1bslave_last_backup_timestamp\x18\x03 \x01(\x02H\x02\x88\x01\x01\"2\n\x04\x43ode\x12\x07\n\x03\x41\x43K\x10\x00\x12\x07\n\x03NAK\x10\x01\x12\t\n\x05\x45RROR\x10\x02\x12\r\n\tHEARTBEAT\x10\x03\x42\x07\n\x05_codeB\x0e\n\x0c_master_hostB\x1e\n\x1c_slave_last_backup_timestamp\"t\n\x14SlaveBackupTimestamp\x12\x16\n\ttimestamp\x18\x01 \x01(\x02H\x00\x88\x01\x01\x12\x11\n\x04host\x18\x02 \x01(\tH\x01\x88\x01\x01\x12\x11\n\x04port\x18\x03 \x01(\x05H\x02\x88\x01\x01\x42\x0c\n\n_timestampB\x07\n\x05_hostB\x07\n\x05_port\"\x94\x05\n\x0eInitConnection\x12\x19\n\x0cis_heartbeat\x18\x01 \x01(\x08H\x00\x88\x01\x01\x12\x34\n\x06sender\x18\x02 \x01(\x0e\x32\x1f.TrackNet.InitConnection.SenderH\x01\x88\x01\x01\x12\x30\n\x0c\x63lient_state\x18\x03 \x01(\x0b\x32\x15.TrackNet.ClientStateH\x02\x88\x01\x01\x12\x36\n\x0fserver_response\x18\x04 \x01(\x0b\x32\x18.TrackNet.ServerResponseH\x03\x88\x01\x01\x12\x34\n\x0erailway_update\x18\x05 \x01(\x0b\x32\x17.TrackNet.RailwayUpdateH\x04\x88\x01\x01\x12\x33\n\rslave_details\x18\x06 \x01(\x0b\x32\x17.TrackNet.ServerDetailsH\x05\x88\x01\x01\x12:\n\x11server_assignment\x18\x07 \x01(\x0b\x32\x1a.TrackNet.ServerAssignmentH\x06\x88\x01\x01\x12\x43\n\x16slave_backup_timestamp\x18\x08 \x01(\x0b\x32\x1e.TrackNet.SlaveBackupTimestampH\x07\x88\x01\x01\"D\n\x06Sender\x12\x11\n\rSERVER_MASTER\x10\x00\x12\x10\n\x0cSERVER_SLAVE\x10\x01\x12\n\n\x06\x43LIENT\x10\x02\x12\t\n\x05PROXY\x10\x03\x42\x0f\n\r_is_heartbeatB\t\n\x07_senderB\x0f\n\r_client_stateB\x12\n\x10_server_responseB\x11\n\x0f_railway_updateB\x10\n\x0e_slave_detailsB\x14\n\x12_server_assignmentB\x19\n\x17_slave_backup_timestamp*#\n\x0eTrackCondition\x12\x07\n\x03\x42\x41\x44\x10\x00\x12\x08\n\x04GOOD\x10\x01*.\n\nTrainSpeed\x12\x0b\n\x07STOPPED\x10\x00\x12\x08\n\x04SLOW\x10\x64\x12\t\n\x04\x46\x41ST\x10\xc8\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0eTrackNet.proto\x12\x08TrackNet\"\xa6\x01\n\x05Track\x12\x0f\n\x02id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x11\n\ttrain_ids\x18\x02 \x03(\t\x12\x30\n\tcondition\x18\x03 \x01(\x0e\x32\x18.TrackNet.TrackConditionH\x01\x88\x01\x01\x12(\n\x05speed\x18\x04 \x01(\x0e\x32\x14.TrackNet.TrainSpeedH\x02\x88\x01\x01\x42\x05\n\x03_idB\x0c\n\n_conditionB\x08\n\x06_speed\"=\n\x08Junction\x12\x0f\n\x02id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x19\n\x11parked_trains_ids\x18\x02 \x03(\tB\x05\n\x03_id\"]\n\x05Route\x12\x14\n\x0cjunction_ids\x18\x01 \x03(\t\x12#\n\x16\x63urrent_junction_index\x18\x02 \x01(\x05H\x00\x88\x01\x01\x42\x19\n\x17_current_junction_index\"\xb0\x02\n\x08Location\x12\x1e\n\x11\x66ront_junction_id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x1b\n\x0e\x66ront_track_id\x18\x02 \x01(\tH\x01\x88\x01\x01\x12\x1b\n\x0e\x66ront_position\x18\x03 \x01(\x02H\x02\x88\x01\x01\x12\x1d\n\x10\x62\x61\x63k_junction_id\x18\x04 \x01(\tH\x03\x88\x01\x01\x12\x1a\n\rback_track_id\x18\x05 \x01(\tH\x04\x88\x01\x01\x12\x1a\n\rback_position\x18\x06 \x01(\x02H\x05\x88\x01\x01\x42\x14\n\x12_front_junction_idB\x11\n\x0f_front_track_idB\x11\n\x0f_front_positionB\x13\n\x11_back_junction_idB\x10\n\x0e_back_track_idB\x10\n\x0e_back_position\"\xc0\x03\n\x05Train\x12\x0f\n\x02id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x13\n\x06length\x18\x02 \x01(\x02H\x01\x88\x01\x01\x12.\n\x05state\x18\x03 \x01(\x0e\x32\x1a.TrackNet.Train.TrainStateH\x02\x88\x01\x01\x12)\n\x08location\x18\x04 \x01(\x0b\x32\x12.TrackNet.LocationH\x03\x88\x01\x01\x12#\n\x05route\x18\x05 \x01(\x0b\x32\x0f.TrackNet.RouteH\x04\x88\x01\x01\x12\x12\n\x05speed\x18\x06 \x01(\x05H\x05\x88\x01\x01\x12\x1d\n\x10next_junction_id\x18\x07 \x01(\tH\x06\x88\x01\x01\x12\x1d\n\x10prev_junction_id\x18\x08 \x01(\tH\x07\x88\x01\x01\"X\n\nTrainState\x12\x0b\n\x07RUNNING\x10\x00\x12\x08\n\x04SLOW\x10\x01\x12\x0b\n\x07STOPPED\x10\x02\x12\n\n\x06PARKED\x10\x03\x12\x0b\n\x07PARKING\x10\x04\x12\r\n\tUNPARKING\x10\x05\x42\x05\n\x03_idB\t\n\x07_lengthB\x08\n\x06_stateB\x0b\n\t_locationB\x08\n\x06_routeB\x08\n\x06_speedB\x13\n\x11_next_junction_idB\x13\n\x11_prev_junction_id\"Q\n\x07Railmap\x12%\n\tjunctions\x18\x01 \x03(\x0b\x32\x12.TrackNet.Junction\x12\x1f\n\x06tracks\x18\x02 \x03(\x0b\x32\x0f.TrackNet.Track\"\x85\x01\n\x07Railway\x12#\n\x03map\x18\x01 \x01(\x0b\x32\x11.TrackNet.RailmapH\x00\x88\x01\x01\x12\x1f\n\x06trains\x18\x02 \x03(\x0b\x32\x0f.TrackNet.Train\x12\x1a\n\rtrain_counter\x18\x03 \x01(\x05H\x01\x88\x01\x01\x42\x06\n\x04_mapB\x10\n\x0e_train_counter\"\xad\x01\n\x0c\x43ompactTrack\x12\x0f\n\x02id\x18\x01 \x01(\rH\x00\x88\x01\x01\x12\x11\n\ttrain_ids\x18\x02 \x03(\r\x12\x30\n\tcondition\x18\x03 \x01(\x0e\x32\x18.TrackNet.TrackConditionH\x01\x88\x01\x01\x12(\n\x05speed\x18\x04 \x01(\x0e\x32\x14.TrackNet.TrainSpeedH\x02\x88\x01\x01\x42\x05\n\x03_idB\x0c\n\n_conditionB\x08\n\x06_speed\"C\n\x0f\x43ompactJunction\x12\x0f\n\x02id\x18\x01 \x01(\rH\x00\x88\x01\x01\x12\x18\n\x10parked_train_ids\x18\x02 \x03(\rB\x05\n\x03_id\"d\n\x0c\x43ompactRoute\x12\x14\n\x0cjunction_ids\x18\x01 \x03(\r\x12#\n\x16\x63urrent_junction_index\x18\x02 \x01(\x05H\x00\x88\x01\x01\x42\x19\n\x17_current_junction_index\"\xb7\x02\n\x0f\x43ompactLocation\x12\x1e\n\x11\x66ront_junction_id\x18\x01 \x01(\rH\x00\x88\x01\x01\x12\x1b\n\x0e\x66ront_track_id\x18\x02 \x01(\rH\x01\x88\x01\x01\x12\x1b\n\x0e\x66ront_position\x18\x03 \x01(\x02H\x02\x88\x01\x01\x12\x1d\n\x10\x62\x61\x63k_junction_id\x18\x04 \x01(\rH\x03\x88\x01\x01\x12\x1a\n\rback_track_id\x18\x05 \x01(\rH\x04\x88\x01\x01\x12\x1a\n\rback_position\x18\x06 \x01(\x02H\x05\x88\x01\x01\x42\x14\n\x12_front_junction_idB\x11\n\x0f_front_track_idB\x11\n\x0f_front_positionB\x13\n\x11_back_junction_idB\x10\n\x0e_back_track_idB\x10\n\x0e_back_position\"\xfb\x02\n\x0c\x43ompactTrain\x12\x0f\n\x02id\x18\x01 \x01(\rH\x00\x88\x01\x01\x12\x13\n\x06length\x18\x02 \x01(\x02H\x01\x88\x01\x01\x12.\n\x05state\x18\x03 \x01(\x0e\x32\x1a.TrackNet.Train.TrainStateH\x02\x88\x01\x01\x12\x30\n\x08location\x18\x04 \x01(\x0b\x32\x19.TrackNet.CompactLocationH\x03\x88\x01\x01\x12*\n\x05route\x18\x05 \x01(\x0b\x32\x16.TrackNet.CompactRouteH\x04\x88\x01\x01\x12\x12\n\x05speed\x18\x06 \x01(\x05H\x05\x88\x01\x01\x12\x1d\n\x10next_junction_id\x18\x07 \x01(\rH\x06\x88\x01\x01\x12\x1d\n\x10prev_junction_id\x18\x08 \x01(\rH\x07\x88\x01\x01\x42\x05\n\x03_idB\t\n\x07_lengthB\x08\n\x06_stateB\x0b\n\t_locationB\x08\n\x06_routeB\x08\n\x06_speedB\x13\n\x11_next_junction_idB\x13\n\x11_prev_junction_id\"\xbc\x01\n\x0e\x43ompactRailway\x12,\n\tjunctions\x18\x01 \x03(\x0b\x32\x19.TrackNet.CompactJunction\x12&\n\x06tracks\x18\x02 \x03(\x0b\x32\x16.TrackNet.CompactTrack\x12&\n\x06trains\x18\x03 \x03(\x0b\x32\x16.TrackNet.CompactTrain\x12\x1a\n\rtrain_counter\x18\x04 \x01(\x05H\x00\x88\x01\x01\x42\x10\n\x0e_train_counter\"\xeb\x01\n\x11SymbolTableUpdate\x12\x1e\n\x11\x66irst_junction_id\x18\x01 \x01(\rH\x00\x88\x01\x01\x12\x16\n\x0ejunction_names\x18\x02 \x03(\t\x12\x1b\n\x0e\x66irst_track_id\x18\x03 \x01(\rH\x01\x88\x01\x01\x12\x13\n\x0btrack_names\x18\x04 \x03(\t\x12\x1b\n\x0e\x66irst_train_id\x18\x05 \x01(\rH\x02\x88\x01\x01\x12\x13\n\x0btrain_names\x18\x06 \x03(\tB\x14\n\x12_first_junction_idB\x11\n\x0f_first_track_idB\x11\n\x0f_first_train_id\"\xb4\x02\n\x16LastHandledClientState\x12\x15\n\x08train_id\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x1e\n\x11\x63lient_state_hash\x18\x02 \x01(\tH\x01\x88\x01\x01\x12\x35\n\x0eserverResponse\x18\x03 \x01(\x0b\x32\x18.TrackNet.ServerResponseH\x02\x88\x01\x01\x12 \n\x13\x63lient_state_digest\x18\x04 \x01(\x0cH\x03\x88\x01\x01\x12\"\n\x15\x63lient_state_sequence\x18\x05 \x01(\x04H\x04\x88\x01\x01\x42\x0b\n\t_train_idB\x14\n\x12_client_state_hashB\x11\n\x0f_serverResponseB\x16\n\x14_client_state_digestB\x18\n\x16_client_state_sequence\"\xce\x02\n\rRailwayUpdate\x12\'\n\x07railway\x18\x01 \x01(\x0b\x32\x11.TrackNet.RailwayH\x00\x88\x01\x01\x12\x16\n\ttimestamp\x18\x02 \x01(\x02H\x01\x88\x01\x01\x12\x44\n\x1alast_handled_client_states\x18\x03 \x03(\x0b\x32 .TrackNet.LastHandledClientState\x12\x15\n\x08sequence\x18\x04 \x01(\x03H\x02\x88\x01\x01\x12\x36\n\x0f\x63ompact_railway\x18\x05 \x01(\x0b\x32\x18.TrackNet.CompactRailwayH\x03\x88\x01\x01\x12&\n\x1e\x65victed_client_state_train_ids\x18\x07 \x03(\tB\n\n\x08_railwayB\x0c\n\n_timestampB\x0b\n\t_sequenceB\x12\n\x10_compact_railwayJ\x04\x08\x06\x10\x07\"\xa1\x04\n\x0cRailwayDelta\x12\x15\n\x08sequence\x18\x01 \x01(\x03H\x00\x88\x01\x01\x12\x1a\n\rbase_sequence\x18\x02 \x01(\x03H\x01\x88\x01\x01\x12\x16\n\ttimestamp\x18\x03 \x01(\x02H\x02\x88\x01\x01\x12\x1f\n\x06trains\x18\x04 \x03(\x0b\x32\x0f.TrackNet.Train\x12\x1f\n\x06tracks\x18\x05 \x03(\x0b\x32\x0f.TrackNet.Track\x12%\n\tjunctions\x18\x06 \x03(\x0b\x32\x12.TrackNet.Junction\x12\x1a\n\rtrain_counter\x18\x07 \x01(\x05H\x03\x88\x01\x01\x12\x44\n\x1alast_handled_client_states\x18\x08 \x03(\x0b\x32 .TrackNet.LastHandledClientState\x12.\n\x0e\x63ompact_trains\x18\t \x03(\x0b\x32\x16.TrackNet.CompactTrain\x12.\n\x0e\x63ompact_tracks\x18\n \x03(\x0b\x32\x16.TrackNet.CompactTrack\x12\x34\n\x11\x63ompact_junctions\x18\x0b \x03(\x0b\x32\x19.TrackNet.CompactJunction\x12&\n\x1e\x65victed_client_state_train_ids\x18\x0c \x03(\tB\x0b\n\t_sequenceB\x10\n\x0e_base_sequenceB\x0c\n\n_timestampB\x10\n\x0e_train_counter\"=\n\rResyncRequest\x12\x1a\n\rlast_sequence\x18\x01 \x01(\x03H\x00\x88\x01\x01\x42\x10\n\x0e_last_sequence\"\xcb\x01\n\tLogRecord\x12\x15\n\x08sequence\x18\x01 \x01(\x03H\x00\x88\x01\x01\x12,\n\rclient_states\x18\x02 \x03(\x0b\x32\x15.TrackNet.ClientState\x12\x44\n\x1alast_handled_client_states\x18\x03 \x03(\x0b\x32 .TrackNet.LastHandledClientState\x12&\n\x1e\x65victed_client_state_train_ids\x18\x04 \x03(\tB\x0b\n\t_sequence\"\xc2\x03\n\x0eServerResponse\x12,\n\x06\x63lient\x18\x01 \x01(\x0b\x32\x17.TrackNet.ServerDetailsH\x00\x88\x01\x01\x12#\n\x05train\x18\x02 \x01(\x0b\x32\x0f.TrackNet.TrainH\x01\x88\x01\x01\x12:\n\x06status\x18\x03 \x01(\x0e\x32%.TrackNet.ServerResponse.UpdateStatusH\x02\x88\x01\x01\x12\'\n\tnew_route\x18\x04 \x01(\x0b\x32\x0f.TrackNet.RouteH\x03\x88\x01\x01\x12\x12\n\x05speed\x18\x05 \x01(\x05H\x04\x88\x01\x01\x12\x15\n\x08sequence\x18\x06 \x01(\x04H\x05\x88\x01\x01\x12!\n\x14next_report_interval\x18\x07 \x01(\x02H\x06\x88\x01\x01\"L\n\x0cUpdateStatus\x12\x10\n\x0c\x43HANGE_SPEED\x10\x00\x12\x0b\n\x07REROUTE\x10\x01\x12\x08\n\x04STOP\x10\x02\x12\x08\n\x04PARK\x10\x03\x12\t\n\x05\x43LEAR\x10\x04\x42\t\n\x07_clientB\x08\n\x06_trainB\t\n\x07_statusB\x0c\n\n_new_routeB\x08\n\x06_speedB\x0b\n\t_sequenceB\x17\n\x15_next_report_interval\"\x98\x03\n\x0b\x43lientState\x12,\n\x06\x63lient\x18\x01 \x01(\x0b\x32\x17.TrackNet.ServerDetailsH\x00\x88\x01\x01\x12#\n\x05train\x18\x02 \x01(\x0b\x32\x0f.TrackNet.TrainH\x01\x88\x01\x01\x12\x12\n\x05speed\x18\x03 \x01(\x02H\x02\x88\x01\x01\x12)\n\x08location\x18\x04 \x01(\x0b\x32\x12.TrackNet.LocationH\x03\x88\x01\x01\x12\x30\n\tcondition\x18\x05 \x01(\x0e\x32\x18.TrackNet.TrackConditionH\x04\x88\x01\x01\x12#\n\x05route\x18\x06 \x01(\x0b\x32\x0f.TrackNet.RouteH\x05\x88\x01\x01\x12\x15\n\x08sequence\x18\x07 \x01(\x04H\x06\x88\x01\x01\x12 \n\x13last_acked_sequence\x18\x08 \x01(\x04H\x07\x88\x01\x01\x42\t\n\x07_clientB\x08\n\x06_trainB\x08\n\x06_speedB\x0b\n\t_locationB\x0c\n\n_conditionB\x08\n\x06_routeB\x0b\n\t_sequenceB\x16\n\x14_last_acked_sequence\"@\n\x10\x43lientStateBatch\x12,\n\rclient_states\x18\x01 \x03(\x0b\x32\x15.TrackNet.ClientState\"I\n\x13ServerResponseBatch\x12\x32\n\x10server_responses\x18\x01 \x03(\x0b\x32\x18.TrackNet.ServerResponse\"+\n\rServerDetails\x12\x0c\n\x04host\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\x05\"b\n\x10ServerAssignment\x12\x16\n\tis_master\x18\x01 \x01(\x08H\x00\x88\x01\x01\x12(\n\x07servers\x18\x02 \x03(\x0b\x32\x17.TrackNet.ServerDetailsB\x0c\n\n_is_master\"\x8f\x02\n\x08Response\x12*\n\x04\x63ode\x18\x01 \x01(\x0e\x32\x17.TrackNet.Response.CodeH\x00\x88\x01\x01\x12\x18\n\x0bmaster_host\x18\x02 \x01(\tH\x01\x88\x01\x01\x12(\n\x1bslave_last_backup_timestamp\x18\x03 \x01(\x02H\x02\x88\x01\x01\x12\x17\n\nproxy_time\x18\x04 \x01(\x02H\x03\x88\x01\x01\"2\n\x04\x43ode\x12\x07\n\x03\x41\x43K\x10\x00\x12\x07\n\x03NAK\x10\x01\x12\t\n\x05\x45RROR\x10\x02\x12\r\n\tHEARTBEAT\x10\x03\x42\x07\n\x05_codeB\x0e\n\x0c_master_hostB\x1e\n\x1c_slave_last_backup_timestampB\r\n\x0b_proxy_time\"t\n\x14SlaveBackupTimestamp\x12\x16\n\ttimestamp\x18\x01 \x01(\x02H\x00\x88\x01\x01\x12\x11\n\x04host\x18\x02 \x01(\tH\x01\x88\x01\x01\x12\x11\n\x04port\x18\x03 \x01(\x05H\x02\x88\x01\x01\x42\x0c\n\n_timestampB\x07\n\x05_hostB\x07\n\x05_port\"\x93\x08\n\x0eInitConnection\x12\x19\n\x0cis_heartbeat\x18\x01 \x01(\x08H\x00\x88\x01\x01\x12\x34\n\x06sender\x18\x02 \x01(\x0e\x32\x1f.TrackNet.InitConnection.SenderH\x01\x88\x01\x01\x12\x30\n\x0c\x63lient_state\x18\x03 \x01(\x0b\x32\x15.TrackNet.ClientStateH\x02\x88\x01\x01\x12\x36\n\x0fserver_response\x18\x04 \x01(\x0b\x32\x18.TrackNet.ServerResponseH\x03\x88\x01\x01\x12\x34\n\x0erailway_update\x18\x05 \x01(\x0b\x32\x17.TrackNet.RailwayUpdateH\x04\x88\x01\x01\x12\x33\n\rslave_details\x18\x06 \x01(\x0b\x32\x17.TrackNet.ServerDetailsH\x05\x88\x01\x01\x12:\n\x11server_assignment\x18\x07 \x01(\x0b\x32\x1a.TrackNet.ServerAssignmentH\x06\x88\x01\x01\x12\x43\n\x16slave_backup_timestamp\x18\x08 \x01(\x0b\x32\x1e.TrackNet.SlaveBackupTimestampH\x07\x88\x01\x01\x12\x32\n\rrailway_delta\x18\t \x01(\x0b\x32\x16.TrackNet.RailwayDeltaH\x08\x88\x01\x01\x12\x34\n\x0eresync_request\x18\n \x01(\x0b\x32\x17.TrackNet.ResyncRequestH\t\x88\x01\x01\x12;\n\x12\x63lient_state_batch\x18\x0b \x01(\x0b\x32\x1a.TrackNet.ClientStateBatchH\n\x88\x01\x01\x12\x41\n\x15server_response_batch\x18\x0c \x01(\x0b\x32\x1d.TrackNet.ServerResponseBatchH\x0b\x88\x01\x01\x12\x31\n\x07symbols\x18\r \x01(\x0b\x32\x1b.TrackNet.SymbolTableUpdateH\x0c\x88\x01\x01\"D\n\x06Sender\x12\x11\n\rSERVER_MASTER\x10\x00\x12\x10\n\x0cSERVER_SLAVE\x10\x01\x12\n\n\x06\x43LIENT\x10\x02\x12\t\n\x05PROXY\x10\x03\x42\x0f\n\r_is_heartbeatB\t\n\x07_senderB\x0f\n\r_client_stateB\x12\n\x10_server_responseB\x11\n\x0f_railway_updateB\x10\n\x0e_slave_detailsB\x14\n\x12_server_assignmentB\x19\n\x17_slave_backup_timestampB\x10\n\x0e_railway_deltaB\x11\n\x0f_resync_requestB\x15\n\x13_client_state_batchB\x18\n\x16_server_response_batchB\n\n\x08_symbols*#\n\x0eTrackCondition\x12\x07\n\x03\x42\x41\x44\x10\x00\x12\x08\n\x04GOOD\x10\x01*.\n\nTrainSpeed\x12\x0b\n\x07STOPPED\x10\x00\x12\x08\n\x04SLOW\x10\x64\x12\t\n\x04\x46\x41ST\x10\xc8\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'TrackNet_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
-  _globals['_TRACKCONDITION']._serialized_start=3536
-  _globals['_TRACKCONDITION']._serialized_end=3571
-  _globals['_TRAINSPEED']._serialized_start=3573
-  _globals['_TRAINSPEED']._serialized_end=3619
+  _globals['_TRACKCONDITION']._serialized_start=6857
+  _globals['_TRACKCONDITION']._serialized_end=6892
+  _globals['_TRAINSPEED']._serialized_start=6894
+  _globals['_TRAINSPEED']._serialized_end=6940
   _globals['_TRACK']._serialized_start=29
   _globals['_TRACK']._serialized_end=195
   _globals['_JUNCTION']._serialized_start=197
@@ -41,28 +41,52 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   _globals['_RAILMAP']._serialized_end=1194
   _globals['_RAILWAY']._serialized_start=1197
   _globals['_RAILWAY']._serialized_end=1330
-  _globals['_LASTHANDLEDCLIENTSTATE']._serialized_start=1333
-  _globals['_LASTHANDLEDCLIENTSTATE']._serialized_end=1521
-  _globals['_RAILWAYUPDATE']._serialized_start=1524
-  _globals['_RAILWAYUPDATE']._serialized_end=1700
-  _globals['_SERVERRESPONSE']._serialized_start=1703
-  _globals['_SERVERRESPONSE']._serialized_end=2057
-  _globals['_SERVERRESPONSE_UPDATESTATUS']._serialized_start=1925
-  _globals['_SERVERRESPONSE_UPDATESTATUS']._serialized_end=2001
-  _globals['_CLIENTSTATE']._serialized_start=2060
-  _globals['_CLIENTSTATE']._serialized_end=2374
-  _globals['_SERVERDETAILS']._serialized_start=2376
-  _globals['_SERVERDETAILS']._serialized_end=2419
-  _globals['_SERVERASSIGNMENT']._serialized_start=2421
-  _globals['_SERVERASSIGNMENT']._serialized_end=2519
-  _globals['_RESPONSE']._serialized_start=2522
-  _globals['_RESPONSE']._serialized_end=2753
-  _globals['_RESPONSE_CODE']._serialized_start=2646
-  _globals['_RESPONSE_CODE']._serialized_end=2696
-  _globals['_SLAVEBACKUPTIMESTAMP']._serialized_start=2755
-  _globals['_SLAVEBACKUPTIMESTAMP']._serialized_end=2871
-  _globals['_INITCONNECTION']._serialized_start=2874
-  _globals['_INITCONNECTION']._serialized_end=3534
-  _globals['_INITCONNECTION_SENDER']._serialized_start=3315
-  _globals['_INITCONNECTION_SENDER']._serialized_end=3383
+  _globals['_COMPACTTRACK']._serialized_start=1333
+  _globals['_COMPACTTRACK']._serialized_end=1506
+  _globals['_COMPACTJUNCTION']._serialized_start=1508
+  _globals['_COMPACTJUNCTION']._serialized_end=1575
+  _globals['_COMPACTROUTE']._serialized_start=1577
+  _globals['_COMPACTROUTE']._serialized_end=1677
+  _globals['_COMPACTLOCATION']._serialized_start=1680
+  _globals['_COMPACTLOCATION']._serialized_end=1991
+  _globals['_COMPACTTRAIN']._serialized_start=1994
+  _globals['_COMPACTTRAIN']._serialized_end=2373
+  _globals['_COMPACTRAILWAY']._serialized_start=2376
+  _globals['_COMPACTRAILWAY']._serialized_end=2564
+  _globals['_SYMBOLTABLEUPDATE']._serialized_start=2567
+  _globals['_SYMBOLTABLEUPDATE']._serialized_end=2802
+  _globals['_LASTHANDLEDCLIENTSTATE']._serialized_start=2805
+  _globals['_LASTHANDLEDCLIENTSTATE']._serialized_end=3113
+  _globals['_RAILWAYUPDATE']._serialized_start=3116
+  _globals['_RAILWAYUPDATE']._serialized_end=3450
+  _globals['_RAILWAYDELTA']._serialized_start=3453
+  _globals['_RAILWAYDELTA']._serialized_end=3998
+  _globals['_RESYNCREQUEST']._serialized_start=4000
+  _globals['_RESYNCREQUEST']._serialized_end=4061
+  _globals['_LOGRECORD']._serialized_start=4064
+  _globals['_LOGRECORD']._serialized_end=4267
+  _globals['_SERVERRESPONSE']._serialized_start=4270
+  _globals['_SERVERRESPONSE']._serialized_end=4720
+  _globals['_SERVERRESPONSE_UPDATESTATUS']._serialized_start=4550
+  _globals['_SERVERRESPONSE_UPDATESTATUS']._serialized_end=4626
+  _globals['_CLIENTSTATE']._serialized_start=4723
+  _globals['_CLIENTSTATE']._serialized_end=5131
+  _globals['_CLIENTSTATEBATCH']._serialized_start=5133
+  _globals['_CLIENTSTATEBATCH']._serialized_end=5197
+  _globals['_SERVERRESPONSEBATCH']._serialized_start=5199
+  _globals['_SERVERRESPONSEBATCH']._serialized_end=5272
+  _globals['_SERVERDETAILS']._serialized_start=5274
+  _globals['_SERVERDETAILS']._serialized_end=5317
+  _globals['_SERVERASSIGNMENT']._serialized_start=5319
+  _globals['_SERVERASSIGNMENT']._serialized_end=5417
+  _globals['_RESPONSE']._serialized_start=5420
+  _globals['_RESPONSE']._serialized_end=5691
+  _globals['_RESPONSE_CODE']._serialized_start=5569
+  _globals['_RESPONSE_CODE']._serialized_end=5619
+  _globals['_SLAVEBACKUPTIMESTAMP']._serialized_start=5693
+  _globals['_SLAVEBACKUPTIMESTAMP']._serialized_end=5809
+  _globals['_INITCONNECTION']._serialized_start=5812
+  _globals['_INITCONNECTION']._serialized_end=6855
+  _globals['_INITCONNECTION_SENDER']._serialized_start=6538
+  _globals['_INITCONNECTION_SENDER']._serialized_end=6606
 # @@protoc_insertion_point(module_scope)
@@ -0,0 +1,2 @@
+"""Benchmarks for TrackNet components. Run each module from the repository root, 
+e.g. ``python3 -m bench.bench_client_states``. Results are printed as JSON."""
@@ -0,0 +1,229 @@
+"""Load test for the proxy with many concurrent client connections.
+
+Starts a main proxy in a child process, either the threaded ``Proxy`` or the
+``AsyncProxy`` used with ``-async``. A stand-in master server connects to it as a
+slave, is promoted, and answers every client state with a server response. Then
+the given number of clients connect at once, keep their connections open, and each
+sends client states one at a time, waiting for the response to each.
+
+Reports the connections held, round trips per second, round trip latency
+percentiles, and the CPU seconds and peak threads used by the proxy process.
+
+usage: python3 -m bench.bench_async_proxy [-clients 1000 10000] [-threadedClients 1000] [-reports 3] [-batchWindowMs 0 5]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import socket
+import threading
+import time
+
+import TrackNet_pb2
+import utils
+from utils import send, receive
+
+
+def run_proxy(use_async: bool, port: int, batch_window: float, ready, conn):
+    """Runs a main proxy in the child process. Answers each request received on
+    ``conn`` with the CPU seconds and peak thread count of the process."""
+    logging.disable(logging.CRITICAL)
+    import proxy
+
+    proxy_class = proxy.AsyncProxy if use_async else proxy.Proxy
+    main_proxy = proxy_class(listening_port=port, is_main=True, batch_window=batch_window)
+    main_proxy.host = "127.0.0.1"
+
+    peak_threads = [threading.active_count()]
+
+    def sample_threads():
+        while True:
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+            time.sleep(0.1)
+
+    def report():
+        while conn.recv():
+            conn.send((time.process_time(), peak_threads[0]))
+
+    threading.Thread(target=sample_threads, daemon=True).start()
+    threading.Thread(target=report, daemon=True).start()
+    ready.set()
+    main_proxy.run()
+
+
+def run_master(port: int, stop: threading.Event, handled: list):
+    """A master server stand-in: registers with the proxy, then answers client states
+    and heartbeats."""
+    sock = utils.create_client_socket("127.0.0.1", port, timeout=10)
+    identification = TrackNet_pb2.InitConnection()
+    identification.sender = TrackNet_pb2.InitConnection.SERVER_SLAVE
+    identification.slave_details.host = "127.0.0.1"
+    identification.slave_details.port = 1
+    send(sock, identification.SerializeToString())
+
+    while not stop.is_set():
+        try:
+            data = receive(sock, timeout=1, returnException=True, copy=False)
+        except socket.timeout:
+            continue
+        except Exception:
+            return
+
+        message = TrackNet_pb2.InitConnection()
+        message.ParseFromString(data)
+        response = TrackNet_pb2.InitConnection()
+        response.sender = TrackNet_pb2.InitConnection.SERVER_MASTER
+
+        if message.HasField("client_state"):
+            respond(message.client_state, response.server_response)
+            handled[0] += 1
+        elif message.HasField("client_state_batch"):
+            for client_state in message.client_state_batch.client_states:
+                respond(client_state, response.server_response_batch.server_responses.add())
+            handled[0] += len(message.client_state_batch.client_states)
+            handled[1] += 1
+        elif message.HasField("is_heartbeat"):
+            response.is_heartbeat = True
+        else:
+            continue
+
+        send(sock, response.SerializeToString())
+
+
+def respond(client_state: TrackNet_pb2.ClientState, server_response: TrackNet_pb2.ServerResponse):
+    server_response.client.CopyFrom(client_state.client)
+    server_response.train.id = client_state.train.id
+    server_response.train.length = client_state.train.length
+    server_response.status = TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(4)
+    return await reader.readexactly(int.from_bytes(header, "big"))
+
+
+async def run_client(client_id: int, port: int, reports: int, connect_limit: asyncio.Semaphore,
+                     all_connected: asyncio.Event, connected: list, latencies: list):
+    async with connect_limit:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    host, client_port = writer.get_extra_info("sockname")[:2]
+
+    connected[0] += 1
+    await all_connected.wait()
+
+    message = TrackNet_pb2.InitConnection()
+    message.sender = TrackNet_pb2.InitConnection.CLIENT
+    message.client_state.client.host = host
+    message.client_state.client.port = client_port
+    message.client_state.train.id = f"Train{client_id}"
+    message.client_state.train.length = 3
+    data = message.SerializeToString()
+
+    for _ in range(reports):
+        start = time.perf_counter()
+        writer.write(len(data).to_bytes(4, "big") + data)
+        await read_frame(reader)
+        latencies.append(time.perf_counter() - start)
+
+    return writer
+
+
+async def run_clients(num_clients: int, port: int, reports: int, timeout: float) -> dict:
+    connect_limit = asyncio.Semaphore(256)
+    all_connected = asyncio.Event()
+    connected = [0]
+    latencies = []
+
+    tasks = [
+        asyncio.create_task(run_client(i, port, reports, connect_limit, all_connected, connected, latencies))
+        for i in range(num_clients)
+    ]
+
+    connect_start = time.perf_counter()
+    while connected[0] < num_clients and time.perf_counter() - connect_start < timeout:
+        if any(task.done() and task.exception() for task in tasks):
+            break
+        await asyncio.sleep(0.05)
+    connect_seconds = time.perf_counter() - connect_start
+    held = connected[0]
+
+    start = time.perf_counter()
+    all_connected.set()
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    elapsed = time.perf_counter() - start
+
+    for task in pending:
+        task.cancel()
+    for task in done:
+        if not task.exception():
+            task.result().close()
+
+    latencies.sort()
+    return {
+        "connections_held": held,
+        "connect_seconds": round(connect_seconds, 3),
+        "round_trips": len(latencies),
+        "round_trips_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms_p50": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        "latency_ms_p99": round(latencies[int(len(latencies) * 0.99)] * 1000, 2) if latencies else None,
+        "failed_clients": sum(1 for task in done if task.exception()) + len(pending),
+    }
+
+
+def run(use_async: bool, num_clients: int, reports: int, port: int, timeout: float, batch_window: float) -> dict:
+    ready = multiprocessing.Event()
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=run_proxy, args=(use_async, port, batch_window, ready, child_conn), daemon=True)
+    process.start()
+    ready.wait()
+    time.sleep(0.5)
+
+    stop = threading.Event()
+    handled = [0, 0]
+    master = threading.Thread(target=run_master, args=(port, stop, handled), daemon=True)
+    master.start()
+    time.sleep(0.5)
+
+    parent_conn.send(True)
+    cpu_before, _ = parent_conn.recv()
+    result = asyncio.run(run_clients(num_clients, port, reports, timeout))
+    parent_conn.send(True)
+    cpu_after, threads = parent_conn.recv()
+
+    stop.set()
+    process.terminate()
+    process.join()
+
+    result.update({
+        "mode": "async" if use_async else "threaded",
+        "clients": num_clients,
+        "proxy_cpu_seconds": round(cpu_after - cpu_before, 3),
+        "proxy_peak_threads": threads,
+        "batch_window_ms": batch_window * 1000,
+        "master_handled": handled[0],
+        "master_batches": handled[1],
+    })
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the proxy with many client connections")
+    parser.add_argument("-clients", type=int, nargs="+", default=[1000, 10000], help="Client counts for the asyncio proxy")
+    parser.add_argument("-threadedClients", type=int, nargs="*", default=[1000], help="Client counts for the threaded proxy")
+    parser.add_argument("-reports", type=int, default=3, help="Client states sent per client")
+    parser.add_argument("-port", type=int, default=56555)
+    parser.add_argument("-timeout", type=float, default=120)
+    parser.add_argument("-batchWindowMs", type=float, nargs="+", default=[5], help="Proxy batch windows to compare, 0 disables batching")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    runs = [(False, n, w) for n in args.threadedClients for w in args.batchWindowMs]
+    runs += [(True, n, w) for n in args.clients for w in args.batchWindowMs]
+    results = []
+    for index, (use_async, num_clients, window) in enumerate(runs):
+        # a fresh port per run, so a closing listener never delays the next one
+        results.append(run(use_async, num_clients, args.reports, args.port + index, args.timeout, window / 1000))
+
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,99 @@
+"""Measures how long the master takes to answer a batch of client states with conflict
+analysis inline, in every batch, and on its own thread.
+
+Builds a synthetic grid with ``-trains`` trains per size, mostly parked at random
+junctions with one running train on each of a fifth of the tracks, and marks the
+whole railway unanalyzed, as it is after a restart or a promotion without a live
+railway. The master then handles ``-batches`` batches of ``-batchSize`` client states
+of random trains:
+
+- ``inline``: every batch is analyzed before it is answered, the first one in full.
+- ``background``: batches are answered from the published command table, while the
+  conflict analysis thread analyzes them every ``conflict_analysis_interval`` seconds
+  or once a batch was applied.
+
+For both it reports the 50th and 99th percentile and the longest time to answer a
+batch, and the conflict analysis passes with their mean duration.
+
+usage: python3 -m bench.bench_background_analysis [-trains 1000 10000] [-batches 500] [-batchSize 32]
+"""
+import argparse
+import json
+import logging
+import random
+import socket
+import threading
+import time
+
+import utils
+from bench import topology
+from bench.bench_ingest_priority import create_client_states
+from server import Server
+from utils import receive
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(num_trains: int, batches: int, batch_size: int, background: bool, seed: int) -> dict:
+    rng = random.Random(seed)
+    num_junctions = max(num_trains // 5, 16)
+    server = Server()
+    server.is_master = True
+    server.railway = topology.build_railway("grid", num_junctions, num_trains - num_junctions // 5, rng)
+    topology.fill_tracks(server.railway, num_junctions // 5, 1, rng)
+    server.railway.pop_changes()
+    server.railway.rebuild_waiting_index()
+    client_states = create_client_states(server.railway)
+
+    stop = threading.Event()
+    server_sock, proxy_sock = socket.socketpair()
+    threading.Thread(target=lambda: [receive(proxy_sock, timeout=1) for _ in iter(stop.is_set, True)], daemon=True).start()
+
+    utils.exit_flag = False
+    if background:
+        server.start_conflict_analysis()
+
+    timings = []
+    for _ in range(batches):
+        server.client_state_queue.put(rng.sample(client_states, batch_size), server_sock, True)
+        start = time.perf_counter()
+        server.handle_client_state_batch(server.client_state_queue.take(0))
+        timings.append(time.perf_counter() - start)
+        # the time between batches a master with proxies spends receiving them
+        time.sleep(0.001)
+
+    utils.exit_flag = True
+    stop.set()
+    metrics = server.get_conflict_analysis_metrics()
+    return {
+        "batch_p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+        "batch_p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+        "batch_max_ms": round(max(timings) * 1000, 3),
+        "analysis_passes": metrics["passes"],
+        "analysis_mean_pass_ms": round(metrics["mean_pass_ms"], 3),
+        "unanalyzed_command_lookups": metrics["unanalyzed_command_lookups"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark conflict analysis inline and on its own thread")
+    parser.add_argument("-trains", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("-batches", type=int, default=500, help="Batches of client states handled")
+    parser.add_argument("-batchSize", type=int, default=32, help="Client states per batch")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    for num_trains in args.trains:
+        results.append({
+            "trains": num_trains,
+            "inline": run(num_trains, args.batches, args.batchSize, False, args.seed),
+            "background": run(num_trains, args.batches, args.batchSize, True, args.seed),
+        })
+    print(json.dumps(results, indent=2))
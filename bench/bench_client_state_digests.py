@@ -0,0 +1,97 @@
+"""Measures the cost of the duplicate client state check on the master, per message.
+
+Builds the InitConnection messages a proxy sends, holding one client state or a
+ClientStateBatch, and times getting the digest of every client state in them:
+
+- ``sha256_hex``: serializing the parsed state again and taking its SHA-256 hex digest,
+  as the master did before.
+- ``reserialized``: serializing the parsed state again and taking the response cache digest.
+- ``wire``: taking the response cache digest of the bytes the state was received as,
+  found with ``Server.compute_wire_digests`` without serializing anything.
+
+For each it reports the mean time per client state, the share of one core the check
+takes at ``-rate`` client states per second, and the thread it runs on. The first two run
+on the thread that handles client states under the server lock, the wire digests are
+taken on the thread receiving from the proxy.
+
+usage: python3 -m bench.bench_client_state_digests [-rate 10000] [-batchSizes 1 32] [-messages 20000]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import time
+
+import TrackNet_pb2
+from bench.bench_client_states import create_client_state
+from server import Server
+
+
+def create_messages(num_messages: int, batch_size: int) -> list:
+    messages = []
+    for index in range(num_messages):
+        message = TrackNet_pb2.InitConnection()
+        message.sender = TrackNet_pb2.InitConnection.Sender.PROXY
+        client_states = [
+            create_client_state(f"Train{(index * batch_size + offset) % 1000}", "127.0.0.1", index)
+            for offset in range(batch_size)
+        ]
+        if batch_size == 1:
+            message.client_state.CopyFrom(client_states[0])
+        else:
+            message.client_state_batch.client_states.extend(client_states)
+        data = message.SerializeToString()
+        messages.append((memoryview(data), client_states))
+    return messages
+
+
+def time_per_state(messages: list, digest_message) -> float:
+    states = sum(len(client_states) for (_, client_states) in messages)
+    start = time.perf_counter()
+    for (data, client_states) in messages:
+        digest_message(data, client_states)
+    return (time.perf_counter() - start) / states
+
+
+def run(batch_size: int, num_messages: int, rate: int) -> dict:
+    server = Server()
+    messages = create_messages(max(1, num_messages // batch_size), batch_size)
+    batched = batch_size > 1
+
+    def sha256_hex(data, client_states):
+        return [hashlib.sha256(client_state.SerializeToString()).hexdigest() for client_state in client_states]
+
+    def reserialized(data, client_states):
+        return [server.computeHash(client_state) for client_state in client_states]
+
+    def wire(data, client_states):
+        return server.compute_wire_digests(data, batched, len(client_states))
+
+    results = {"batch_size": batch_size}
+    for (name, digest_message, thread) in (
+        ("sha256_hex", sha256_hex, "client state handler"),
+        ("reserialized", reserialized, "client state handler"),
+        ("wire", wire, "proxy receiver"),
+    ):
+        seconds = min(time_per_state(messages, digest_message) for _ in range(5))
+        results[name] = {
+            "us_per_state": round(seconds * 1e6, 3),
+            "core_share_at_rate": round(seconds * rate, 5),
+            "thread": thread,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the master's duplicate client state check")
+    parser.add_argument("-rate", type=int, default=10000, help="Client states per second the core share is given for")
+    parser.add_argument("-batchSizes", type=int, nargs="+", default=[1, 32], help="Client states per proxy message")
+    parser.add_argument("-messages", type=int, default=20000, help="Client states digested per measurement")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps({
+        "rate": args.rate,
+        "results": [run(batch_size, args.messages, args.rate) for batch_size in args.batchSizes],
+    }, indent=2))
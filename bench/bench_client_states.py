@@ -0,0 +1,141 @@
+"""Measures the master server's client state processing loop.
+
+Reports the CPU used by the loop while the queue is idle, and the throughput of 
+``Server.handle_client_states`` with 10, 100 and 1000 trains reporting. The idle 
+CPU of the previous ``qsize()`` polling loop is measured alongside for comparison.
+
+usage: python3 -m bench.bench_client_states [-trains 10 100 1000] [-reports 5] [-idleSeconds 2]
+"""
+import argparse
+import json
+import logging
+import socket
+import threading
+import time
+from queue import Queue
+
+import TrackNet_pb2
+import utils
+from server import Server
+from utils import receive
+
+
+def legacy_polling_loop(client_state_queue: Queue, stop: threading.Event):
+    """The loop ``handle_client_states`` used before it blocked on the queue."""
+    while not stop.is_set():
+        if client_state_queue.qsize() != 0:
+            client_state_queue.get_nowait()
+
+
+def measure_cpu(target, seconds: float) -> float:
+    """Runs ``target`` for ``seconds`` and returns the CPU used as a fraction of one core."""
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    target(seconds)
+    return (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+
+
+def idle_legacy(seconds: float):
+    stop = threading.Event()
+    thread = threading.Thread(target=legacy_polling_loop, args=(Queue(), stop), daemon=True)
+    thread.start()
+    time.sleep(seconds)
+    stop.set()
+    thread.join()
+
+
+def idle_server(seconds: float):
+    server = Server()
+    utils.exit_flag = False
+    thread = threading.Thread(target=server.handle_client_states, daemon=True)
+    thread.start()
+    time.sleep(seconds)
+    utils.exit_flag = True
+    thread.join()
+
+
+def create_client_state(train_id: str, host: str, port: int) -> TrackNet_pb2.ClientState:
+    """Creates the client state of a train parked at junction A, waiting to go to D."""
+    client_state = TrackNet_pb2.ClientState()
+    client_state.client.host = host
+    client_state.client.port = port
+    client_state.train.id = train_id
+    client_state.train.length = 3
+    client_state.train.state = TrackNet_pb2.Train.TrainState.PARKED
+    client_state.speed = 0
+    client_state.condition = TrackNet_pb2.TrackCondition.GOOD
+    client_state.location.front_junction_id = "A"
+    client_state.location.back_junction_id = "A"
+    client_state.location.front_track_id = "Track (A, B)"
+    client_state.location.back_track_id = "Track (A, B)"
+    client_state.location.front_position = 0
+    client_state.location.back_position = 0
+    client_state.route.junction_ids.extend(["A", "B", "C", "D"])
+    client_state.route.current_junction_index = 0
+    return client_state
+
+
+def throughput(num_trains: int, reports_per_train: int) -> dict:
+    """Queues ``reports_per_train`` client states for every train and times how long the 
+    server takes to answer them. The queue keeps the newest state of each train, so the 
+    server answers each train once."""
+    server = Server()
+    for _ in range(num_trains):
+        server.railway.create_new_train(3, "A")
+
+    server_sock, proxy_sock = socket.socketpair()
+    total = num_trains * reports_per_train
+    received = 0
+
+    def drain():
+        nonlocal received
+        while received < num_trains and receive(proxy_sock, timeout=600):
+            received += 1
+
+    drain_thread = threading.Thread(target=drain, daemon=True)
+    drain_thread.start()
+
+    for report in range(reports_per_train):
+        for train_id in server.railway.trains.keys():
+            client_state = create_client_state(train_id, "127.0.0.1", report)
+            server.client_state_queue.put([client_state], server_sock, False)
+
+    utils.exit_flag = False
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    thread = threading.Thread(target=server.handle_client_states, daemon=True)
+    thread.start()
+    drain_thread.join()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    utils.exit_flag = True
+    thread.join()
+    proxy_sock.close()
+
+    return {
+        "trains": num_trains,
+        "client_states": total,
+        "responses": received,
+        "seconds": round(elapsed, 4),
+        "client_states_per_second": round(total / elapsed, 1),
+        "cpu_seconds": round(cpu, 4),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the server's client state loop")
+    parser.add_argument("-trains", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("-reports", type=int, default=5, help="Client states sent per train")
+    parser.add_argument("-idleSeconds", type=float, default=2)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    results = {
+        "idle_cpu_fraction": {
+            "legacy_polling": round(measure_cpu(idle_legacy, args.idleSeconds), 4),
+            "blocking_batched": round(measure_cpu(idle_server, args.idleSeconds), 4),
+        },
+        "throughput": [throughput(n, args.reports) for n in args.trains],
+    }
+    print(json.dumps(results, indent=2))
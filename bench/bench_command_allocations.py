@@ -0,0 +1,132 @@
+"""Measures the memory churn and garbage collection caused by building commands during
+conflict analysis.
+
+Builds a synthetic grid, puts several running trains on many of its tracks with
+``bench.topology.fill_tracks`` and marks some of those tracks bad, then repeatedly runs
+the linear parts of conflict analysis that give a command to every train:
+
+- ``incremental``: ``ConflictAnalyzer.resolve_conflicts_incremental`` with every train
+  marked unanalyzed, which builds a command for each of them.
+- ``track_conflicts``: ``resolve_bad_track_condition`` and ``resolve_current_track_conflict``
+  over every track, which override the commands of the trains on bad tracks and behind
+  slowed or stopped trains.
+
+For each it reports the mean time per pass, the memory allocated per pass as traced by
+``tracemalloc`` (the peak above the memory in use before the pass), and the number and
+total length of the garbage collector runs, timed with ``gc.callbacks``.
+
+usage: python3 -m bench.bench_command_allocations [-junctions 2500] [-tracks 1000 4000] [-trainsPerTrack 4] [-runs 20]
+"""
+import argparse
+import gc
+import json
+import logging
+import random
+import time
+import tracemalloc
+
+import utils
+from bench import topology
+from classes.conflict_analyzer import ConflictAnalyzer
+from classes.enums import TrackCondition
+from classes.railway import Railway
+
+
+class GcTimer:
+    def __init__(self):
+        self.collections = 0
+        self.seconds = 0.0
+        self.started = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.started = time.perf_counter()
+        elif self.started is not None:
+            self.collections += 1
+            self.seconds += time.perf_counter() - self.started
+            self.started = None
+
+
+def build_railway(num_junctions: int, num_tracks: int, trains_per_track: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    junctions, tracks = topology.grid(num_junctions, rng)
+    railway = Railway(None, junctions, tracks)
+    num_trains = topology.fill_tracks(railway, min(num_tracks, len(railway.map.tracks)), trains_per_track, rng)
+    for track in railway.map.tracks.values():
+        if track.trains and rng.random() < 0.2:
+            railway.map.set_track_condition(track.name, TrackCondition.BAD)
+    return railway, num_trains
+
+
+def analyze_all(railway) -> dict:
+    railway.unanalyzed_trains.update(railway.trains.keys())
+    return ConflictAnalyzer.resolve_conflicts_incremental(railway, {})
+
+
+def resolve_track_conflicts(railway, commands: dict) -> dict:
+    commands = dict(commands)
+    for track_id in railway.map.tracks.keys():
+        commands = ConflictAnalyzer.resolve_bad_track_condition(railway, commands, track_id)
+    for track_id in railway.map.tracks.keys():
+        commands = ConflictAnalyzer.resolve_current_track_conflict(railway, commands, track_id)
+    return commands
+
+
+def measure(runs: int, function) -> dict:
+    gc_timer = GcTimer()
+    gc.collect()
+    gc.callbacks.append(gc_timer)
+    try:
+        start = time.perf_counter()
+        for _ in range(runs):
+            function()
+        seconds = time.perf_counter() - start
+    finally:
+        gc.callbacks.remove(gc_timer)
+
+    allocated = []
+    for _ in range(min(runs, 3)):
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        commands = function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        allocated.append(peak - before)
+
+    return {
+        "mean_ms": round(seconds / runs * 1000, 2),
+        "allocated_kib_per_pass": round(min(allocated) / 1024, 1),
+        "gc_collections_per_pass": round(gc_timer.collections / runs, 2),
+        "gc_ms_per_pass": round(gc_timer.seconds / runs * 1000, 3),
+        "distinct_command_objects": len({id(command) for command in commands.values()}),
+    }
+
+
+def run(num_junctions: int, num_tracks: int, trains_per_track: int, runs: int, seed: int) -> dict:
+    # the incremental analysis allows one train per track, the track conflict checks are for several
+    single_railway, single_trains = build_railway(num_junctions, num_tracks, 1, seed)
+    railway, num_trains = build_railway(num_junctions, num_tracks, trains_per_track, seed)
+    # start every train from the same command, the track checks replace commands rather than change them
+    command = next(iter(analyze_all(single_railway).values()))
+    commands = {name: command for name in railway.trains}
+    return {
+        "incremental": {"trains": single_trains, **measure(runs, lambda: analyze_all(single_railway))},
+        "track_conflicts": {"trains": num_trains, **measure(runs, lambda: resolve_track_conflicts(railway, commands))},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark command allocations in conflict analysis")
+    parser.add_argument("-junctions", type=int, default=2500)
+    parser.add_argument("-tracks", type=int, nargs="+", default=[1000, 4000], help="Tracks to put trains on")
+    parser.add_argument("-trainsPerTrack", type=int, default=4, help="The most trains put on one track")
+    parser.add_argument("-runs", type=int, default=20, help="Analysis passes to time")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps([
+        run(args.junctions, num_tracks, args.trainsPerTrack, args.runs, args.seed) for num_tracks in args.tracks
+    ], indent=2))
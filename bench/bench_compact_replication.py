@@ -0,0 +1,103 @@
+"""Compares replicating the railway with names against replicating it with interned ids.
+
+Builds a synthetic grid with trains spread over it, moves the trains around, then
+reports for a full ``RailwayUpdate`` and for a ``RailwayDelta`` of the trains that moved:
+
+- the serialized size with names and with ids, and the size of the ``SymbolTableUpdate``
+  a slave receives once per connection before the first compact message.
+- the time to convert the railway to the message, serialize it and parse it.
+- for the compact update, the time a promoted slave takes to expand it with the
+  symbol tables back into the message with names.
+
+usage: python3 -m bench.bench_compact_replication [-junctions 1000] [-trains 1000 10000] [-moves 1000] [-repeat 5]
+"""
+import argparse
+import json
+import logging
+import random
+import time
+
+import TrackNet_pb2
+import utils
+from bench import topology
+from converters.compact_converter import CompactConverter
+from converters.railway_converter import RailwayConverter
+
+
+def best_of(repeat: int, function) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def measure(repeat: int, convert, message_class) -> tuple:
+    convert_seconds, message = best_of(repeat, convert)
+    serialize_seconds, data = best_of(repeat, message.SerializeToString)
+    parse_seconds, _ = best_of(repeat, lambda: message_class.FromString(data))
+
+    def milliseconds(seconds):
+        return round(seconds * 1000, 2)
+
+    return message, {
+        "bytes": len(data),
+        "convert_ms": milliseconds(convert_seconds),
+        "serialize_ms": milliseconds(serialize_seconds),
+        "parse_ms": milliseconds(parse_seconds),
+    }
+
+
+def run(num_junctions: int, num_trains: int, moves: int, repeat: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    railway = topology.build_railway("grid", num_junctions, num_trains, rng)
+    trains = list(railway.trains.values())
+    railway.pop_changes()
+    for _ in range(moves):
+        topology.advance_train(railway, rng.choice(trains), rng)
+    train_ids, track_ids, junction_ids = railway.pop_changes()
+
+    symbols = railway.get_symbols()
+    symbols_pb = CompactConverter.create_symbol_table_update(symbols, (0, 0, 0))
+
+    _, named_update = measure(repeat, lambda: RailwayConverter.convert_railway_obj_to_pb(railway), TrackNet_pb2.Railway)
+    compact_railway, compact_update = measure(
+        repeat, lambda: CompactConverter.convert_railway_obj_to_compact_pb(railway), TrackNet_pb2.CompactRailway
+    )
+    expand_seconds, _ = best_of(repeat, lambda: CompactConverter.expand_railway_pb(compact_railway, symbols))
+    compact_update["expand_ms"] = round(expand_seconds * 1000, 2)
+
+    _, named_delta = measure(
+        repeat, lambda: RailwayConverter.convert_railway_delta_to_pb(railway, train_ids, track_ids, junction_ids),
+        TrackNet_pb2.RailwayDelta,
+    )
+    _, compact_delta = measure(
+        repeat, lambda: CompactConverter.convert_railway_delta_to_compact_pb(railway, train_ids, track_ids, junction_ids),
+        TrackNet_pb2.RailwayDelta,
+    )
+
+    return {
+        "trains": num_trains,
+        "changed_trains": len(train_ids),
+        "symbol_table_bytes": symbols_pb.ByteSize(),
+        "update": {"named": named_update, "compact": compact_update},
+        "delta": {"named": named_delta, "compact": compact_delta},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark compact railway replication")
+    parser.add_argument("-junctions", type=int, default=1000)
+    parser.add_argument("-trains", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("-moves", type=int, default=1000, help="Train moves made before the delta is taken")
+    parser.add_argument("-repeat", type=int, default=5, help="Runs per measurement, the fastest is reported")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps([
+        run(args.junctions, num_trains, args.moves, args.repeat, args.seed) for num_trains in args.trains
+    ], indent=2))
@@ -0,0 +1,144 @@
+"""Measures the cost of one train update followed by conflict analysis.
+
+Builds a line of junctions with one train parked at each, routed over the next two
+junctions, so every train running on its first track competes with the next train
+for the same following track. Each update either unparks a parked train onto its
+track or parks a running train back at its origin, and every tenth update also flips
+the condition of a random track.
+
+Reports the mean and 99th percentile time per update for
+``ConflictAnalyzer.resolve_conflicts_incremental`` and, up to ``-fullMaxTrains``,
+for the full ``resolve_conflicts_simple``. When both run, the commands they produce
+are compared after every update and any difference is reported.
+
+usage: python3 -m bench.bench_conflict_analyzer [-trains 10 100 1000 10000] [-updates 500] [-fullMaxTrains 1000]
+"""
+import argparse
+import json
+import logging
+import random
+import time
+
+import utils
+from classes.conflict_analyzer import ConflictAnalyzer
+from classes.enums import TrackCondition, TrainState
+from classes.location import Location
+from classes.railway import Railway
+from classes.route import Route
+
+
+def build_railway(num_trains: int) -> Railway:
+    junctions = [f"J{i}" for i in range(num_trains + 2)]
+    tracks = [(junctions[i], junctions[i + 1], 100) for i in range(num_trains + 1)]
+    railway = Railway(None, junctions, tracks)
+
+    for i in range(num_trains):
+        train = railway.create_new_train(5, junctions[i])
+        railway.update_train(train, TrainState.PARKED, parked_location(railway, i), make_route(railway, i))
+
+    return railway
+
+
+def make_route(railway: Railway, index: int) -> Route:
+    return Route([railway.map.junctions[f"J{index + offset}"] for offset in range(3)])
+
+
+def first_track(railway: Railway, index: int):
+    return railway.map.junctions[f"J{index}"].neighbors[f"J{index + 1}"]
+
+
+def parked_location(railway: Railway, index: int) -> Location:
+    junction = railway.map.junctions[f"J{index}"]
+    track = first_track(railway, index)
+    return Location(junction, junction, track, track, 0, 0)
+
+
+def running_location(railway: Railway, index: int) -> Location:
+    junction = railway.map.junctions[f"J{index}"]
+    track = first_track(railway, index)
+    return Location(junction, junction, track, track, 10, 5)
+
+
+def apply_update(railway: Railway, rng: random.Random, update: int):
+    index = rng.randrange(len(railway.trains))
+    train = railway.trains[f"Train{index}"]
+    if train.state == TrainState.PARKED:
+        railway.update_train(train, TrainState.RUNNING, running_location(railway, index), make_route(railway, index))
+    else:
+        railway.update_train(train, TrainState.PARKED, parked_location(railway, index), make_route(railway, index))
+
+    if update % 10 == 0:
+        track = first_track(railway, rng.randrange(len(railway.trains)))
+        condition = TrackCondition.BAD if track.condition == TrackCondition.GOOD else TrackCondition.GOOD
+        railway.map.set_track_condition(track.name, condition)
+
+
+def count_mismatches(incremental: dict, full: dict) -> int:
+    mismatches = 0
+    for train_id, command in full.items():
+        other = incremental.get(train_id)
+        if other is None or other.status != command.status or other.speed != command.speed:
+            mismatches += 1
+    return mismatches + len(incremental.keys() - full.keys())
+
+
+def summarize(durations: list) -> dict:
+    durations = sorted(durations)
+    return {
+        "mean_us": round(sum(durations) / len(durations) * 1e6, 1),
+        "p99_us": round(durations[int(len(durations) * 0.99)] * 1e6, 1),
+    }
+
+
+def run(num_trains: int, updates: int, run_full: bool, seed: int) -> dict:
+    railway = build_railway(num_trains)
+    rng = random.Random(seed)
+    commands = ConflictAnalyzer.resolve_conflicts_incremental(railway, {})
+
+    incremental_durations = []
+    full_durations = []
+    mismatches = 0
+
+    for update in range(updates):
+        apply_update(railway, rng, update)
+
+        start = time.perf_counter()
+        commands = ConflictAnalyzer.resolve_conflicts_incremental(railway, commands)
+        incremental_durations.append(time.perf_counter() - start)
+
+        if run_full:
+            start = time.perf_counter()
+            full_commands = ConflictAnalyzer.resolve_conflicts_simple(railway, {})
+            full_durations.append(time.perf_counter() - start)
+            mismatches += count_mismatches(commands, full_commands)
+
+    result = {
+        "trains": num_trains,
+        "updates": updates,
+        "incremental": summarize(incremental_durations),
+    }
+    if run_full:
+        result["full"] = summarize(full_durations)
+        result["mismatched_commands"] = mismatches
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark incremental conflict analysis")
+    parser.add_argument("-trains", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("-updates", type=int, default=500)
+    parser.add_argument("-fullMaxTrains", type=int, default=1000, help="Largest train count to also run the full analysis for")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    for num_trains in args.trains:
+        run_full = num_trains <= args.fullMaxTrains
+        # the full analysis is quadratic, so fewer updates keep the largest runs short
+        updates = args.updates if not run_full or num_trains < 1000 else max(args.updates // 10, 20)
+        results.append(run(num_trains, updates, run_full, args.seed))
+
+    print(json.dumps(results, indent=2))
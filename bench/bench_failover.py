@@ -0,0 +1,174 @@
+"""Measures how long a slave takes to answer its first client state after the master is lost.
+
+Builds a grid railway with ``-trains`` parked trains and ``-tracks`` tracks holding running
+trains, and replicates it from a master ``Server`` to a slave ``Server`` over a socket pair.
+The master then moves ``-movesPerUpdate`` random trains per update for ``-updates``
+updates, analyzing and replicating each, before it stops. The time is taken from when the
+master stops until the promoted slave's response to one client state reaches the proxy:
+
+- ``warm_standby``: the slave applied every update to its live railway and conflict
+  commands as it arrived, so promotion only flips its role.
+- ``rebuild_at_promotion``: the railway is built from the last checkpoint when the slave
+  is promoted and conflict analysis then starts over for every train, as slaves did before.
+
+The time the warm slave spent applying each delta it received, off the failover path, is
+reported alongside; a delta covers several updates when the replicator coalesced them. Detecting the master's loss is up to the proxy's heartbeats and not included.
+
+usage: python3 -m bench.bench_failover [-trains 1000 10000] [-junctions 2500] [-updates 50] [-movesPerUpdate 100]
+"""
+import argparse
+import gc
+import json
+import logging
+import random
+import socket
+import threading
+import time
+
+import TrackNet_pb2
+import utils
+from bench import topology
+from classes.conflict_analyzer import ConflictAnalyzer
+from converters.compact_converter import CompactConverter
+from converters.enum_converter import EnumConverter
+from converters.railway_converter import RailwayConverter
+from converters.train_converter import TrainConverter
+from replication import SlaveReplicator
+from server import Server
+from utils import receive
+
+
+def create_server(num_junctions: int, num_trains: int, num_tracks: int, seed: int) -> Server:
+    server = Server()
+    rng = random.Random(seed)
+    server.railway = topology.build_railway("grid", num_junctions, num_trains, rng)
+    topology.fill_tracks(server.railway, num_tracks, 1, rng)
+    server.railway.pop_changes()
+    return server
+
+
+def create_client_state(train, sequence: int) -> TrackNet_pb2.ClientState:
+    """Creates the client state a train's client reports where the railway has it."""
+    client_state = TrackNet_pb2.ClientState()
+    client_state.client.host = "127.0.0.1"
+    client_state.client.port = 1
+    client_state.train.id = train.name
+    client_state.train.length = train.length
+    client_state.train.state = EnumConverter.train_state_enum_to_pb(train.state)
+    client_state.condition = TrackNet_pb2.TrackCondition.GOOD
+    client_state.location.CopyFrom(TrainConverter.convert_location_obj_to_pb(train.location))
+    client_state.route.CopyFrom(TrainConverter.convert_route_obj_to_pb(train.route))
+    client_state.sequence = sequence
+    return client_state
+
+
+def promote(server: Server):
+    assignment = TrackNet_pb2.InitConnection()
+    assignment.server_assignment.is_master = True
+    server.slave_proxy_communication(None, assignment.SerializeToString())
+
+
+def time_first_response(server: Server, client_state: TrackNet_pb2.ClientState, lost: float) -> float:
+    """Has ``server`` handle one client state and returns the seconds from ``lost`` until
+    the response reached the proxy."""
+    server_sock, proxy_sock = socket.socketpair()
+    server.client_state_queue.put([client_state], server_sock, False)
+    server.handle_client_state_batch(server.client_state_queue.take(0))
+    receive(proxy_sock)
+    elapsed = time.perf_counter() - lost
+    server_sock.close()
+    proxy_sock.close()
+    return elapsed
+
+
+def run(num_trains: int, num_junctions: int, num_tracks: int, updates: int, moves_per_update: int, seed: int) -> dict:
+    utils.exit_flag = False
+    master = create_server(num_junctions, num_trains, num_tracks, seed)
+    master.is_master = True
+    master.client_commands = ConflictAnalyzer.resolve_conflicts_incremental(master.railway, master.client_commands)
+
+    slave = create_server(num_junctions, 0, 0, seed)
+    slave.connected_to_master = True
+    apply_seconds = []
+    apply_railway_delta = slave.apply_railway_delta
+
+    def timed_apply_railway_delta(conn, railway_delta):
+        start = time.perf_counter()
+        apply_railway_delta(conn, railway_delta)
+        apply_seconds.append(time.perf_counter() - start)
+
+    slave.apply_railway_delta = timed_apply_railway_delta
+
+    master_sock, slave_sock = socket.socketpair()
+    replicator = SlaveReplicator(master_sock, "slave", master.send_checkpoint_to_slave, symbols=master.railway.get_symbols())
+    with master.lock:
+        master.send_checkpoint_to_slave(replicator)
+        master.slave_replicators.append(replicator)
+        checkpoint = master.create_railway_update_message().SerializeToString()
+    replicator.start()
+    threading.Thread(target=slave.handle_master_communication, args=(slave_sock,), daemon=True).start()
+
+    rng = random.Random(seed)
+    trains = list(master.railway.trains.values())
+    for _ in range(updates):
+        with master.lock:
+            for train in rng.sample(trains, moves_per_update):
+                topology.advance_train(master.railway, train, rng)
+            master.client_commands = ConflictAnalyzer.resolve_conflicts_incremental(master.railway, master.client_commands)
+            master.talk_to_slaves(master.create_replication_message())
+
+    while slave.backup_sequence != master.replication_sequence:
+        time.sleep(0.001)
+    # the sequence is set before the last update is analyzed, under the lock
+    with slave.lock:
+        pass
+
+    train = master.railway.trains[sorted(master.railway.trains)[0]]
+    client_state = create_client_state(train, 1)
+    replicator.close()
+
+    # warm standby: the promoted slave already holds the railway and commands
+    gc.collect()
+    lost = time.perf_counter()
+    promote(slave)
+    warm = time_first_response(slave, client_state, lost)
+
+    # rebuild at promotion: the railway is built from the checkpoint, as the deltas
+    # after it are applied to it, and every train is analyzed for the first response
+    cold = create_server(num_junctions, 0, 0, seed)
+    cold.is_master = True
+    gc.collect()
+    lost = time.perf_counter()
+    railway_update = TrackNet_pb2.RailwayUpdate()
+    railway_update.ParseFromString(checkpoint)
+    railway_pb = CompactConverter.expand_railway_pb(railway_update.compact_railway, master.railway.get_symbols())
+    RailwayConverter.update_railway_with_pb(railway_pb, cold.railway)
+    cold.railway.pop_changes()
+    cold.railway.rebuild_waiting_index()
+    rebuild = time_first_response(cold, client_state, lost)
+
+    return {
+        "trains": len(master.railway.trains),
+        "warm_standby_ms": round(warm * 1000, 3),
+        "rebuild_at_promotion_ms": round(rebuild * 1000, 3),
+        "slave_apply_ms_per_delta": round(sum(apply_seconds) / max(len(apply_seconds), 1) * 1000, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the time from losing the master to the first response")
+    parser.add_argument("-trains", type=int, nargs="+", default=[1000, 10000], help="Trains parked at junctions")
+    parser.add_argument("-junctions", type=int, default=2500)
+    parser.add_argument("-tracks", type=int, default=500, help="Tracks to put running trains on")
+    parser.add_argument("-updates", type=int, default=50, help="Updates the master replicates before it stops")
+    parser.add_argument("-movesPerUpdate", type=int, default=100, help="Trains moved per update")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps([
+        run(num_trains, args.junctions, args.tracks, args.updates, args.movesPerUpdate, args.seed)
+        for num_trains in args.trains
+    ], indent=2))
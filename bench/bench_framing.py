@@ -0,0 +1,140 @@
+"""Compares the length prefixed framing helpers in ``utils`` with the ones they replaced.
+
+For each message size, a sender thread writes frames over a socket pair while the
+main thread reads them back. Reports messages and megabytes per second, the bytes
+allocated per received message (from ``tracemalloc``) and, for the previous
+helpers, how many messages were truncated by a short read.
+
+usage: python3 -m bench.bench_framing [-sizes 64 4096 262144] [-messages 2000]
+"""
+import argparse
+import json
+import logging
+import socket
+import threading
+import time
+import tracemalloc
+
+from utils import send, receive
+
+
+def legacy_send(sock: socket.socket, msg: bytes):
+    """The previous ``utils.send``: two ``sendall`` calls per message."""
+    sock.sendall(len(msg).to_bytes(4, "big"))
+    sock.sendall(msg)
+
+
+def legacy_receive(sock: socket.socket) -> bytes:
+    """The previous ``utils.receive``: one ``recv`` for the header and one for the payload."""
+    content_length = sock.recv(4)
+    return sock.recv(int.from_bytes(content_length, "big"))
+
+
+def read_remainder(sock: socket.socket, length: int):
+    """Reads the rest of a truncated legacy frame so the stream stays in sync."""
+    while length > 0:
+        length -= len(sock.recv(length))
+
+
+def run(size: int, messages: int, legacy: bool) -> dict:
+    sender_sock, receiver_sock = socket.socketpair()
+    sender_sock.settimeout(60)
+    receiver_sock.settimeout(60)
+    payload = bytes(size)
+
+    def sender():
+        for _ in range(messages):
+            if legacy:
+                legacy_send(sender_sock, payload)
+            else:
+                send(sender_sock, payload)
+
+    thread = threading.Thread(target=sender, daemon=True)
+    truncated = 0
+
+    start = time.perf_counter()
+    thread.start()
+
+    for _ in range(messages):
+        if legacy:
+            data = legacy_receive(receiver_sock)
+            if len(data) != size:
+                truncated += 1
+                read_remainder(receiver_sock, size - len(data))
+        else:
+            data = receive(receiver_sock, timeout=60, copy=False)
+
+    elapsed = time.perf_counter() - start
+    thread.join()
+    sender_sock.close()
+    receiver_sock.close()
+
+    return {
+        "messages_per_second": round(messages / elapsed, 1),
+        "megabytes_per_second": round(messages * size / elapsed / 1e6, 2),
+        "truncated_messages": truncated,
+    }
+
+
+def allocated_bytes_per_message(size: int, messages: int, legacy: bool) -> float:
+    """Measures the bytes allocated per received message, as the growth of the peak 
+    traced memory when each message is dropped right after it is read. The frames are 
+    written by a single ``sendall`` of a prebuilt stream, so the sender allocates 
+    nothing while the receiver is traced."""
+    sender_sock, receiver_sock = socket.socketpair()
+    frame = len(bytes(size)).to_bytes(4, "big") + bytes(size)
+    stream = frame * messages
+    thread = threading.Thread(target=sender_sock.sendall, args=(stream,), daemon=True)
+    thread.start()
+
+    # warm the per socket buffer before counting
+    if legacy:
+        legacy_receive(receiver_sock)
+    else:
+        receive(receiver_sock, timeout=60, copy=False)
+
+    allocated = 0
+    tracemalloc.start()
+    for _ in range(messages - 1):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        if legacy:
+            data = legacy_receive(receiver_sock)
+            if len(data) != size:
+                read_remainder(receiver_sock, size - len(data))
+        else:
+            data = receive(receiver_sock, timeout=60, copy=False)
+        del data
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - baseline
+    tracemalloc.stop()
+    thread.join()
+    sender_sock.close()
+    receiver_sock.close()
+
+    return round(allocated / (messages - 1), 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the socket framing helpers")
+    parser.add_argument("-sizes", type=int, nargs="+", default=[64, 4096, 262144])
+    parser.add_argument("-messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    for size in args.sizes:
+        messages = args.messages if size <= 65536 else max(args.messages // 20, 10)
+        results.append({
+            "size": size,
+            "messages": messages,
+            "legacy": run(size, messages, legacy=True),
+            "framed": run(size, messages, legacy=False),
+            "allocated_bytes_per_message": {
+                "legacy": allocated_bytes_per_message(size, min(messages, 50), legacy=True),
+                "framed": allocated_bytes_per_message(size, min(messages, 50), legacy=False),
+            },
+        })
+
+    print(json.dumps(results, indent=2))
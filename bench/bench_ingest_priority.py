@@ -0,0 +1,125 @@
+"""Measures the latency of the master's responses to client states by priority class,
+with the pending states handled in order of arrival and in order of urgency.
+
+Builds a synthetic grid with ``-parked`` trains parked at random junctions and running
+trains on ``-tracks`` random tracks and puts it on a master ``Server``. For
+``-seconds`` seconds, client states of random trains arrive at ``-rate`` a second,
+more than the master can handle, and the states that arrived while the master
+handled a batch are queued before it takes the next. The master takes at most
+``-maxBatchSize`` pending states per batch:
+
+- ``fifo``: the trains whose states have waited longest.
+- ``priority``: the most urgent trains, as scored by ``IngestScheduler`` with aging.
+
+For both it reports the client states handled and, for each priority class, the 50th,
+95th and 99th percentile of the time from the arrival of a state to its response.
+
+usage: python3 -m bench.bench_ingest_priority [-junctions 400] [-parked 2000] [-tracks 200] [-rate 20000] [-seconds 5] [-maxBatchSize 256]
+"""
+import argparse
+import json
+import logging
+import random
+import socket
+import threading
+import time
+
+import TrackNet_pb2
+import utils
+from bench import topology
+from classes.enums import TrainSpeed, TrainState
+from converters.enum_converter import EnumConverter
+from converters.train_converter import TrainConverter
+from server import Server
+from utils import receive
+
+
+def create_client_states(railway) -> list:
+    """Returns a client state for every train, at the train's current location."""
+    client_states = []
+    for train in railway.trains.values():
+        client_state = TrackNet_pb2.ClientState()
+        client_state.client.host = "127.0.0.1"
+        client_state.client.port = 1
+        client_state.train.id = train.name
+        client_state.train.length = train.length
+        client_state.train.state = EnumConverter.train_state_enum_to_pb(train.state)
+        client_state.speed = TrainSpeed.FAST.value if train.state == TrainState.RUNNING else 0
+        client_state.condition = TrackNet_pb2.TrackCondition.GOOD
+        client_state.location.CopyFrom(TrainConverter.convert_location_obj_to_pb(train.location))
+        client_state.route.CopyFrom(TrainConverter.convert_route_obj_to_pb(train.route))
+        client_states.append(client_state)
+    return client_states
+
+
+def run(mode: str, num_junctions: int, num_parked: int, num_tracks: int, rate: int, seconds: float,
+        max_batch_size: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    server = Server(max_batch_size=max_batch_size)
+    server.is_master = True
+    server.railway = topology.build_railway("grid", num_junctions, num_parked, rng)
+    topology.fill_tracks(server.railway, num_tracks, 1, rng)
+    client_states = create_client_states(server.railway)
+
+    if mode == "priority":
+        server.client_state_queue_timeout = 0
+        get_batch = server.get_client_state_batch
+    else:
+        def oldest_first(pending, now):
+            # scored only to record the priority class of the state
+            server.score_pending_client_state(pending, now)
+            return now - pending.received
+
+        get_batch = lambda: server.client_state_queue.take(timeout=0, limit=max_batch_size, key=oldest_first)
+
+    stop = threading.Event()
+    server_sock, proxy_sock = socket.socketpair()
+    threading.Thread(target=lambda: [receive(proxy_sock, timeout=1) for _ in iter(stop.is_set, True)], daemon=True).start()
+
+    # the states that arrived while a batch was handled are queued before the next batch is taken
+    handled = 0
+    sent = 0
+    start = time.perf_counter()
+    while True:
+        elapsed = time.perf_counter() - start
+        if elapsed < seconds:
+            due = int(elapsed * rate)
+            if due > sent:
+                server.client_state_queue.put([rng.choice(client_states) for _ in range(due - sent)], server_sock, True)
+                sent = due
+        elif not len(server.client_state_queue):
+            break
+
+        batch = get_batch()
+        if batch:
+            server.handle_client_state_batch(batch)
+            handled += len(batch)
+
+    stop.set()
+    metrics = server.get_ingest_metrics()
+    return {
+        "client_states_sent": sent,
+        "client_states_handled": handled,
+        "max_depth": metrics["max_depth"],
+        "latency": metrics["latency"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark response latency by priority class")
+    parser.add_argument("-junctions", type=int, default=400)
+    parser.add_argument("-parked", type=int, default=2000, help="Trains parked at junctions")
+    parser.add_argument("-tracks", type=int, default=200, help="Tracks to put running trains on")
+    parser.add_argument("-rate", type=int, default=20000, help="Client states sent per second")
+    parser.add_argument("-seconds", type=float, default=5)
+    parser.add_argument("-maxBatchSize", type=int, default=256, help="Most client states handled in one batch")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps({
+        mode: run(mode, args.junctions, args.parked, args.tracks, args.rate, args.seconds, args.maxBatchSize, args.seed)
+        for mode in ("fifo", "priority")
+    }, indent=2))
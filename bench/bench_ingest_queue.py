@@ -0,0 +1,99 @@
+"""Measures how the master catches up on a backlog of client states, as after a stall or
+a failover in which the proxies resend every unanswered state.
+
+``-trains`` trains each have ``-reportsBehind`` client states waiting, sent by
+``-proxies`` proxies, each state one position further along. The backlog is handled:
+
+- ``fifo``: every state in the order received, as the master's plain FIFO queue did.
+- ``coalesced``: taken from an ``IngestQueue``, which keeps the newest state of each train
+  and the proxies waiting for it.
+
+For both it reports the backlog depth, the client states the master applied and
+the time taken to catch up, and for the ingest queue its counters.
+
+usage: python3 -m bench.bench_ingest_queue [-trains 1000] [-reportsBehind 20] [-proxies 2]
+"""
+import argparse
+import json
+import logging
+import socket
+import threading
+import time
+
+import utils
+from bench.bench_client_states import create_client_state
+from ingest_queue import IngestQueue, PendingClientState
+from server import Server
+from utils import receive
+
+
+def create_backlog(train_ids: list, reports_behind: int, socks: list) -> list:
+    """Returns the (client_state, sock) pairs of the backlog, in the order received."""
+    backlog = []
+    for report in range(reports_behind):
+        for (index, train_id) in enumerate(train_ids):
+            client_state = create_client_state(train_id, "127.0.0.1", 1)
+            client_state.sequence = report + 1
+            client_state.location.front_position = report % 2
+            backlog.append((client_state, socks[index % len(socks)]))
+    return backlog
+
+
+def catch_up(num_trains: int, reports_behind: int, num_proxies: int, coalesce: bool) -> dict:
+    server = Server()
+    server.is_master = True
+    for _ in range(num_trains):
+        server.railway.create_new_train(3, "A")
+    train_ids = list(server.railway.trains.keys())
+
+    stop = threading.Event()
+    socks = []
+    for _ in range(num_proxies):
+        server_sock, proxy_sock = socket.socketpair()
+        threading.Thread(target=lambda sock=proxy_sock: [receive(sock, timeout=1) for _ in iter(stop.is_set, True)], daemon=True).start()
+        socks.append(server_sock)
+    backlog = create_backlog(train_ids, reports_behind, socks)
+
+    applied = 0
+    start = time.perf_counter()
+    if coalesce:
+        queue = IngestQueue()
+        for (client_state, sock) in backlog:
+            queue.put([client_state], sock, False)
+        depth = len(queue)
+        batch = queue.take(0)
+        applied = len(batch)
+        server.handle_client_state_batch(batch)
+    else:
+        depth = len(backlog)
+        # one state at a time, as the FIFO queue handed them over when the master fell behind
+        for (client_state, sock) in backlog:
+            server.handle_client_state_batch([PendingClientState(client_state, None, [(sock, False)])])
+            applied += 1
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    result = {
+        "backlog_depth": depth,
+        "client_states_applied": applied,
+        "catch_up_ms": round(elapsed * 1000, 2),
+    }
+    if coalesce:
+        result["ingest_queue"] = queue.get_metrics()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark catching up on a backlog of client states")
+    parser.add_argument("-trains", type=int, default=1000)
+    parser.add_argument("-reportsBehind", type=int, default=20, help="Client states waiting per train")
+    parser.add_argument("-proxies", type=int, default=2, help="Proxies the states arrive from")
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps({
+        "fifo": catch_up(args.trains, args.reportsBehind, args.proxies, False),
+        "coalesced": catch_up(args.trains, args.reportsBehind, args.proxies, True),
+    }, indent=2))
@@ -0,0 +1,129 @@
+"""Compares the slotted ``Location`` with the dictionary based one it replaced.
+
+Creates the given number of locations on a small railway and reports the memory
+each takes (from ``tracemalloc``), the time to create them, and the time to read
+and update cart fields across all of them: by attribute, through the mapping shim
+of ``CartPosition`` and, for the previous class, by dictionary key.
+
+usage: python3 -m bench.bench_location [-locations 100000] [-repeat 5]
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+import utils
+from classes.location import Location
+from classes.railway import Railway
+
+
+class LegacyLocation:
+    """The previous ``Location``: one dictionary per cart."""
+
+    def __init__(self, front_junction=None, back_junction=None,
+        front_track=None, back_track=None, front_position=0, back_position=0):
+        self.front_cart = {
+            "track": front_track,
+            "junction": front_junction,
+            "position": front_position,
+        }
+        self.back_cart = {
+            "track": back_track,
+            "junction": back_junction,
+            "position": back_position,
+        }
+
+
+def create(location_class, count: int, junction, track) -> tuple:
+    """Creates the locations, returning them with the seconds taken and bytes allocated.
+    They are created twice, as tracing the allocations slows the creation down."""
+    start = time.perf_counter()
+    locations = [location_class(junction, junction, track, track, i % 10, 0) for i in range(count)]
+    seconds = time.perf_counter() - start
+    del locations
+
+    tracemalloc.start()
+    locations = [location_class(junction, junction, track, track, i % 10, 0) for i in range(count)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return locations, seconds, allocated
+
+
+def best_of(repeat: int, function, locations) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(locations)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def read_keys(locations):
+    total = 0
+    for location in locations:
+        if location.front_cart["track"] is not None:
+            total += location.front_cart["position"] - location.back_cart["position"]
+    return total
+
+
+def read_attributes(locations):
+    total = 0
+    for location in locations:
+        if location.front_cart.track is not None:
+            total += location.front_cart.position - location.back_cart.position
+    return total
+
+
+def write_keys(locations):
+    for location in locations:
+        location.front_cart["position"] += 1
+        location.back_cart["position"] = location.front_cart["position"] - 1
+
+
+def write_attributes(locations):
+    for location in locations:
+        location.front_cart.position += 1
+        location.back_cart.position = location.front_cart.position - 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Location representation")
+    parser.add_argument("-locations", type=int, default=100000)
+    parser.add_argument("-repeat", type=int, default=5, help="Runs per access pattern, the fastest is reported")
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    railway = Railway(None, utils.initial_config["junctions"], utils.initial_config["tracks"])
+    junction = railway.map.junctions["A"]
+    track = railway.map.tracks["Track (A, B)"]
+
+    legacy, legacy_seconds, legacy_bytes = create(LegacyLocation, args.locations, junction, track)
+    slotted, slotted_seconds, slotted_bytes = create(Location, args.locations, junction, track)
+
+    def milliseconds(seconds):
+        return round(seconds * 1000, 2)
+
+    print(json.dumps({
+        "locations": args.locations,
+        "bytes_per_location": {
+            "legacy": round(legacy_bytes / args.locations, 1),
+            "slotted": round(slotted_bytes / args.locations, 1),
+        },
+        "create_ms": {
+            "legacy": milliseconds(legacy_seconds),
+            "slotted": milliseconds(slotted_seconds),
+        },
+        "read_ms": {
+            "legacy_keys": milliseconds(best_of(args.repeat, read_keys, legacy)),
+            "slotted_attributes": milliseconds(best_of(args.repeat, read_attributes, slotted)),
+            "slotted_keys": milliseconds(best_of(args.repeat, read_keys, slotted)),
+        },
+        "write_ms": {
+            "legacy_keys": milliseconds(best_of(args.repeat, write_keys, legacy)),
+            "slotted_attributes": milliseconds(best_of(args.repeat, write_attributes, slotted)),
+            "slotted_keys": milliseconds(best_of(args.repeat, write_keys, slotted)),
+        },
+    }, indent=2))
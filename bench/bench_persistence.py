@@ -0,0 +1,113 @@
+"""Measures what the write-ahead log and snapshots of ``Persistence`` cost the master,
+and how long a restarted master takes to recover from them.
+
+A master ``Server`` with ``-trains`` trains handles ``-updates`` batches of
+``-batchSize`` client states with a data directory, snapshotting every
+``-snapshotInterval`` batches, and, before and after, keeping only memory. It reports
+the mean time per batch with and without the data directory, and the difference, on the thread that handles client states, along with
+the records per fsync of the writer thread. A new ``Server`` is then started on the
+data directory, and the time it takes to load the snapshot and replay the log is
+reported with the number of records replayed.
+
+usage: python3 -m bench.bench_persistence [-trains 1000] [-updates 5000] [-batchSize 1] [-snapshotInterval 1000] [-dataDir DIR]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import TrackNet_pb2
+import utils
+from bench.bench_client_states import create_client_state
+from server import Server
+from utils import receive
+
+
+def handle_updates(server: Server, num_trains: int, updates: int, batch_size: int) -> float:
+    """Has the server handle ``updates`` batches of client states, alternating each
+    train between two positions, and returns the mean seconds per batch."""
+    server.is_master = True
+    for _ in range(num_trains):
+        server.railway.create_new_train(3, "A")
+    train_ids = list(server.railway.trains.keys())
+
+    stop = threading.Event()
+    server_sock, proxy_sock = socket.socketpair()
+    threading.Thread(target=lambda: [receive(proxy_sock, timeout=1) for _ in iter(stop.is_set, True)], daemon=True).start()
+
+    handling = 0.0
+    for update in range(updates):
+        client_states = []
+        for offset in range(batch_size):
+            index = update * batch_size + offset
+            client_state = create_client_state(train_ids[index % num_trains], "127.0.0.1", 1)
+            client_state.sequence = index // num_trains + 1
+            client_state.condition = TrackNet_pb2.TrackCondition.GOOD if index % 2 else TrackNet_pb2.TrackCondition.BAD
+            client_states.append(client_state)
+
+        server.client_state_queue.put(client_states, server_sock, True)
+        start = time.perf_counter()
+        server.handle_client_state_batch(server.client_state_queue.take(0))
+        handling += time.perf_counter() - start
+
+    stop.set()
+    server_sock.close()
+    return handling / updates
+
+
+def run(num_trains: int, updates: int, batch_size: int, snapshot_interval: int, data_dir: str) -> dict:
+    in_memory = handle_updates(Server(), num_trains, updates, batch_size)
+
+    server = Server(data_dir=data_dir)
+    server.persistence.snapshot_interval = snapshot_interval
+    persisted = handle_updates(server, num_trains, updates, batch_size)
+    server.persistence.close()
+    # the faster of a run before and after the persisted one, as the first warms up
+    in_memory = min(in_memory, handle_updates(Server(), num_trains, updates, batch_size))
+    metrics = server.persistence.get_metrics()
+    log_bytes = os.path.getsize(server.persistence.log_path)
+
+    start = time.perf_counter()
+    recovered = Server(data_dir=data_dir)
+    recovery = time.perf_counter() - start
+    recovered.persistence.close()
+
+    return {
+        "batch_size": batch_size,
+        "in_memory_ms_per_batch": round(in_memory * 1000, 4),
+        "persisted_ms_per_batch": round(persisted * 1000, 4),
+        "added_ms_per_batch": round((persisted - in_memory) * 1000, 4),
+        "records_per_sync": round(metrics["records_per_sync"], 2),
+        "snapshots_written": metrics["snapshots_written"],
+        "recovery": {
+            "trains": len(recovered.railway.trains),
+            "log_records": metrics["records_written"] % snapshot_interval if snapshot_interval else metrics["records_written"],
+            "log_megabytes": round(log_bytes / 1e6, 3),
+            "ms": round(recovery * 1000, 2),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the master's write-ahead log and recovery")
+    parser.add_argument("-trains", type=int, default=1000)
+    parser.add_argument("-updates", type=int, default=5000, help="Batches of client states handled")
+    parser.add_argument("-batchSize", type=int, default=1, help="Client states per batch")
+    parser.add_argument("-snapshotInterval", type=int, default=1000, help="Batches between snapshots")
+    parser.add_argument("-dataDir", type=str, help="Directory for the log and snapshots, a temporary one if not given")
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    data_dir = args.dataDir or tempfile.mkdtemp(prefix="tracknet-")
+    try:
+        print(json.dumps(run(args.trains, args.updates, args.batchSize, args.snapshotInterval, data_dir), indent=2))
+    finally:
+        if args.dataDir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
@@ -0,0 +1,116 @@
+"""Compares reporting client states at a fixed interval with the adaptive intervals of
+``ReportScheduler``.
+
+Builds a synthetic grid, parks trains at random junctions where they wait and puts
+running trains on random tracks with ``bench.topology.fill_tracks``. The running trains
+then move at full speed for ``-seconds`` of simulated time, each starting over at the
+beginning of its track when it reaches the end. Every train reports either every
+``-fixedInterval`` seconds or after the interval the master would hint in its response,
+``ReportScheduler.suggest_interval``.
+
+For both it reports the client states sent per train per minute, and how old the
+master's view of a train is while that train is within ``near_distance`` of a junction
+or another train: the mean and 95th percentile of the time since its last report, over
+every simulation step.
+
+usage: python3 -m bench.bench_report_intervals [-junctions 400] [-tracks 200] [-parked 500] [-seconds 300]
+"""
+import argparse
+import json
+import logging
+import random
+
+import utils
+from bench import topology
+from classes.command import CLEAR_FAST, STOP
+from classes.enums import TrainSpeed
+from classes.report_scheduler import ReportScheduler
+from classes.trainmovement import TrainMovement
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def simulate(running: list, parked: list, seconds: float, step: float, next_interval) -> dict:
+    distance_per_step = TrainSpeed.FAST.value * TrainMovement.SPEED_FACTOR / 3600 * step
+    scheduler = ReportScheduler()
+    trains = [(train, CLEAR_FAST) for train in running] + [(train, STOP) for train in parked]
+    last_report = {train.name: 0.0 for (train, _) in trains}
+    next_report = {train.name: next_interval(train, command) for (train, command) in trains}
+    reports = len(trains)
+    staleness = []
+
+    now = 0.0
+    while now < seconds:
+        now += step
+        for train in running:
+            location = train.location
+            track = location.front_cart.track
+            front = location.front_cart.position + distance_per_step
+            if front > track.length:
+                front = train.length + front - track.length
+            location.front_cart.position = front
+            location.back_cart.position = max(0, front - train.length)
+
+            distance = ReportScheduler.get_conflict_distance(train)
+            if distance is not None and distance <= scheduler.near_distance:
+                staleness.append(now - last_report[train.name])
+
+        for (train, command) in trains:
+            if now >= next_report[train.name]:
+                reports += 1
+                last_report[train.name] = now
+                next_report[train.name] = now + next_interval(train, command)
+
+    return {
+        "client_states_per_train_per_minute": round(reports / len(trains) / seconds * 60, 2),
+        "near_conflict_report_age_mean_s": round(sum(staleness) / len(staleness), 3) if staleness else 0.0,
+        "near_conflict_report_age_p95_s": round(percentile(staleness, 0.95), 3),
+    }
+
+
+def run(num_junctions: int, num_tracks: int, num_parked: int, trains_per_track: int,
+        seconds: float, step: float, fixed_interval: float, seed: int) -> dict:
+    results = {}
+    for mode in ("fixed", "adaptive"):
+        # both modes simulate the same trains from the same start
+        rng = random.Random(seed)
+        railway = topology.build_railway("grid", num_junctions, num_parked, rng)
+        parked = list(railway.trains.values())
+        topology.fill_tracks(railway, num_tracks, trains_per_track, rng)
+        running = [train for train in railway.trains.values() if train.location.front_cart.position > 0]
+
+        scheduler = ReportScheduler()
+        if mode == "fixed":
+            next_interval = lambda train, command: fixed_interval
+        else:
+            next_interval = lambda train, command: scheduler.suggest_interval(railway, train, command)
+        results[mode] = simulate(running, parked, seconds, step, next_interval)
+
+    results["trains"] = {"running": len(running), "parked": len(parked)}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark adaptive client report intervals")
+    parser.add_argument("-junctions", type=int, default=400)
+    parser.add_argument("-tracks", type=int, default=200, help="Tracks to put running trains on")
+    parser.add_argument("-parked", type=int, default=500, help="Trains parked at junctions")
+    parser.add_argument("-trainsPerTrack", type=int, default=1, help="The most trains put on one track")
+    parser.add_argument("-seconds", type=float, default=300, help="Simulated seconds")
+    parser.add_argument("-step", type=float, default=0.1, help="Simulated seconds per step")
+    parser.add_argument("-fixedInterval", type=float, default=5, help="The interval of the fixed schedule")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps(run(
+        args.junctions, args.tracks, args.parked, args.trainsPerTrack,
+        args.seconds, args.step, args.fixedInterval, args.seed,
+    ), indent=2))
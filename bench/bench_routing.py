@@ -0,0 +1,131 @@
+"""Compares ``Railmap.find_shortest_path`` with the Dijkstra search it replaced.
+
+Builds a synthetic grid map with random track lengths, picks a few origin junctions,
+as clients share a handful of origins, and looks up routes from them to random
+destinations, with and without a random track to avoid. Reports lookups per second
+for the previous search and for the cached shortest path trees, and checks that both
+return the same paths.
+
+usage: python3 -m bench.bench_routing [-junctions 1000 10000] [-lookups 2000] [-origins 8]
+"""
+import argparse
+import json
+import logging
+import random
+import time
+from queue import PriorityQueue
+
+import utils
+from classes.railmap import Railmap
+
+
+def legacy_find_shortest_path(railmap: Railmap, start_junction_name: str, destination_junction_name: str, avoid_track_name=None):
+    """The previous ``Railmap.find_shortest_path``: a fresh search on every call."""
+    distances = {junction: float("infinity") for junction in railmap.junctions}
+    previous_junctions = {junction: None for junction in railmap.junctions}
+    distances[start_junction_name] = 0
+
+    pq = PriorityQueue()
+    pq.put((0, start_junction_name))
+
+    while not pq.empty():
+        current_distance, current_junction_name = pq.get()
+        current_junction = railmap.junctions[current_junction_name]
+
+        if current_junction_name == destination_junction_name:
+            break
+
+        for neighbor_name, track in current_junction.neighbors.items():
+            if track.name == avoid_track_name:
+                continue
+
+            distance = current_distance + track.length
+            if distance < distances[neighbor_name]:
+                distances[neighbor_name] = distance
+                previous_junctions[neighbor_name] = current_junction_name
+                pq.put((distance, neighbor_name))
+
+    path = []
+    current = destination_junction_name
+    while current != start_junction_name:
+        if current is None:
+            return None
+        path.insert(0, railmap.junctions[current])
+        current = previous_junctions[current]
+    path.insert(0, railmap.junctions[start_junction_name])
+    return path
+
+
+def build_grid(num_junctions: int, rng: random.Random) -> Railmap:
+    width = int(num_junctions ** 0.5)
+    names = [f"J{i}" for i in range(num_junctions)]
+    tracks = []
+    for i in range(num_junctions):
+        if (i + 1) % width != 0 and i + 1 < num_junctions:
+            tracks.append((names[i], names[i + 1], rng.randint(10, 100)))
+        if i + width < num_junctions:
+            tracks.append((names[i], names[i + width], rng.randint(10, 100)))
+    return Railmap(names, tracks)
+
+
+def make_queries(railmap: Railmap, lookups: int, origins: int, rng: random.Random) -> list:
+    names = list(railmap.junctions.keys())
+    track_names = list(railmap.tracks.keys())
+    sources = rng.sample(names, origins)
+    queries = []
+    for i in range(lookups):
+        avoid = rng.choice(track_names) if i % 2 else None
+        queries.append((rng.choice(sources), rng.choice(names), avoid))
+    return queries
+
+
+def time_lookups(find, queries: list) -> tuple:
+    start = time.perf_counter()
+    paths = [find(*query) for query in queries]
+    return time.perf_counter() - start, paths
+
+
+def run(num_junctions: int, lookups: int, origins: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    railmap = build_grid(num_junctions, rng)
+    queries = make_queries(railmap, lookups, origins, rng)
+
+    # the previous search is slow on large maps, so it only runs on a sample of the queries
+    legacy_queries = queries[:max(lookups // 10, 20)]
+    legacy_seconds, legacy_paths = time_lookups(
+        lambda *query: legacy_find_shortest_path(railmap, *query), legacy_queries
+    )
+    cached_seconds, cached_paths = time_lookups(railmap.find_shortest_path, queries)
+    warm_seconds, _ = time_lookups(railmap.find_shortest_path, queries)
+
+    def names(path):
+        return None if path is None else [junction.name for junction in path]
+
+    mismatches = sum(
+        names(legacy) != names(cached) for legacy, cached in zip(legacy_paths, cached_paths)
+    )
+
+    return {
+        "junctions": len(railmap.junctions),
+        "tracks": len(railmap.tracks),
+        "lookups": lookups,
+        "legacy_lookups_per_second": round(len(legacy_queries) / legacy_seconds, 1),
+        "cached_lookups_per_second": round(lookups / cached_seconds, 1),
+        "warm_lookups_per_second": round(lookups / warm_seconds, 1),
+        "shortest_path_trees": len(railmap.shortest_path_trees),
+        "mismatched_paths": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark shortest path lookups on large maps")
+    parser.add_argument("-junctions", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("-lookups", type=int, default=2000)
+    parser.add_argument("-origins", type=int, default=8, help="Distinct start junctions among the lookups")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps([run(n, args.lookups, args.origins, args.seed) for n in args.junctions], indent=2))
@@ -0,0 +1,149 @@
+"""Measures replicating the master's railway to 1, 4 and 16 local slave servers.
+
+Starts a master ``Server`` and slave ``Server`` instances in one process, connected
+over socket pairs the way ``Server.connect_to_slave`` connects them, optionally with
+one more slave that reads each message ``-slowDelayMs`` late. The master then handles
+``-batches`` batches of client states, one per train, each batch replicated to every
+slave by ``Server.talk_to_slaves``.
+
+For each slave count it reports:
+
+- the mean time the master spends handling a batch, replication included, and how
+  long after the last batch the slaves held the master's latest sequence.
+- the replication messages sent to the prompt slaves and how many of them had to be
+  serialized, as each broadcast is serialized once for all slaves that send it as is.
+- with a slow slave, the messages sent to it and how many were coalesced.
+
+usage: python3 -m bench.bench_slave_fanout [-slaves 1 4 16] [-trains 200] [-batches 50] [-slowDelayMs 0]
+"""
+import argparse
+import json
+import logging
+import socket
+import threading
+import time
+
+import TrackNet_pb2
+import utils
+from bench.bench_client_states import create_client_state
+from replication import SlaveReplicator
+from server import Server
+from utils import receive
+
+
+def connect_slave(master: Server, name: str) -> socket.socket:
+    master_sock, slave_end = socket.socketpair()
+    replicator = SlaveReplicator(
+        master_sock, name, master.send_checkpoint_to_slave,
+        symbols=master.railway.get_symbols() if master.compact_replication else None,
+    )
+    with master.lock:
+        master.send_checkpoint_to_slave(replicator)
+        master.slave_replicators.append(replicator)
+    replicator.start()
+    return slave_end
+
+
+def read_messages(sock: socket.socket, delay: float, stop: threading.Event):
+    while not stop.is_set():
+        if receive(sock, timeout=1) is not None and delay:
+            time.sleep(delay)
+
+
+def wait_until_synced(master: Server, slaves: list, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if all(slave.backup_sequence == master.replication_sequence for slave in slaves):
+            return True
+        time.sleep(0.001)
+    return False
+
+
+def run(num_slaves: int, num_trains: int, batches: int, slow_delay: float) -> dict:
+    utils.exit_flag = False
+    stop = threading.Event()
+    master = Server()
+    master.is_master = True
+    for _ in range(num_trains):
+        master.railway.create_new_train(3, "A")
+
+    slaves = []
+    for index in range(num_slaves):
+        slave = Server()
+        slave.connected_to_master = True
+        slave_end = connect_slave(master, f"slave{index}")
+        threading.Thread(target=slave.handle_master_communication, args=(slave_end,), daemon=True).start()
+        slaves.append(slave)
+
+    slow_replicator = None
+    if slow_delay > 0:
+        slow_end = connect_slave(master, "slow")
+        slow_replicator = master.slave_replicators[-1]
+        threading.Thread(target=read_messages, args=(slow_end, slow_delay, stop), daemon=True).start()
+
+    wait_until_synced(master, slaves, 60)
+
+    server_sock, proxy_sock = socket.socketpair()
+    threading.Thread(target=read_messages, args=(proxy_sock, 0, stop), daemon=True).start()
+
+    train_ids = list(master.railway.trains.keys())
+    handling = 0.0
+    for batch in range(batches):
+        client_states = []
+        for train_id in train_ids:
+            client_state = create_client_state(train_id, "127.0.0.1", 1)
+            client_state.sequence = batch + 1
+            client_state.condition = TrackNet_pb2.TrackCondition.GOOD if batch % 2 else TrackNet_pb2.TrackCondition.BAD
+            client_states.append(client_state)
+
+        master.client_state_queue.put(client_states, server_sock, True)
+        start = time.perf_counter()
+        master.handle_client_state_batch(master.client_state_queue.take(0))
+        handling += time.perf_counter() - start
+
+    start = time.perf_counter()
+    synced = wait_until_synced(master, slaves, 60)
+    catch_up = time.perf_counter() - start
+
+    metrics = master.get_replication_metrics()
+    prompt = [metrics[f"slave{index}"] for index in range(num_slaves)]
+    result = {
+        "slaves": num_slaves,
+        "synced": synced,
+        "master_ms_per_batch": round(handling / batches * 1000, 3),
+        "catch_up_ms": round(catch_up * 1000, 2),
+        "messages_sent": sum(replicator["messages_sent"] for replicator in prompt),
+        "messages_serialized": sum(replicator["messages_serialized"] for replicator in prompt),
+        "megabytes_sent": round(sum(replicator["bytes_sent"] for replicator in prompt) / 1e6, 3),
+    }
+    if slow_replicator is not None:
+        slow = metrics["slow"]
+        result["slow_slave"] = {
+            "messages_sent": slow["messages_sent"],
+            "messages_coalesced": slow["messages_coalesced"],
+            "lag_updates": slow["lag_updates"],
+        }
+
+    stop.set()
+    for slave in slaves:
+        slave.connected_to_master = False
+    for replicator in master.slave_replicators:
+        replicator.close()
+    server_sock.close()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark replicating the railway to several slaves")
+    parser.add_argument("-slaves", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("-trains", type=int, default=200)
+    parser.add_argument("-batches", type=int, default=50, help="Batches of client states the master handles")
+    parser.add_argument("-slowDelayMs", type=float, default=0, help="Add a slave reading each message this late, 0 for none")
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps([
+        run(num_slaves, args.trains, args.batches, args.slowDelayMs / 1000) for num_slaves in args.slaves
+    ], indent=2))
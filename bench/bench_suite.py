@@ -0,0 +1,175 @@
+"""Scaling benchmark of the server side railway code on synthetic networks.
+
+For every combination of topology, junction count and train count, builds a railway
+with ``bench.topology`` and measures:
+
+- ``update_train``: one ``Railway.update_train`` call moving a train along its route,
+  including the shortest path lookup for a new route when it reaches its destination.
+- ``conflict_incremental``: ``ConflictAnalyzer.resolve_conflicts_incremental`` after each update.
+- ``conflict_simple``: a full ``ConflictAnalyzer.resolve_conflicts_simple`` pass, up to
+  ``-fullAnalysisMaxTrains`` trains since it is quadratic in the number of trains.
+- ``railway_to_pb``: ``RailwayConverter.convert_railway_obj_to_pb`` plus serialization,
+  as sent in a replication checkpoint.
+- ``pb_to_railway``: parsing a checkpoint and ``RailwayConverter.update_railway_with_pb``.
+- ``railway_delta``: ``RailwayConverter.convert_railway_delta_to_pb`` for the changes of one update.
+- ``shortest_path``: ``Railmap.find_shortest_path`` between random junctions.
+
+Each reports ops per second and latency percentiles from an untraced run, and the peak
+memory allocated during a short second run under ``tracemalloc``. The build reports its
+time and peak memory too. Output is JSON, one entry per combination, so runs can be
+compared to catch regressions.
+
+usage: python3 -m bench.bench_suite [-topologies grid ring scale_free real_world] [-junctions 100 1000] [-trains 10 100] [-ops 200]
+"""
+import argparse
+import json
+import logging
+import random
+import time
+import tracemalloc
+
+import TrackNet_pb2
+import utils
+from bench import topology
+from classes.conflict_analyzer import CollisionException, ConflictAnalyzer
+from classes.railway import Railway
+from converters.railway_converter import RailwayConverter
+
+
+def measure(operation, ops: int, traced_ops: int) -> dict:
+    """Times ``ops`` calls of ``operation`` and traces the memory of ``traced_ops`` more.
+
+    :param operation: A callable taking no arguments and returning the seconds spent in
+        the measured part of the call, so it can prepare its input untimed.
+    :param ops: The number of timed calls.
+    :param traced_ops: The number of calls made under ``tracemalloc``.
+    :return: A dictionary of ops per second, latency percentiles and peak memory.
+    """
+    latencies = []
+    for _ in range(ops):
+        latencies.append(operation())
+
+    tracemalloc.start()
+    for _ in range(traced_ops):
+        operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "ops": ops,
+        "ops_per_second": round(ops / sum(latencies), 1) if sum(latencies) else None,
+        "latency_us_p50": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "latency_us_p99": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run(topology_name: str, num_junctions: int, num_trains: int, ops: int, full_max_trains: int, seed: int) -> dict:
+    rng = random.Random(seed)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    railway = topology.build_railway(topology_name, num_junctions, num_trains, rng)
+    build_seconds = time.perf_counter() - start
+    _, build_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    trains = list(railway.trains.values())
+    commands = ConflictAnalyzer.resolve_conflicts_incremental(railway, {})
+    railway.pop_changes()
+    traced_ops = min(ops, 20)
+
+    def update_train():
+        train = rng.choice(trains)
+        start = time.perf_counter()
+        topology.advance_train(railway, train, rng)
+        return time.perf_counter() - start
+
+    def conflict_incremental():
+        topology.advance_train(railway, rng.choice(trains), rng)
+        start = time.perf_counter()
+        ConflictAnalyzer.resolve_conflicts_incremental(railway, commands)
+        return time.perf_counter() - start
+
+    def conflict_simple():
+        start = time.perf_counter()
+        ConflictAnalyzer.resolve_conflicts_simple(railway, {})
+        return time.perf_counter() - start
+
+    def railway_to_pb():
+        start = time.perf_counter()
+        RailwayConverter.convert_railway_obj_to_pb(railway).SerializeToString()
+        return time.perf_counter() - start
+
+    checkpoint = RailwayConverter.convert_railway_obj_to_pb(railway).SerializeToString()
+    junctions, tracks = list(railway.map.junction_names), [
+        (track.junctions[0], track.junctions[1], track.length) for track in railway.map.tracks.values()
+    ]
+    restored = Railway(None, junctions, tracks)
+
+    def pb_to_railway():
+        start = time.perf_counter()
+        railway_pb = TrackNet_pb2.Railway()
+        railway_pb.ParseFromString(checkpoint)
+        RailwayConverter.update_railway_with_pb(railway_pb, restored)
+        return time.perf_counter() - start
+
+    def railway_delta():
+        topology.advance_train(railway, rng.choice(trains), rng)
+        start = time.perf_counter()
+        RailwayConverter.convert_railway_delta_to_pb(railway, *railway.pop_changes()).SerializeToString()
+        return time.perf_counter() - start
+
+    def shortest_path():
+        origin, destination = rng.sample(railway.map.junction_names, 2)
+        start = time.perf_counter()
+        railway.map.find_shortest_path(origin, destination)
+        return time.perf_counter() - start
+
+    results = {
+        "topology": topology_name,
+        "junctions": len(railway.map.junctions),
+        "tracks": len(railway.map.tracks),
+        "trains": num_trains,
+        "build": {"seconds": round(build_seconds, 3), "peak_kib": round(build_peak / 1024, 1)},
+        "update_train": measure(update_train, ops, traced_ops),
+        "conflict_incremental": measure(conflict_incremental, ops, traced_ops),
+    }
+
+    if num_trains <= full_max_trains:
+        full_ops = max(ops // 50, 3)
+        try:
+            results["conflict_simple"] = measure(conflict_simple, full_ops, 1)
+        except CollisionException as e:
+            # trains are only moved onto empty tracks, so this points at a bug in the railway
+            results["conflict_simple"] = {"error": str(e)}
+
+    checkpoint_ops = max(ops // 20, 3)
+    results["railway_to_pb"] = measure(railway_to_pb, checkpoint_ops, 1)
+    results["pb_to_railway"] = measure(pb_to_railway, checkpoint_ops, 1)
+    results["railway_delta"] = measure(railway_delta, ops, traced_ops)
+    results["shortest_path"] = measure(shortest_path, ops, traced_ops)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the railway code on synthetic networks")
+    parser.add_argument("-topologies", nargs="+", default=list(topology.TOPOLOGIES.keys()), choices=list(topology.TOPOLOGIES.keys()))
+    parser.add_argument("-junctions", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("-trains", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("-ops", type=int, default=200, help="Timed operations per measurement")
+    parser.add_argument("-fullAnalysisMaxTrains", type=int, default=100, help="Largest train count to run resolve_conflicts_simple for")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    for topology_name in args.topologies:
+        for num_junctions in args.junctions:
+            for num_trains in args.trains:
+                results.append(run(topology_name, num_junctions, num_trains, args.ops, args.fullAnalysisMaxTrains, args.seed))
+
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,114 @@
+"""Compares a railway keeping its trains as objects with one keeping them in a ``TrainStore``.
+
+Builds the same synthetic grid with the same trains both ways, moves the trains around
+so the tracks fill up, and reports for each:
+
+- the memory taken per train, from ``tracemalloc``, including its location and route.
+- ``Railway.update_train`` calls per second, as made for client state updates.
+- the time to order the trains on every track front to back, as
+  ``ConflictAnalyzer.resolve_current_track_conflict`` does, by sorting the trains of
+  each track for the objects and with one sort over the columns for the store.
+- the time to find the trains within ``ConflictAnalyzer.SAFETY_DISTANCE`` of the end of
+  their track, as ``ConflictAnalyzer.resolve_immediate_junction_conflict`` does.
+
+usage: python3 -m bench.bench_train_store [-junctions 1000] [-trains 50000] [-moves 100000] [-repeat 5]
+"""
+import argparse
+import json
+import logging
+import random
+import time
+import tracemalloc
+
+import utils
+from bench import topology
+from classes.conflict_analyzer import ConflictAnalyzer
+
+
+def trains_by_track_objects(railway) -> dict:
+    return {
+        track.name: [train.name for train in sorted(track.trains.values(), key=lambda train: train.location.back_cart.position, reverse=True)]
+        for track in railway.map.tracks.values() if track.trains
+    }
+
+
+def trains_near_track_end_objects(railway, distance: float) -> list:
+    return [
+        train.name for track in railway.map.tracks.values() for train in track.trains.values()
+        if track.length - train.location.front_cart.position < distance
+    ]
+
+
+def best_of(repeat: int, function) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(columnar: bool, num_junctions: int, num_trains: int, moves: int, repeat: int, seed: int) -> dict:
+    tracemalloc.start()
+    empty = topology.build_railway("grid", num_junctions, 0, random.Random(seed), columnar=columnar)
+    empty_bytes, _ = tracemalloc.get_traced_memory()
+    del empty
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    railway = topology.build_railway("grid", num_junctions, num_trains, rng, columnar=columnar)
+    build_seconds = time.perf_counter() - start
+    railway_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    trains = list(railway.trains.values())
+    start = time.perf_counter()
+    for _ in range(moves):
+        topology.advance_train(railway, rng.choice(trains), rng)
+    update_seconds = time.perf_counter() - start
+
+    if columnar:
+        store = railway.train_store
+        order_seconds, by_track = best_of(repeat, store.get_trains_by_track)
+        near_seconds, near = best_of(repeat, lambda: store.get_trains_near_track_end(ConflictAnalyzer.SAFETY_DISTANCE))
+    else:
+        order_seconds, by_track = best_of(repeat, lambda: trains_by_track_objects(railway))
+        near_seconds, near = best_of(repeat, lambda: trains_near_track_end_objects(railway, ConflictAnalyzer.SAFETY_DISTANCE))
+
+    return {
+        "bytes_per_train": round((railway_bytes - empty_bytes) / num_trains, 1),
+        "column_bytes_per_train": round(railway.train_store.get_memory_bytes() / num_trains, 1) if columnar else None,
+        "build_seconds": round(build_seconds, 2),
+        "updates_per_second": round(moves / update_seconds, 1),
+        "trains_on_tracks": sum(len(names) for names in by_track.values()),
+        "order_by_track_ms": round(order_seconds * 1000, 2),
+        "near_track_end_ms": round(near_seconds * 1000, 2),
+        "trains_near_track_end": len(near),
+        # the same seed gives the same moves, so both runs must agree
+        "check": hash((tuple(sorted((name, tuple(names)) for name, names in by_track.items())), tuple(sorted(near)))),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the columnar train store")
+    parser.add_argument("-junctions", type=int, default=1000)
+    parser.add_argument("-trains", type=int, default=50000)
+    parser.add_argument("-moves", type=int, default=100000, help="Train moves made before the queries are timed")
+    parser.add_argument("-repeat", type=int, default=5, help="Runs per query, the fastest is reported")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    objects = run(False, args.junctions, args.trains, args.moves, args.repeat, args.seed)
+    columns = run(True, args.junctions, args.trains, args.moves, args.repeat, args.seed)
+    print(json.dumps({
+        "junctions": args.junctions,
+        "trains": args.trains,
+        "objects": objects,
+        "columns": columns,
+        "same_results": objects.pop("check") == columns.pop("check"),
+    }, indent=2))
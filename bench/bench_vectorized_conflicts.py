@@ -0,0 +1,99 @@
+"""Compares the vectorized per-track conflict checks with the train by train ones.
+
+Builds a synthetic grid, puts several running trains on many of its tracks with
+``bench.topology.fill_tracks`` and gives every train a random pending command, then
+times:
+
+- ``track_conflicts``: ``ConflictAnalyzer.resolve_current_track_conflict`` over every
+  track against one ``resolve_current_track_conflicts_vectorized`` call, which
+  includes gathering and sorting the trains.
+
+Both are run on a railway of objects and on a columnar one, and the commands are
+checked to be the same.
+
+usage: python3 -m bench.bench_vectorized_conflicts [-junctions 10000] [-tracks 1000 10000] [-trainsPerTrack 8] [-repeat 5]
+"""
+import argparse
+import json
+import logging
+import random
+import time
+
+import TrackNet_pb2
+import utils
+from bench import topology
+from classes.command import Command
+from classes.conflict_analyzer import ConflictAnalyzer
+from classes.enums import TrainSpeed
+from classes.railway import Railway
+
+STATUSES = [
+    (TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR, TrainSpeed.FAST),
+    (TrackNet_pb2.ServerResponse.UpdateStatus.CHANGE_SPEED, TrainSpeed.SLOW),
+    (TrackNet_pb2.ServerResponse.UpdateStatus.STOP, TrainSpeed.STOPPED),
+]
+
+
+def random_commands(railway: Railway, rng: random.Random) -> dict:
+    commands = {}
+    for train_id in railway.trains:
+        status, speed = rng.choice(STATUSES)
+        commands[train_id] = Command.of(status, speed.value)
+    return commands
+
+
+def track_conflicts_by_track(railway: Railway, commands: dict) -> dict:
+    for track_id in railway.map.tracks.keys():
+        commands = ConflictAnalyzer.resolve_current_track_conflict(railway, commands, track_id)
+    return commands
+
+
+def best_of(repeat: int, function) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(num_junctions: int, num_tracks: int, trains_per_track: int, columnar: bool, repeat: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    junctions, tracks = topology.grid(num_junctions, rng)
+    railway = Railway(None, junctions, tracks, columnar=columnar)
+    num_trains = topology.fill_tracks(railway, min(num_tracks, len(railway.map.tracks)), trains_per_track, rng)
+    commands = random_commands(railway, rng)
+
+    loop_seconds, loop_commands = best_of(repeat, lambda: track_conflicts_by_track(railway, dict(commands)))
+    vector_seconds, vector_commands = best_of(
+        repeat, lambda: ConflictAnalyzer.resolve_current_track_conflicts_vectorized(railway, dict(commands))
+    )
+
+    def milliseconds(seconds):
+        return round(seconds * 1000, 2)
+
+    return {
+        "columnar": columnar,
+        "tracks_filled": min(num_tracks, len(railway.map.tracks)),
+        "trains_on_tracks": num_trains,
+        "track_conflicts_ms": {"by_track": milliseconds(loop_seconds), "vectorized": milliseconds(vector_seconds)},
+        "mismatched_commands": sum(loop_commands[train_id] != vector_commands[train_id] for train_id in loop_commands),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized track conflict checks")
+    parser.add_argument("-junctions", type=int, default=10000)
+    parser.add_argument("-tracks", type=int, nargs="+", default=[1000, 10000], help="Tracks to put trains on")
+    parser.add_argument("-trainsPerTrack", type=int, default=8, help="The most trains put on one track")
+    parser.add_argument("-repeat", type=int, default=5, help="Runs per check, the fastest is reported")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps([
+        run(args.junctions, num_tracks, args.trainsPerTrack, columnar, args.repeat, args.seed)
+        for num_tracks in args.tracks for columnar in (False, True)
+    ], indent=2))
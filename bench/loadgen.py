@@ -0,0 +1,370 @@
+"""Drives many simulated trains against a proxy from one process.
+
+Each train reuses the ``Client`` logic for building client states and handling server
+responses, and ``TrainMovement`` for moving along its route. Instead of one process
+with its own position and send threads per train, every train is a coroutine on a
+single asyncio event loop. It moves its train by the time elapsed since its last
+report, sends a client state over its own connection, waits for the response and
+sleeps until its next report.
+
+Trains start all at once (``burst``), at a fixed rate (``uniform``) or as a Poisson
+process (``poisson``), and leave when they reach their destination or the run ends.
+Every request/response round trip is recorded in a per train latency histogram. The
+output is JSON with the overall histogram and percentiles, the spread of per train
+percentiles and counters for timeouts and reconnects.
+
+usage: python3 -m bench.loadgen -proxy localhost -proxyPort 5555 [-trains 1000] [-reportInterval 5] [-arrivals poisson -arrivalRate 100] [-duration 60] [-junctionDelay 5]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import resource
+import time
+from datetime import datetime
+
+import TrackNet_pb2
+from classes.enums import TrainState
+from classes.location import Location
+from classes.railmap import Railmap
+from classes.trainmovement import TrainMovement
+from client import Client
+from utils import FRAME_HEADER, initial_config
+
+
+class LatencyHistogram:
+    """Counts latencies in buckets whose bounds double, from 0.125 ms up.
+
+    Attributes
+    ----------
+    bounds : list
+        The upper bound in milliseconds of every bucket but the last, which is unbounded.
+    counts : list
+        The number of latencies in each bucket.
+    count : int
+        The number of latencies recorded.
+    total : float
+        The sum of the latencies recorded, in milliseconds.
+    maximum : float
+        The largest latency recorded, in milliseconds.
+    """
+
+    bounds = [0.125 * 2 ** i for i in range(18)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, latency_ms: float):
+        """Adds one latency to the histogram.
+
+        :param latency_ms: The latency in milliseconds.
+        """
+        index = 0
+        while index < len(self.bounds) and latency_ms > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += latency_ms
+        self.maximum = max(self.maximum, latency_ms)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Adds the latencies of another histogram to this one.
+
+        :param other: The histogram to add.
+        """
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the upper bound of the bucket holding the given percentile.
+
+        :param fraction: The percentile as a fraction, such as 0.99.
+        :return: The latency in milliseconds, or None if nothing was recorded.
+        """
+        if self.count == 0:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.maximum
+        return self.maximum
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.maximum, 3),
+            "buckets": {
+                (f"<={bound}" if index < len(self.bounds) else f">{self.bounds[-1]}"): count
+                for index, (bound, count) in enumerate(zip(self.bounds + [None], self.counts))
+                if count
+            },
+        }
+
+
+class SimulatedTrainMovement(TrainMovement):
+    """A ``TrainMovement`` that waits at junctions without sleeping. Instead of
+    blocking for ``junction_delay`` seconds on arrival, it records when the wait ends
+    and ``SimulatedClient.move`` leaves the junction once it has.
+
+    Attributes
+    ----------
+    parked_until : float
+        The ``time.monotonic()`` time the train may leave the junction it arrived at, or
+        None while it is not waiting there. A train at its origin only leaves on a CLEAR.
+    """
+
+    def __init__(self, *args, **kwargs):
+        TrainMovement.__init__(self, *args, **kwargs)
+        self.parked_until = None
+
+    def handle_arrival_at_junction(self):
+        """Parks the train like ``TrainMovement.handle_arrival_at_junction`` and starts the wait."""
+        self.location.set_to_park()
+        self.state = TrainState.PARKED
+        self.current_speed = 0
+        self.route.increment_junction_index()
+        self.parked_until = time.monotonic() + self.junction_delay
+
+
+class SimulatedClient(Client):
+    """A ``Client`` without its connection, threads and process exit, so that many
+    can share one event loop. Movement is driven by ``move`` instead of the
+    ``update_position`` thread.
+
+    Attributes
+    ----------
+    speed_factor : float
+        Multiplies the train speed, like the factor in ``Client.update_position``.
+    latencies : LatencyHistogram
+        The round trip latency of every client state this train sent.
+    """
+
+    def __init__(self, origin: str, destination: str, speed_factor: float = 10, junction_delay: float = 5):
+        """Initializes the simulated client with a route from origin to destination.
+
+        :param origin: The name of the junction the train starts at.
+        :param destination: The name of the junction the train drives to.
+        :param speed_factor: Multiplies the train speed. Defaults to 10, as in ``Client``.
+        :param junction_delay: Seconds the train waits at each junction on its route. Defaults to 5, as in ``TrainMovement``.
+        """
+        self.sock = None
+        self.probabilty_track_stay_good = 0.95
+        self.probability_track_stay_bad = 0.8
+        self.speed_factor = speed_factor
+        self.latencies = LatencyHistogram()
+
+        self.railmap = Railmap(junctions=initial_config["junctions"], tracks=initial_config["tracks"])
+        self.last_time_updated = datetime.now()
+        self.origin = self.railmap.junctions[origin]
+        self.destination = self.railmap.junctions[destination]
+        self.train = SimulatedTrainMovement(
+            length=self.generate_random_train_length(),
+            location=Location(front_junction=self.origin, back_junction=self.origin),
+        )
+        self.train.junction_delay = junction_delay
+        self.generate_route()
+
+    def move(self, elapsed_seconds: float):
+        """Moves the train as ``Client.update_position`` would over the elapsed time,
+        and leaves the current junction once the wait there is over.
+
+        :param elapsed_seconds: The time since the train was last moved.
+        """
+        if self.train.state == TrainState.PARKED:
+            if self.train.parked_until is not None and time.monotonic() >= self.train.parked_until:
+                self.train.parked_until = None
+                if not self.train.stay_parked and not self.train.route.destination_reached():
+                    self.train.leave_junction()
+            return
+        if self.train.state == TrainState.STOPPED:
+            return
+        distance_moved = self.train.get_speed() * self.speed_factor * (elapsed_seconds / 3600)
+        self.train.update_location(distance_moved)
+
+
+class LoadGenerator:
+    """Runs simulated trains against a proxy and collects their latencies.
+
+    Attributes
+    ----------
+    args : argparse.Namespace
+        The command line arguments.
+    counters : dict
+        Counts of started and finished trains, requests, responses, timeouts,
+        reconnects and errors.
+    clients : list
+        Every SimulatedClient started so far.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.counters = dict.fromkeys(
+            ["started", "arrived", "requests", "responses", "timeouts", "reconnects", "errors"], 0
+        )
+        self.clients = []
+        self.connect_limit = None
+        self.deadline = None
+
+    def arrival_delays(self) -> list:
+        """Returns the start time of every train, in seconds from the start of the run."""
+        if self.args.arrivals == "burst":
+            return [0.0] * self.args.trains
+        if self.args.arrivals == "uniform":
+            return [i / self.args.arrivalRate for i in range(self.args.trains)]
+
+        delays = []
+        delay = 0.0
+        for _ in range(self.args.trains):
+            delays.append(delay)
+            delay += self.rng.expovariate(self.args.arrivalRate)
+        return delays
+
+    async def connect(self):
+        async with self.connect_limit:
+            return await asyncio.open_connection(self.args.proxy, self.args.proxyPort)
+
+    async def run_train(self, start_delay: float):
+        await asyncio.sleep(start_delay)
+        if time.monotonic() >= self.deadline:
+            return
+
+        origin, destination = self.rng.sample(initial_config["junctions"], 2)
+        client = SimulatedClient(origin, destination, self.args.speedFactor, self.args.junctionDelay)
+        self.clients.append(client)
+        self.counters["started"] += 1
+
+        writer = None
+        try:
+            reader, writer = await self.connect()
+            client.client_ip, client.client_port = writer.get_extra_info("sockname")[:2]
+            last_moved = time.monotonic()
+
+            while time.monotonic() < self.deadline:
+                now = time.monotonic()
+                client.move(now - last_moved)
+                last_moved = now
+                if client.train.route.destination_reached():
+                    self.counters["arrived"] += 1
+                    return
+
+                message = TrackNet_pb2.InitConnection()
+                message.sender = TrackNet_pb2.InitConnection.Sender.CLIENT
+                client.set_client_state_msg(message.client_state, client.client_ip, client.client_port)
+                data = message.SerializeToString()
+
+                start = time.perf_counter()
+                writer.write(FRAME_HEADER.pack(len(data)) + data)
+                self.counters["requests"] += 1
+                try:
+                    response_data = await asyncio.wait_for(read_frame(reader), self.args.responseTimeout)
+                except asyncio.TimeoutError:
+                    # a late response would be taken for the answer to the next state, so start over
+                    self.counters["timeouts"] += 1
+                    writer.close()
+                    reader, writer = await self.connect()
+                    client.client_ip, client.client_port = writer.get_extra_info("sockname")[:2]
+                    self.counters["reconnects"] += 1
+                else:
+                    client.latencies.record((time.perf_counter() - start) * 1000)
+                    self.counters["responses"] += 1
+
+                    response = TrackNet_pb2.InitConnection()
+                    response.ParseFromString(response_data)
+                    if response.HasField("server_response"):
+                        client.handle_server_response(response.server_response)
+
+                interval = self.args.reportInterval * (1 + self.rng.uniform(-self.args.reportJitter, self.args.reportJitter))
+                await asyncio.sleep(interval)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            logging.getLogger("LoadGenerator").debug(f"Train {client.train.name} failed: {e}")
+            self.counters["errors"] += 1
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def run(self) -> dict:
+        self.connect_limit = asyncio.Semaphore(self.args.connectConcurrency)
+        start = time.monotonic()
+        cpu_start = time.process_time()
+        self.deadline = start + self.args.duration
+        await asyncio.gather(*(self.run_train(delay) for delay in self.arrival_delays()))
+        elapsed = time.monotonic() - start
+
+        overall = LatencyHistogram()
+        for client in self.clients:
+            overall.merge(client.latencies)
+
+        result = {
+            "trains": self.args.trains,
+            "arrivals": self.args.arrivals,
+            "report_interval": self.args.reportInterval,
+            "seconds": round(elapsed, 3),
+            **self.counters,
+            "responses_per_second": round(self.counters["responses"] / elapsed, 1),
+            "cpu_seconds": round(time.process_time() - cpu_start, 3),
+            "max_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "latency": overall.to_dict(),
+            "per_train": self.summarize_per_train(),
+        }
+        if self.args.perTrain:
+            result["trains_latency"] = {
+                client.train.name or f"unnamed{index}": client.latencies.to_dict()
+                for index, client in enumerate(self.clients)
+            }
+        return result
+
+    def summarize_per_train(self) -> dict:
+        """Returns how the per train p50 and p99 latencies are spread over the trains."""
+        summary = {}
+        for label, fraction in (("p50_ms", 0.5), ("p99_ms", 0.99)):
+            values = sorted(
+                client.latencies.percentile(fraction) for client in self.clients if client.latencies.count
+            )
+            if values:
+                summary[label] = {
+                    "median_train": values[len(values) // 2],
+                    "worst_train": values[-1],
+                }
+        return summary
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(FRAME_HEADER.size)
+    (length,) = FRAME_HEADER.unpack(header)
+    return await reader.readexactly(length)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate many trains against a proxy from one process")
+    parser.add_argument("-proxy", type=str, default="localhost", help="Address of the proxy")
+    parser.add_argument("-proxyPort", type=int, default=5555, help="Proxy port number")
+    parser.add_argument("-trains", type=int, default=1000, help="Number of simulated trains")
+    parser.add_argument("-reportInterval", type=float, default=5, help="Seconds between the client states of a train")
+    parser.add_argument("-reportJitter", type=float, default=0.1, help="Random spread of the report interval, as a fraction of it")
+    parser.add_argument("-arrivals", choices=["burst", "uniform", "poisson"], default="burst", help="How train start times are spread")
+    parser.add_argument("-arrivalRate", type=float, default=100, help="Trains started per second for uniform and poisson arrivals")
+    parser.add_argument("-duration", type=float, default=60, help="Seconds before all trains stop")
+    parser.add_argument("-responseTimeout", type=float, default=2, help="Seconds to wait for a server response")
+    parser.add_argument("-speedFactor", type=float, default=10, help="Multiplies the train speeds")
+    parser.add_argument("-junctionDelay", type=float, default=5, help="Seconds each train waits at a junction")
+    parser.add_argument("-connectConcurrency", type=int, default=256, help="Most connections opened at once")
+    parser.add_argument("-perTrain", action="store_true", help="Include the latency histogram of every train")
+    parser.add_argument("-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print(json.dumps(asyncio.run(LoadGenerator(args).run()), indent=2))
@@ -0,0 +1,247 @@
+"""Synthetic rail networks and train populations for the benchmarks.
+
+Each generator returns the junction names and the (junction, junction, length)
+track tuples that ``Railway`` and ``Railmap`` take, so a benchmark can build a
+network of any size instead of the four junction ``initial_config``:
+
+- ``grid``: junctions on a square lattice, each linked to its right and lower neighbour.
+- ``ring``: junctions on a cycle, optionally with chords across it.
+- ``scale_free``: preferential attachment, giving a few busy hubs and many quiet junctions.
+- ``real_world``: junctions scattered on a plane, each linked to a few of its nearest
+  neighbours with track lengths following the distance, like a regional network.
+
+``build_railway`` creates a railway from one of them and parks trains on it with
+shortest path routes, and ``advance_train`` moves a train one step along its route
+the way client state updates do.
+"""
+import math
+import random
+
+from classes.enums import TrainState
+from classes.location import Location
+from classes.railway import Railway
+from classes.route import Route
+
+
+def junction_names(num_junctions: int) -> list:
+    return [f"J{i}" for i in range(num_junctions)]
+
+
+def grid(num_junctions: int, rng: random.Random) -> tuple:
+    """A square lattice with random track lengths.
+
+    :param num_junctions: The number of junctions.
+    :param rng: The random number generator to use.
+    :return: A tuple of (junction names, track tuples).
+    """
+    names = junction_names(num_junctions)
+    width = max(int(math.sqrt(num_junctions)), 1)
+    tracks = []
+    for i in range(num_junctions):
+        if (i + 1) % width != 0 and i + 1 < num_junctions:
+            tracks.append((names[i], names[i + 1], rng.randint(10, 100)))
+        if i + width < num_junctions:
+            tracks.append((names[i], names[i + width], rng.randint(10, 100)))
+    return names, tracks
+
+
+def ring(num_junctions: int, rng: random.Random, chords: int = 0) -> tuple:
+    """A cycle with random track lengths and optional chords between random junctions.
+
+    :param num_junctions: The number of junctions, at least 3.
+    :param rng: The random number generator to use.
+    :param chords: The number of extra tracks across the ring. Defaults to 0.
+    :return: A tuple of (junction names, track tuples).
+    """
+    names = junction_names(num_junctions)
+    tracks = [(names[i], names[(i + 1) % num_junctions], rng.randint(10, 100)) for i in range(num_junctions)]
+    connected = {tuple(sorted(track[:2])) for track in tracks}
+    while chords > 0:
+        pair = tuple(sorted(rng.sample(names, 2)))
+        if pair not in connected:
+            connected.add(pair)
+            tracks.append((pair[0], pair[1], rng.randint(100, 500)))
+            chords -= 1
+    return names, tracks
+
+
+def scale_free(num_junctions: int, rng: random.Random, links_per_junction: int = 2) -> tuple:
+    """A Barabasi-Albert graph: each new junction links to existing junctions with a
+    probability proportional to how many tracks they already have.
+
+    :param num_junctions: The number of junctions, more than ``links_per_junction``.
+    :param rng: The random number generator to use.
+    :param links_per_junction: The number of tracks each new junction adds. Defaults to 2.
+    :return: A tuple of (junction names, track tuples).
+    """
+    names = junction_names(num_junctions)
+    tracks = []
+    # every junction appears once per track it has, so sampling from it follows the degree
+    endpoints = []
+    for i in range(links_per_junction + 1):
+        for j in range(i):
+            tracks.append((names[j], names[i], rng.randint(10, 100)))
+            endpoints += [j, i]
+
+    for i in range(links_per_junction + 1, num_junctions):
+        targets = set()
+        while len(targets) < links_per_junction:
+            targets.add(rng.choice(endpoints))
+        for j in targets:
+            tracks.append((names[j], names[i], rng.randint(10, 100)))
+            endpoints += [j, i]
+    return names, tracks
+
+
+def real_world(num_junctions: int, rng: random.Random, neighbors: int = 2) -> tuple:
+    """Junctions scattered over a square whose area grows with their number. Sweeping
+    from west to east, each junction is linked to the junction before it, which keeps
+    the network connected, and to its nearest junctions among the next few. Track
+    lengths are the distances between the junctions.
+
+    :param num_junctions: The number of junctions.
+    :param rng: The random number generator to use.
+    :param neighbors: The number of nearby junctions each junction links to. Defaults to 2.
+    :return: A tuple of (junction names, track tuples).
+    """
+    names = junction_names(num_junctions)
+    side = 50 * math.sqrt(num_junctions)
+    points = sorted((rng.uniform(0, side), rng.uniform(0, side)) for _ in range(num_junctions))
+
+    def distance(i, j):
+        return max(int(math.dist(points[i], points[j])), 1)
+
+    connected = set()
+    tracks = []
+
+    def link(i, j):
+        if (i, j) not in connected:
+            connected.add((i, j))
+            tracks.append((names[i], names[j], distance(i, j)))
+
+    for i in range(1, num_junctions):
+        link(i - 1, i)
+    for i in range(num_junctions):
+        candidates = range(i + 1, min(i + 4 * neighbors + 1, num_junctions))
+        for j in sorted(candidates, key=lambda j: distance(i, j))[:neighbors]:
+            link(i, j)
+    return names, tracks
+
+
+TOPOLOGIES = {
+    "grid": grid,
+    "ring": ring,
+    "scale_free": scale_free,
+    "real_world": real_world,
+}
+
+
+def parked_location(junction, track) -> Location:
+    return Location(junction, junction, track, track, 0, 0)
+
+
+def build_railway(topology: str, num_junctions: int, num_trains: int, rng: random.Random, columnar: bool = False) -> Railway:
+    """Builds a railway on a synthetic network and parks trains at random junctions,
+    each with a shortest path route to a random destination.
+
+    :param topology: One of the names in ``TOPOLOGIES``.
+    :param num_junctions: The number of junctions.
+    :param num_trains: The number of trains.
+    :param rng: The random number generator to use.
+    :param columnar: Whether the railway keeps its trains in a TrainStore. Defaults to False.
+    :return: The Railway object.
+    """
+    junctions, tracks = TOPOLOGIES[topology](num_junctions, rng)
+    railway = Railway(None, junctions, tracks, columnar=columnar)
+
+    for _ in range(num_trains):
+        origin = rng.choice(junctions)
+        train = railway.create_new_train(rng.randint(1, 5), origin)
+        route = random_route(railway, origin, rng)
+        railway.update_train(train, TrainState.PARKED, parked_location(route.junctions[0], route.get_next_track()), route)
+
+    return railway
+
+
+def fill_tracks(railway: Railway, num_tracks: int, trains_per_track: int, rng: random.Random) -> int:
+    """Puts up to ``trains_per_track`` running trains on each of ``num_tracks`` random
+    tracks, one behind the other with random gaps and all heading the same way, as
+    the conflict checks expect when several trains share a track. Each route ends one
+    track past the track the train is on.
+
+    :param railway: The railway to add trains to.
+    :param num_tracks: The number of tracks to fill.
+    :param trains_per_track: The most trains put on one track.
+    :param rng: The random number generator to use.
+    :return: The number of trains added.
+    """
+    added = 0
+    for track in rng.sample(list(railway.map.tracks.values()), num_tracks):
+        junction_a, junction_b = [railway.map.junctions[name] for name in track.junctions]
+        back_position = track.length
+        for _ in range(rng.randint(1, trains_per_track)):
+            length = rng.randint(1, 3)
+            back_position -= length + rng.choice([0.5, 1, 4, 8])
+            if back_position < 0:
+                break
+            train = railway.create_new_train(length, junction_a.name)
+            location = Location(junction_a, junction_a, track, track, back_position + length, back_position)
+            # carry on to a neighbour of the far junction, so the train has a next track
+            onward = [name for name in junction_b.neighbors if name != junction_a.name]
+            route_junctions = [junction_a, junction_b]
+            if onward:
+                route_junctions.append(railway.map.junctions[rng.choice(onward)])
+            route = Route(route_junctions)
+            railway.update_train(train, TrainState.RUNNING, location, route)
+            added += 1
+    return added
+
+
+def random_route(railway: Railway, origin: str, rng: random.Random) -> Route:
+    """Returns the shortest route from a junction to a random other junction.
+
+    :param railway: The railway to route on.
+    :param origin: The name of the junction the route starts at.
+    :param rng: The random number generator to use.
+    :return: A Route object.
+    """
+    names = railway.map.junction_names
+    while True:
+        destination = rng.choice(names)
+        if destination != origin:
+            path = railway.map.find_shortest_path(origin, destination)
+            if path is not None:
+                return Route(path)
+
+
+def advance_train(railway: Railway, train, rng: random.Random) -> bool:
+    """Moves a train one step, the way its client reports it: a parked train
+    runs onto the next track of its route if that track is empty, and a running
+    train parks at the junction at the end of its track. A train parked at its
+    destination gets a new route to a random destination.
+
+    :param railway: The railway the train is on.
+    :param train: The Train object to move.
+    :param rng: The random number generator to use.
+    :return: False if the train had to wait for its next track, True otherwise.
+    """
+    route = train.route
+    if train.state == TrainState.PARKED:
+        if route.destination_reached():
+            junction = route.get_current_junction()
+            new_route = random_route(railway, junction.name, rng)
+            railway.update_train(train, TrainState.PARKED, parked_location(junction, new_route.get_next_track()), new_route)
+            return True
+
+        track = route.get_next_track()
+        if track.trains:
+            return False
+        junction = route.get_current_junction()
+        location = Location(junction, junction, track, track, train.length + 1, 1)
+        railway.update_train(train, TrainState.RUNNING, location, Route(route.junctions, route.current_junction_index))
+        return True
+
+    track = route.get_next_track()
+    new_route = Route(route.junctions, route.current_junction_index + 1)
+    railway.update_train(train, TrainState.PARKED, parked_location(new_route.get_current_junction(), track), new_route)
+    return True
@@ -0,0 +1,51 @@
+from typing import NamedTuple
+from classes.enums import TrainSpeed
+import TrackNet_pb2
+
+UpdateStatus = TrackNet_pb2.ServerResponse.UpdateStatus
+
+
+class Command(NamedTuple):
+    """The status and speed the conflict analyzer decides on for a train. Commands are
+    immutable and shared: ``Command.of`` returns the same object for the same status
+    and speed, so analysis creates no objects per train, and a ServerResponse is only
+    filled in from a command when a response is sent.
+
+    Attributes
+    ----------
+    status : int
+        A ``ServerResponse.UpdateStatus`` value.
+    speed : int
+        A ``TrainSpeed`` value.
+    """
+
+    status: int
+    speed: int
+
+    @staticmethod
+    def of(status: int, speed: int) -> "Command":
+        """Returns the shared command with a status and speed.
+
+        :param status: A ``ServerResponse.UpdateStatus`` value.
+        :param speed: A ``TrainSpeed`` value.
+        :return: A Command.
+        """
+        command = COMMANDS.get((status, speed))
+        if command is None:
+            command = COMMANDS[(status, speed)] = Command(status, speed)
+        return command
+
+    def fill_pb(self, server_response: TrackNet_pb2.ServerResponse):
+        """Sets the status and speed of a ServerResponse message to those of the command.
+
+        :param server_response: The ServerResponse protobuf message to fill in.
+        """
+        server_response.status = self.status
+        server_response.speed = self.speed
+
+
+COMMANDS = {}
+
+CLEAR_FAST = Command.of(UpdateStatus.CLEAR, TrainSpeed.FAST.value)
+SLOW_DOWN = Command.of(UpdateStatus.CHANGE_SPEED, TrainSpeed.SLOW.value)
+STOP = Command.of(UpdateStatus.STOP, TrainSpeed.STOPPED.value)
@@ -1,9 +1,15 @@
 
 from classes.enums import TrainState, TrainSpeed, TrackCondition
 from classes.train import Train
+from classes.command import Command, CLEAR_FAST, SLOW_DOWN, STOP
 import TrackNet_pb2
 import logging
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -30,6 +36,44 @@ class ImmediateTrackConflict(Conflict):
         self.track_id = track_id
 
 
+class OnTrackTrains:
+    """
+    The trains running on tracks, gathered into arrays sorted by track index and 
+    then front to back (by decreasing back cart position), for the vectorized checks. 
+    Entry i of every array describes the train named names[i].
+    """
+
+    def __init__(self, names, track, back_position, front_position, track_length, heading):
+        self.names = names
+        self.track = track
+        self.back_position = back_position
+        self.front_position = front_position
+        self.track_length = track_length
+        self.heading = heading
+
+        is_segment_start = numpy.ones(len(names), dtype=bool)
+        is_segment_start[1:] = track[1:] != track[:-1]
+        self.is_segment_start = is_segment_start
+        # index of the first (front) train on the same track as each train
+        self.segment_start = numpy.flatnonzero(is_segment_start)[numpy.cumsum(is_segment_start) - 1]
+
+    def __len__(self):
+        return len(self.names)
+
+    def is_behind_flagged_train(self, flags):
+        """
+        For each train, whether a train ahead of it on its track, other than the front 
+        train, is flagged. This is what the cascades of resolve_current_track_conflict 
+        compute: every train behind the first flagged train is affected.
+
+        :param flags: a boolean array in the same order as the trains
+        :return: a boolean array in the same order as the trains
+        """
+        marked = (flags & ~self.is_segment_start).astype(numpy.int64)
+        marked_before = numpy.cumsum(marked) - marked
+        return marked_before - marked_before[self.segment_start] > 0
+
+
 class ConflictAnalyzer:
     """
     The class uses for detecting conflicts within the railway system
@@ -67,10 +111,7 @@ class ConflictAnalyzer:
     def resolve_conflicts_simple(railway, commands):
 
         for train in railway.trains.values():
-            command = TrackNet_pb2.ServerResponse()
-            command.status = TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR
-            command.speed = TrainSpeed.FAST.value
-            commands[train.name] = command
+            commands[train.name] = CLEAR_FAST
         
         LOGGER.debugv("Resolving bad track conditions")
         for track_id in railway.map.tracks.keys():
@@ -86,26 +127,123 @@ class ConflictAnalyzer:
                 # clear
                 if next_track is not None:
                     LOGGER.debugv(f"{train_id} may enter {next_track.name}")
-                command = TrackNet_pb2.ServerResponse()
-                command.status = TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR
-                command.speed = commands[train_id].speed
-                commands[train_id] = command
+                commands[train_id] = Command.of(TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR, commands[train_id].speed)
             else:
                 # park
                 if next_track is not None:
                     LOGGER.debugv(f"{train_id} may not enter {next_track.name}")
-                command = TrackNet_pb2.ServerResponse()
-                command.status = TrackNet_pb2.ServerResponse.UpdateStatus.PARK
-                command.speed = commands[train_id].speed
-                commands[train_id] = command
+                commands[train_id] = Command.of(TrackNet_pb2.ServerResponse.UpdateStatus.PARK, commands[train_id].speed)
 
         return commands
     
 
+    @staticmethod
+    def resolve_conflicts_incremental(railway, commands):
+        """
+        Produces the same commands as resolve_conflicts_simple, but only recomputes 
+        the commands of trains that may have been affected by the changes recorded 
+        on the railway since the last call: trains that were created or updated, 
+        trains on tracks whose occupants or condition changed, and the trains favored 
+        to enter those tracks next. The cost of an update therefore depends on how 
+        many trains it touches rather than on the total number of trains.
+
+        Relies on railway.waiting_trains being up to date. After replacing the railway 
+        wholesale, call railway.rebuild_waiting_index first.
+
+        :param railway: railway with trains, tracks and junctions
+        :param commands: a dictionary that maps train id to its current Command, updated in place
+        :return: the updated commands dictionary
+        """
+        affected_train_ids = ConflictAnalyzer.pop_affected_trains(railway)
+
+        LOGGER.debugv(f"Recomputing commands for {len(affected_train_ids)} trains")
+        for train_id in affected_train_ids:
+            if train_id in railway.trains:
+                commands[train_id] = ConflictAnalyzer.get_train_command(railway, train_id)
+
+        return commands
+
+
+    @staticmethod
+    def pop_affected_trains(railway):
+        """
+        Returns the trains whose commands may have changed since the last call, as 
+        resolve_conflicts_incremental recomputes them, and starts recording afresh.
+
+        :param railway: railway with trains, tracks and junctions
+        :return: a set of train ids
+        """
+        train_ids, track_ids = railway.pop_unanalyzed_changes()
+        affected_train_ids = set(train_ids)
+
+        for track_id in track_ids:
+            track = railway.map.tracks[track_id]
+            if len(track.trains) > 1:
+                raise CollisionException("Multiple trains on same track")
+            affected_train_ids.update(track.trains.keys())
+
+            favored_train_id = railway.waiting_trains.get_favored_train(track_id)
+            if favored_train_id is not None:
+                affected_train_ids.add(favored_train_id)
+
+        return affected_train_ids
+
+
+    @staticmethod
+    def get_train_command(railway, train_id):
+        """
+        Builds the command resolve_conflicts_simple would give one train: park unless 
+        the train may enter its next track, and move slowly while on a bad track.
+
+        :param railway: railway with trains, tracks and junctions
+        :param train_id: id of the train
+        :return: the Command holding the status and speed for the train
+        """
+        train = railway.trains[train_id]
+        if ConflictAnalyzer.may_enter_next_track_indexed(railway, train_id):
+            status = TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR
+        else:
+            status = TrackNet_pb2.ServerResponse.UpdateStatus.PARK
+
+        speed = TrainSpeed.FAST.value
+        # trains park at every junction, so a train can only be held by the track under its front or back cart
+        location = train.location
+        for cart in (location.front_cart, location.back_cart):
+            track = cart.track
+            if track is not None and train_id in track.trains and track.condition == TrackCondition.BAD:
+                speed = TrainSpeed.SLOW.value
+
+        return Command.of(status, speed)
+
+
+    @staticmethod
+    def may_enter_next_track_indexed(railway, train_id):
+        """
+        Same rule as may_enter_next_track, but finds the favored train through the 
+        waiting train index instead of filtering and sorting every train.
+
+        :param railway: railway with trains, tracks and junctions
+        :param train_id: id of the train
+        :return: True if the train is the favored train for its next track and that track is empty
+        """
+        train = railway.trains[train_id]
+        if train.route is None:
+            return False
+
+        next_track = train.get_next_track_for_conflict_analyzer()
+        if next_track is None:
+            return False
+
+        if railway.waiting_trains.get_favored_train(next_track.name) != train_id:
+            return False
+
+        return len(next_track.trains) == 0
+
+
     @staticmethod
     def may_enter_next_track(railway, commands, train_id):
         train = railway.trains[train_id]
-        current_junction = train.location.front_cart["junction"]
+        current_junction = train.location.front_cart.junction
         next_track = train.get_next_track_for_conflict_analyzer()
         next_junction = train.route.get_next_junction()
 
@@ -137,10 +275,10 @@ class ConflictAnalyzer:
         #     return False # existing trains are moving opposite direction
         
         # # train that has made the least progress along the track
-        # back_train = sorted(next_track.trains.values(), key=lambda t: t.location.back_cart["position"])[0]
+        # back_train = sorted(next_track.trains.values(), key=lambda t: t.location.back_cart.position)[0]
 
         # # only go if the back train is far enough along the track
-        # return (back_train.location.back_cart["position"] > ConflictAnalyzer.SAFETY_DISTANCE)
+        # return (back_train.location.back_cart.position > ConflictAnalyzer.SAFETY_DISTANCE)
 
         return False
 
@@ -150,12 +288,8 @@ class ConflictAnalyzer:
         if railway.map.tracks[track_id].condition == TrackCondition.BAD:
             for train in railway.map.tracks[track_id].trains.values():
                 LOGGER.debug(f"{train.name} must move slowly due to poor track conditions")
-                # message creation inside the for loop as the messages must be separate objects, 
-                # as they may be overwritten in different ways in the future
-                command = TrackNet_pb2.ServerResponse() 
-                command.status = TrackNet_pb2.ServerResponse.UpdateStatus.CHANGE_SPEED
-                command.speed = TrainSpeed.SLOW.value
-                commands[train.name] = command
+                # commands are immutable, so every train can share the same one
+                commands[train.name] = SLOW_DOWN
         
         return commands
     
@@ -173,10 +307,7 @@ class ConflictAnalyzer:
 
         # fast and clear
         for train in railway.trains.values():
-            command = TrackNet_pb2.ServerResponse()
-            command.status = TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR
-            command.speed = TrainSpeed.FAST.value
-            commands[train.name] = command
+            commands[train.name] = CLEAR_FAST
             
         # slow
         LOGGER.debug("Resolving bad track conditions")
@@ -200,6 +331,164 @@ class ConflictAnalyzer:
         return commands
     
 
+    @staticmethod
+    def resolve_conflicts_vectorized(railway, commands):
+        """
+        Produces the same commands as resolve_conflicts, but checks the trains on all 
+        tracks at once with array operations: the safety distance test of 
+        resolve_immediate_junction_conflict and everything resolve_current_track_conflict 
+        does. Falls back to resolve_conflicts when numpy is not installed.
+
+        The safety distance test is only vectorized here, where the trains are gathered 
+        for the track checks anyway; gathering them for that test alone is slower than 
+        testing train by train. The server's resolve_conflicts_incremental gives the 
+        commands of resolve_conflicts_simple, which makes neither check.
+
+        :param railway: railway with trains, tracks and junctions
+        :param commands: ignored, as in resolve_conflicts
+        :return: a dictionary that maps train id to the command to give that train
+        """
+        if numpy is None:
+            return ConflictAnalyzer.resolve_conflicts(railway, commands)
+
+        commands = {}
+
+        for train in railway.trains.values():
+            commands[train.name] = CLEAR_FAST
+
+        LOGGER.debug("Resolving bad track conditions")
+        for track_id in railway.map.tracks.keys():
+            commands = ConflictAnalyzer.resolve_bad_track_condition(railway, commands, track_id)
+
+        on_track_trains = ConflictAnalyzer.get_on_track_trains(railway)
+
+        LOGGER.debug("Resolving immediate junction conflicts")
+        # the trains are already gathered for the track checks, so the safety distance 
+        # test of every train takes one array comparison
+        near = on_track_trains.track_length - on_track_trains.front_position < ConflictAnalyzer.SAFETY_DISTANCE
+        near_track_end = {on_track_trains.names[i] for i in numpy.flatnonzero(near).tolist()}
+        for junction_id in railway.map.junctions.keys():
+            commands = ConflictAnalyzer.resolve_immediate_junction_conflict(railway, commands, junction_id, near_track_end)
+
+        LOGGER.debug("Resolving current track conflicts")
+        commands = ConflictAnalyzer.resolve_current_track_conflicts_vectorized(railway, commands, on_track_trains)
+
+        return commands
+
+
+    @staticmethod
+    def get_on_track_trains(railway):
+        """
+        Gathers the trains on tracks and sorts them once with numpy.lexsort on 
+        (track, back position). When the railway keeps a TrainStore, the positions 
+        are read straight from its columns.
+
+        :param railway: railway with trains, tracks and junctions
+        :return: an OnTrackTrains instance
+        """
+        track_names = railway.map.track_names
+        store = railway.train_store
+
+        if store is not None:
+            rows = numpy.fromiter(store.on_track_rows, dtype=numpy.intp, count=len(store.on_track_rows))
+            rows.sort()
+            track = numpy.frombuffer(store.back_track, dtype=numpy.int32)[rows]
+            rows, track = rows[track >= 0], track[track >= 0]
+            back_position = numpy.frombuffer(store.back_position, dtype=numpy.float64)[rows]
+            front_position = numpy.frombuffer(store.front_position, dtype=numpy.float64)[rows]
+            names = [store.names[row] for row in rows.tolist()]
+            trains = [railway.trains[name] for name in names]
+        else:
+            trains, track, back_position, front_position = [], [], [], []
+            for track_index, track_name in enumerate(track_names):
+                on_track = railway.map.tracks[track_name].trains
+                if not on_track:
+                    continue
+                for train in on_track.values():
+                    location = train.location
+                    trains.append(train)
+                    track.append(track_index)
+                    back_position.append(location.back_cart.position)
+                    front_position.append(location.front_cart.position)
+            names = [train.name for train in trains]
+            track = numpy.array(track, dtype=numpy.int32)
+            back_position = numpy.array(back_position, dtype=numpy.float64)
+            front_position = numpy.array(front_position, dtype=numpy.float64)
+
+        track_lengths = numpy.array([railway.map.tracks[track_name].length for track_name in track_names], dtype=numpy.float64)
+        # trains compare their next junction objects, so number them by identity
+        heading_ids = {}
+        heading = numpy.array(
+            [heading_ids.setdefault(id(train.next_junction), len(heading_ids)) for train in trains],
+            dtype=numpy.int64,
+        )
+
+        # lexsort sorts by the last key first and is stable, so trains with equal 
+        # positions keep the order the tracks hold them in, as in sorted()
+        order = numpy.lexsort((-back_position, track))
+        return OnTrackTrains(
+            [names[i] for i in order.tolist()],
+            track[order],
+            back_position[order],
+            front_position[order],
+            track_lengths[track[order]],
+            heading[order],
+        )
+
+
+    @staticmethod
+    def resolve_current_track_conflicts_vectorized(railway, commands, on_track_trains=None):
+        """
+        Does what resolve_current_track_conflict does for every track, in one pass over 
+        the trains on all tracks. Raises the same CollisionException as the first track 
+        resolve_current_track_conflict would raise for.
+
+        :param railway: railway with trains, tracks and junctions
+        :param commands: a dictionary that maps train id to a pending Command
+        :param on_track_trains: the OnTrackTrains of the railway, gathered if not given
+        :return: the updated commands dictionary
+        """
+        if on_track_trains is None:
+            on_track_trains = ConflictAnalyzer.get_on_track_trains(railway)
+        if len(on_track_trains) == 0:
+            return commands
+
+        trains = on_track_trains
+        track_names = railway.map.track_names
+
+        # every train must head the same way as the front train of its track
+        opposite_direction = trains.heading != trains.heading[trains.segment_start]
+        # a train overlaps the one ahead of it if its front is past that train's back
+        overlapping = numpy.zeros(len(trains), dtype=bool)
+        overlapping[1:] = trains.front_position[1:] > trains.back_position[:-1]
+        overlapping &= ~trains.is_segment_start
+
+        if opposite_direction.any() or overlapping.any():
+            first_track = trains.track[numpy.flatnonzero(opposite_direction | overlapping)].min()
+            on_first_track = trains.track == first_track
+            if (opposite_direction & on_first_track).any():
+                raise CollisionException(f"Trains moving opposite directions on Track {track_names[first_track]}")
+            raise CollisionException(f"Two trains occupy the same part of Track {track_names[first_track]}")
+
+        pending = [commands[name] for name in trains.names]
+        slow_speed = TrainSpeed.SLOW.value
+        stop_status = TrackNet_pb2.ServerResponse.UpdateStatus.STOP
+        slow = numpy.array([command.speed == slow_speed for command in pending], dtype=bool)
+        stop = numpy.array([command.status == stop_status for command in pending], dtype=bool)
+
+        # a slow command never overwrites a stop command, so stopping does not depend on slowing
+        stopping = trains.is_behind_flagged_train(stop)
+        slowing = trains.is_behind_flagged_train(slow) & ~stop & ~stopping
+
+        for i in numpy.flatnonzero(slowing).tolist():
+            commands[trains.names[i]] = SLOW_DOWN
+
+        for i in numpy.flatnonzero(stopping).tolist():
+            commands[trains.names[i]] = STOP
+
+        return commands
+
+
     @staticmethod
     def resolve_current_track_conflict(railway, commands, track_id):
         """
@@ -211,7 +500,7 @@ class ConflictAnalyzer:
             3. Reverse (TODO later potentially) 
 
         :param railway: railway with trains, tracks and junctions
-        :param commands: a dictionary that maps train id to a pending server response
+        :param commands: a dictionary that maps train id to a pending Command
         :param track_id: id of the track we are preventing conflicts on
         """
         track = railway.map.tracks[track_id]
@@ -225,14 +514,14 @@ class ConflictAnalyzer:
             raise CollisionException(f"Trains moving opposite directions on Track {track_id}")
 
         # Sort trains front to back
-        sorted_trains = sorted(track.trains.values(), key=lambda train: train.location.back_cart["position"], reverse=True)
+        sorted_trains = sorted(track.trains.values(), key=lambda train: train.location.back_cart.position, reverse=True)
 
         # check for collision by overlapping positions
-        pos = sorted_trains[0].location.front_cart["position"] + 1
+        pos = sorted_trains[0].location.front_cart.position + 1
         for train in sorted_trains:
-            if train.location.front_cart["position"] > pos:
+            if train.location.front_cart.position > pos:
                 raise CollisionException(f"Two trains occupy the same part of Track {track_id}")
-            pos = train.location.back_cart["position"]
+            pos = train.location.back_cart.position
 
         # Slow down trains starting front to back
         for i, train in enumerate(sorted_trains):
@@ -244,24 +533,18 @@ class ConflictAnalyzer:
                 # if a train is recieving a stop command,
                 # then do not overwrite it with a slow command.
             
-            if ( 
-                commands[train.name].HasField("speed")
-                and commands[train.name].speed == TrainSpeed.SLOW.value
-            ):
+            if commands[train.name].speed == TrainSpeed.SLOW.value:
                 # If this condition is true, then this train is either moving slow or has a command telling it to slow down.
                 for train_j_id in range(i + 1, len(sorted_trains)):
                     train_j = sorted_trains[train_j_id]
 
-                    if commands[train_j.name].status == TrackNet_pb2.UpdateStatus.STOP:
+                    if commands[train_j.name].status == TrackNet_pb2.ServerResponse.UpdateStatus.STOP:
                         # skip this train; a stop command 
                         # cannot be overwritten by a slow command
                         continue 
 
                     # overwrite previous command with slow command
-                    command = TrackNet_pb2.ServerResponse()
-                    command.status = TrackNet_pb2.ServerResponse.UpdateStatus.CHANGE_SPEED
-                    command.speed = TrainSpeed.SLOW.value
-                    commands[train_j.name] = command
+                    commands[train_j.name] = SLOW_DOWN
                 
                 break # already told all following trains to slow down so can exit loop
 
@@ -276,19 +559,13 @@ class ConflictAnalyzer:
                 # then it would be redundant to tell it to stop again,
                 # so skip over those cases.
             
-            if ( 
-                commands[train.name].HasField("status")
-                and commands[train.name].status == TrackNet_pb2.ServerResponse.UpdateStatus.STOP
-            ):
+            if commands[train.name].status == TrackNet_pb2.ServerResponse.UpdateStatus.STOP:
                 # If this condition is true, then this train is either moving slow or has a command telling it to slow down.
                 for train_j_id in range(i + 1, len(sorted_trains)):
                     train_j = sorted_trains[train_j_id]
 
                     # overwrite previous command with stop command
-                    command = TrackNet_pb2.ServerResponse()
-                    command.status = TrackNet_pb2.ServerResponse.UpdateStatus.STOP
-                    command.speed = TrainSpeed.STOPPED.value
-                    commands[train_j.name] = command
+                    commands[train_j.name] = STOP
                 
                 break # already told all following trains to stop so can exit loop
 
@@ -296,7 +573,7 @@ class ConflictAnalyzer:
         
     
     @staticmethod
-    def resolve_immediate_junction_conflict(railway, commands, junction_id):
+    def resolve_immediate_junction_conflict(railway, commands, junction_id, near_track_end=None):
         LOGGER.debugv(f"Solving Junction: {junction_id}")
         """
         Resolve a conflict that may occur once trains enter the junction the are heading towards
@@ -307,8 +584,10 @@ class ConflictAnalyzer:
             3. Reverse (TODO later potentially)
 
         :param railway: railway with trains, tracks and junctions
-        :param commands: a dictionary that maps train id to a pending server response
+        :param commands: a dictionary that maps train id to a pending Command
         :param junction_id: if of the junction we are preventing conflicts on
+        :param near_track_end: optional set of the trains closer than SAFETY_DISTANCE to the end 
+            of their track, as found by resolve_conflicts_vectorized. Tested train by train if not given.
         """
         junction = railway.map.junctions[junction_id]
 
@@ -332,7 +611,11 @@ class ConflictAnalyzer:
             track_heading = next(iter(trains.values())).route.get_next_junction().name
             if track_heading == junction.name:
                 for train in track.trains.values():
-                    if track.length - train.location.front_cart["position"] < ConflictAnalyzer.SAFETY_DISTANCE:
+                    if near_track_end is not None:
+                        is_near_track_end = train.name in near_track_end
+                    else:
+                        is_near_track_end = track.length - train.location.front_cart.position < ConflictAnalyzer.SAFETY_DISTANCE
+                    if is_near_track_end:
                         involved_trains[train.name] = train
                     next_track = train.get_next_track_for_conflict_analyzer()
                     if next_track is not None:
@@ -387,7 +670,7 @@ class ConflictAnalyzer:
             LOGGER.debugv(f"{train_id} is moving and next track is unavailable")
 
             if (
-                train.location.front_cart["track"].name in in_demand_tracks
+                train.location.front_cart.track.name in in_demand_tracks
                 and train.state not in [TrainState.PARKED, TrainState.PARKING]
             ):
                 if len(parking_trains) < ConflictAnalyzer.JUNCTION_CAPACITY:
@@ -412,27 +695,17 @@ class ConflictAnalyzer:
 
 
         # populate commands
-        # each train has a different command object to allow for different references
         for train_id, train in parking_trains.items():
             LOGGER.debug(f"{train_id} told to park")
-            command = TrackNet_pb2.ServerResponse()
-            command.status = TrackNet_pb2.ServerResponse.UpdateStatus.PARK
-            command.speed = commands[train_id].speed
-            commands[train_id] = command
+            commands[train_id] = Command.of(TrackNet_pb2.ServerResponse.UpdateStatus.PARK, commands[train_id].speed)
         
         for train_id, train in moving_trains.items():
             LOGGER.debug(f"{train_id} told to move")
-            command = TrackNet_pb2.ServerResponse()
-            command.status = TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR
-            command.speed = commands[train_id].speed
-            commands[train_id] = command
+            commands[train_id] = Command.of(TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR, commands[train_id].speed)
         
         for train_id, train in stopping_trains.items():
             LOGGER.debug(f"{train_id} told to stop")
-            command = TrackNet_pb2.ServerResponse()
-            command.status = TrackNet_pb2.ServerResponse.UpdateStatus.STOP
-            command.speed = TrainSpeed.STOPPED.value
-            commands[train_id] = command
+            commands[train_id] = STOP
 
         return commands
         
\ No newline at end of file
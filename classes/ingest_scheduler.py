@@ -0,0 +1,168 @@
+import threading
+from collections import deque
+
+from classes.enums import TrainState
+from classes.conflict_analyzer import ConflictAnalyzer
+from classes.trainmovement import TrainMovement
+
+
+class IngestScheduler:
+    """Chooses the order in which the master handles the pending client states of its
+    trains, so that a train about to reach a junction it may have to wait at is not
+    held up behind trains with nothing new to report.
+
+    Each pending state is put in a priority class:
+
+    - ``urgent``: the track the train enters next is contended, holding trains or awaited
+      by other trains, and the train is within ``near_distance`` of the junction ending its
+      track or parked at that junction as the train favored to enter next. Trains within
+      ``ConflictAnalyzer.SAFETY_DISTANCE`` of the junction are urgent whether or not the
+      next track is contended.
+    - ``normal``: the train is moving, close to an uncontended junction, parked as the
+      favored train for an uncontended track, or not known to the master yet.
+    - ``idle``: the train is stopped on a track away from any junction, parked behind
+      the favored train for its next track, which it cannot enter before that train
+      has, or at the end of its route.
+
+    A state's score is its class, plus up to one more the sooner the train reaches the
+    junction at its speed, plus one more for every ``aging_interval`` seconds it has
+    waited. The aging keeps low classes from starving: an idle state that waited
+    ``2 * aging_interval`` seconds goes before an urgent state that just arrived.
+
+    The scheduler also keeps the latency of the most recent states of each class, from
+    the arrival of a state to the response to it.
+
+    Attributes
+    ----------
+    near_distance : float
+        The distance to a junction within which a train waiting for a contended track is urgent.
+    aging_interval : float
+        The seconds a pending state waits to gain one priority class.
+    latencies : dict
+        Maps each priority class to a deque of the latencies of its most recent states, in seconds.
+    """
+
+    IDLE = 0
+    NORMAL = 1
+    URGENT = 2
+    PRIORITY_CLASSES = ("idle", "normal", "urgent")
+
+    LATENCY_SAMPLES = 10000
+
+    def __init__(self, near_distance: float=2 * ConflictAnalyzer.SAFETY_DISTANCE, aging_interval: float=0.25):
+        """Initializes an IngestScheduler.
+
+        :param near_distance: The distance to a junction within which a train waiting for a
+            contended track is urgent. Defaults to twice ``ConflictAnalyzer.SAFETY_DISTANCE``.
+        :param aging_interval: The seconds a pending state waits to gain one priority class.
+            Defaults to 0.25.
+        """
+        self.near_distance = near_distance
+        self.aging_interval = aging_interval
+        self.latencies = {priority_class: deque(maxlen=IngestScheduler.LATENCY_SAMPLES) for priority_class in IngestScheduler.PRIORITY_CLASSES}
+        self.latency_lock = threading.Lock()
+
+    def score(self, railway, pending, now: float) -> float:
+        """Returns the score of a pending client state, higher to be handled sooner. The
+        state is classified once, recording its class in ``pending.priority_class`` and its
+        score before aging in ``pending.urgency``, and again only once a newer state of the
+        train replaces it, so scoring the waiting states again on every batch stays cheap.
+
+        :param railway: The master's railway. Only read, so it may be called without the lock
+            guarding the railway while the conflict analysis thread modifies it.
+        :param pending: A PendingClientState.
+        :param now: The current ``time.monotonic()``.
+        :return: The score.
+        """
+        if pending.priority_class is None:
+            (priority_class, closeness) = self.classify(railway, pending.client_state)
+            pending.priority_class = priority_class
+            pending.urgency = priority_class + closeness
+        return pending.urgency + (now - pending.received) / self.aging_interval
+
+    def classify(self, railway, client_state) -> tuple:
+        """Returns the priority class of a client state and how close, from 0 to 1, the
+        train is to reaching the junction ending its track.
+
+        :param railway: The master's railway.
+        :param client_state: The ClientState protobuf message.
+        :return: A tuple of the priority class and the closeness.
+        """
+        train = railway.trains.get(client_state.train.id) if client_state.train.HasField("id") else None
+        if train is None:
+            return (IngestScheduler.NORMAL, 0.0)
+
+        location = client_state.location
+        track = railway.map.tracks.get(location.front_track_id) if location.HasField("front_track_id") else None
+        if train.state == TrainState.PARKED or track is None:
+            distance = None
+            closeness = 0.5
+        else:
+            distance = max(track.length - location.front_position, 0)
+            distance_per_second = client_state.speed * TrainMovement.SPEED_FACTOR / 3600
+            closeness = 1 / (1 + distance / distance_per_second) if distance_per_second > 0 else 0.0
+
+        next_track = IngestScheduler.get_next_track(train)
+        if next_track is None:
+            return (IngestScheduler.IDLE, 0.0)
+
+        if distance is not None and distance <= ConflictAnalyzer.SAFETY_DISTANCE:
+            return (IngestScheduler.URGENT, closeness)
+
+        if distance is None:
+            # only the favored train may be cleared to enter the next track
+            if railway.waiting_trains.peek_favored_train(next_track.name) != train.name:
+                return (IngestScheduler.IDLE, closeness)
+            near = True
+        else:
+            near = distance <= self.near_distance
+
+        if near and IngestScheduler.is_contended(railway, train, next_track):
+            return (IngestScheduler.URGENT, closeness)
+
+        if near or client_state.speed > 0:
+            return (IngestScheduler.NORMAL, closeness)
+        return (IngestScheduler.IDLE, closeness)
+
+    @staticmethod
+    def get_next_track(train):
+        """Returns the track a train enters next, or None if it has no route or no more tracks to enter."""
+        if train.route is None:
+            return None
+        try:
+            return train.get_next_track_for_conflict_analyzer()
+        except (IndexError, KeyError, AttributeError):
+            return None
+
+    @staticmethod
+    def is_contended(railway, train, next_track) -> bool:
+        """Returns whether a track holds trains or another train than ``train`` waits to enter it."""
+        if len(next_track.trains) > 0:
+            return True
+        waiting = railway.waiting_trains.counts.get(next_track.name, 0)
+        if railway.waiting_trains.waiting_for.get(train.name) == next_track.name:
+            waiting -= 1
+        return waiting > 0
+
+    def record_latency(self, priority_class: int, seconds: float):
+        """Records the time from the arrival of a client state to the response to it.
+
+        :param priority_class: The priority class the state was handled in.
+        :param seconds: The latency, in seconds.
+        """
+        with self.latency_lock:
+            self.latencies[IngestScheduler.PRIORITY_CLASSES[priority_class]].append(seconds)
+
+    def get_latency_percentiles(self) -> dict:
+        """Returns the number of recorded latencies and their 50th, 95th and 99th
+        percentiles, in milliseconds, for each priority class."""
+        with self.latency_lock:
+            samples = {priority_class: sorted(latencies) for (priority_class, latencies) in self.latencies.items()}
+
+        percentiles = {}
+        for (priority_class, latencies) in samples.items():
+            percentiles[priority_class] = {"count": len(latencies)}
+            for fraction in (0.5, 0.95, 0.99):
+                value = latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0.0
+                percentiles[priority_class][f"p{int(fraction * 100)}_ms"] = round(value, 3)
+        return percentiles
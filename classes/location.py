@@ -1,11 +1,65 @@
 import TrackNet_pb2
 import logging
+from collections.abc import MutableMapping
 from classes.junction import Junction
 from classes.track import Track
 
 LOGGER = logging.getLogger(__name__)
 
 
+class CartPosition(MutableMapping):
+    """The track, junction and position of one cart of a train. Fields are slots, so a 
+    cart takes a fraction of the memory of a dictionary and reads like any attribute.
+
+    The cart also behaves as a mapping with the keys ``"track"``, ``"junction"`` and 
+    ``"position"``, so code written against the dictionaries carts used to be keeps working.
+
+    Attributes
+    ----------
+    track : Track
+        The track of the cart. See ``Location`` for what it means at each position.
+    junction : Junction
+        The junction of the cart. See ``Location`` for what it means at each position.
+    position : float
+        The cart's position along the track.
+    """
+
+    __slots__ = ("track", "junction", "position")
+
+    def __init__(self, track: Track=None, junction: Junction=None, position: float=0):
+        """Initializes a CartPosition instance.
+
+        :param track: The track of the cart. Defaults to None.
+        :param junction: The junction of the cart. Defaults to None.
+        :param position: The cart's position along the track. Defaults to 0.
+        """
+        self.track = track
+        self.junction = junction
+        self.position = position
+
+    def __getitem__(self, key: str):
+        if key not in CartPosition.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in CartPosition.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str):
+        raise TypeError("CartPosition fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(CartPosition.__slots__)
+
+    def __len__(self):
+        return len(CartPosition.__slots__)
+
+    def __repr__(self):
+        return f"CartPosition(track={self.track}, junction={self.junction}, position={self.position})"
+
+
 class Location:
     """Used to store a train's location on a track, including its front and 
     back cart positions relative to junctions and tracks.
@@ -15,7 +69,7 @@ class Location:
 
     Attributes
     ----------
-    front_cart: A dictionary containing the front cart's track, junction, and position. 
+    front_cart: A CartPosition holding the front cart's track, junction, and position. 
         - When the cart position is ``0``, 
         the junction is the current junction, and
         the track is last track the cart was on.
@@ -24,9 +78,11 @@ class Location:
         the track is the current track, and
         the junction is last junction the cart was at.
 
-    back_cart: A dictionary similar to ``front_cart``, but for the back cart. When moving, the junction is the one the cart is heading from.
+    back_cart: A CartPosition like ``front_cart``, but for the back cart. When moving, the junction is the one the cart is heading from.
     """
 
+    __slots__ = ("front_cart", "back_cart")
+
     def __init__(self,front_junction: Junction=None, back_junction: Junction=None,
         front_track: Track=None, back_track: Track=None, front_position: float=0, back_position: float=0):
         """Initializes a Location instance.
@@ -38,16 +94,8 @@ class Location:
         :param front_position: The front cart's position along the track. Defaults to 0.
         :param back_position: The back cart's position along the track. Defaults to 0.
         """
-        self.front_cart = {
-            "track": front_track,
-            "junction": front_junction,
-            "position": front_position,
-        }
-        self.back_cart = {
-            "track": back_track,
-            "junction": back_junction,
-            "position": back_position,
-        }
+        self.front_cart = CartPosition(front_track, front_junction, front_position)
+        self.back_cart = CartPosition(back_track, back_junction, back_position)
 
     def set_location_message(self, msg: TrackNet_pb2.Location):
         """Sets the location message for network communication based on the current location of the train.
@@ -56,21 +104,21 @@ class Location:
 
         :param msg: The TrackNet_pb2.Location message to be updated with the train's location.
         """
-        if self.front_cart["track"] is not None:
-            msg.front_track_id = self.front_cart["track"].name
+        if self.front_cart.track is not None:
+            msg.front_track_id = self.front_cart.track.name
 
-        if self.front_cart["junction"] is not None:
-            msg.front_junction_id = self.front_cart["junction"].name
+        if self.front_cart.junction is not None:
+            msg.front_junction_id = self.front_cart.junction.name
 
-        msg.front_position = self.front_cart["position"]
+        msg.front_position = self.front_cart.position
 
-        if self.back_cart["track"] is not None:
-            msg.back_track_id = self.back_cart["track"].name
+        if self.back_cart.track is not None:
+            msg.back_track_id = self.back_cart.track.name
 
-        if self.back_cart["junction"] is not None:
-            msg.back_junction_id = self.back_cart["junction"].name
+        if self.back_cart.junction is not None:
+            msg.back_junction_id = self.back_cart.junction.name
 
-        msg.back_position = self.back_cart["position"]
+        msg.back_position = self.back_cart.position
 
     def set_position(self, distance_moved: int, train_length: int):
         """Updates the position of the train's front and back carts based on the distance moved.
@@ -81,8 +129,8 @@ class Location:
         :param distance_moved: The distance the train has moved.
         :param train_length: The length of the train.
         """
-        self.front_cart["position"] += distance_moved
-        self.back_cart["position"] = max(0, self.front_cart["position"] - train_length)
+        self.front_cart.position += distance_moved
+        self.back_cart.position = max(0, self.front_cart.position - train_length)
 
     def check_back_cart_departed(self) -> bool:
         """Checks if the back cart has departed from a junction or a starting point.
@@ -92,7 +140,7 @@ class Location:
 
         :return: True if the back cart has departed; False otherwise.
         """
-        if self.back_cart["track"] is not None and self.back_cart["position"] > 0:
+        if self.back_cart.track is not None and self.back_cart.position > 0:
             return True
         return False
 
@@ -104,7 +152,7 @@ class Location:
 
         :return: True if the front cart has departed; False otherwise.
         """
-        if self.front_cart["track"] is not None and self.front_cart["position"] > 0:
+        if self.front_cart.track is not None and self.front_cart.position > 0:
             return True
         return False
 
@@ -117,8 +165,8 @@ class Location:
         :return: True if the front junction is reached; False otherwise.
         """
         if (
-            self.front_cart["track"] is not None
-            and self.front_cart["position"] >= self.front_cart["track"].length
+            self.front_cart.track is not None
+            and self.front_cart.position >= self.front_cart.track.length
         ):
             return True
         return False
@@ -132,8 +180,8 @@ class Location:
         :return: True if the back junction is reached; False otherwise.
         """
         if (
-            self.back_cart["track"] is not None
-            and self.back_cart["position"] >= self.back_cart["track"].length
+            self.back_cart.track is not None
+            and self.back_cart.position >= self.back_cart.track.length
         ):
             return True
         return False
@@ -146,7 +194,7 @@ class Location:
 
         :param junction: The junction to be set for the front cart.
         """
-        self.front_cart["junction"] = junction
+        self.front_cart.junction = junction
 
     def set_junction_back_cart(self, junction: Junction):
         """Sets the junction for the back cart.
@@ -156,15 +204,15 @@ class Location:
 
         :param junction: The junction to be set for the back cart.
         """
-        self.back_cart["junction"] = junction
+        self.back_cart.junction = junction
 
     def set_track(self, track: Track):
         """Sets the track for both the front and back carts.
 
         :param track: The track to be set for both carts.
         """
-        self.front_cart["track"] = track
-        self.back_cart["track"] = track
+        self.front_cart.track = track
+        self.back_cart.track = track
 
     def set_to_park(self):
         """Parks the train at junction
@@ -172,32 +220,32 @@ class Location:
         Used by TrainMovement.handle_arrival_at_junction(). The is how ther client updates the train position, 
         the server never uses this function.
         """
-        self.front_cart["position"] = 0
-        self.back_cart["position"] = 0
+        self.front_cart.position = 0
+        self.back_cart.position = 0
 
     def __str__(self):
         front_cart_track = (
-            self.front_cart["track"].name
-            if self.front_cart["track"]
+            self.front_cart.track.name
+            if self.front_cart.track
             else "None"
         )
         front_cart_junction = (
-            self.front_cart["junction"].name
-            if self.front_cart["junction"]
+            self.front_cart.junction.name
+            if self.front_cart.junction
             else "None"
         )
-        front_cart_position = self.front_cart["position"]
+        front_cart_position = self.front_cart.position
         back_cart_track = (
-            self.back_cart["track"].name
-            if self.back_cart["track"]
+            self.back_cart.track.name
+            if self.back_cart.track
             else "None"
         )
         back_cart_junction = (
-            self.back_cart["junction"].name
-            if self.back_cart["junction"]
+            self.back_cart.junction.name
+            if self.back_cart.junction
             else "None"
         )
-        back_cart_position = self.back_cart["position"]
+        back_cart_position = self.back_cart.position
         frontString = (
             f"    Front: Track: {front_cart_track}, Junction: {front_cart_junction}, Position: {front_cart_position}"
         )
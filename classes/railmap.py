@@ -2,7 +2,9 @@ import logging
 from classes.junction import Junction
 from classes.enums import TrackCondition
 from classes.track import Track
-from queue import PriorityQueue
+from classes.symbol_table import SymbolTable
+from array import array
+import heapq
 
 LOGGER = logging.getLogger(__name__)
 
@@ -16,6 +18,30 @@ class Railmap:
         A dictionary that stores junction objects by their names.
     tracks : dict
         A collection that stores track objects, with track names as keys.
+    changed_junctions : set
+        Names of junctions whose parked trains changed since the changes were last collected.
+    changed_tracks : set
+        Names of tracks whose trains or condition changed since the changes were last collected.
+    unanalyzed_tracks : set
+        Names of tracks whose trains or condition changed since the ConflictAnalyzer last looked at them.
+    junction_symbols : SymbolTable
+        Assigns each junction an integer id in the order junctions were added, used as its index in the 
+        shortest path trees and a TrainStore and as its id in compact protobuf messages.
+    junction_names : list
+        The junction names by id, the ``names`` of ``junction_symbols``.
+    junction_indices : dict
+        Maps each junction name to its id, the ``ids`` of ``junction_symbols``.
+    track_symbols : SymbolTable
+        Assigns each track an integer id in the order tracks were added, used as its index in a 
+        TrainStore and as its id in compact protobuf messages.
+    track_names : list
+        The track names by id, the ``names`` of ``track_symbols``.
+    track_indices : dict
+        Maps each track name to its id, the ``ids`` of ``track_symbols``.
+    shortest_path_trees : dict
+        Cached shortest path trees keyed by (start junction name, avoided track name). Dropped whenever a junction or track is added.
+    max_shortest_path_trees : int
+        The number of shortest path trees kept before the oldest is dropped.
     """
 
     def __init__(self, junctions=None, tracks=None):
@@ -26,6 +52,17 @@ class Railmap:
         """
         self.junctions = {}  # Stores junctions by name
         self.tracks = {}  # Collection of tracks
+        self.changed_junctions = set()
+        self.changed_tracks = set()
+        self.unanalyzed_tracks = set()
+        self.junction_symbols = SymbolTable()
+        self.junction_names = self.junction_symbols.names
+        self.junction_indices = self.junction_symbols.ids
+        self.track_symbols = SymbolTable()
+        self.track_names = self.track_symbols.names
+        self.track_indices = self.track_symbols.ids
+        self.shortest_path_trees = {}
+        self.max_shortest_path_trees = 1024
 
         if junctions:
             for junction_name in junctions:
@@ -44,6 +81,8 @@ class Railmap:
         if name not in self.junctions:
             junction = Junction(name)
             self.junctions[name] = junction
+            self.junction_symbols.intern(name)
+            self.shortest_path_trees = {}
             return junction
         else:
             return self.junctions[name]
@@ -60,8 +99,10 @@ class Railmap:
             junction_b: Junction = self.junctions[junction_b_name]
             track = Track(junction_a_name, junction_b_name, length)
             self.tracks[track.name] = track
+            self.track_symbols.intern(track.name)
             junction_a.add_neighbor(junction_b, track)
             junction_b.add_neighbor(junction_a, track)
+            self.shortest_path_trees = {}
         else:
             LOGGER.debug("One or both junctions do not exist, adding them now.")
 
@@ -71,7 +112,10 @@ class Railmap:
         :param track_id: The identifier (name) of the track.
         :param condition: The new condition to be set for the track.
         """
-        self.tracks[track_id].condition = condition
+        if self.tracks[track_id].condition != condition:
+            self.tracks[track_id].condition = condition
+            self.changed_tracks.add(track_id)
+            self.unanalyzed_tracks.add(track_id)
 
     def has_bad_track_condition(self, track_id: str) -> bool:
         """Checks if a specified track has a BAD condition.
@@ -91,6 +135,9 @@ class Railmap:
     def find_shortest_path(self, start_junction_name: str, destination_junction_name: str, avoid_track_name=None):
         """Finds the shortest path between two junctions, optionally avoiding a specified track.
 
+        The shortest path tree of the start junction is computed once and cached, so 
+        repeated lookups from the same junction only walk the path itself.
+
         example usage = map_instance.find_shortest_path(start_junction_name="A", destination_junction_name="D", avoid_track_name="AB")
 
         :param start_junction_name: The name of the start junction.
@@ -98,48 +145,101 @@ class Railmap:
         :param avoid_track_name: An optional track name to avoid in the pathfinding. Defaults to None.
         :return: A list of Junction objects representing the shortest path.
         """
-        distances = {junction: float("infinity") for junction in self.junctions}
-        previous_junctions = {junction: None for junction in self.junctions}
-        distances[start_junction_name] = 0
+        previous_junctions = self.get_shortest_path_tree(start_junction_name, avoid_track_name)
+        return self.reconstruct_path(
+            previous_junctions,
+            self.junction_indices[start_junction_name],
+            self.junction_indices[destination_junction_name],
+        )
+
+    def get_shortest_path_tree(self, start_junction_name: str, avoid_track_name=None) -> array:
+        """Returns the shortest path tree rooted at a junction, computing it if it is not cached.
 
-        pq = PriorityQueue()
-        pq.put((0, start_junction_name))
+        Avoiding a track only changes the tree if the track is one of its edges, so 
+        in every other case the tree computed without avoiding anything is reused.
 
-        while not pq.empty():
-            current_distance, current_junction_name = pq.get()
-            current_junction = self.junctions[current_junction_name]
+        :param start_junction_name: The name of the junction at the root of the tree.
+        :param avoid_track_name: An optional track name to avoid. Defaults to None.
+        :return: An array mapping each junction index to the index of its predecessor 
+            on the shortest path from the root, -1 for the root and unreachable junctions.
+        """
+        key = (start_junction_name, avoid_track_name)
+        previous_junctions = self.shortest_path_trees.get(key)
+        if previous_junctions is not None:
+            return previous_junctions
+
+        if avoid_track_name is not None:
+            previous_junctions = self.get_shortest_path_tree(start_junction_name)
+            if not self.tree_uses_track(previous_junctions, self.tracks.get(avoid_track_name)):
+                return previous_junctions
 
-            if current_junction_name == destination_junction_name:
-                break
+        previous_junctions = self.compute_shortest_path_tree(start_junction_name, avoid_track_name)
+        if len(self.shortest_path_trees) >= self.max_shortest_path_trees:
+            # forget the oldest tree
+            del self.shortest_path_trees[next(iter(self.shortest_path_trees))]
+        self.shortest_path_trees[key] = previous_junctions
+        return previous_junctions
 
-            for neighbor_name, track in current_junction.neighbors.items():
+    def compute_shortest_path_tree(self, start_junction_name: str, avoid_track_name=None) -> array:
+        """Runs Dijkstra's algorithm over the whole map from a junction.
+
+        :param start_junction_name: The name of the junction at the root of the tree.
+        :param avoid_track_name: An optional track name to avoid. Defaults to None.
+        :return: An array mapping each junction index to the index of its predecessor, -1 if none.
+        """
+        distances = {junction: float("infinity") for junction in self.junctions}
+        previous_junctions = array("i", [-1]) * len(self.junction_names)
+        distances[start_junction_name] = 0
+
+        heap = [(0, start_junction_name)]
+        while heap:
+            current_distance, current_junction_name = heapq.heappop(heap)
+            if current_distance > distances[current_junction_name]:
+                continue # stale entry, junction already reached by a shorter path
+
+            current_index = self.junction_indices[current_junction_name]
+            for neighbor_name, track in self.junctions[current_junction_name].neighbors.items():
                 if track.name == avoid_track_name:
                     continue
 
                 distance = current_distance + track.length
                 if distance < distances[neighbor_name]:
                     distances[neighbor_name] = distance
-                    previous_junctions[neighbor_name] = current_junction_name
-                    pq.put((distance, neighbor_name))
+                    previous_junctions[self.junction_indices[neighbor_name]] = current_index
+                    heapq.heappush(heap, (distance, neighbor_name))
 
-        return self.reconstruct_path(previous_junctions, start_junction_name, destination_junction_name)
+        return previous_junctions
+
+    def tree_uses_track(self, previous_junctions: array, track) -> bool:
+        """Checks whether a track is an edge of a shortest path tree.
+
+        :param previous_junctions: The predecessor array of the tree.
+        :param track: The Track object, or None.
+        :return: True if a path in the tree runs along the track.
+        """
+        if track is None:
+            return False
+        index_a = self.junction_indices[track.junctions[0]]
+        index_b = self.junction_indices[track.junctions[1]]
+        return previous_junctions[index_a] == index_b or previous_junctions[index_b] == index_a
 
-    def reconstruct_path(self, previous_junctions: dict, start: str, end: str) -> list:
-        """Reconstructs a path from start to end junction using the data from pathfinding.
+    def reconstruct_path(self, previous_junctions: array, start: int, end: int) -> list:
+        """Reconstructs a path from start to end junction using a shortest path tree.
 
-        :param previous_junctions: A dictionary mapping each junction to its predecessor on the path.
-        :param start: The name of the start junction.
-        :param end: The name of the end junction.
-        :return: A list of Junction objects representing the path.
+        :param previous_junctions: The predecessor array of the tree rooted at the start junction.
+        :param start: The index of the start junction.
+        :param end: The index of the end junction.
+        :return: A list of Junction objects representing the path, or None if there is no path.
         """
         path = []
         current = end
         while current != start:
-            if current is None:
+            if current == -1:
                 return None  # Path not found
-            path.insert(0, self.junctions[current])
+            path.append(self.junctions[self.junction_names[current]])
             current = previous_junctions[current]
-        path.insert(0, self.junctions[start])
+        path.append(self.junctions[self.junction_names[start]])
+        path.reverse()
         return path
 
     def print_map(self):
@@ -3,6 +3,9 @@ from .route import *
 from .train import *
 from .track import *
 from .location import *
+from .waiting_index import WaitingTrainIndex
+from .train_store import TrainStore
+from .symbol_table import RailwaySymbols, SymbolTable
 import logging
 
 LOGGER = logging.getLogger(__name__)
@@ -36,18 +39,35 @@ class Railway:
         Stores all trains by their names. Each train is associated with its name as the key.
     train_counter : int
         A counter used to assign unique names to newly created trains.
+    changed_trains : set
+        Names of trains that were created or updated since the changes were last collected.
+    unanalyzed_trains : set
+        Names of trains whose command may have changed since the ConflictAnalyzer last looked at them.
+    waiting_trains : WaitingTrainIndex
+        Indexes the trains waiting to enter each track.
+    train_symbols : SymbolTable
+        Assigns each train an integer id, used as its id in compact protobuf messages.
+    train_store : TrainStore
+        Holds the trains in columns when the railway is columnar, in which case the 
+        values of ``trains`` are views of its rows. None otherwise.
     """
 
-    def __init__(self, trains=None, junctions=None, tracks=None):
+    def __init__(self, trains=None, junctions=None, tracks=None, columnar=False):
         """Initializes the Railway system with optional trains, junctions, and tracks.
 
         :param trains: A dictionary of trains where keys are train names and values are train lengths. Defaults to None.
         :param junctions: A list of junction names to initialize the railway map. Defaults to None.
         :param tracks: A list of tuples where each tuple contains information about a track (start junction, end junction, and length). Defaults to None.
+        :param columnar: Whether to keep the trains in a TrainStore. Defaults to False.
         """
         self.map = Railmap(junctions, tracks)  # Composition: Railway has a Railmap; Track & Junction are now accessed as map.tracks and map.junctions
         self.trains = {}  # store trains by name
         self.train_counter = 0
+        self.changed_trains = set()
+        self.unanalyzed_trains = set()
+        self.waiting_trains = WaitingTrainIndex()
+        self.train_symbols = SymbolTable()
+        self.train_store = TrainStore(self.map) if columnar else None
 
         if trains:
             for train_name, train_length in trains.items():
@@ -62,10 +82,13 @@ class Railway:
         """
         new_name = "Train" + str(self.train_counter)
         self.train_counter += 1
-        new_train = Train(new_name, length)
+        new_train = self.new_train_object(new_name, length)
         # add train to origin junction
         self.map.junctions[origin_id].park_train(new_train)
         self.trains[new_name] = new_train
+        self.changed_trains.add(new_name)
+        self.unanalyzed_trains.add(new_name)
+        self.map.changed_junctions.add(origin_id)
         return new_train
 
     def add_train(self, name: str, length: int):
@@ -75,10 +98,63 @@ class Railway:
         :param length: The length of the new train.
         """
         if name not in self.trains:
-            self.trains[name] = Train(name, length)
+            self.trains[name] = self.new_train_object(name, length)
         else:
             raise Exception(f"Train {name} already exists.")
 
+    def new_train_object(self, name: str, length: int) -> Train:
+        """Creates a Train object, as a view of a new row when the railway is columnar.
+
+        :param name: The name of the new train.
+        :param length: The length of the new train.
+        :return: The Train object, not yet added to the railway.
+        """
+        self.train_symbols.intern(name)
+        if self.train_store is not None:
+            return self.train_store.add_train(name, length)
+        return Train(name, length)
+
+    def put_train(self, train: Train) -> Train:
+        """Adds a train replicated from the master, or copies it onto the train of the
+        same name so that the tracks and junctions holding that train stay valid. The
+        train is recorded as unanalyzed and its waiting index entry is updated, which
+        keeps a slave's conflict analysis current without recording replication changes.
+
+        :param train: A Train object converted from the master's message.
+        :return: The Train object now held by the railway.
+        """
+        existing = self.trains.get(train.name)
+        if existing is None:
+            existing = self.new_train_object(train.name, train.length)
+            self.trains[train.name] = existing
+        else:
+            existing.length = train.length
+        existing.state = train.state
+        existing.current_speed = train.current_speed
+        existing.location = train.location
+        existing.route = train.route
+        existing.next_junction = train.next_junction
+        existing.prev_junction = train.prev_junction
+
+        self.unanalyzed_trains.add(train.name)
+        self.update_waiting_index(existing)
+        return existing
+
+    def replace_trains(self, trains: dict) -> dict:
+        """Replaces all trains of the railway, such as when restoring a backup. When 
+        the railway is columnar the trains are copied into a fresh TrainStore.
+
+        :param trains: A dictionary mapping train names to Train objects.
+        :return: The dictionary of trains now held by the railway.
+        """
+        for name in trains:
+            self.train_symbols.intern(name)
+        if self.train_store is not None:
+            self.train_store.clear()
+            trains = {name: self.train_store.adopt_train(train) for name, train in trains.items()}
+        self.trains = trains
+        return trains
+
     def update_train(self, train, state, location_obj: Location, route_obj: Route) -> bool:
         """Updates the state and location of a specified train based on the provided protobuf messages.
 
@@ -89,14 +165,19 @@ class Railway:
         """
         train_done = False
 
-        front_track_id = location_obj.front_cart["track"].name
-        front_junction_id = location_obj.front_cart["junction"].name
-        front_position = location_obj.front_cart["position"]
-        back_track_id = location_obj.back_cart["track"].name
-        back_junction_id = location_obj.back_cart["junction"].name
-        back_position = location_obj.back_cart["position"]
-        
-        LOGGER.debugv(f" train name: {train.name} \n train location={train.location} \n new location={location_obj}")
+        front_track_id = location_obj.front_cart.track.name
+        front_junction_id = location_obj.front_cart.junction.name
+        front_position = location_obj.front_cart.position
+        back_track_id = location_obj.back_cart.track.name
+        back_junction_id = location_obj.back_cart.junction.name
+        back_position = location_obj.back_cart.position
+
+        # read once, a columnar train builds its location anew on every read
+        previous_location = train.location
+        LOGGER.debugv(f" train name: {train.name} \n train location={previous_location} \n new location={location_obj}")
+        self.mark_location_changed(previous_location)
+        self.mark_location_changed(location_obj)
+        self.changed_trains.add(train.name)
 		
 
         # check if new track
@@ -118,7 +199,7 @@ class Railway:
             
             # remove train from track
             try:
-                self.map.tracks[train.location.back_cart["track"].name].remove_train(train.name)
+                self.map.tracks[previous_location.back_cart.track.name].remove_train(train.name)
             except:
                 pass
             # add tain to new junction
@@ -129,8 +210,10 @@ class Railway:
         self.trains[train.name].location = location_obj
         self.trains[train.name].state = state
         self.trains[train.name].route = route_obj
+        self.unanalyzed_trains.add(train.name)
+        self.update_waiting_index(train)
 
-        if self.trains[train.name].location.back_cart["junction"] == self.trains[train.name].route.destination:
+        if location_obj.back_cart.junction == route_obj.destination:
             try: 
                 self.map.junctions[back_junction_id].depart_train(train)
                 train_done = True
@@ -144,6 +227,82 @@ class Railway:
         # self.set_route_for_train(route_msg, train)
         # train.route = MessageConverter.route_msg_to_obj(route_msg, self.map.junctions)
 
+    def get_symbols(self) -> RailwaySymbols:
+        """Returns the symbol tables of the railway's junctions, tracks and trains.
+
+        :return: A RailwaySymbols instance sharing the railway's tables.
+        """
+        return RailwaySymbols(self.map.junction_symbols, self.map.track_symbols, self.train_symbols)
+
+    def mark_location_changed(self, location_obj: Location):
+        """Records the tracks and junctions of a location as changed, since a train 
+        arriving at or leaving them changes which trains they hold.
+
+        :param location_obj: The location whose tracks and junctions are recorded.
+        """
+        for cart in (location_obj.front_cart, location_obj.back_cart):
+            if cart.track is not None:
+                self.map.changed_tracks.add(cart.track.name)
+                self.map.unanalyzed_tracks.add(cart.track.name)
+            if cart.junction is not None:
+                self.map.changed_junctions.add(cart.junction.name)
+
+    def pop_changes(self):
+        """Returns the names of the trains, tracks and junctions that changed since the 
+        last call and starts recording changes afresh.
+
+        :return: A tuple of sets (train names, track names, junction names).
+        """
+        changes = (self.changed_trains, self.map.changed_tracks, self.map.changed_junctions)
+        self.changed_trains = set()
+        self.map.changed_tracks = set()
+        self.map.changed_junctions = set()
+        return changes
+
+    def update_waiting_index(self, train: Train):
+        """Moves a train to the waiting list of the track it will enter next. The tracks 
+        it leaves and joins are recorded as unanalyzed, as is the train that was favored 
+        to enter each of them, since that train may no longer be favored.
+
+        :param train: The Train object whose state or route changed.
+        """
+        next_track = train.get_next_track_for_conflict_analyzer() if train.route is not None else None
+        next_track_id = next_track.name if next_track is not None else None
+        previous_track_id = self.waiting_trains.waiting_for.get(train.name)
+        if previous_track_id == next_track_id:
+            return
+
+        affected_track_ids = [track_id for track_id in (previous_track_id, next_track_id) if track_id is not None]
+        for track_id in affected_track_ids:
+            favored_train_id = self.waiting_trains.get_favored_train(track_id)
+            if favored_train_id is not None:
+                self.unanalyzed_trains.add(favored_train_id)
+
+        self.waiting_trains.set_next_track(train.name, next_track_id)
+        self.map.unanalyzed_tracks.update(affected_track_ids)
+
+    def rebuild_waiting_index(self):
+        """Rebuilds the waiting train index from scratch and records every train and 
+        track as unanalyzed. Used after the railway was replaced wholesale, such as when 
+        a slave is promoted and restores its backup.
+        """
+        self.waiting_trains = WaitingTrainIndex()
+        for train in self.trains.values():
+            self.update_waiting_index(train)
+        self.unanalyzed_trains = set(self.trains.keys())
+        self.map.unanalyzed_tracks = set(self.map.tracks.keys())
+
+    def pop_unanalyzed_changes(self):
+        """Returns the names of the trains and tracks that changed since the 
+        ConflictAnalyzer last looked at them and starts recording afresh.
+
+        :return: A tuple of sets (train names, track names).
+        """
+        changes = (self.unanalyzed_trains, self.map.unanalyzed_tracks)
+        self.unanalyzed_trains = set()
+        self.map.unanalyzed_tracks = set()
+        return changes
+
     def set_route_for_train(self, route: TrackNet_pb2.Route, train: Train):
         """Sets a new route for the specified train.
 
@@ -177,8 +336,8 @@ class Railway:
                     print(f"Track: {track_name}, Length: {track.length}m, Speed Limit: {track.speed}km/h")
                     for train_id, train_data in track.trains.items():
                         # Rounding positions to two decimal places
-                        front_position = round(train_data.location.front_cart['position'], 2)
-                        back_position = round(train_data.location.back_cart['position'], 2)
+                        front_position = round(train_data.location.front_cart.position, 2)
+                        back_position = round(train_data.location.back_cart.position, 2)
                         print(f"  - Train: {train_id}, Speed: {train_data.current_speed}km/h, "
                             f"Position: Front {front_position}m - Back {back_position}m")
                 else:
@@ -207,8 +366,8 @@ class Railway:
                     map_overview += f"Track: {track_name}, Length: {track.length}m, Speed Limit: {track.speed}km/h\n"
                     for train_id, train_data in track.trains.items():
                         # Rounding positions to two decimal places
-                        front_position = round(train_data.location.front_cart['position'], 2)
-                        back_position = round(train_data.location.back_cart['position'], 2)
+                        front_position = round(train_data.location.front_cart.position, 2)
+                        back_position = round(train_data.location.back_cart.position, 2)
                         map_overview += f"  - Train: {train_id}, Speed: {train_data.current_speed}km/h, " \
                                         f"Position: Front {front_position}m - Back {back_position}m\n"
                 else:
@@ -0,0 +1,101 @@
+from classes.enums import TrainState
+from classes.conflict_analyzer import ConflictAnalyzer
+from classes.trainmovement import TrainMovement
+import TrackNet_pb2
+
+
+class ReportScheduler:
+    """Chooses how long a train waits before it reports its state again. Trains within
+    ``near_distance`` of a junction or of another train report every ``min_interval``
+    seconds, as the conflict analyzer has to act on them soon. Further away, a train
+    waits long enough to report at least twice before it gets that close, up to
+    ``max_interval`` seconds, and trains that are not moving wait ``max_interval``.
+
+    The client uses ``get_interval`` with what it knows about its own train, the master
+    uses ``suggest_interval``, which also sees the other trains, to hint an interval in
+    its responses.
+
+    Attributes
+    ----------
+    min_interval : float
+        The shortest interval, in seconds.
+    max_interval : float
+        The longest interval, in seconds.
+    near_distance : float
+        The distance to a junction or another train within which trains report every ``min_interval``.
+    """
+
+    HINT_STEP = 0.5
+
+    def __init__(self, min_interval: float=1.0, max_interval: float=10.0, near_distance: float=2 * ConflictAnalyzer.SAFETY_DISTANCE):
+        """Initializes a ReportScheduler.
+
+        :param min_interval: The shortest interval, in seconds. Defaults to 1.
+        :param max_interval: The longest interval, in seconds. Defaults to 10.
+        :param near_distance: The distance within which trains report every ``min_interval``.
+            Defaults to twice ``ConflictAnalyzer.SAFETY_DISTANCE``.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.near_distance = near_distance
+
+    def get_interval(self, distance: float, speed: int) -> float:
+        """Returns the report interval of a train.
+
+        :param distance: The distance from the train's front to the nearest junction or train,
+            None if the train is not on a track.
+        :param speed: The speed the train moves at, a ``TrainSpeed`` value.
+        :return: The interval, in seconds.
+        """
+        if distance is not None and distance <= self.near_distance:
+            return self.min_interval
+
+        distance_per_second = speed * TrainMovement.SPEED_FACTOR / 3600
+        if distance is None or distance_per_second <= 0:
+            return self.max_interval
+
+        interval = (distance - self.near_distance) / distance_per_second / 2
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def suggest_interval(self, railway, train, command) -> float:
+        """Returns the report interval the master hints to a train, rounded to ``HINT_STEP``
+        seconds so that the hint only changes when the train's situation does.
+
+        :param railway: The master's railway.
+        :param train: The Train object.
+        :param command: The Command the train is sent.
+        :return: The interval, in seconds.
+        """
+        if train.state == TrainState.PARKED:
+            # a parked train cleared to leave is about to enter a track
+            if command.status == TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR:
+                return self.min_interval
+            return self.max_interval
+
+        interval = self.get_interval(ReportScheduler.get_conflict_distance(train), command.speed)
+        return max(round(interval / self.HINT_STEP) * self.HINT_STEP, self.min_interval)
+
+    @staticmethod
+    def get_conflict_distance(train) -> float:
+        """Returns the distance from a train's front to the junction at the end of its
+        track, or to the nearest other train on the track if that is closer.
+
+        :param train: A Train object with its location on the master's railway.
+        :return: The distance, or None if the train is not on a track.
+        """
+        front_cart = train.location.front_cart
+        track = front_cart.track
+        if track is None or front_cart.position <= 0:
+            return None
+
+        distance = track.length - front_cart.position
+        for other in track.trains.values():
+            if other is train:
+                continue
+            other_location = other.location
+            if other_location.back_cart.position >= front_cart.position:
+                gap = other_location.back_cart.position - front_cart.position
+            else:
+                gap = train.location.back_cart.position - other_location.front_cart.position
+            distance = min(distance, max(gap, 0))
+        return distance
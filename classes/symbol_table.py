@@ -0,0 +1,79 @@
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SymbolTable:
+    """Assigns dense integer ids to names in the order they are first seen. Ids are
+    never reused or reassigned, so a copy of the table can be kept up to date by
+    sending it only the names added since it was last updated.
+
+    Attributes
+    ----------
+    names : list
+        The name of each id.
+    ids : dict
+        Maps each name to its id.
+    """
+
+    def __init__(self):
+        """Initializes an empty table."""
+        self.names = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """Returns the id of a name, assigning the next id if the name is new.
+
+        :param name: The name to look up.
+        :return: The id of the name.
+        """
+        symbol_id = self.ids.get(name)
+        if symbol_id is None:
+            symbol_id = len(self.names)
+            self.ids[name] = symbol_id
+            self.names.append(name)
+        return symbol_id
+
+    def extend(self, first_id: int, names):
+        """Adds names received from another table, the first of which has id ``first_id`` there.
+
+        :param first_id: The id of the first name in the other table.
+        :param names: The names, in id order.
+        """
+        if first_id != len(self.names):
+            raise ValueError(f"Symbols from id {first_id} do not follow on the {len(self.names)} known symbols")
+        for name in names:
+            self.intern(name)
+
+
+class RailwaySymbols:
+    """The symbol tables of a railway's junctions, tracks and trains, which compact
+    protobuf messages refer to instead of names.
+
+    Attributes
+    ----------
+    junctions : SymbolTable
+        The junction names.
+    tracks : SymbolTable
+        The track names.
+    trains : SymbolTable
+        The train names.
+    """
+
+    def __init__(self, junctions: SymbolTable=None, tracks: SymbolTable=None, trains: SymbolTable=None):
+        """Initializes the symbols, with empty tables for those not given.
+
+        :param junctions: The junction symbol table. Defaults to a new table.
+        :param tracks: The track symbol table. Defaults to a new table.
+        :param trains: The train symbol table. Defaults to a new table.
+        """
+        self.junctions = junctions if junctions is not None else SymbolTable()
+        self.tracks = tracks if tracks is not None else SymbolTable()
+        self.trains = trains if trains is not None else SymbolTable()
+
+    def get_counts(self) -> tuple:
+        """Returns the number of junction, track and train symbols."""
+        return (len(self.junctions), len(self.tracks), len(self.trains))
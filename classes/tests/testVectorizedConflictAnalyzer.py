@@ -0,0 +1,102 @@
+import logging
+import random
+from utils import *
+from classes.command import Command
+from classes.conflict_analyzer import CollisionException, ConflictAnalyzer
+from classes.enums import TrainState, TrainSpeed, TrackCondition
+from classes.location import Location
+from classes.railway import Railway
+from classes.route import Route
+from bench import topology
+import TrackNet_pb2
+
+setup_logging()
+logging.disable(logging.CRITICAL)
+
+# Checks that the vectorized conflict checks give the same commands, and raise the 
+# same collisions, as the train by train checks they replace.
+
+
+def build_railway(seed, columnar, trains_per_track=4, bad_tracks=0.2):
+    rng = random.Random(seed)
+    junctions, tracks = topology.grid(64, rng)
+    railway = Railway(None, junctions, tracks, columnar=columnar)
+
+    topology.fill_tracks(railway, 30, trains_per_track, rng)
+    for track in railway.map.tracks.values():
+        if track.trains and rng.random() < bad_tracks:
+            railway.map.set_track_condition(track.name, TrackCondition.BAD)
+
+    for _ in range(20):
+        origin = rng.choice(junctions)
+        train = railway.create_new_train(2, origin)
+        route = topology.random_route(railway, origin, rng)
+        railway.update_train(train, TrainState.PARKED, topology.parked_location(route.junctions[0], route.get_next_track()), route)
+    return railway
+
+
+def random_commands(railway, rng):
+    commands = {}
+    for train_id in railway.trains:
+        status, speed = rng.choice([
+            (TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR, TrainSpeed.FAST),
+            (TrackNet_pb2.ServerResponse.UpdateStatus.CHANGE_SPEED, TrainSpeed.SLOW),
+            (TrackNet_pb2.ServerResponse.UpdateStatus.STOP, TrainSpeed.STOPPED),
+            (TrackNet_pb2.ServerResponse.UpdateStatus.PARK, TrainSpeed.FAST),
+        ])
+        commands[train_id] = Command.of(status, speed.value)
+    return commands
+
+
+def outcome(resolve):
+    try:
+        return resolve()
+    except CollisionException as e:
+        return str(e)
+
+
+def track_conflicts_by_track(railway, commands):
+    for track_id in railway.map.tracks.keys():
+        commands = ConflictAnalyzer.resolve_current_track_conflict(railway, commands, track_id)
+    return commands
+
+
+failures = 0
+for seed in range(20):
+    for columnar in (False, True):
+        railway = build_railway(seed, columnar)
+        rng = random.Random(seed)
+        commands = random_commands(railway, rng)
+
+        expected = outcome(lambda: track_conflicts_by_track(railway, dict(commands)))
+        actual = outcome(lambda: ConflictAnalyzer.resolve_current_track_conflicts_vectorized(railway, dict(commands)))
+        if expected != actual:
+            failures += 1
+            print(f"seed {seed} columnar {columnar}: track conflicts differ")
+
+        expected = outcome(lambda: ConflictAnalyzer.resolve_conflicts(railway, {}))
+        actual = outcome(lambda: ConflictAnalyzer.resolve_conflicts_vectorized(railway, {}))
+        if expected != actual:
+            failures += 1
+            print(f"seed {seed} columnar {columnar}: full analysis differs")
+
+# collisions: overlapping trains, then trains heading opposite ways
+for columnar in (False, True):
+    railway = build_railway(0, columnar, trains_per_track=1)
+    track = next(track for track in railway.map.tracks.values() if track.trains)
+    junction_a, junction_b = [railway.map.junctions[name] for name in track.junctions]
+    train = railway.create_new_train(3, junction_a.name)
+    front_position = next(iter(track.trains.values())).location.front_cart.position
+    location = Location(junction_a, junction_a, track, track, front_position, front_position - 3)
+    railway.update_train(train, TrainState.RUNNING, location, Route([junction_a, junction_b]))
+
+    for heading in (None, junction_a):
+        train.next_junction = heading
+        expected = outcome(lambda: track_conflicts_by_track(railway, random_commands(railway, random.Random(1))))
+        actual = outcome(lambda: ConflictAnalyzer.resolve_current_track_conflicts_vectorized(railway, random_commands(railway, random.Random(1))))
+        print(f"columnar {columnar}: {expected}")
+        if expected != actual:
+            failures += 1
+            print(f"columnar {columnar}: collision differs: {actual}")
+
+print(f"{failures} mismatches")
@@ -25,6 +25,9 @@ class Train:
         A list of strings denoting the junctions in a train's route. If not provided during initialization, it should be set using the `set_route` method.
 
     """
+
+    __slots__ = ("name", "length", "state", "location", "route", "current_speed", "next_junction", "prev_junction")
+
     def __init__(self, name: str=None, length: int=5, state:TrainState=TrainState.PARKED, location: Location=Location(),
         route: Route=None, current_speed: int=0, next_junction: Junction=None, prev_junction: Junction=None):
         """Initializes a new Train instance.
@@ -93,27 +96,27 @@ class Train:
         )
         print(f"Printing Location: ")
         front_cart_track = (
-            self.location.front_cart["track"].name
-            if self.location.front_cart["track"]
+            self.location.front_cart.track.name
+            if self.location.front_cart.track
             else "None"
         )
         front_cart_junction = (
-            self.location.front_cart["junction"].name
-            if self.location.front_cart["junction"]
+            self.location.front_cart.junction.name
+            if self.location.front_cart.junction
             else "None"
         )
-        front_cart_position = self.location.front_cart["position"]
+        front_cart_position = self.location.front_cart.position
         back_cart_track = (
-            self.location.back_cart["track"].name
-            if self.location.back_cart["track"]
+            self.location.back_cart.track.name
+            if self.location.back_cart.track
             else "None"
         )
         back_cart_junction = (
-            self.location.back_cart["junction"].name
-            if self.location.back_cart["junction"]
+            self.location.back_cart.junction.name
+            if self.location.back_cart.junction
             else "None"
         )
-        back_cart_position = self.location.back_cart["position"]
+        back_cart_position = self.location.back_cart.position
         print(
             f"    Front: Track: {front_cart_track}, Junction: {front_cart_junction}, Position: {round(front_cart_position,3)}"
         )
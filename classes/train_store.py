@@ -0,0 +1,290 @@
+from array import array
+from classes.enums import TrainState
+from classes.location import Location
+from classes.train import Train
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+NO_STATE = -1
+NO_TRACK = -1
+NO_JUNCTION = -1
+
+STATES_BY_VALUE = {state.value: state for state in TrainState}
+
+# values of the states in which Railway.update_train keeps a train on a track rather than at a junction
+ON_TRACK_STATE_VALUES = frozenset(
+    state.value for state in TrainState if state not in (TrainState.PARKED, TrainState.PARKING)
+)
+
+
+
+
+class TrainStore:
+    """Stores the trains of a railway column by column, one row per train, so the
+    fields compared across trains live in compact typed arrays instead of being
+    spread over one object per train. Tracks and junctions are referred to by their
+    index in ``Railmap.track_names`` and ``Railmap.junction_names``, and train states
+    by their enum value.
+
+    Trains in the store are ``TrainView`` objects. They behave like any Train, but
+    read and write their state, speed, length and location through the columns.
+
+    Attributes
+    ----------
+    map : Railmap
+        The map whose track and junction indices the columns hold.
+    names : list
+        The name of the train in each row.
+    state : array
+        The TrainState value of each train, or ``NO_STATE``.
+    speed : array
+        The current speed of each train.
+    length : array
+        The length of each train.
+    front_junction : array
+        The junction index of each front cart, or ``NO_JUNCTION``.
+    back_junction : array
+        The junction index of each back cart, or ``NO_JUNCTION``.
+    front_track : array
+        The track index of each front cart, or ``NO_TRACK``.
+    back_track : array
+        The track index of each back cart, or ``NO_TRACK``.
+    front_position : array
+        The position of each front cart along its track.
+    back_position : array
+        The position of each back cart along its track.
+    on_track_rows : set
+        The rows of the trains whose state keeps them on a track rather than at a junction.
+    track_lengths : array
+        The length of each track by index, refreshed when tracks were added to the map.
+    junction_objects : list
+        The Junction of each junction index followed by None, so that ``NO_JUNCTION``
+        indexes None, refreshed when junctions were added to the map.
+    track_objects : list
+        The Track of each track index followed by None, like ``junction_objects``.
+    """
+
+    def __init__(self, railmap):
+        """Initializes an empty store.
+
+        :param railmap: The Railmap of the railway the trains run on.
+        """
+        self.map = railmap
+        self.names = []
+        self.state = array("b")
+        self.speed = array("i")
+        self.length = array("d")
+        self.front_junction = array("i")
+        self.back_junction = array("i")
+        self.front_track = array("i")
+        self.back_track = array("i")
+        self.front_position = array("d")
+        self.back_position = array("d")
+        self.on_track_rows = set()
+        self.track_lengths = array("d")
+        self.junction_objects = [None]
+        self.track_objects = [None]
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_columns(self) -> tuple:
+        return (
+            self.state, self.speed, self.length, self.front_junction, self.back_junction, 
+            self.front_track, self.back_track, self.front_position, self.back_position,
+        )
+
+    def add_train(self, name: str, length: float=5, state: TrainState=TrainState.PARKED, location: Location=None,
+        route=None, current_speed: int=0, next_junction=None, prev_junction=None) -> "TrainView":
+        """Adds a row for a new train.
+
+        :param name: The name of the train.
+        :param length: The length of the train. Defaults to 5.
+        :param state: The state of the train. Defaults to PARKED.
+        :param location: The location of the train. Defaults to an empty Location.
+        :param route: The route of the train. Defaults to None.
+        :param current_speed: The speed of the train. Defaults to 0.
+        :param next_junction: The next junction the train is heading towards. Defaults to None.
+        :param prev_junction: The previous junction the train has passed. Defaults to None.
+        :return: The TrainView of the new row.
+        """
+        row = len(self.names)
+        self.names.append(name)
+        self.state.append(NO_STATE)
+        self.speed.append(0)
+        self.length.append(0)
+        self.front_junction.append(NO_JUNCTION)
+        self.back_junction.append(NO_JUNCTION)
+        self.front_track.append(NO_TRACK)
+        self.back_track.append(NO_TRACK)
+        self.front_position.append(0)
+        self.back_position.append(0)
+
+        return TrainView(self, row, name, length, state, location if location is not None else Location(),
+            route, current_speed, next_junction, prev_junction)
+
+    def adopt_train(self, train: Train) -> "TrainView":
+        """Adds a row holding a copy of a plain Train object.
+
+        :param train: The Train object to copy.
+        :return: The TrainView of the new row.
+        """
+        return self.add_train(train.name, train.length, train.state, train.location, train.route,
+            train.current_speed, train.next_junction, train.prev_junction)
+
+    def clear(self):
+        """Removes every train from the store. Views of the removed rows must no longer be used."""
+        self.names = []
+        self.on_track_rows = set()
+        for column in self.get_columns():
+            del column[:]
+
+    def set_state(self, row: int, state: TrainState):
+        """Writes the state of a train.
+
+        :param row: The row of the train.
+        :param state: The new TrainState, or None.
+        """
+        value = NO_STATE if state is None else state.value
+        self.state[row] = value
+        if value in ON_TRACK_STATE_VALUES:
+            self.on_track_rows.add(row)
+        else:
+            self.on_track_rows.discard(row)
+
+    def get_location(self, row: int) -> Location:
+        """Builds a Location object from a row.
+
+        :param row: The row of the train.
+        :return: A new Location holding the train's junctions, tracks and positions.
+        """
+        if len(self.junction_objects) != len(self.map.junction_names) + 1:
+            self.junction_objects = [self.map.junctions[name] for name in self.map.junction_names] + [None]
+        if len(self.track_objects) != len(self.map.track_names) + 1:
+            self.track_objects = [self.map.tracks[name] for name in self.map.track_names] + [None]
+
+        junctions, tracks = self.junction_objects, self.track_objects
+        return Location(
+            junctions[self.front_junction[row]],
+            junctions[self.back_junction[row]],
+            tracks[self.front_track[row]],
+            tracks[self.back_track[row]],
+            self.front_position[row],
+            self.back_position[row],
+        )
+
+    def set_location(self, row: int, location: Location):
+        """Writes the junctions, tracks and positions of a location into a row.
+
+        :param row: The row of the train.
+        :param location: The new Location of the train.
+        """
+        front_cart, back_cart = location.front_cart, location.back_cart
+        junction_indices, track_indices = self.map.junction_indices, self.map.track_indices
+        self.front_junction[row] = junction_indices[front_cart.junction.name] if front_cart.junction is not None else NO_JUNCTION
+        self.back_junction[row] = junction_indices[back_cart.junction.name] if back_cart.junction is not None else NO_JUNCTION
+        self.front_track[row] = track_indices[front_cart.track.name] if front_cart.track is not None else NO_TRACK
+        self.back_track[row] = track_indices[back_cart.track.name] if back_cart.track is not None else NO_TRACK
+        self.front_position[row] = front_cart.position
+        self.back_position[row] = back_cart.position
+
+    def get_trains_by_track(self) -> dict:
+        """Groups the trains on tracks by their track with a single sort over all of
+        them, instead of sorting the trains of every track separately.
+
+        :return: A dictionary mapping track names to the names of the trains on them,
+            ordered front to back, that is by decreasing back cart position.
+        """
+        back_track, back_position = self.back_track, self.back_position
+        rows = [row for row in self.on_track_rows if back_track[row] != NO_TRACK]
+        rows.sort(key=lambda row: (back_track[row], -back_position[row], row))
+
+        trains_by_track = {}
+        current_track = NO_TRACK
+        current_trains = None
+        for row in rows:
+            if back_track[row] != current_track:
+                current_track = back_track[row]
+                current_trains = trains_by_track[self.map.track_names[current_track]] = []
+            current_trains.append(self.names[row])
+        return trains_by_track
+
+    def get_trains_near_track_end(self, distance: float) -> list:
+        """Finds the trains on tracks whose front cart is closer than a distance to
+        the junction at the end of its track.
+
+        :param distance: The distance to the end of the track, such as ``ConflictAnalyzer.SAFETY_DISTANCE``.
+        :return: A list of train names.
+        """
+        if len(self.track_lengths) != len(self.map.track_names):
+            self.track_lengths = array("d", (self.map.tracks[name].length for name in self.map.track_names))
+
+        track_lengths, front_track, front_position = self.track_lengths, self.front_track, self.front_position
+        return [
+            self.names[row] for row in self.on_track_rows
+            if front_track[row] != NO_TRACK and track_lengths[front_track[row]] - front_position[row] < distance
+        ]
+
+    def get_memory_bytes(self) -> int:
+        """Returns the number of bytes held by the columns, not counting the names."""
+        return sum(column.itemsize * len(column) for column in self.get_columns())
+
+
+class TrainView(Train):
+    """A train whose state, speed, length and location are kept in a row of a
+    TrainStore rather than in the object itself. Reading ``location`` builds a new
+    Location from the row, so a location must be assigned back to take effect, 
+    as ``Railway.update_train`` does, rather than changed in place.
+
+    Attributes
+    ----------
+    store : TrainStore
+        The store holding the train's row.
+    row : int
+        The train's row in the store.
+    """
+
+    # the name, route and junctions are kept in the slots of Train, which leaves views without a __dict__
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: TrainStore, row: int, name: str, length: float, state: TrainState, location: Location,
+        route, current_speed: int, next_junction, prev_junction):
+        """Initializes a view of a row and fills the row in. Use ``TrainStore.add_train``
+        instead of creating views directly.
+        """
+        self.store = store
+        self.row = row
+        super().__init__(name, length, state, location, route, current_speed, next_junction, prev_junction)
+
+    @property
+    def length(self) -> float:
+        return self.store.length[self.row]
+
+    @length.setter
+    def length(self, length: float):
+        self.store.length[self.row] = length
+
+    @property
+    def state(self) -> TrainState:
+        return STATES_BY_VALUE.get(self.store.state[self.row])
+
+    @state.setter
+    def state(self, state: TrainState):
+        self.store.set_state(self.row, state)
+
+    @property
+    def current_speed(self) -> int:
+        return self.store.speed[self.row]
+
+    @current_speed.setter
+    def current_speed(self, current_speed: int):
+        self.store.speed[self.row] = int(current_speed)
+
+    @property
+    def location(self) -> Location:
+        return self.store.get_location(self.row)
+
+    @location.setter
+    def location(self, location: Location):
+        self.store.set_location(self.row, location)
@@ -19,7 +19,12 @@ class TrainMovement(Train):
     junction_delay : Integer representing the delay (in seconds) at a junction.
 
     stay_parked : Boolean indicating whether the train stays parked or not.
+
+    SPEED_FACTOR : How many times faster than its speed value the simulated train moves.
     """
+
+    SPEED_FACTOR = 10
+
     def __init__(self, name: str=None, length: int=5, location: Location=None):
         """Initializes the TrainMovement instance.
 
@@ -46,12 +51,12 @@ class TrainMovement(Train):
             
         if self.location.check_front_junction_reached():
             self.location.set_junction_front_cart(self.next_junction)
-            LOGGER.debug(f"{self.name}'s front has reached {self.location.front_cart['junction'].name} junction - Waiting for back to reach junction.")
+            LOGGER.debug(f"{self.name}'s front has reached {self.location.front_cart.junction.name} junction - Waiting for back to reach junction.")
             self.state = TrainState.PARKING         
         
         if self.location.check_back_junction_reached() and self.state == TrainState.PARKING:
             self.location.set_junction_back_cart(self.next_junction)
-            LOGGER.debug(f"{self.name}'s back has reached {self.location.back_cart['junction'].name} junction.")
+            LOGGER.debug(f"{self.name}'s back has reached {self.location.back_cart.junction.name} junction.")
             self.handle_arrival_at_junction()
 
         if self.state == TrainState.PARKED and not self.stay_parked and not self.route.destination_reached():
@@ -83,6 +88,26 @@ class TrainMovement(Train):
         if not self.stay_parked and not self.route.destination_reached():
             self.leave_junction()
 
+    def get_report_interval(self, scheduler) -> float:
+        """Returns how long to wait before reporting the train's state again, judged from 
+        the train's distance to the junction ahead. The server may hint a shorter interval 
+        for conflicts with other trains.
+
+        :param scheduler: The ReportScheduler to use.
+        :return: The interval, in seconds.
+        """
+        if self.state == TrainState.PARKED:
+            # a train that does not stay parked leaves the junction after junction_delay
+            return scheduler.max_interval if self.stay_parked else scheduler.min_interval
+        if self.state == TrainState.STOPPED:
+            return scheduler.max_interval
+
+        front_cart = self.location.front_cart
+        distance = None
+        if front_cart.track is not None:
+            distance = front_cart.track.length - front_cart.position
+        return scheduler.get_interval(distance, self.current_speed)
+
     def stop(self):
         """Stops the train by setting its current speed to 0 and changing its state to STOPPED."""
         self.current_speed = 0
@@ -0,0 +1,120 @@
+import heapq
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WaitingTrainIndex:
+    """Indexes which trains are waiting to enter each track, so that the train
+    favored to enter a track next can be found without scanning every train.
+
+    Each track keeps a heap of the names of the trains waiting for it, so the favored
+    train (the one with the smallest name, matching the tie break used by the
+    ConflictAnalyzer) is always at the top. Trains are removed lazily: a heap entry is
+    only valid while ``waiting_for`` still maps the train to that track, and stale
+    entries are discarded when they reach the top or when the heap is compacted.
+
+    Attributes
+    ----------
+    waiting_for : dict
+        Maps each train name to the name of the track it is waiting to enter, or None.
+    heaps : dict
+        Maps each track name to a heap of the names of the trains waiting to enter it. May hold stale entries.
+    counts : dict
+        Maps each track name to the number of trains actually waiting to enter it.
+    """
+
+    def __init__(self):
+        """Initializes an empty index."""
+        self.waiting_for = {}
+        self.heaps = {}
+        self.counts = {}
+
+    def set_next_track(self, train_name: str, track_name: str):
+        """Records the track a train is waiting to enter, replacing the previous one.
+
+        :param train_name: The name of the train.
+        :param track_name: The name of the track the train will enter next, or None if it has no next track.
+        :return: The name of the track the train was waiting for before.
+        """
+        previous_track = self.waiting_for.get(train_name)
+        if previous_track == track_name:
+            return previous_track
+
+        if previous_track is not None:
+            self.counts[previous_track] -= 1
+            self.compact(previous_track)
+
+        self.waiting_for[train_name] = track_name
+        if track_name is not None:
+            heapq.heappush(self.heaps.setdefault(track_name, []), train_name)
+            self.counts[track_name] = self.counts.get(track_name, 0) + 1
+
+        return previous_track
+
+    def remove_train(self, train_name: str):
+        """Removes a train from the index.
+
+        :param train_name: The name of the train.
+        :return: The name of the track the train was waiting for.
+        """
+        previous_track = self.set_next_track(train_name, None)
+        del self.waiting_for[train_name]
+        return previous_track
+
+    def get_favored_train(self, track_name: str):
+        """Returns the train favored to enter a track next, dropping stale heap entries
+        on the way.
+
+        :param track_name: The name of the track.
+        :return: The name of the waiting train with the smallest name, or None if no train is waiting.
+        """
+        heap = self.heaps.get(track_name)
+        while heap:
+            if self.waiting_for.get(heap[0]) == track_name:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def peek_favored_train(self, track_name: str):
+        """Returns the train favored to enter a track next without modifying the index,
+        so it may be called without the lock guarding the railway. Skips stale heap
+        entries instead of dropping them, which scans the heap when its top is stale.
+        Called while another thread modifies the index, the answer may already be out
+        of date, but the index is left intact.
+
+        :param track_name: The name of the track.
+        :return: The name of the waiting train with the smallest name, or None if no train is waiting.
+        """
+        heap = self.heaps.get(track_name)
+        if not heap:
+            return None
+        try:
+            if self.waiting_for.get(heap[0]) == track_name:
+                return heap[0]
+        except IndexError:
+            return None
+        return min((train_name for train_name in list(heap) if self.waiting_for.get(train_name) == track_name), default=None)
+
+    def get_waiting_trains(self, track_name: str) -> set:
+        """Returns the names of all trains waiting to enter a track.
+
+        :param track_name: The name of the track.
+        :return: A set of train names.
+        """
+        return {
+            train_name for train_name in self.heaps.get(track_name, [])
+            if self.waiting_for.get(train_name) == track_name
+        }
+
+    def compact(self, track_name: str):
+        """Rebuilds the heap of a track once more than half of its entries are stale,
+        which keeps each heap within twice the number of waiting trains.
+
+        :param track_name: The name of the track.
+        """
+        heap = self.heaps[track_name]
+        if len(heap) > 2 * self.counts[track_name] + 8:
+            LOGGER.debugv(f"Compacting waiting trains of {track_name}")
+            heap[:] = self.get_waiting_trains(track_name)
+            heapq.heapify(heap)
@@ -16,6 +16,7 @@ from classes.enums import *
 from classes.railmap import Railmap
 from classes.route import Route
 from classes.trainmovement import TrainMovement
+from classes.report_scheduler import ReportScheduler
 from datetime import datetime
 import random
 from classes.location import Location
@@ -59,13 +60,33 @@ class Client():
 
     probabilty_of_good_track : int
       The probability (as a percentage) that the track condition is good. Defaults to 95.
+
+    sequence : int
+      The sequence number of the last client state sent. States are numbered from 1 up.
+
+    last_acked_sequence : int
+      The sequence number of the newest client state a server response was received for.
+
+    report_interval : float
+      Seconds between client states, or None to adapt the interval to how close the train is to a 
+      junction or another train. States are sent without waiting for the response to the previous one.
+
+    report_scheduler : ReportScheduler
+      Chooses the interval between client states when ``report_interval`` is None.
+
+    server_report_interval : float
+      The longest interval the server asked for in its last response, or None.
     """
     
-    def __init__(self, host: str ="csx2.ucalgary.ca", port: int =5555, origin=None, destination=None):
+    def __init__(self, host: str ="csx2.ucalgary.ca", port: int =5555, origin=None, destination=None, report_interval: float =None,
+        min_report_interval: float =1, max_report_interval: float =10):
         """ Initializes the client instance, setting up the railway map, generating a route for the train, and starting a thread to update the train's position. It also initializes proxy connection details if provided through command line arguments.
 
         :param host: The hostname or IP address of the server to connect to.
         :param port: The port number on the server to connect to.
+        :param report_interval: Seconds between client states. Defaults to None, which adapts the interval.
+        :param min_report_interval: The shortest adaptive interval, in seconds. Defaults to 1.
+        :param max_report_interval: The longest adaptive interval, in seconds. Defaults to 10.
         """
         self.host = host
         self.port = port
@@ -78,6 +99,13 @@ class Client():
         self.timeoutLimit = 2
 
         self.sentInitClientState = False
+        self.sequence = 0
+        self.last_acked_sequence = 0
+        self.report_interval = report_interval
+        self.report_scheduler = ReportScheduler(min_report_interval, max_report_interval)
+        self.server_report_interval = None
+        self.last_report_time = time.monotonic()
+        self.report_condition = threading.Condition()
 
         self.railmap = Railmap(
             junctions=initial_config["junctions"], tracks=initial_config["tracks"]
@@ -155,7 +183,8 @@ class Client():
         """A loop that runs continuously to update the train's position and checks if the destination is reached. """
         while not utils.exit_flag and not (self.train.route.destination_reached()):
             self.last_time_updated = datetime.now()
-            time.sleep(2)
+            # positions are integrated at least as often as they are reported
+            time.sleep(min(2, self.get_report_interval()))
 
             if self.train.state in [TrainState.PARKED, TrainState.STOPPED]:
                 #LOGGER.debug(f"Trains is parked")
@@ -164,8 +193,7 @@ class Client():
                 elapsed_time = (datetime.now() - self.last_time_updated).total_seconds()
 
                 # Adjust the speed to achieve desired movement
-                speed_factor = 10  # Adjust this factor as needed
-                effective_speed = self.train.get_speed() * speed_factor
+                effective_speed = self.train.get_speed() * TrainMovement.SPEED_FACTOR
                 distance_moved = effective_speed * (elapsed_time / 3600)  # Assuming speed is in km/h
                 #LOGGER.debug(f"Distance moved by train: {distance_moved}")
                 self.train.update_location(distance_moved)
@@ -211,9 +239,10 @@ class Client():
         LOGGER.debug(f"init track={self.train.route.get_next_track()}")
 
     def run(self):
-        """Initiates the client's main loop, managing the socket connection, 
-        sending the train's state, and processing responses from the server."""
-        connected_to_main_proxy = True
+        """Initiates the client's main loop, managing the socket connection and 
+        sending the train's state every ``get_report_interval()`` seconds. States are 
+        pipelined: responses are received on another thread and matched to the 
+        states by sequence number, so a lost response never holds up the next state."""
         connected_to_proxy = False
 
         while not utils.exit_flag:
@@ -228,104 +257,32 @@ class Client():
 
                     if (not self.sock):  # If connection failed, switch to backup and retry
                         LOGGER.debug("Connection with main proxy failed, switching to backup proxy.")
-                        temp = self.current_proxy
-                        self.current_proxy = self.backup_proxy
-                        self.backup_proxy = temp
-
-                        connected_to_main_proxy = False
-                        
+                        self.switch_proxy()
                         continue  # Skip the rest of this iteration
                     else:
                         connected_to_proxy = True
                         self.client_ip, self.client_port = self.sock.getsockname()
+                        threading.Thread(target=self.receive_server_responses, args=(self.sock,), daemon=True).start()
+
+                elif (self.sentInitClientState == True) and (self.train.name is None):
+                    # the first state creates the train, states sent before the server names it would create more
+                    LOGGER.debug("Will not send anymore client states untill train id is set (a server response is handled")
+                    self.timeout_counter +=1
+                    if self.timeout_counter >= self.timeoutLimit:
+                        LOGGER.debug(f"Timed out {self.timeout_counter} times, Will switch to backup proxy {self.backup_proxy}")
+                        self.timeout_counter = 0
+                        self.sentInitClientState = False
+                        connected_to_proxy = False
+                        self.switch_proxy()
+
+                elif self.send_client_state():
+                    LOGGER.debug(f" Sent client state {self.sequence} to proxy ")
+                    self.sentInitClientState = True
 
                 else:
-                    
-                    client_state = TrackNet_pb2.ClientState()
-                    
-                    self.set_client_state_msg(client_state, self.client_ip, self.client_port)
-                    LOGGER.debug(f"state:\n{client_state.location}")
-                    self.train.print_train()
-
-                    message = TrackNet_pb2.InitConnection()
-                    message.sender = TrackNet_pb2.InitConnection.Sender.CLIENT
-                    message.client_state.CopyFrom(client_state)
-
-                    if (self.sentInitClientState == True) and (self.train.name is None):
-                        LOGGER.debug("Will not send anymore client states untill train id is set (a server response is handled")
-                        try:
-                            data = receive(self.sock,returnException=True,timeout=2)
-                            resp = TrackNet_pb2.InitConnection()
-                            server_resp = TrackNet_pb2.ServerResponse()
-
-                            if data is not None:
-                                resp.ParseFromString(data)
-                                server_resp.CopyFrom(resp.server_response)
-                                self.handle_server_response(server_resp)
-                            
-                        except socket.timeout:
-                            #LOGGER.warning("Socket timeout. Switching to backup proxy.")
-                            LOGGER.debug(f"Socket timeout. Will wait for a server response")
-                            self.timeout_counter +=1
-                            if self.timeout_counter >= self.timeoutLimit:
-                                LOGGER.debug(f"Timed out {self.timeout_counter} times, Will switch to backup proxy {self.backup_proxy}")
-                                self.timeout_counter = 0
-                                self.sock.close()
-                                self.sock = None
-                                connected_to_proxy = False
-                                temp = self.current_proxy
-                                self.current_proxy = self.backup_proxy
-                                self.backup_proxy = temp
-
-                        except Exception as e:
-                            LOGGER.warning(f"Exception thrown after sending client state {e}, Will switch to backup proxy {self.backup_proxy}")
-                            self.sock.close()
-                            self.sock = None
-                            connected_to_proxy = False
-                            temp = self.current_proxy
-                            self.current_proxy = self.backup_proxy
-                            self.backup_proxy = temp
-
-                    else:
-                        if send(self.sock, message.SerializeToString()):
-                            LOGGER.debug(f" Sent client state to proxy ")
-                            self.sentInitClientState = True
-                            try:
-                                data = receive(self.sock,returnException=True,timeout=2)
-                                resp = TrackNet_pb2.InitConnection()
-                                server_resp = TrackNet_pb2.ServerResponse()
-
-                                if data is not None:
-                                    resp.ParseFromString(data)
-                                    server_resp.CopyFrom(resp.server_response)
-                                    self.handle_server_response(server_resp)
-                                
-                            except socket.timeout:
-                                #LOGGER.warning("Socket timeout. Switching to backup proxy.")
-                                LOGGER.debug(f"Socket timeout. Will resend a client state")
-                                #self.sock.close()
-                                #self.sock = None
-                                #connected_to_proxy = False
-                                #self.current_proxy = self.backup_proxy
-
-                            except Exception as e:
-                                LOGGER.warning(f"Exception thrown after sending client state {e}, Will switch to backup proxy {self.backup_proxy}")
-                                self.sock.close()
-                                self.sock = None
-                                connected_to_proxy = False
-                                temp = self.current_proxy
-                                self.current_proxy = self.backup_proxy
-                                self.backup_proxy = temp
-
-                        
-                        else:
-                            LOGGER.debug(f"Unable to send the client state to the proxy server. Switch to backup proxy: {self.backup_proxy} ")
-                            connected_to_proxy = False 
-                            self.sock.close()
-                            self.sock = None
-                            temp = self.current_proxy
-                            self.current_proxy = self.backup_proxy
-                            self.backup_proxy = temp
+                    LOGGER.debug(f"Unable to send the client state to the proxy server. Switch to backup proxy: {self.backup_proxy} ")
+                    connected_to_proxy = False 
+                    self.switch_proxy()
         
             except Exception as e:
                 traceback.print_exception(e)
@@ -333,7 +290,84 @@ class Client():
 
                 break  # Exit the loop on unexpected error
 
-            time.sleep(5)
+            self.last_report_time = time.monotonic()
+            self.wait_for_next_report()
+
+    def get_report_interval(self) -> float:
+        """Returns how long to wait between client states: ``report_interval`` if it is 
+        set, otherwise the interval the train's situation calls for, shortened to the 
+        server's hint, which also accounts for the other trains. Until the server has 
+        named the train, it is the shortest adaptive interval.
+
+        :return: The interval, in seconds.
+        """
+        if self.report_interval is not None:
+            return self.report_interval
+        if self.train.name is None:
+            # failover to the backup proxy waits ``timeoutLimit`` intervals for the server to name the train
+            return self.report_scheduler.min_interval
+
+        interval = self.train.get_report_interval(self.report_scheduler)
+        if self.server_report_interval is not None:
+            interval = min(interval, self.server_report_interval)
+        return interval
+
+    def wait_for_next_report(self):
+        """Waits until the next client state is due. A server hint that brings it 
+        forward ends the wait early."""
+        with self.report_condition:
+            while not utils.exit_flag:
+                remaining = self.last_report_time + self.get_report_interval() - time.monotonic()
+                if remaining <= 0:
+                    return
+                self.report_condition.wait(remaining)
+
+    def send_client_state(self) -> bool:
+        """Sends the train's current state to the proxy with the next sequence number.
+
+        :return: True if the state was sent, otherwise False.
+        """
+        client_state = TrackNet_pb2.ClientState()
+        self.set_client_state_msg(client_state, self.client_ip, self.client_port)
+        self.sequence += 1
+        client_state.sequence = self.sequence
+        client_state.last_acked_sequence = self.last_acked_sequence
+        LOGGER.debug(f"state:\n{client_state.location}")
+        self.train.print_train()
+
+        message = TrackNet_pb2.InitConnection()
+        message.sender = TrackNet_pb2.InitConnection.Sender.CLIENT
+        message.client_state.CopyFrom(client_state)
+        return send(self.sock, message.SerializeToString())
+
+    def receive_server_responses(self, sock: socket.socket):
+        """Handles the server responses received on a proxy connection until the 
+        connection fails or the client switches to another proxy.
+
+        :param sock: The socket connected to the proxy.
+        """
+        while not utils.exit_flag and sock is self.sock:
+            try:
+                data = receive(sock, returnException=True, timeout=2, copy=False)
+            except socket.timeout:
+                continue
+            except Exception as e:
+                LOGGER.debug(f"Stopped receiving server responses from {sock}: {e}")
+                return
+
+            resp = TrackNet_pb2.InitConnection()
+            resp.ParseFromString(data)
+            if resp.HasField("server_response"):
+                self.handle_server_response(resp.server_response)
+
+    def switch_proxy(self):
+        """Closes the connection to the current proxy and swaps it with the backup proxy."""
+        if self.sock:
+            self.sock.close()
+        self.sock = None
+        temp = self.current_proxy
+        self.current_proxy = self.backup_proxy
+        self.backup_proxy = temp
 
     def handle_server_response (self, server_resp: TrackNet_pb2.ServerResponse):
         """Handles the response received from the server, adjusting the train's speed, route, or stopping the train as instructed by the server.
@@ -341,6 +375,17 @@ class Client():
         :param server_resp: The server response as a protobuf message.
         """
         LOGGER.debug(f"handling server response: {server_resp} none: {server_resp==None}")
+        if server_resp.sequence:
+            if server_resp.sequence <= self.last_acked_sequence:
+                LOGGER.debug(f"Ignoring response to client state {server_resp.sequence}, a response to {self.last_acked_sequence} was already handled")
+                return
+            self.last_acked_sequence = server_resp.sequence
+
+        if server_resp.HasField("next_report_interval"):
+            with self.report_condition:
+                self.server_report_interval = server_resp.next_report_interval
+                self.report_condition.notify()
+
         if self.train.name is None:
             self.train.name = server_resp.train.id
             LOGGER.debug(f"Initi. {self.train.name}")
@@ -393,6 +438,9 @@ if __name__ == '__main__':
     parser.add_argument('-proxyPort2', type=int, help='Proxy 2 port number')
     parser.add_argument('-start', type=str, help='Start junction')
     parser.add_argument('-destination', type=str, help='Destination junction')
+    parser.add_argument('-reportInterval', type=float, help='Seconds between client states, adapts to the train\'s situation if not set')
+    parser.add_argument('-minReportInterval', type=float, default=1, help='Shortest adaptive interval between client states')
+    parser.add_argument('-maxReportInterval', type=float, default=10, help='Longest adaptive interval between client states')
     
     
     args = parser.parse_args()
@@ -426,4 +474,5 @@ if __name__ == '__main__':
             cmdLineProxyDetails.append((proxy1_address, proxy1_port_num))
         if proxy2_address != None:
             cmdLineProxyDetails.append((proxy2_address, proxy2_port_num))
-    Client(origin=start_junction, destination=destination_junction)
+    Client(origin=start_junction, destination=destination_junction, report_interval=args.reportInterval,
+        min_report_interval=args.minReportInterval, max_report_interval=args.maxReportInterval)
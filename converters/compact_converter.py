@@ -0,0 +1,249 @@
+import TrackNet_pb2
+from classes.railway import Railway
+from classes.symbol_table import RailwaySymbols
+from converters.enum_converter import EnumConverter
+from converters.railway_converter import RailwayConverter
+
+
+class CompactConverter:
+    """Converts railways and railway deltas to the compact protobuf messages, which
+    refer to junctions, tracks and trains by their ids in the railway's symbol tables,
+    and expands compact messages back into the messages that use names."""
+
+    # SECTION: Serialization
+
+    @staticmethod
+    def convert_railway_obj_to_compact_pb(railway: Railway) -> TrackNet_pb2.CompactRailway:
+        symbols = railway.get_symbols()
+        railway_pb = TrackNet_pb2.CompactRailway()
+
+        for junction in railway.map.junctions.values():
+            CompactConverter.fill_junction_pb(junction, railway_pb.junctions.add(), symbols)
+
+        for track in railway.map.tracks.values():
+            CompactConverter.fill_track_pb(track, railway_pb.tracks.add(), symbols)
+
+        for train in railway.trains.values():
+            CompactConverter.fill_train_pb(train, railway_pb.trains.add(), symbols)
+
+        railway_pb.train_counter = railway.train_counter
+        return railway_pb
+
+    @staticmethod
+    def convert_railway_delta_to_compact_pb(
+        railway: Railway, train_ids, track_ids, junction_ids
+    ) -> TrackNet_pb2.RailwayDelta:
+        symbols = railway.get_symbols()
+        delta_pb = TrackNet_pb2.RailwayDelta()
+
+        for train_id in train_ids:
+            CompactConverter.fill_train_pb(railway.trains[train_id], delta_pb.compact_trains.add(), symbols)
+
+        for track_id in track_ids:
+            CompactConverter.fill_track_pb(railway.map.tracks[track_id], delta_pb.compact_tracks.add(), symbols)
+
+        for junction_id in junction_ids:
+            CompactConverter.fill_junction_pb(railway.map.junctions[junction_id], delta_pb.compact_junctions.add(), symbols)
+
+        delta_pb.train_counter = railway.train_counter
+        return delta_pb
+
+    @staticmethod
+    def fill_junction_pb(junction, junction_pb: TrackNet_pb2.CompactJunction, symbols: RailwaySymbols):
+        train_ids = symbols.trains.ids
+        junction_pb.id = symbols.junctions.ids[junction.name]
+        junction_pb.parked_train_ids.extend(train_ids[name] for name in junction.parked_trains.keys())
+
+    @staticmethod
+    def fill_track_pb(track, track_pb: TrackNet_pb2.CompactTrack, symbols: RailwaySymbols):
+        train_ids = symbols.trains.ids
+        track_pb.id = symbols.tracks.ids[track.name]
+        track_pb.condition = EnumConverter.track_condition_enum_to_pb(track.condition)
+        track_pb.speed = EnumConverter.train_speed_enum_to_pb(track.speed)
+        track_pb.train_ids.extend(train_ids[name] for name in track.trains.keys())
+
+    @staticmethod
+    def fill_train_pb(train, train_pb: TrackNet_pb2.CompactTrain, symbols: RailwaySymbols):
+        # fields are set under the same conditions as in TrainConverter.convert_train_obj_to_pb
+        junction_ids = symbols.junctions.ids
+        track_ids = symbols.tracks.ids
+
+        if train.name:
+            train_pb.id = symbols.trains.ids[train.name]
+        if train.length:
+            train_pb.length = train.length
+        if train.state:
+            train_pb.state = EnumConverter.train_state_enum_to_pb(train.state)
+        if train.current_speed:
+            train_pb.speed = train.current_speed
+        if train.next_junction:
+            train_pb.next_junction_id = junction_ids[train.next_junction.name]
+        if train.prev_junction:
+            train_pb.prev_junction_id = junction_ids[train.prev_junction.name]
+
+        location = train.location
+        if location:
+            location_pb = train_pb.location
+            front_cart, back_cart = location.front_cart, location.back_cart
+            if front_cart.junction:
+                location_pb.front_junction_id = junction_ids[front_cart.junction.name]
+            if back_cart.junction:
+                location_pb.back_junction_id = junction_ids[back_cart.junction.name]
+            if front_cart.track:
+                location_pb.front_track_id = track_ids[front_cart.track.name]
+            if back_cart.track:
+                location_pb.back_track_id = track_ids[back_cart.track.name]
+            location_pb.front_position = front_cart.position
+            location_pb.back_position = back_cart.position
+
+        if train.route:
+            train_pb.route.junction_ids.extend(junction_ids[junction.name] for junction in train.route.junctions)
+            train_pb.route.current_junction_index = train.route.current_junction_index
+
+    # SECTION: Symbol tables
+
+    @staticmethod
+    def create_symbol_table_update(symbols: RailwaySymbols, sent_counts: tuple) -> TrackNet_pb2.SymbolTableUpdate:
+        """Creates a message holding the symbols added since a copy of the tables last
+        had ``sent_counts`` symbols, or None if there are no new symbols.
+
+        :param symbols: The symbol tables.
+        :param sent_counts: The junction, track and train symbol counts already sent.
+        :return: A SymbolTableUpdate protobuf message, or None.
+        """
+        junction_count, track_count, train_count = sent_counts
+        junction_names = symbols.junctions.names[junction_count:]
+        track_names = symbols.tracks.names[track_count:]
+        train_names = symbols.trains.names[train_count:]
+        if not (junction_names or track_names or train_names):
+            return None
+
+        update_pb = TrackNet_pb2.SymbolTableUpdate()
+        update_pb.first_junction_id = junction_count
+        update_pb.junction_names.extend(junction_names)
+        update_pb.first_track_id = track_count
+        update_pb.track_names.extend(track_names)
+        update_pb.first_train_id = train_count
+        update_pb.train_names.extend(train_names)
+        return update_pb
+
+    @staticmethod
+    def apply_symbol_table_update(update_pb: TrackNet_pb2.SymbolTableUpdate, symbols: RailwaySymbols):
+        symbols.junctions.extend(update_pb.first_junction_id, update_pb.junction_names)
+        symbols.tracks.extend(update_pb.first_track_id, update_pb.track_names)
+        symbols.trains.extend(update_pb.first_train_id, update_pb.train_names)
+
+    # SECTION: Expansion
+
+    @staticmethod
+    def expand_railway_pb(compact_railway_pb: TrackNet_pb2.CompactRailway, symbols: RailwaySymbols) -> TrackNet_pb2.Railway:
+        """Converts a compact railway into the Railway message the same railway
+        converts to with names.
+
+        :param compact_railway_pb: The CompactRailway protobuf message.
+        :param symbols: The symbol tables the message refers to.
+        :return: A Railway protobuf message.
+        """
+        railway_pb = TrackNet_pb2.Railway()
+        for junction_pb in compact_railway_pb.junctions:
+            CompactConverter.expand_junction_pb(junction_pb, railway_pb.map.junctions.add(), symbols)
+        for track_pb in compact_railway_pb.tracks:
+            CompactConverter.expand_track_pb(track_pb, railway_pb.map.tracks.add(), symbols)
+        for train_pb in compact_railway_pb.trains:
+            CompactConverter.expand_train_pb(train_pb, railway_pb.trains.add(), symbols)
+        if compact_railway_pb.HasField("train_counter"):
+            railway_pb.train_counter = compact_railway_pb.train_counter
+        return railway_pb
+
+    @staticmethod
+    def expand_delta_pb(delta_pb: TrackNet_pb2.RailwayDelta, symbols: RailwaySymbols):
+        """Replaces the compact entries of a delta with entries that use names, in place.
+
+        :param delta_pb: The RailwayDelta protobuf message.
+        :param symbols: The symbol tables the message refers to.
+        """
+        for junction_pb in delta_pb.compact_junctions:
+            CompactConverter.expand_junction_pb(junction_pb, delta_pb.junctions.add(), symbols)
+        for track_pb in delta_pb.compact_tracks:
+            CompactConverter.expand_track_pb(track_pb, delta_pb.tracks.add(), symbols)
+        for train_pb in delta_pb.compact_trains:
+            CompactConverter.expand_train_pb(train_pb, delta_pb.trains.add(), symbols)
+        delta_pb.ClearField("compact_junctions")
+        delta_pb.ClearField("compact_tracks")
+        delta_pb.ClearField("compact_trains")
+
+    @staticmethod
+    def expand_junction_pb(compact_pb: TrackNet_pb2.CompactJunction, junction_pb: TrackNet_pb2.Junction, symbols: RailwaySymbols):
+        train_names = symbols.trains.names
+        junction_pb.id = symbols.junctions.names[compact_pb.id]
+        junction_pb.parked_trains_ids.extend(train_names[train_id] for train_id in compact_pb.parked_train_ids)
+
+    @staticmethod
+    def expand_track_pb(compact_pb: TrackNet_pb2.CompactTrack, track_pb: TrackNet_pb2.Track, symbols: RailwaySymbols):
+        train_names = symbols.trains.names
+        track_pb.id = symbols.tracks.names[compact_pb.id]
+        track_pb.train_ids.extend(train_names[train_id] for train_id in compact_pb.train_ids)
+        if compact_pb.HasField("condition"):
+            track_pb.condition = compact_pb.condition
+        if compact_pb.HasField("speed"):
+            track_pb.speed = compact_pb.speed
+
+    @staticmethod
+    def expand_train_pb(compact_pb: TrackNet_pb2.CompactTrain, train_pb: TrackNet_pb2.Train, symbols: RailwaySymbols):
+        junction_names = symbols.junctions.names
+        track_names = symbols.tracks.names
+
+        if compact_pb.HasField("id"):
+            train_pb.id = symbols.trains.names[compact_pb.id]
+        if compact_pb.HasField("length"):
+            train_pb.length = compact_pb.length
+        if compact_pb.HasField("state"):
+            train_pb.state = compact_pb.state
+        if compact_pb.HasField("speed"):
+            train_pb.speed = compact_pb.speed
+        if compact_pb.HasField("next_junction_id"):
+            train_pb.next_junction_id = junction_names[compact_pb.next_junction_id]
+        if compact_pb.HasField("prev_junction_id"):
+            train_pb.prev_junction_id = junction_names[compact_pb.prev_junction_id]
+
+        if compact_pb.HasField("location"):
+            compact_location, location_pb = compact_pb.location, train_pb.location
+            location_pb.SetInParent()
+            if compact_location.HasField("front_junction_id"):
+                location_pb.front_junction_id = junction_names[compact_location.front_junction_id]
+            if compact_location.HasField("front_track_id"):
+                location_pb.front_track_id = track_names[compact_location.front_track_id]
+            if compact_location.HasField("front_position"):
+                location_pb.front_position = compact_location.front_position
+            if compact_location.HasField("back_junction_id"):
+                location_pb.back_junction_id = junction_names[compact_location.back_junction_id]
+            if compact_location.HasField("back_track_id"):
+                location_pb.back_track_id = track_names[compact_location.back_track_id]
+            if compact_location.HasField("back_position"):
+                location_pb.back_position = compact_location.back_position
+
+        if compact_pb.HasField("route"):
+            compact_route, route_pb = compact_pb.route, train_pb.route
+            route_pb.SetInParent()
+            route_pb.junction_ids.extend(junction_names[junction_id] for junction_id in compact_route.junction_ids)
+            if compact_route.HasField("current_junction_index"):
+                route_pb.current_junction_index = compact_route.current_junction_index
+
+    # SECTION: Deltas
+
+    @staticmethod
+    def update_compact_railway_pb_with_delta_pb(
+        delta_pb: TrackNet_pb2.RailwayDelta, railway_pb: TrackNet_pb2.CompactRailway
+    ):
+        """Applies a compact delta to a compact railway in place, as
+        ``RailwayConverter.update_railway_pb_with_delta_pb`` does for the messages with names.
+
+        :param delta_pb: The compact RailwayDelta protobuf message.
+        :param railway_pb: The CompactRailway protobuf message, modified in place.
+        """
+        RailwayConverter.replace_pb_entries_by_id(railway_pb.trains, delta_pb.compact_trains)
+        RailwayConverter.replace_pb_entries_by_id(railway_pb.tracks, delta_pb.compact_tracks)
+        RailwayConverter.replace_pb_entries_by_id(railway_pb.junctions, delta_pb.compact_junctions)
+
+        if delta_pb.HasField("train_counter"):
+            railway_pb.train_counter = delta_pb.train_counter
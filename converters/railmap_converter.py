@@ -1,6 +1,7 @@
 import TrackNet_pb2
 from classes.railmap import Railmap
 from classes.junction import Junction
+from classes.track import Track
 from classes.train import Train
 from converters.enum_converter import EnumConverter
 
@@ -10,35 +11,46 @@ class RailmapConverter:
     def convert_railmap_obj_to_pb(railmap: Railmap) -> TrackNet_pb2.Railmap:
         railmap_pb = TrackNet_pb2.Railmap()
         for junction in railmap.junctions.values():
-            junction_pb = TrackNet_pb2.Junction()
-            junction_pb.id = junction.name
-            for parked_train_id in junction.parked_trains.keys():
-                junction_pb.parked_trains_ids.append(parked_train_id)
-
-            railmap_pb.junctions.append(junction_pb)
-
-        for track in railmap.tracks.values():
-            track_pb = TrackNet_pb2.Track()
-            track_pb.id = track.name
-            track_pb.condition = EnumConverter.track_condition_enum_to_pb(
-                track.condition
+            railmap_pb.junctions.append(
+                RailmapConverter.convert_junction_obj_to_pb(junction)
             )
-            track_pb.speed = EnumConverter.train_speed_enum_to_pb(track.speed)
-            for train_id in track.trains.keys():
-                track_pb.train_ids.append(train_id)
 
-            railmap_pb.tracks.append(track_pb)
+        for track in railmap.tracks.values():
+            railmap_pb.tracks.append(RailmapConverter.convert_track_obj_to_pb(track))
 
         return railmap_pb
 
+    @staticmethod
+    def convert_junction_obj_to_pb(junction: Junction) -> TrackNet_pb2.Junction:
+        junction_pb = TrackNet_pb2.Junction()
+        junction_pb.id = junction.name
+        for parked_train_id in junction.parked_trains.keys():
+            junction_pb.parked_trains_ids.append(parked_train_id)
+
+        return junction_pb
+
+    @staticmethod
+    def convert_track_obj_to_pb(track: Track) -> TrackNet_pb2.Track:
+        track_pb = TrackNet_pb2.Track()
+        track_pb.id = track.name
+        track_pb.condition = EnumConverter.track_condition_enum_to_pb(track.condition)
+        track_pb.speed = EnumConverter.train_speed_enum_to_pb(track.speed)
+        for train_id in track.trains.keys():
+            track_pb.train_ids.append(train_id)
+
+        return track_pb
+
     # This function is named update because it updates the railmap object with the protobuf object
-    # it doesnt create a new object, instead it updates the existing object
+    # it doesnt create a new object, instead it updates the existing object.
+    # The trains of each junction and track in the protobuf replace those it held,
+    # so a RailwayDelta, which has the same junctions and tracks fields, can be applied too.
     @staticmethod
     def update_railmap_with_pb(
         railmap_pb: TrackNet_pb2.Railmap, railmap: Railmap, trains: dict[str, Train]
     ):
         for junction_pb in railmap_pb.junctions:
             junction_name = junction_pb.id
+            railmap.junctions[junction_name].parked_trains.clear()
             for parked_train_id in junction_pb.parked_trains_ids:
                 train_obj = trains[parked_train_id]
                 railmap.junctions[junction_name].park_train(train_obj)
@@ -51,6 +63,7 @@ class RailmapConverter:
             railmap.tracks[track_name].speed = EnumConverter.train_speed_pb_to_enum(
                 track_pb.speed
             )
+            railmap.tracks[track_name].trains.clear()
             for train_id in track_pb.train_ids:
                 train_obj = trains[train_id]
                 railmap.tracks[track_name].add_train(train_obj)
@@ -30,5 +30,81 @@ class RailwayConverter:
             )
             trains[train_obj.name] = train_obj
 
+        trains = railway.replace_trains(trains)
         RailmapConverter.update_railmap_with_pb(railway_pb.map, railway.map, trains)
-        railway.trains = trains
+
+    @staticmethod
+    def convert_railway_delta_to_pb(
+        railway: Railway, train_ids, track_ids, junction_ids
+    ) -> TrackNet_pb2.RailwayDelta:
+        delta_pb = TrackNet_pb2.RailwayDelta()
+
+        for train_id in train_ids:
+            delta_pb.trains.append(
+                TrainConverter.convert_train_obj_to_pb(railway.trains[train_id])
+            )
+
+        for track_id in track_ids:
+            delta_pb.tracks.append(
+                RailmapConverter.convert_track_obj_to_pb(railway.map.tracks[track_id])
+            )
+
+        for junction_id in junction_ids:
+            delta_pb.junctions.append(
+                RailmapConverter.convert_junction_obj_to_pb(
+                    railway.map.junctions[junction_id]
+                )
+            )
+
+        delta_pb.train_counter = railway.train_counter
+
+        return delta_pb
+
+    # Applies a delta to a railway object in place, as slaves do to keep a live copy of the
+    # master's railway. Trains are updated in place and recorded as unanalyzed, as are the
+    # tracks in the delta, so conflict analysis only revisits what the delta touched.
+    @staticmethod
+    def update_railway_with_delta_pb(delta_pb: TrackNet_pb2.RailwayDelta, railway: Railway):
+        junctions = railway.map.junctions
+        tracks = railway.map.tracks
+        for train_pb in delta_pb.trains:
+            railway.put_train(
+                TrainConverter.convert_train_pb_to_obj(train_pb, junctions, tracks)
+            )
+
+        RailmapConverter.update_railmap_with_pb(delta_pb, railway.map, railway.trains)
+        railway.map.unanalyzed_tracks.update(track_pb.id for track_pb in delta_pb.tracks)
+
+        if delta_pb.HasField("train_counter"):
+            railway.train_counter = delta_pb.train_counter
+
+    # Applies a delta to a railway protobuf object in place.
+    # Entries in the delta replace the entries with the same id.
+    @staticmethod
+    def update_railway_pb_with_delta_pb(
+        delta_pb: TrackNet_pb2.RailwayDelta, railway_pb: TrackNet_pb2.Railway
+    ):
+        RailwayConverter.replace_pb_entries_by_id(railway_pb.trains, delta_pb.trains)
+        RailwayConverter.replace_pb_entries_by_id(
+            railway_pb.map.tracks, delta_pb.tracks
+        )
+        RailwayConverter.replace_pb_entries_by_id(
+            railway_pb.map.junctions, delta_pb.junctions
+        )
+
+        if delta_pb.HasField("train_counter"):
+            railway_pb.train_counter = delta_pb.train_counter
+
+    @staticmethod
+    def replace_pb_entries_by_id(entries, new_entries, key: str = "id"):
+        if len(new_entries) == 0:
+            return
+
+        indexes = {getattr(entry, key): index for index, entry in enumerate(entries)}
+        for new_entry in new_entries:
+            entry_id = getattr(new_entry, key)
+            if entry_id in indexes:
+                entries[indexes[entry_id]].CopyFrom(new_entry)
+            else:
+                indexes[entry_id] = len(entries)
+                entries.append(new_entry)
@@ -3,7 +3,7 @@ from classes.train import Train
 from classes.route import Route
 from classes.location import Location
 from utils import *
-from classes.enums import TrainState
+from classes.enums import TrainState, TrackCondition
 from classes.railway import Railway
 from converters.train_converter import TrainConverter
 from converters.railway_converter import RailwayConverter
@@ -30,3 +30,33 @@ RailwayConverter.update_railway_with_pb(railway_pb, railway2)
 railway2.map.print_map()
 for train in railway2.trains.values():
     train.print_train()
+
+# apply only the changes since the snapshot above as a delta
+railway.pop_changes()
+railway.create_new_train(30, "C")
+railway.map.set_track_condition("Track (A, B)", TrackCondition.BAD)
+train_ids, track_ids, junction_ids = railway.pop_changes()
+delta_pb = RailwayConverter.convert_railway_delta_to_pb(
+    railway, train_ids, track_ids, junction_ids
+)
+print(delta_pb)
+
+RailwayConverter.update_railway_pb_with_delta_pb(delta_pb, railway_pb)
+railway3 = Railway(
+    trains=None, junctions=initial_config["junctions"], tracks=initial_config["tracks"]
+)
+RailwayConverter.update_railway_with_pb(railway_pb, railway3)
+railway3.map.print_map()
+for train in railway3.trains.values():
+    train.print_train()
+
+# apply the same delta to the live railway2, as a slave does
+RailwayConverter.update_railway_with_delta_pb(delta_pb, railway2)
+railway2.map.print_map()
+for train in railway2.trains.values():
+    train.print_train()
+print(
+    "live railway matches:",
+    RailwayConverter.convert_railway_obj_to_pb(railway2).SerializeToString(deterministic=True)
+    == RailwayConverter.convert_railway_obj_to_pb(railway3).SerializeToString(deterministic=True),
+)
@@ -12,20 +12,20 @@ class TrainConverter:
     @staticmethod
     def convert_location_obj_to_pb(location_obj: Location) -> TrackNet_pb2.Location:
         location_pb = TrackNet_pb2.Location()
-        if location_obj.front_cart["junction"]:
-            location_pb.front_junction_id = location_obj.front_cart["junction"].name
+        if location_obj.front_cart.junction:
+            location_pb.front_junction_id = location_obj.front_cart.junction.name
 
-        if location_obj.back_cart["junction"]:
-            location_pb.back_junction_id = location_obj.back_cart["junction"].name
+        if location_obj.back_cart.junction:
+            location_pb.back_junction_id = location_obj.back_cart.junction.name
 
-        if location_obj.front_cart["track"]:
-            location_pb.front_track_id = location_obj.front_cart["track"].name
+        if location_obj.front_cart.track:
+            location_pb.front_track_id = location_obj.front_cart.track.name
 
-        if location_obj.back_cart["track"]:
-            location_pb.back_track_id = location_obj.back_cart["track"].name
+        if location_obj.back_cart.track:
+            location_pb.back_track_id = location_obj.back_cart.track.name
 
-        location_pb.front_position = location_obj.front_cart["position"]
-        location_pb.back_position = location_obj.back_cart["position"]
+        location_pb.front_position = location_obj.front_cart.position
+        location_pb.back_position = location_obj.back_cart.position
 
         return location_pb
 
@@ -79,7 +79,7 @@ class TrainConverter:
         train_length = train_pb.length if train_pb.length else 0
         train_state = (
             EnumConverter.train_state_pb_to_enum(train_pb.state)
-            if train_pb.state
+            if train_pb.HasField("state")
             else None
         )
         train_speed = train_pb.speed if train_pb.speed else 0
@@ -0,0 +1,168 @@
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+LOGGER = logging.getLogger("IngestQueue")
+
+
+class PendingClientState:
+    """The newest client state received for a train that the master has not handled yet,
+    and every proxy connection waiting for a response to a state of that train.
+
+    Attributes
+    ----------
+    client_state : TrackNet_pb2.ClientState
+        The newest client state of the train.
+    digest : bytes
+        The response cache digest of the state's wire bytes, None if it must be computed
+        from the parsed state or the state has a sequence number.
+    waiters : list
+        (sock, batched) tuples, one per proxy connection to respond to. ``batched`` is
+        whether that proxy sent the state in a ClientStateBatch.
+    received : float
+        The ``time.monotonic()`` at which the first of the train's pending states arrived.
+    priority_class : int
+        The priority class the state was scheduled in, None until it is scheduled and
+        again whenever a newer state replaces it.
+    urgency : float
+        The score the state was scheduled with before aging, valid while ``priority_class`` is set.
+    """
+
+    __slots__ = ("client_state", "digest", "waiters", "received", "priority_class", "urgency")
+
+    def __init__(self, client_state, digest: bytes, waiters: list, received: float=None):
+        self.client_state = client_state
+        self.digest = digest
+        self.waiters = waiters
+        self.received = received if received is not None else time.monotonic()
+        self.priority_class = None
+        self.urgency = 0.0
+
+
+class IngestQueue:
+    """Holds the client states received from the proxies until the master handles them,
+    keeping only the newest pending state of each train. A state replaces the pending
+    state of its train unless both are numbered and it is the older one, and the
+    connection it came on is added to the connections waiting for that train's response.
+    However far the master falls behind, for example while the proxies resend every
+    unanswered state after a failover, it only handles each train's newest position once.
+
+    Trains keep the place in the queue of their first pending state, unless ``take`` is
+    given a key to order them by. States without a
+    train id, from clients whose train was not created yet, are never coalesced. The queue
+    holds at most ``max_entries`` trains; states of other trains are dropped while it is
+    full, and their clients send them again.
+
+    Attributes
+    ----------
+    pending : OrderedDict
+        Maps train ids to PendingClientState objects, oldest first.
+    max_entries : int
+        The most pending trains.
+    """
+
+    DEFAULT_MAX_ENTRIES = 100000
+
+    def __init__(self, max_entries: int=DEFAULT_MAX_ENTRIES):
+        """Initializes an empty queue.
+
+        :param max_entries: The most pending trains. Defaults to ``DEFAULT_MAX_ENTRIES``.
+        """
+        self.pending = OrderedDict()
+        self.max_entries = max_entries
+        self.condition = threading.Condition()
+        self.unnamed_states = 0
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, client_states, sock, batched: bool, digests: list=None):
+        """Adds the client states a proxy sent in one message.
+
+        :param client_states: The ClientState protobuf messages, in the order received.
+        :param sock: The socket connected to the proxy, which the responses are sent on.
+        :param batched: Whether the states arrived in a ClientStateBatch.
+        :param digests: The digest of each state's wire bytes, or None if they must be
+            computed from the parsed states.
+        """
+        waiter = (sock, batched)
+        with self.condition:
+            for (index, client_state) in enumerate(client_states):
+                self.enqueued += 1
+                digest = digests[index] if digests is not None else None
+
+                if client_state.train.HasField("id"):
+                    key = client_state.train.id
+                else:
+                    key = (None, self.unnamed_states)
+                    self.unnamed_states += 1
+
+                entry = self.pending.get(key)
+                if entry is None:
+                    if len(self.pending) >= self.max_entries:
+                        self.dropped += 1
+                        LOGGER.debug(f"Ingest queue is full, dropping client state of {key}")
+                        continue
+                    self.pending[key] = PendingClientState(client_state, digest, [waiter])
+                    continue
+
+                self.coalesced += 1
+                pending_sequence = entry.client_state.sequence
+                if not (client_state.sequence and pending_sequence and client_state.sequence < pending_sequence):
+                    entry.client_state = client_state
+                    entry.digest = digest
+                    entry.priority_class = None
+                if waiter not in entry.waiters:
+                    entry.waiters.append(waiter)
+
+            self.max_depth = max(self.max_depth, len(self.pending))
+            self.condition.notify()
+
+    def take(self, timeout: float=None, limit: int=None, key=None) -> list:
+        """Waits for up to ``timeout`` seconds for a pending state, then takes up to
+        ``limit`` pending states. Without a key the oldest are taken, oldest first; with
+        a key, those with the highest key, highest first.
+
+        :param timeout: The most seconds to wait, None to wait until a state arrives.
+        :param limit: The most states to take, None to take every pending state.
+        :param key: A function of a PendingClientState and the current ``time.monotonic()``
+            returning the state's score, called once per pending state with the queue locked.
+        :return: A list of PendingClientState objects. Empty if the wait timed out.
+        """
+        with self.condition:
+            if not self.pending:
+                self.condition.wait(timeout)
+
+            if key is None:
+                if limit is None or limit >= len(self.pending):
+                    entries = list(self.pending.values())
+                    self.pending.clear()
+                    return entries
+                return [self.pending.popitem(last=False)[1] for _ in range(limit)]
+
+            now = time.monotonic()
+            # the position breaks ties, so equal scores keep the order of arrival
+            scored = [(key(entry, now), -position, train_key) for (position, (train_key, entry)) in enumerate(self.pending.items())]
+            if limit is None or limit >= len(scored):
+                scored.sort(reverse=True)
+            else:
+                scored = heapq.nlargest(limit, scored)
+            return [self.pending.pop(train_key) for (_, _, train_key) in scored]
+
+    def get_metrics(self) -> dict:
+        """Returns the depth of the queue and its enqueued, coalesced and dropped state counters."""
+        with self.condition:
+            return {
+                "depth": len(self.pending),
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+            }
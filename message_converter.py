@@ -299,12 +299,12 @@ class MessageConverter:
         location: Location, locationProto: TrackNet_pb2.Location
     ) -> TrackNet_pb2.Location:
         msg = TrackNet_pb2.Location()
-        locationProto.front_junction_id = location.front_cart["junction"].name
-        locationProto.front_track_id = location.front_cart["track"].name
-        locationProto.front_position = location.front_cart["position"]
-        locationProto.back_junction_id = location.back_cart["junction"].name
-        locationProto.back_track_id = location.back_cart["track"].name
-        locationProto.back_position = location.back_cart["position"]
+        locationProto.front_junction_id = location.front_cart.junction.name
+        locationProto.front_track_id = location.front_cart.track.name
+        locationProto.front_position = location.front_cart.position
+        locationProto.back_junction_id = location.back_cart.junction.name
+        locationProto.back_track_id = location.back_cart.track.name
+        locationProto.back_position = location.back_cart.position
         return msg
 
     @staticmethod
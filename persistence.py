@@ -0,0 +1,280 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+LOGGER = logging.getLogger("Persistence")
+
+
+class Persistence:
+    """Keeps a master's state on local disk as a snapshot file and a write-ahead log of
+    the records appended since the snapshot, so that a restarted master can recover its
+    railway when no slave holds a copy.
+
+    Records are appended to an in-memory queue and written by a writer thread, which
+    writes everything queued in one go and fsyncs the log at most once every
+    ``sync_interval`` seconds, so the thread handling client states never waits on the
+    disk. A crash loses at most the records of the last ``sync_interval`` seconds, which
+    clients report again. Each record is framed by its length and CRC-32, and a record
+    torn by a crash is cut off the end of the log when it is replayed.
+
+    Snapshots are queued in order with the records. The writer writes a snapshot to a
+    temporary file, fsyncs and renames it over the previous one and then empties the log,
+    since every record written before the snapshot is covered by it.
+
+    Attributes
+    ----------
+    data_dir : str
+        The directory holding the snapshot and log files.
+    sync_interval : float
+        The least time, in seconds, between two fsyncs of the log.
+    snapshot_interval : int
+        The number of records after which ``snapshot_due`` returns True.
+    records_since_snapshot : int
+        The number of records appended since the last snapshot was queued.
+    snapshot_requested : bool
+        Set by ``request_snapshot`` until the next snapshot is queued.
+    closed : bool
+        Set once ``close`` was called.
+    """
+
+    LOG_FILE = "wal.log"
+    SNAPSHOT_FILE = "snapshot.bin"
+    RECORD_HEADER = struct.Struct("<II")
+
+    def __init__(self, data_dir: str, sync_interval: float=0.005, snapshot_interval: int=10000):
+        """Opens or creates the files in ``data_dir``. Call ``load_snapshot`` and ``replay``
+        to recover what they hold, then ``start`` to start the writer thread.
+
+        :param data_dir: The directory holding the snapshot and log files, created if missing.
+        :param sync_interval: The least time, in seconds, between two fsyncs. Defaults to 0.005.
+        :param snapshot_interval: The number of records between snapshots. Defaults to 10000.
+        """
+        os.makedirs(data_dir, exist_ok=True)
+        self.data_dir = data_dir
+        self.log_path = os.path.join(data_dir, Persistence.LOG_FILE)
+        self.snapshot_path = os.path.join(data_dir, Persistence.SNAPSHOT_FILE)
+        self.sync_interval = sync_interval
+        self.snapshot_interval = snapshot_interval
+        self.records_since_snapshot = 0
+        self.snapshot_requested = False
+        self.closed = False
+
+        self.condition = threading.Condition()
+        self.queued = []
+        self.log_file = open(self.log_path, "ab")
+
+        self.records_written = 0
+        self.bytes_written = 0
+        self.syncs = 0
+        self.snapshots_written = 0
+
+        self.writer = threading.Thread(target=self.write_queued, daemon=True)
+
+    def start(self):
+        """Starts the writer thread."""
+        self.writer.start()
+
+    def close(self):
+        """Writes and fsyncs everything queued, then stops the writer thread and closes the log."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.writer.is_alive():
+            self.writer.join()
+        else:
+            self.write(self.take_queued())
+        self.log_file.close()
+
+    def append(self, record):
+        """Queues a record to be written to the log. The record is serialized on the
+        writer thread, so it must not be modified afterwards.
+
+        :param record: A protobuf message.
+        """
+        with self.condition:
+            self.queued.append(record)
+            self.records_since_snapshot += 1
+            self.condition.notify()
+
+    def snapshot_due(self) -> bool:
+        """Returns whether a snapshot was requested or ``snapshot_interval`` records were
+        appended since the last snapshot."""
+        return self.snapshot_requested or self.records_since_snapshot >= self.snapshot_interval
+
+    def request_snapshot(self):
+        """Makes ``snapshot_due`` return True until the next snapshot is queued."""
+        self.snapshot_requested = True
+
+    def write_snapshot(self, snapshot):
+        """Queues a snapshot, which replaces the previous snapshot and every record
+        appended before it once written. Must be queued in order with the records.
+
+        :param snapshot: A protobuf message, not modified afterwards.
+        """
+        with self.condition:
+            self.queued.append(Snapshot(snapshot))
+            self.records_since_snapshot = 0
+            self.snapshot_requested = False
+            self.condition.notify()
+
+    def load_snapshot(self) -> bytes:
+        """Returns the contents of the snapshot file, or None if there is none."""
+        try:
+            with open(self.snapshot_path, "rb") as snapshot_file:
+                return snapshot_file.read()
+        except FileNotFoundError:
+            return None
+
+    def replay(self):
+        """Yields the records in the log, in the order they were appended. The log is
+        memory mapped and each record is a memoryview into it, valid only until the next
+        record is yielded. A torn or corrupt record ends the log and is cut off.
+
+        :return: A generator of memoryview objects.
+        """
+        size = os.path.getsize(self.log_path)
+        if size == 0:
+            return
+
+        header_size = Persistence.RECORD_HEADER.size
+        offset = 0
+        with open(self.log_path, "rb") as log_file, mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as log_map:
+            with memoryview(log_map) as view:
+                while offset + header_size <= size:
+                    (length, checksum) = Persistence.RECORD_HEADER.unpack_from(view, offset)
+                    start = offset + header_size
+                    end = start + length
+                    if end > size:
+                        break
+                    record = view[start:end]
+                    if zlib.crc32(record) != checksum:
+                        record.release()
+                        break
+                    try:
+                        yield record
+                    finally:
+                        record.release()
+                    offset = end
+
+        if offset < size:
+            LOGGER.warning(f"Cutting {size - offset} bytes of a torn record off the end of the log")
+            os.truncate(self.log_path, offset)
+
+    def take_queued(self) -> list:
+        with self.condition:
+            queued = self.queued
+            self.queued = []
+            return queued
+
+    def write_queued(self):
+        """Runs on the writer thread. Writes the queued records and snapshots, at most
+        once every ``sync_interval`` seconds, until closed."""
+        while True:
+            with self.condition:
+                while not self.queued and not self.closed:
+                    self.condition.wait(timeout=1)
+                closed = self.closed
+
+            started = time.perf_counter()
+            try:
+                self.write(self.take_queued())
+            except OSError as e:
+                LOGGER.error(f"Could not write to {self.data_dir}: {e}")
+            if closed:
+                return
+
+            remaining = self.sync_interval - (time.perf_counter() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def write(self, queued: list):
+        """Writes records to the log and fsyncs it, writing each snapshot once the
+        records before it are synced.
+
+        :param queued: A list of protobuf messages and Snapshot objects, in order.
+        """
+        parts = []
+        for item in queued:
+            if isinstance(item, Snapshot):
+                self.write_log(parts)
+                parts = []
+                self.write_snapshot_file(item.message.SerializeToString())
+                continue
+
+            data = item.SerializeToString()
+            parts.append(Persistence.RECORD_HEADER.pack(len(data), zlib.crc32(data)))
+            parts.append(data)
+            self.records_written += 1
+        self.write_log(parts)
+
+    def write_log(self, parts: list):
+        if not parts:
+            return
+        data = b"".join(parts)
+        self.log_file.write(data)
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+        self.bytes_written += len(data)
+        self.syncs += 1
+
+    def write_snapshot_file(self, data: bytes):
+        """Replaces the snapshot file and empties the log the snapshot covers."""
+        temporary_path = self.snapshot_path + ".tmp"
+        with open(temporary_path, "wb") as snapshot_file:
+            snapshot_file.write(data)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary_path, self.snapshot_path)
+        Persistence.sync_directory(self.data_dir)
+
+        self.log_file.truncate(0)
+        os.fsync(self.log_file.fileno())
+        self.snapshots_written += 1
+        LOGGER.debug(f"Wrote a snapshot of {len(data)} bytes")
+
+    @staticmethod
+    def sync_directory(path: str):
+        """Fsyncs a directory so that a file renamed into it survives a crash. Not
+        possible on every platform, where it is skipped."""
+        try:
+            descriptor = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(descriptor)
+        except OSError:
+            pass
+        finally:
+            os.close(descriptor)
+
+    def get_metrics(self) -> dict:
+        """Returns the records, bytes, fsyncs and snapshots written, and the records queued."""
+        with self.condition:
+            queued = len(self.queued)
+        return {
+            "records_written": self.records_written,
+            "bytes_written": self.bytes_written,
+            "syncs": self.syncs,
+            "records_per_sync": self.records_written / self.syncs if self.syncs else 0.0,
+            "snapshots_written": self.snapshots_written,
+            "queued": queued,
+        }
+
+
+class Snapshot:
+    """A snapshot queued in order with the log records.
+
+    Attributes
+    ----------
+    message : protobuf message
+        The snapshot, serialized on the writer thread.
+    """
+
+    __slots__ = ("message",)
+
+    def __init__(self, message):
+        self.message = message
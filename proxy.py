@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 import os
 import select
@@ -10,6 +11,8 @@ import TrackNet_pb2
 import logging
 import sys
 from utils import *
+from utils import FRAME_HEADER
+import utils
 import argparse
 import time 
 import signal
@@ -29,6 +32,63 @@ LOGGER = logging.getLogger("Proxy")
 #signal.signal(signal.SIGTERM, exit_gracefully)
 #signal.signal(signal.SIGINT, exit_gracefully)
 
+class ClientStateBatcher:
+    """Collects the client states a proxy relays and hands them to ``flush`` together, 
+    once ``max_batch_size`` states are waiting or the oldest one has waited 
+    ``flush_window`` seconds. Flushing happens on the batcher's own thread.
+
+    Attributes
+    ----------
+    flush : callable
+        Called with the list of client states to send.
+    flush_window : float
+        The longest a client state waits for others to join its batch, in seconds.
+    max_batch_size : int
+        The number of client states that triggers an immediate flush.
+    """
+
+    def __init__(self, flush, flush_window: float = 0.005, max_batch_size: int = 100):
+        self.flush = flush
+        self.flush_window = flush_window
+        self.max_batch_size = max_batch_size
+        self.condition = threading.Condition()
+        self.pending = []
+        self.first_added = None
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def add(self, client_state: TrackNet_pb2.ClientState):
+        with self.condition:
+            self.pending.append(client_state)
+            if len(self.pending) == 1:
+                self.first_added = time.monotonic()
+                self.condition.notify()
+            elif len(self.pending) >= self.max_batch_size:
+                self.condition.notify()
+
+    def run(self):
+        while not utils.exit_flag:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait(timeout=1)
+                    if utils.exit_flag:
+                        return
+
+                deadline = self.first_added + self.flush_window
+                while len(self.pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+                batch = self.pending
+                self.pending = []
+
+            try:
+                self.flush(batch)
+            except Exception:
+                LOGGER.error(traceback.format_exc())
+
+
 class Proxy:
     """Manages network connections for a railway simulation proxy, handling communication between clients, servers, and other proxies.
 
@@ -48,14 +108,18 @@ class Proxy:
         A dictionary mapping slave proxy addresses to their respective socket objects.
     client_sockets : dict
         A dictionary mapping client addresses to their respective socket objects.
+    client_state_batcher : ClientStateBatcher
+        Batches the client states relayed to the master server. None if batching is disabled.
     """
-    def __init__(self,proxy_port=5555,listening_port=5555,is_main=False,mainProxyAddress=list(proxy_details.items())[0][0]):
+    def __init__(self,proxy_port=5555,listening_port=5555,is_main=False,mainProxyAddress=list(proxy_details.items())[0][0],batch_window=0.005,batch_size=100):
         """Initializes the Proxy instance with the specified proxy port, listening port, and mode (main or backup).
 
         :param proxy_port: The port number for proxy communications. Defaults to 5555.
         :param listening_port: The port number for listening to incoming connections. Defaults to 5555.
         :param is_main: A boolean indicating whether the proxy operates as the main proxy. Defaults to False.
         :param mainProxyAddress: The address of the main proxy. This is necessary for backup proxies to know where to connect.
+        :param batch_window: The longest a client state waits to be batched with others, in seconds. 0 disables batching.
+        :param batch_size: The number of client states that are sent in one batch at most. 1 disables batching.
         """
         LOGGER.debug(f"proxy port: {proxy_port} listening port {listening_port}")
         self.host = socket.gethostname()
@@ -91,6 +155,11 @@ class Proxy:
         # self.set_main_proxy_host()
 
         self.all_slave_timestamps = {}
+
+        self.client_state_batcher = None
+        if batch_window > 0 and batch_size > 1:
+            self.client_state_batcher = ClientStateBatcher(self.send_client_states, batch_window, batch_size)
+
         threading.Thread(target=self.proxy_to_proxy, daemon=True).start()
 
     def set_main_proxy_host(self):
@@ -154,7 +223,9 @@ class Proxy:
             LOGGER.warning(f"Error removing slave socket from list of slaves: {exc}")
 
     def relay_client_state(self, client_state: TrackNet_pb2.ClientState):
-        """Forwards a client state message from a client to the master server.
+        """Forwards a client state message from a client to the master server. A state 
+        with a lower sequence number than the last one relayed for its client is 
+        dropped, the newer state already replaced it.
 
         :param client_state: A protobuf message containing the state of a client.
         """
@@ -162,32 +233,58 @@ class Proxy:
         LOGGER.debug(f"{client_state}")
         # Extract the target client's IP and port
         target_client_key = (f"{client_state.client.host}:{client_state.client.port}")
+        (last_client_state, _) = self.client_state_handled.get(target_client_key, (None, False))
+        if last_client_state is not None and client_state.sequence < last_client_state.sequence:
+            LOGGER.debug(f"Dropping stale client state {client_state.sequence} from {target_client_key}")
+            return
         self.client_state_handled[target_client_key] = (client_state,False) 
 
         if self.master_socket is not None:
-            new_message = proto.InitConnection()
-            new_message.sender = proto.InitConnection.Sender.PROXY
-            # Can't copy from entire client state
-            # Have to copy each field individually
-            new_message.client_state.client.CopyFrom(client_state.client)
-            new_message.client_state.train.CopyFrom(client_state.train)
-            new_message.client_state.location.CopyFrom(client_state.location)
-            new_message.client_state.condition = client_state.condition
-            new_message.client_state.route.CopyFrom(client_state.route)
-            new_message.client_state.speed = client_state.speed
-            # new_message.client_state.CopyFrom(client_state)
-
-            if not send(self.master_socket, new_message.SerializeToString()):
-                LOGGER.warning(f"Failed to send client state message to master.")
+            if self.client_state_batcher is not None:
+                self.client_state_batcher.add(client_state)
             else:
-                LOGGER.debug("client state forwaded to master server")
+                self.send_client_states([client_state])
                 
         else:
             LOGGER.warning("There is currently no master server")
 
+    def send_client_states(self, client_states: list):
+        """Sends client states to the master server, as a ``ClientStateBatch`` if there 
+        is more than one. States that cannot be sent stay in ``client_state_handled`` 
+        and are relayed again when a new master is promoted.
+
+        :param client_states: A list of ClientState protobuf messages.
+        """
+        master_socket = self.master_socket
+        if master_socket is None:
+            LOGGER.warning(f"There is currently no master server, {len(client_states)} client states not sent")
+            return
+
+        new_message = proto.InitConnection()
+        new_message.sender = proto.InitConnection.Sender.PROXY
+        if len(client_states) == 1:
+            new_message.client_state.CopyFrom(client_states[0])
+        else:
+            new_message.client_state_batch.client_states.extend(client_states)
+
+        if not self.send_message(master_socket, new_message.SerializeToString()):
+            LOGGER.warning(f"Failed to send client state message to master.")
+        else:
+            LOGGER.debug(f"{len(client_states)} client states forwaded to master server")
+
+    def send_message(self, conn, data, returnException=False) -> bool:
+        """Sends a framed message on one of the proxy's connections.
+
+        :param conn: The connection to send on.
+        :param data: The serialized message.
+        :return: True if the message was sent, otherwise False.
+        """
+        return send(conn, data, returnException=returnException)
+
     def relay_server_response(self, server_response: TrackNet_pb2.ServerResponse):
         """Forwards a server response from the master server to the appropriate client 
-        based on the client's address.
+        based on the client's address. The client's last state only counts as handled 
+        if the response answers it, not an earlier state the client pipelined.
 
         :param server_response: A protobuf message containing a response from the master server.
         """
@@ -212,10 +309,12 @@ class Proxy:
             # Forward the server's message to the target client
             if target_client_socket:
                 try: 
-                    if not send(target_client_socket, relay_resp.SerializeToString(),returnException=True):
+                    if not self.send_message(target_client_socket, relay_resp.SerializeToString(),returnException=True):
                         LOGGER.warning(f"Failed to send server response message to client. socket: {target_client_socket}")
                     else:
-                        self.client_state_handled[target_client_key] = (None,True)
+                        (client_state, _) = self.client_state_handled.get(target_client_key, (None, False))
+                        if client_state is None or server_response.sequence >= client_state.sequence:
+                            self.client_state_handled[target_client_key] = (client_state,True)
                 except Exception as e:
                     LOGGER.warning(f"Failed to send server response message to client. socket: {target_client_socket}")
                     LOGGER.warning(f"Exception thrown: {e} type: {type(e)} repr: {repr(e)}")
@@ -259,7 +358,7 @@ class Proxy:
 
         proxy_message.server_assignment.CopyFrom(role_assignment)
 
-        if send(slave_socket, proxy_message.SerializeToString()):
+        if self.send_message(slave_socket, proxy_message.SerializeToString()):
             LOGGER.debug(f"Sent role assignmnet to newly elected master.")
 
             LOGGER.debug("Will send any unhandeled client states to the new master")
@@ -290,7 +389,7 @@ class Proxy:
         slave_details.port = slave_port
 
         LOGGER.debug("Sending slave details to master")
-        if not send(self.master_socket, resp.SerializeToString()):
+        if not self.send_message(self.master_socket, resp.SerializeToString()):
             LOGGER.warning(f"Failed to send slave details to master.")
 
     def notify_master_of_slaves(self):
@@ -306,7 +405,7 @@ class Proxy:
             slave_details.port = slave_to_master_port
 
         LOGGER.debug("Sending slave details to master")
-        if not send(self.master_socket, resp.SerializeToString()):
+        if not self.send_message(self.master_socket, resp.SerializeToString()):
             LOGGER.warning(f"Failed to send slave details to master.")
 
     def slave_role_assignment(self, slave_socket: socket.socket, init_conn: TrackNet_pb2.InitConnection):
@@ -337,7 +436,7 @@ class Proxy:
                 role_assignment.is_master = False
                 proxy_message.server_assignment.CopyFrom(role_assignment)
 
-                if not send(slave_socket, proxy_message.SerializeToString()):
+                if not self.send_message(slave_socket, proxy_message.SerializeToString()):
                     LOGGER.warning(f"Failed to send role assignmnet to slave.")
 
                 # self.notify_master_of_slaves()
@@ -492,7 +591,7 @@ class Proxy:
 
                             LOGGER.debugv(f"Sending... heartbeat to master server {self.master_socket}")
 
-                            if not send(self.master_socket, heartbeat_message.SerializeToString()):
+                            if not self.send_message(self.master_socket, heartbeat_message.SerializeToString()):
                                 LOGGER.warning(f"Failed to send heartbeat request to master server {self.master_socket} FD: {self.master_socket.fileno()}")
                                 self.heartbeat_timer.cancel()
                                 self.handle_heartbeat_timeout_loop()
@@ -520,14 +619,21 @@ class Proxy:
             self.heartbeat_timer.cancel()
 
 
-    def handle_heartbeat_timeout_loop(self):
+    def handle_heartbeat_timeout_loop(self, lost_socket=None):
         """Handles the scenario when a heartbeat response is not received from the 
-        master server within a specified timeout period. This method may involve 
-        promoting a slave server to the master or taking other recovery actions.
+        master server within a specified timeout period, or its connection was lost. 
+        This method may involve promoting a slave server to the master or taking other 
+        recovery actions.
+
+        :param lost_socket: The master's connection that was lost, if the failover was 
+            started by losing it. Nothing is done if another master was chosen since.
         """
         if self.heartbeat_timer and self.heartbeat_timer.is_alive():
             self.heartbeat_timer.cancel()
         with self.lock:
+            if lost_socket is not None and lost_socket is not self.master_socket:
+                LOGGER.debug("Lost connection was no longer the master's, a new master was already chosen")
+                return
             LOGGER.info("Heartbeat response timed out. Stop sending hearbeat by setting master socket to none")
             #self.master_server_heartbeat_thread
             try:
@@ -572,7 +678,7 @@ class Proxy:
         request_heartbeat.is_heartbeat = True
         try:
 
-            if not send(slave_socket, request_heartbeat.SerializeToString()):
+            if not self.send_message(slave_socket, request_heartbeat.SerializeToString()):
                 LOGGER.warning(f"failed to send heatbeat request to slave socket: {slave_socket}")
             else:
                 # Wait for self.slave_heartbeat_timeout seconds or until the slave sent its timestamp
@@ -661,96 +767,17 @@ class Proxy:
             LOGGER.debug(f"New connection handled in thread {client_key}")
 
             while not exit_flag:
-                data = receive(conn)
                 try:
-                    if data:
-                        init_conn = proto.InitConnection()
-                        init_conn.ParseFromString(data)
-
-                        if init_conn.sender == proto.InitConnection.Sender.CLIENT:
-                            LOGGER.debug(f"Received a client state from client")
-                            self.relay_client_state(init_conn.client_state)
-
-                        elif (init_conn.sender == proto.InitConnection.Sender.SERVER_MASTER):
-
-                            if self.master_socket is None:
-                                LOGGER.debug("Received heartbeat from master server when it set to None")
-
-                            if self.master_socket_hostIP != conn.getpeername()[0]:
-                                LOGGER.warning(f"Received message with sender type master from NON master server.")
-
-                            if init_conn.HasField("server_response"):
-                                self.relay_server_response(init_conn.server_response)
-
-                            if init_conn.HasField("is_heartbeat") and self.is_main:
-                                LOGGER.debugv(f"Received heartbeat from master server. Sending response...")
-                                
-                                #self.handle_heartbeat_response_loop()
-                                LOGGER.debugv(f"Recived heartbeat from master server. checking if timer running")
-                                if (self.heartbeat_timer is not None) and self.heartbeat_timer.is_alive():
-                                    LOGGER.debugv(f"Timer is still running, will cancel timer")
-                                    self.heartbeat_timer.cancel()
-                                
-
-                                # send heartbeat
-                                # LOGGER.debug(
-                                #     "Creating Thread to handle heartbeat response which calls: handle_heartbeat_response "
-                                # )
-                                #threading.Thread(target=self.handle_heartbeat_response, daemon=True).start()
-
-                            #else:
-                                #LOGGER.warning(f"Proxy received msg from master with missing content {init_conn}")
-
-                        elif (init_conn.sender == proto.InitConnection.Sender.SERVER_SLAVE):
-                            
-                            if init_conn.HasField("slave_details"):
-
-                                if self.is_main:
-                                    LOGGER.debug(f"Slave server has connect, will now decide its role")
-                                    self.slave_role_assignment(conn, init_conn)
-                                else:
-
-                                    slave_port = init_conn.slave_details.port
-                                    self.add_slave_socket(conn,slave_port)
-
-                            elif init_conn.HasField("slave_backup_timestamp"):
-                                LOGGER.debug(f"Message received from slave socket has a last backup timestamp response: {init_conn}")
-                                try:    
-                                    timestamp = init_conn.slave_backup_timestamp.timestamp
-                                    slave_host = init_conn.slave_backup_timestamp.host
-                                    slave_port = init_conn.slave_backup_timestamp.port
-                                    self.all_slave_timestamps[(slave_host,slave_port)] = timestamp
-                                except Exception as e:
-                                    LOGGER.warning(f"Error handling slaves backup response {init_conn} socket: {conn}")
-                            else:
-                                LOGGER.debug(f"proxy recieved an init connection with no salve details and no slave_backup_timestamp: init_conn")
-
-
-                        elif (
-                            init_conn.sender == proto.InitConnection.Sender.PROXY
-                            and self.is_main
-                        ):
-                            ## add bool for backup is up
-                            LOGGER.debugv("Received message from backup proxy")
-                            heartbeat = proto.Response()
-                            heartbeat.code = proto.Response.Code.HEARTBEAT
-
-                            # nofity backup proxy who the master server is
-                            try:
-                                master_host, _ = self.master_socket.getpeername()
-                                heartbeat.master_host = master_host
-                                LOGGER.debugv("Setting master host to %s", master_host)
-
-                            except Exception as e:
-                                LOGGER.debugv(
-                                    "Master server not connected. Unable to set master host"
-                                )
-
-                            if send(conn, heartbeat.SerializeToString()):
-                                LOGGER.debugv("Sent heartbeat response to backup proxy")
-                            else:
-                                LOGGER.warning(f"Failed to send heartbeat to backup proxy.")
+                    data = receive(conn, returnException=True, copy=False)
+                except socket.timeout:
+                    continue
+                except (ConnectionError, FramingError, OSError) as e:
+                    LOGGER.debug(f"Connection {client_key} closed: {e}")
+                    break
 
+                try:
+                    if data:
+                        self.handle_message(conn, data)
                 except Exception as e:
                     LOGGER.debug("Exception thrown in handle connection loop")
                     LOGGER.error(traceback.format_exc())
@@ -760,21 +787,146 @@ class Proxy:
             LOGGER.warning(f"socket timed out.")
 
         LOGGER.debug(f"handle connection thread closing")
+        self.remove_connection(conn, client_key)
+
+    def handle_message(self, conn, data):
+        """Routes one message received on a connection according to its sender: client 
+        states are relayed to the master server, server responses to the clients, and 
+        heartbeats and role messages are answered.
+
+        :param conn: The connection the message was received on.
+        :param data: The serialized ``InitConnection`` message.
+        """
+        init_conn = proto.InitConnection()
+        init_conn.ParseFromString(data)
+
+        if init_conn.sender == proto.InitConnection.Sender.CLIENT:
+            LOGGER.debug(f"Received a client state from client")
+            self.relay_client_state(init_conn.client_state)
+
+        elif (init_conn.sender == proto.InitConnection.Sender.SERVER_MASTER):
+
+            if self.master_socket is None:
+                LOGGER.debug("Received heartbeat from master server when it set to None")
+
+            if self.master_socket_hostIP != conn.getpeername()[0]:
+                LOGGER.warning(f"Received message with sender type master from NON master server.")
+
+            if init_conn.HasField("server_response"):
+                self.relay_server_response(init_conn.server_response)
+
+            if init_conn.HasField("server_response_batch"):
+                for server_response in init_conn.server_response_batch.server_responses:
+                    self.relay_server_response(server_response)
+
+            if init_conn.HasField("is_heartbeat") and self.is_main:
+                LOGGER.debugv(f"Received heartbeat from master server. Sending response...")
+                
+                #self.handle_heartbeat_response_loop()
+                LOGGER.debugv(f"Recived heartbeat from master server. checking if timer running")
+                if (self.heartbeat_timer is not None) and self.heartbeat_timer.is_alive():
+                    LOGGER.debugv(f"Timer is still running, will cancel timer")
+                    self.heartbeat_timer.cancel()
+                
+
+                # send heartbeat
+                # LOGGER.debug(
+                #     "Creating Thread to handle heartbeat response which calls: handle_heartbeat_response "
+                # )
+                #threading.Thread(target=self.handle_heartbeat_response, daemon=True).start()
+
+            #else:
+                #LOGGER.warning(f"Proxy received msg from master with missing content {init_conn}")
+
+        elif (init_conn.sender == proto.InitConnection.Sender.SERVER_SLAVE):
+            
+            if init_conn.HasField("slave_details"):
+
+                if self.is_main:
+                    LOGGER.debug(f"Slave server has connect, will now decide its role")
+                    self.slave_role_assignment(conn, init_conn)
+                else:
+
+                    slave_port = init_conn.slave_details.port
+                    self.add_slave_socket(conn,slave_port)
+
+            elif init_conn.HasField("slave_backup_timestamp"):
+                LOGGER.debug(f"Message received from slave socket has a last backup timestamp response: {init_conn}")
+                try:    
+                    timestamp = init_conn.slave_backup_timestamp.timestamp
+                    slave_host = init_conn.slave_backup_timestamp.host
+                    slave_port = init_conn.slave_backup_timestamp.port
+                    self.all_slave_timestamps[(slave_host,slave_port)] = timestamp
+                except Exception as e:
+                    LOGGER.warning(f"Error handling slaves backup response {init_conn} socket: {conn}")
+            else:
+                LOGGER.debug(f"proxy recieved an init connection with no salve details and no slave_backup_timestamp: init_conn")
+
+
+        elif (
+            init_conn.sender == proto.InitConnection.Sender.PROXY
+            and self.is_main
+        ):
+            ## add bool for backup is up
+            LOGGER.debugv("Received message from backup proxy")
+            heartbeat = proto.Response()
+            heartbeat.code = proto.Response.Code.HEARTBEAT
+
+            # nofity backup proxy who the master server is
+            try:
+                master_host, _ = self.master_socket.getpeername()
+                heartbeat.master_host = master_host
+                LOGGER.debugv("Setting master host to %s", master_host)
+
+            except Exception as e:
+                LOGGER.debugv(
+                    "Master server not connected. Unable to set master host"
+                )
+
+            if self.send_message(conn, heartbeat.SerializeToString()):
+                LOGGER.debugv("Sent heartbeat response to backup proxy")
+            else:
+                LOGGER.warning(f"Failed to send heartbeat to backup proxy.")
+
+    def remove_connection(self, conn, client_key: str):
+        """Forgets a closed connection, starting the failover to a slave server if it 
+        was the master's connection, and closes it.
+
+        :param conn: The connection that was closed.
+        :param client_key: The "host:port" key of the connection.
+        """
+        master_lost = False
         with self.lock:
             if client_key in self.client_sockets:
                 del self.client_sockets[client_key]  # Remove client from mapping
 
             if conn == self.master_socket:
-                self.master_socket = None
+                master_lost = True
                 LOGGER.warning("Master server connection lost.")
 
             elif client_key in self.slave_sockets:
                 del self.slave_sockets[client_key]
                 LOGGER.warning("Slave server connection lost.")
 
+        if master_lost:
+            self.handle_master_connection_lost(conn)
+
         if conn is not None:
             conn.close()
 
+    def handle_master_connection_lost(self, conn):
+        """Starts the failover to a slave server once the master's connection is lost, 
+        as a heartbeat timeout would. A backup proxy leaves it to the main proxy.
+
+        :param conn: The master's connection that was lost.
+        """
+        if self.is_main and not utils.exit_flag:
+            self.handle_heartbeat_timeout_loop(conn)
+        else:
+            with self.lock:
+                if conn is self.master_socket:
+                    self.master_socket = None
+
     def shutdown(self, proxy_listening_sock: socket.socket):
         """Gracefully shuts down the proxy server, closing all active connections 
         and cleaning up resources.
@@ -823,6 +975,7 @@ class Proxy:
                     if len(read_sockets) > 0:
                         
                         conn, addr = proxy_listening_sock.accept()
+                        set_tcp_nodelay(conn)
                         # Pass both socket and address for easier client management
                         #print("--------------------handle connection thread is called and started")
                         threading.Thread(
@@ -841,6 +994,174 @@ class Proxy:
         
 
 
+class ProxyConnection(asyncio.Protocol):
+    """One connection accepted by an ``AsyncProxy``. Frames are parsed from the bytes 
+    delivered by the event loop and handed to ``Proxy.handle_message``.
+
+    The connection stands in for the socket objects the ``Proxy`` methods expect: 
+    it is stored in ``client_sockets``, ``slave_sockets`` and ``master_socket``, and 
+    offers ``getpeername``, ``fileno``, ``close`` and ``shutdown``. Messages are sent 
+    through ``send``, which may be called from any thread.
+
+    Attributes
+    ----------
+    proxy : AsyncProxy
+        The proxy that accepted the connection.
+    client_key : str
+        The "host:port" address of the peer, used as key in ``client_sockets``.
+    """
+
+    def __init__(self, proxy: "AsyncProxy"):
+        self.proxy = proxy
+        self.transport = None
+        self.peername = None
+        self.client_key = None
+        self.buffer = bytearray()
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self.peername = transport.get_extra_info("peername")
+        self.client_key = f"{self.peername[0]}:{self.peername[1]}"
+        with self.proxy.lock:
+            self.proxy.client_sockets[self.client_key] = self
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        header_size = FRAME_HEADER.size
+        offset = 0
+
+        while len(self.buffer) - offset >= header_size:
+            (frame_length,) = FRAME_HEADER.unpack_from(self.buffer, offset)
+            if frame_length > MAX_FRAME_SIZE:
+                LOGGER.warning(f"Closing {self.client_key}, frame of {frame_length} bytes is too large")
+                self.transport.close()
+                return
+
+            frame_end = offset + header_size + frame_length
+            if len(self.buffer) < frame_end:
+                break
+
+            payload = memoryview(self.buffer)[offset + header_size:frame_end]
+            try:
+                self.proxy.handle_message(self, payload)
+            except Exception:
+                LOGGER.debug("Exception thrown while handling a message")
+                LOGGER.error(traceback.format_exc())
+            finally:
+                # the buffer can only be trimmed once no view of it is left
+                payload.release()
+            offset = frame_end
+
+        if offset:
+            del self.buffer[:offset]
+
+    def connection_lost(self, exc):
+        LOGGER.debug(f"Connection {self.client_key} closed: {exc}")
+        self.proxy.remove_connection(self, self.client_key)
+
+    def send(self, data: bytes) -> bool:
+        """Queues a framed message on the transport. Connections that stop reading are 
+        closed once more than ``max_write_buffer`` bytes are waiting for them.
+
+        :param data: The serialized message.
+        :return: False if the connection is closed, otherwise True.
+        """
+        if self.transport is None or self.transport.is_closing():
+            return False
+
+        if self.transport.get_write_buffer_size() > self.proxy.max_write_buffer:
+            LOGGER.warning(f"Closing {self.client_key}, it is not reading its messages")
+            self.close()
+            return False
+
+        self.proxy.call_in_loop(self.transport.writelines, [FRAME_HEADER.pack(len(data)), data])
+        return True
+
+    def getpeername(self):
+        return self.peername
+
+    def fileno(self) -> int:
+        if self.transport is None or self.transport.is_closing():
+            return -1
+        return self.transport.get_extra_info("socket").fileno()
+
+    def close(self):
+        if self.transport is not None:
+            self.proxy.call_in_loop(self.transport.close)
+
+    def shutdown(self, how=None):
+        self.close()
+
+
+class AsyncProxy(Proxy):
+    """A proxy that serves every client, server and peer proxy connection from a 
+    single asyncio event loop instead of a thread per connection. Message routing, 
+    heartbeats and master election are inherited from ``Proxy``; the heartbeat and 
+    election threads reach the connections through ``ProxyConnection.send``.
+
+    Attributes
+    ----------
+    loop : asyncio.AbstractEventLoop
+        The event loop serving the connections, set by ``run``.
+    max_write_buffer : int
+        Bytes that may wait to be sent on a connection before it is closed.
+    """
+
+    def __init__(self, *args, max_write_buffer: int = 4 * 1024 * 1024, **kwargs):
+        """Takes the same arguments as ``Proxy``.
+
+        :param max_write_buffer: Bytes that may wait to be sent on a connection before it is closed.
+        """
+        self.loop = None
+        self.loop_thread_id = None
+        self.max_write_buffer = max_write_buffer
+        super().__init__(*args, **kwargs)
+
+    def send_message(self, conn, data, returnException=False) -> bool:
+        if isinstance(conn, ProxyConnection):
+            return conn.send(data)
+        return super().send_message(conn, data, returnException=returnException)
+
+    def handle_master_connection_lost(self, conn):
+        """Starts the failover on its own thread: choosing a new master waits for the 
+        slaves' backup timestamps, which are received on the event loop."""
+        threading.Thread(target=super().handle_master_connection_lost, args=(conn,), daemon=True).start()
+
+    def call_in_loop(self, callback, *args):
+        """Calls ``callback`` on the event loop thread, directly if already on it.
+
+        :param callback: The function to call.
+        """
+        if threading.get_ident() == self.loop_thread_id:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def run(self):
+        """Serves connections on the event loop until the exit flag is set."""
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+
+        server = await self.loop.create_server(
+            lambda: ProxyConnection(self), self.host, self.port, reuse_address=True, backlog=4096
+        )
+        LOGGER.info(f"Proxy listening on {self.host}:{self.port} (asyncio)")
+
+        while not utils.exit_flag:
+            await asyncio.sleep(0.5)
+
+        LOGGER.info("Shutting down...")
+        server.close()
+        with self.lock:
+            connections = list(self.client_sockets.values())
+        for conn in connections:
+            conn.close()
+        await server.wait_closed()
+
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Proxess Proxy args")
@@ -852,6 +1173,9 @@ if __name__ == "__main__":
     # Add the flags for main and backup
     parser.add_argument("-main", action="store_true", help="Set mode to main")
     parser.add_argument("-backup", action="store_true", help="Set mode to backup")
+    parser.add_argument("-async", dest="use_async", action="store_true", help="Serve connections from an asyncio event loop")
+    parser.add_argument("-batchWindowMs", type=float, default=5, help="Longest a client state waits to be batched, 0 disables batching")
+    parser.add_argument("-batchSize", type=int, default=100, help="Most client states sent to the master in one batch")
 
     args = parser.parse_args()
 
@@ -893,11 +1217,14 @@ if __name__ == "__main__":
         if listening_port_num == None:
             listening_port_num = 5555
 
-        proxy = Proxy(
+        proxy_class = AsyncProxy if args.use_async else Proxy
+        proxy = proxy_class(
             mainProxyAddress=proxy_address,
             proxy_port=proxy_port_num,
             listening_port=listening_port_num,
             is_main=isMain,
+            batch_window=args.batchWindowMs / 1000,
+            batch_size=args.batchSize,
         )
         try:
             proxy.run()
@@ -0,0 +1,355 @@
+import logging
+import socket
+import threading
+import time
+import TrackNet_pb2
+from utils import *
+import utils
+from converters.railway_converter import RailwayConverter
+from converters.compact_converter import CompactConverter
+from classes.symbol_table import RailwaySymbols
+
+LOGGER = logging.getLogger("Replication")
+
+
+class BroadcastMessage:
+    """A replication message enqueued on every slave replicator, serialized at most once.
+    The first replicator to send it serializes it and the others send the same bytes.
+
+    Attributes
+    ----------
+    message : TrackNet_pb2.InitConnection
+        The message, holding a railway_update or railway_delta. Never modified.
+    data : bytes
+        The serialized message, None until it is first needed.
+    """
+
+    __slots__ = ("message", "data", "lock")
+
+    def __init__(self, message: TrackNet_pb2.InitConnection):
+        self.message = message
+        self.data = None
+        self.lock = threading.Lock()
+
+    def serialize(self) -> tuple:
+        """Returns the serialized message, serializing it on the first call.
+
+        :return: A tuple of the bytes and whether this call serialized them.
+        """
+        if self.data is not None:
+            return self.data, False
+        with self.lock:
+            if self.data is not None:
+                return self.data, False
+            self.data = self.message.SerializeToString()
+            return self.data, True
+
+
+class SlaveReplicator:
+    """Sends railway replication messages from the master to one slave server. Each
+    replicator owns a single long-lived sender thread, which is the only thread that
+    writes to the slave socket, and a reader thread that answers resync requests.
+
+    Enqueuing only appends the shared message to the replicator's queue, so the master
+    never waits on a slave. The sender thread coalesces everything queued since its
+    last send into a single message: a snapshot replaces what came before it, and a
+    delta is merged into the delta before it or applied to the snapshot before it, so
+    a slow slave receives fewer, larger messages rather than falling further and
+    further behind. A message that did not have to be coalesced is sent as the bytes
+    every replicator shares.
+
+    Attributes
+    ----------
+    sock : socket.socket
+        The socket connected to the slave server.
+    name : str
+        A name for the slave, used in logs and metrics. Usually host:port.
+    request_checkpoint : callable
+        Called with the replicator when the slave asks to resync. Expected to enqueue
+        a full RailwayUpdate on the replicator.
+    symbols : RailwaySymbols
+        The master's symbol tables when it replicates compactly, otherwise None. Names
+        added since the previous message are sent ahead of each message.
+    sent_symbol_counts : tuple
+        The number of junction, track and train symbols already sent to the slave.
+    closed : bool
+        Set once the slave connection failed or the replicator was closed.
+    """
+
+    def __init__(self, sock: socket.socket, name: str, request_checkpoint, symbols: RailwaySymbols=None):
+        """Initializes the replicator. Call ``start`` to start its threads.
+
+        :param sock: The socket connected to the slave server.
+        :param name: A name for the slave, used in logs and metrics.
+        :param request_checkpoint: A callable enqueuing a full RailwayUpdate on the replicator.
+        :param symbols: The master's symbol tables, if messages are compact. Defaults to None.
+        """
+        self.sock = sock
+        self.name = name
+        self.request_checkpoint = request_checkpoint
+        self.symbols = symbols
+        self.sent_symbol_counts = (0, 0, 0)
+        self.closed = False
+
+        self.condition = threading.Condition()
+        self.queued = []
+        self.pending_since = None
+
+        self.enqueued_sequence = None
+        self.sent_sequence = None
+        self.sent_timestamp = None
+        self.messages_sent = 0
+        self.messages_coalesced = 0
+        self.messages_serialized = 0
+        self.bytes_sent = 0
+
+        self.sender = threading.Thread(target=self.send_pending, daemon=True)
+        self.reader = threading.Thread(target=self.listen_for_resync_requests, daemon=True)
+
+    def start(self):
+        """Starts the sender and resync reader threads."""
+        self.sender.start()
+        self.reader.start()
+
+    def close(self):
+        """Stops the replicator threads and closes the slave socket."""
+        with self.condition:
+            self.closed = True
+            self.queued = []
+            self.condition.notify()
+
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+            self.sock.close()
+        except Exception:
+            pass
+
+    def enqueue(self, master_resp):
+        """Schedules a replication message for the slave. Messages must be enqueued in
+        sequence order; a snapshot may repeat the latest sequence. Older messages are
+        dropped.
+
+        :param master_resp: A BroadcastMessage, or an InitConnection holding a
+            railway_update or railway_delta for this slave only.
+        """
+        if not isinstance(master_resp, BroadcastMessage):
+            master_resp = BroadcastMessage(master_resp)
+        message = master_resp.message
+        sequence = SlaveReplicator.get_sequence(message)
+
+        with self.condition:
+            if self.closed:
+                return
+
+            is_update = message.HasField("railway_update")
+            if self.enqueued_sequence is not None and (
+                sequence < self.enqueued_sequence or (sequence == self.enqueued_sequence and not is_update)
+            ):
+                LOGGER.debugv(f"{self.name}: dropping replication message {sequence}, already at {self.enqueued_sequence}")
+                return
+
+            if not self.queued:
+                self.pending_since = time.time()
+            self.queued.append(master_resp)
+            self.enqueued_sequence = sequence
+            self.condition.notify()
+
+    def send_pending(self):
+        """Runs on the sender thread. Waits for queued messages, coalesces them and
+        sends the result to the slave, until the replicator is closed or a send fails."""
+        while not utils.exit_flag:
+            with self.condition:
+                while not self.queued and not self.closed:
+                    self.condition.wait(timeout=1)
+                    if utils.exit_flag:
+                        return
+
+                if self.closed:
+                    return
+
+                queued = self.queued
+                self.queued = []
+                self.pending_since = None
+
+            master_resp = SlaveReplicator.coalesce(queued)
+            data, serialized = master_resp.serialize()
+            symbols_pb = None
+            if self.symbols is not None:
+                symbols_pb = CompactConverter.create_symbol_table_update(self.symbols, self.sent_symbol_counts)
+            if symbols_pb is not None:
+                # the message is shared with other replicators, so rather than setting
+                # its symbols field, the field is sent ahead of it and merged when parsed
+                data = [TrackNet_pb2.InitConnection(symbols=symbols_pb).SerializeToString(), data]
+
+            if not send(self.sock, data):
+                LOGGER.warning(f"Could not send replication message to slave {self.name}, closing replicator")
+                self.close()
+                return
+
+            with self.condition:
+                if symbols_pb is not None:
+                    self.sent_symbol_counts = (
+                        symbols_pb.first_junction_id + len(symbols_pb.junction_names),
+                        symbols_pb.first_track_id + len(symbols_pb.track_names),
+                        symbols_pb.first_train_id + len(symbols_pb.train_names),
+                    )
+                self.sent_sequence = SlaveReplicator.get_sequence(master_resp.message)
+                self.sent_timestamp = SlaveReplicator.get_timestamp(master_resp.message)
+                self.messages_sent += 1
+                self.messages_coalesced += len(queued) - 1
+                self.messages_serialized += serialized
+                self.bytes_sent += sum(len(part) for part in data) if isinstance(data, list) else len(data)
+            LOGGER.debugv(f"Replication message {self.sent_sequence} sent to slave {self.name}")
+
+    @staticmethod
+    def coalesce(queued: list) -> BroadcastMessage:
+        """Coalesces queued replication messages into one. The queued messages are
+        shared with other replicators, so the first one that has to be modified is copied.
+
+        A snapshot replaces the messages before it.
+
+        :param queued: A list of BroadcastMessage objects in sequence order.
+        :return: A BroadcastMessage, one of ``queued`` if nothing had to be merged.
+        """
+        # a snapshot replaces everything queued before it
+        start = 0
+        for index in range(len(queued) - 1, 0, -1):
+            if queued[index].message.HasField("railway_update"):
+                start = index
+                break
+
+        pending = queued[start]
+        pending_is_copy = False
+        for broadcast in queued[start + 1:]:
+            master_resp = broadcast.message
+            if not pending_is_copy:
+                copy = TrackNet_pb2.InitConnection()
+                copy.CopyFrom(pending.message)
+                pending = BroadcastMessage(copy)
+                pending_is_copy = True
+
+            if pending.message.HasField("railway_update"):
+                SlaveReplicator.apply_delta_to_update(master_resp.railway_delta, pending.message.railway_update)
+            else:
+                SlaveReplicator.merge_deltas(master_resp.railway_delta, pending.message.railway_delta)
+        return pending
+
+    def listen_for_resync_requests(self):
+        """Runs on the reader thread. Answers each resync request from the slave by
+        scheduling a full checkpoint, which replaces any pending delta."""
+        while (not utils.exit_flag) and (not self.closed):
+            try:
+                data = receive(self.sock, timeout=5, returnException=True)
+            except socket.timeout:
+                continue
+            except Exception as e:
+                LOGGER.debug(f"Stopped listening to slave {self.name}: {e}")
+                return
+
+            if not data:
+                continue
+
+            slave_msg = TrackNet_pb2.InitConnection()
+            slave_msg.ParseFromString(data)
+            if slave_msg.HasField("resync_request"):
+                LOGGER.info(f"Slave {self.name} requested resync from sequence {slave_msg.resync_request.last_sequence}, sending checkpoint")
+                self.request_checkpoint(self)
+
+    def get_metrics(self) -> dict:
+        """Returns replication lag metrics for this slave.
+
+        :return: A dictionary with the enqueued and sent sequence numbers, the lag in
+            updates and in seconds, and message and byte counters.
+        """
+        with self.condition:
+            lag = 0
+            if self.enqueued_sequence is not None:
+                lag = self.enqueued_sequence - (self.sent_sequence if self.sent_sequence is not None else 0)
+
+            return {
+                "enqueued_sequence": self.enqueued_sequence,
+                "sent_sequence": self.sent_sequence,
+                "lag_updates": lag,
+                "lag_seconds": time.time() - self.pending_since if self.pending_since is not None else 0.0,
+                "last_sent_timestamp": self.sent_timestamp,
+                "messages_sent": self.messages_sent,
+                "messages_coalesced": self.messages_coalesced,
+                "messages_serialized": self.messages_serialized,
+                "bytes_sent": self.bytes_sent,
+                "closed": self.closed,
+            }
+
+    @staticmethod
+    def get_sequence(master_resp: TrackNet_pb2.InitConnection) -> int:
+        if master_resp.HasField("railway_update"):
+            return master_resp.railway_update.sequence
+        return master_resp.railway_delta.sequence
+
+    @staticmethod
+    def get_timestamp(master_resp: TrackNet_pb2.InitConnection) -> float:
+        if master_resp.HasField("railway_update"):
+            return master_resp.railway_update.timestamp
+        return master_resp.railway_delta.timestamp
+
+    @staticmethod
+    def merge_deltas(newer: TrackNet_pb2.RailwayDelta, older: TrackNet_pb2.RailwayDelta):
+        """Merges a newer delta into an older one in place, keeping the older base sequence.
+
+        :param newer: The delta that follows on ``older``.
+        :param older: The pending delta, modified in place.
+        """
+        RailwayConverter.replace_pb_entries_by_id(older.trains, newer.trains)
+        RailwayConverter.replace_pb_entries_by_id(older.tracks, newer.tracks)
+        RailwayConverter.replace_pb_entries_by_id(older.junctions, newer.junctions)
+        RailwayConverter.replace_pb_entries_by_id(older.compact_trains, newer.compact_trains)
+        RailwayConverter.replace_pb_entries_by_id(older.compact_tracks, newer.compact_tracks)
+        RailwayConverter.replace_pb_entries_by_id(older.compact_junctions, newer.compact_junctions)
+        SlaveReplicator.merge_client_states(newer, older)
+        if newer.HasField("train_counter"):
+            older.train_counter = newer.train_counter
+        older.sequence = newer.sequence
+        older.timestamp = newer.timestamp
+
+    @staticmethod
+    def apply_delta_to_update(railway_delta: TrackNet_pb2.RailwayDelta, railway_update: TrackNet_pb2.RailwayUpdate):
+        """Applies a delta to a pending snapshot in place.
+
+        :param railway_delta: The delta that follows on ``railway_update``.
+        :param railway_update: The pending snapshot, modified in place.
+        """
+        if railway_update.HasField("compact_railway"):
+            CompactConverter.update_compact_railway_pb_with_delta_pb(railway_delta, railway_update.compact_railway)
+        else:
+            RailwayConverter.update_railway_pb_with_delta_pb(railway_delta, railway_update.railway)
+        SlaveReplicator.merge_client_states(railway_delta, railway_update)
+        railway_update.sequence = railway_delta.sequence
+        railway_update.timestamp = railway_delta.timestamp
+
+    @staticmethod
+    def merge_client_states(newer, older):
+        """Merges the last handled client states stored and evicted in a newer
+        replication message into an older one in place.
+
+        :param newer: The RailwayDelta or RailwayUpdate that follows on ``older``.
+        :param older: The pending RailwayDelta or RailwayUpdate, modified in place.
+        """
+        evicted = set(newer.evicted_client_state_train_ids)
+        if evicted:
+            entries = older.last_handled_client_states
+            for index in reversed(range(len(entries))):
+                if entries[index].train_id in evicted:
+                    del entries[index]
+
+        RailwayConverter.replace_pb_entries_by_id(
+            older.last_handled_client_states, newer.last_handled_client_states, key="train_id"
+        )
+
+        stored = {entry.train_id for entry in newer.last_handled_client_states}
+        if stored or evicted:
+            still_evicted = [
+                train_id for train_id in older.evicted_client_state_train_ids
+                if train_id not in stored and train_id not in evicted
+            ]
+            del older.evicted_client_state_train_ids[:]
+            older.evicted_client_state_train_ids.extend(still_evicted)
+            older.evicted_client_state_train_ids.extend(newer.evicted_client_state_train_ids)
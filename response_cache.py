@@ -0,0 +1,257 @@
+import logging
+import struct
+import time
+import zlib
+from collections import OrderedDict
+import TrackNet_pb2
+
+LOGGER = logging.getLogger("ResponseCache")
+
+
+class CachedResponse:
+    """The last client state handled for a train and the response it was given.
+
+    Attributes
+    ----------
+    digest : bytes
+        The digest of the serialized client state, None if the state had a sequence number.
+    sequence : int
+        The sequence number of the client state, 0 if it had none.
+    response : TrackNet_pb2.ServerResponse
+        The response sent for the client state. Never modified once cached.
+    last_used : float
+        When the entry was last stored or looked up, on the cache's clock.
+    """
+
+    __slots__ = ("digest", "sequence", "response", "last_used")
+
+    def __init__(self, digest: bytes, sequence: int, response: TrackNet_pb2.ServerResponse, last_used: float):
+        self.digest = digest
+        self.sequence = sequence
+        self.response = response
+        self.last_used = last_used
+
+
+class ResponseCache:
+    """Remembers the last client state handled for each train, by sequence number or,
+    for clients that do not number their states, by digest, so a client state delivered
+    twice, for example resent by a proxy after a master failover, is recognized and not
+    applied to the railway again, and states overtaken by a newer one are recognized as
+    stale.
+
+    Entries are kept in least recently used order. The cache holds at most
+    ``max_entries`` of them, entries unused for ``ttl`` seconds are dropped by
+    ``expire``, and the entry of a train that finished its route should be dropped
+    with ``evict``. Stores and evictions are recorded until ``pop_changes`` is called,
+    so the master only replicates the entries that changed.
+
+    Attributes
+    ----------
+    entries : OrderedDict
+        Maps train ids to CachedResponse objects, least recently used first.
+    max_entries : int
+        The most entries kept.
+    ttl : float
+        Seconds after which an unused entry expires.
+    changed : set
+        Train ids whose entry was stored since the last ``pop_changes``.
+    evicted : set
+        Train ids whose entry was removed since the last ``pop_changes``.
+    """
+
+    DEFAULT_MAX_ENTRIES = 100000
+    DEFAULT_TTL = 600.0
+    DIGEST = struct.Struct("<II")
+
+    def __init__(self, max_entries: int=DEFAULT_MAX_ENTRIES, ttl: float=DEFAULT_TTL, clock=time.monotonic):
+        """Initializes an empty cache.
+
+        :param max_entries: The most entries kept. Defaults to ``DEFAULT_MAX_ENTRIES``.
+        :param ttl: Seconds after which an unused entry expires. Defaults to ``DEFAULT_TTL``.
+        :param clock: A callable returning the current time in seconds. Defaults to time.monotonic.
+        """
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.changed = set()
+        self.evicted = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        self.explicit_evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, train_id: str):
+        return train_id in self.entries
+
+    @staticmethod
+    def compute_digest(data) -> bytes:
+        """Computes the digest client states are compared by: the CRC-32 and Adler-32
+        checksums of the serialized state, 8 bytes together. It is not cryptographic,
+        only compared with the previous state of the same train, and is the same in
+        every process, so digests replicated to a slave stay valid after a failover.
+
+        :param data: A bytes-like object holding the serialized client state.
+        :return: The digest bytes.
+        """
+        return ResponseCache.DIGEST.pack(zlib.crc32(data), zlib.adler32(data))
+
+    def lookup(self, train_id: str, digest: bytes) -> TrackNet_pb2.ServerResponse:
+        """Looks up whether a client state was the last one handled for its train.
+
+        :param train_id: The id of the train.
+        :param digest: The digest of the client state.
+        :return: The cached response on a hit, otherwise None.
+        """
+        entry = self.entries.get(train_id)
+        if entry is None or entry.digest != digest:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        entry.last_used = self.clock()
+        self.entries.move_to_end(train_id)
+        return entry.response
+
+    def compare_sequence(self, train_id: str, sequence: int) -> int:
+        """Compares the sequence number of a client state with that of the last one
+        handled for its train, counting a hit if it is the same state again, a miss if
+        it is newer and a stale state if it is older.
+
+        :param train_id: The id of the train.
+        :param sequence: The sequence number of the client state.
+        :return: A negative number if the state is stale, 0 if it is the last handled
+            state and a positive number if it is newer.
+        """
+        entry = self.entries.get(train_id)
+        last_sequence = entry.sequence if entry is not None else 0
+        if sequence > last_sequence:
+            self.misses += 1
+            return 1
+        if sequence < last_sequence:
+            self.stale += 1
+            return -1
+
+        self.hits += 1
+        entry.last_used = self.clock()
+        self.entries.move_to_end(train_id)
+        return 0
+
+    def get(self, train_id: str) -> CachedResponse:
+        """Returns the entry of a train, or None, without counting a lookup."""
+        return self.entries.get(train_id)
+
+    def store(self, train_id: str, digest: bytes, response: TrackNet_pb2.ServerResponse, sequence: int=0):
+        """Records the last client state handled for a train and its response, evicting
+        the least recently used entry if the cache is full. The entry is only recorded
+        as changed if the digest, the sequence number or the response object differs
+        from the cached one.
+
+        :param train_id: The id of the train.
+        :param digest: The digest of the client state, None if it has a sequence number.
+        :param response: The ServerResponse sent for it.
+        :param sequence: The sequence number of the client state, 0 if it has none.
+        """
+        now = self.clock()
+        entry = self.entries.get(train_id)
+        if entry is not None:
+            if entry.digest != digest or entry.sequence != sequence or entry.response is not response:
+                entry.digest = digest
+                entry.sequence = sequence
+                entry.response = response
+                self.changed.add(train_id)
+            entry.last_used = now
+            self.entries.move_to_end(train_id)
+            return
+
+        self.entries[train_id] = CachedResponse(digest, sequence, response, now)
+        self.changed.add(train_id)
+        self.evicted.discard(train_id)
+
+        while len(self.entries) > self.max_entries:
+            oldest_id = next(iter(self.entries))
+            self.remove(oldest_id)
+            self.lru_evictions += 1
+
+    def load(self, train_id: str, digest: bytes, response: TrackNet_pb2.ServerResponse, sequence: int=0):
+        """Adds an entry received from the master, without recording it as changed.
+
+        :param train_id: The id of the train.
+        :param digest: The digest of the client state, None if it has a sequence number.
+        :param response: The ServerResponse the master sent for it.
+        :param sequence: The sequence number of the client state, 0 if it has none.
+        """
+        self.entries[train_id] = CachedResponse(digest, sequence, response, self.clock())
+        self.entries.move_to_end(train_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def evict(self, train_id: str):
+        """Removes the entry of a train, for example once it finished its route.
+
+        :param train_id: The id of the train.
+        """
+        if self.remove(train_id):
+            self.explicit_evictions += 1
+
+    def unload(self, train_id: str):
+        """Removes an entry the master evicted, without recording the eviction."""
+        self.entries.pop(train_id, None)
+
+    def expire(self):
+        """Removes the entries unused for longer than ``ttl`` seconds."""
+        deadline = self.clock() - self.ttl
+        while self.entries:
+            train_id, entry = next(iter(self.entries.items()))
+            if entry.last_used >= deadline:
+                break
+            self.remove(train_id)
+            self.ttl_evictions += 1
+
+    def remove(self, train_id: str) -> bool:
+        """Removes an entry and records its eviction.
+
+        :param train_id: The id of the train.
+        :return: True if the train had an entry.
+        """
+        if self.entries.pop(train_id, None) is None:
+            return False
+        self.changed.discard(train_id)
+        self.evicted.add(train_id)
+        return True
+
+    def clear(self):
+        """Removes every entry without recording evictions, as when replaced by a checkpoint."""
+        self.entries.clear()
+        self.changed = set()
+        self.evicted = set()
+
+    def pop_changes(self) -> tuple:
+        """Returns and forgets the train ids whose entries were stored or evicted.
+
+        :return: A tuple of (changed train ids, evicted train ids).
+        """
+        changed, evicted = self.changed, self.evicted
+        self.changed = set()
+        self.evicted = set()
+        return changed, evicted
+
+    def get_metrics(self) -> dict:
+        """Returns the hit, miss, stale state and eviction counters and the number of entries."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stale": self.stale,
+            "lru_evictions": self.lru_evictions,
+            "ttl_evictions": self.ttl_evictions,
+            "explicit_evictions": self.explicit_evictions,
+        }
@@ -1,17 +1,17 @@
-import hashlib
 import os
 import TrackNet_pb2
 import TrackNet_pb2 as proto
 import logging
 import socket
 import signal
+import struct
 import threading
 from utils import *
 from classes.enums import *
 from classes.railway import Railway
 from classes.train import Train
 import traceback
-from datetime import datetime, timedelta
+from datetime import datetime
 import time
 import threading
 from utils import initial_config, proxy_details
@@ -19,9 +19,16 @@ import utils
 from classes.conflict_analyzer import ConflictAnalyzer
 import argparse
 from converters.railway_converter import RailwayConverter
+from converters.compact_converter import CompactConverter
+from classes.symbol_table import RailwaySymbols
 from message_converter import MessageConverter
 import sys
-from queue import Queue
+from replication import SlaveReplicator, BroadcastMessage
+from response_cache import ResponseCache
+from persistence import Persistence
+from ingest_queue import IngestQueue
+from classes.report_scheduler import ReportScheduler
+from classes.ingest_scheduler import IngestScheduler
 
 from google.protobuf.message import Message
 # Global Variables
@@ -38,6 +45,11 @@ setup_logging()  ## only need to call at main entry point of application
 
 LOGGER = logging.getLogger("UnAssignedServer")
 
+# field numbers used to find the client states in the wire bytes of a message from a proxy
+CLIENT_STATE_FIELD = TrackNet_pb2.InitConnection.DESCRIPTOR.fields_by_name["client_state"].number
+CLIENT_STATE_BATCH_FIELD = TrackNet_pb2.InitConnection.DESCRIPTOR.fields_by_name["client_state_batch"].number
+CLIENT_STATES_FIELD = TrackNet_pb2.ClientStateBatch.DESCRIPTOR.fields_by_name["client_states"].number
+
 
 signal.signal(signal.SIGTERM, exit_gracefully)
 signal.signal(signal.SIGINT, exit_gracefully)
@@ -64,61 +76,162 @@ class Server:
       A flag indicating whether this server instance is operating as the master server.
 	"""
 
-	def __init__(self, host: str = "localhost", port: int = 5555):
+	def __init__(self, host: str = "localhost", port: int = 5555, columnar_trains: bool = False, compact_replication: bool = True,
+		data_dir: str = None, max_batch_size: int = 256):
 		"""Initializes the server instance with the specified host and port. 
-		Sets up the railway simulation and starts threads for managing network 
+		Sets up the railway simulation. Call ``run`` to start managing network 
 		connections and processing client updates.
 
       	:param host: The hostname or IP address to listen on.
       	:param port: The port number to listen on.
+      	:param columnar_trains: Whether the railway keeps its trains in a TrainStore.
+      	:param compact_replication: Whether replication messages refer to junctions, tracks and trains by integer id.
+      	:param data_dir: A directory to keep a snapshot and write-ahead log of the railway in, recovered 
+      		from if it holds them. The railway is only kept in memory if None.
+      	:param max_batch_size: The most client states handled in one batch, the most urgent first. 
+      		Every pending state is handled at once if None.
 		"""
 		self.railway = Railway(
 			trains=None,
 			junctions=initial_config["junctions"],
 			tracks=initial_config["tracks"],
+			columnar=columnar_trains,
 		)
 
 		self.host = socket.gethostname()
 		self.port = port
 		
 
-		self.lock = threading.Lock()
+		self.lock = threading.RLock()
 
 		self.connected_to_master = False
 		self.is_master = False
 		self.slave_sockets = {}
 		self.proxy_sockets = {}
-		self.socks_for_communicating_to_slaves = []
+		self.slave_replicators = []
 		
 		self.connecting_to_proxies = False
 		self.isMaster = False
 		self.proxy_host = "csx1.ucalgary.ca"
 		self.proxy_port = 5555
 
-		self.conflict_analysis_interval = 1
-		self.previous_conflict_analysis_time = datetime.now() - timedelta(seconds=self.conflict_analysis_interval)
 		self.client_commands = {}
+		self.issued_responses = {}
+		self.report_scheduler = ReportScheduler()
+
+		self.background_analysis = False
+		self.conflict_analysis_interval = 0.05
+		self.conflict_analysis_chunk = 256
+		self.conflict_analysis_requested = threading.Event()
+		self.conflict_analysis_passes = 0
+		self.conflict_analysis_seconds = 0.0
+		self.unanalyzed_command_lookups = 0
 
 		self.backup_railway_timestamp = None
-		self.backup_railway = None
-		self.handled_client_states = {}
+		self.has_backup = False
+		self.backup_sequence = None
+		self.resync_requested = False
+		self.master_symbols = RailwaySymbols()
+		self.response_cache = ResponseCache()
+
+		self.replication_sequence = 0
+		self.compact_replication = compact_replication
 		
-		self.client_state_queue = Queue()
+		self.client_state_queue = IngestQueue()
+		self.client_state_queue_timeout = 0.5
+		self.ingest_scheduler = IngestScheduler()
+		self.max_batch_size = max_batch_size
 
 		self.listening_for_backups = threading.Thread(target=self.listen_for_master, args=(self.host, self.port), daemon=True)
-		self.listening_for_backups.start() # will start thread for listening for master backup
 
-		threading.Thread(target=self.connect_to_proxy, daemon=True).start()
-		threading.Thread(target=self.printRailwayMapold, daemon=True).start()
+		self.persistence = None
+		if data_dir is not None:
+			self.persistence = Persistence(data_dir)
+			self.recover_from_disk()
+			self.persistence.start()
 
 		#self.window = None
 		# LOGGER.debug(f" Time {time.time()} ")
 		# timeobj = time.time()
 		# LOGGER.debug(f" Time {timeobj} conversion to readable: { datetime.fromtimestamp(timeobj).strftime('%Y-%m-%d %H:%M:%S') }")
-		
-		
+
+	def run(self):
+		"""Starts the threads for listening for master backups, connecting to the 
+		proxies, analyzing conflicts and printing the railway, then processes client 
+		states on the calling thread until the exit flag is set."""
+		self.listening_for_backups.start() # will start thread for listening for master backup
+
+		threading.Thread(target=self.connect_to_proxy, daemon=True).start()
+		threading.Thread(target=self.printRailwayMapold, daemon=True).start()
+		self.start_conflict_analysis()
+
 		self.handle_client_states()
 
+	def start_conflict_analysis(self):
+		"""Starts the conflict analysis thread. From then on, handling client states 
+		only looks up the commands it publishes instead of analyzing each batch inline."""
+		self.background_analysis = True
+		threading.Thread(target=self.analyze_conflicts_continuously, daemon=True).start()
+
+	def analyze_conflicts_continuously(self):
+		"""Runs on the conflict analysis thread. While this server is the master, analyzes 
+		the trains and tracks changed since the last pass whenever a batch of client states 
+		was applied, and at least every ``conflict_analysis_interval`` seconds."""
+		LOGGER.debug("Conflict analysis thread has been started")
+		while not utils.exit_flag:
+			self.conflict_analysis_requested.wait(timeout=self.conflict_analysis_interval)
+			self.conflict_analysis_requested.clear()
+			if not self.is_master:
+				continue
+
+			try:
+				self.analyze_conflicts()
+			except Exception as e:
+				LOGGER.error(f"Error analyzing conflicts: {e}")
+				traceback.print_exc()
+
+	def analyze_conflicts(self):
+		"""Recomputes the commands of the trains affected by the changes since the last 
+		pass and publishes them. 
+
+		With the conflict analysis thread running, the commands are computed on a copy 
+		of the command table, which then replaces it in one assignment, so a published 
+		table is never modified. The lock is held for ``conflict_analysis_chunk`` trains 
+		at a time, so a pass over the whole railway holds up a batch of client states 
+		no longer than a small one. A train that changes during the pass is recorded as 
+		unanalyzed again and recomputed by the next pass. Otherwise the table is updated 
+		in place by the thread handling client states, its only reader.
+		"""
+		with self.lock:
+			if not self.railway.unanalyzed_trains and not self.railway.map.unanalyzed_tracks:
+				return
+			if not self.background_analysis:
+				start = time.perf_counter()
+				self.client_commands = ConflictAnalyzer.resolve_conflicts_incremental(self.railway, self.client_commands)
+				self.conflict_analysis_passes += 1
+				self.conflict_analysis_seconds += time.perf_counter() - start
+				return
+
+			start = time.perf_counter()
+			affected_train_ids = list(ConflictAnalyzer.pop_affected_trains(self.railway))
+			commands = dict(self.client_commands)
+			elapsed = time.perf_counter() - start
+
+		for offset in range(0, len(affected_train_ids), self.conflict_analysis_chunk):
+			with self.lock:
+				if not self.is_master:
+					return
+				start = time.perf_counter()
+				for train_id in affected_train_ids[offset:offset + self.conflict_analysis_chunk]:
+					if train_id in self.railway.trains:
+						commands[train_id] = ConflictAnalyzer.get_train_command(self.railway, train_id)
+				elapsed += time.perf_counter() - start
+
+		with self.lock:
+			self.client_commands = commands
+			self.conflict_analysis_passes += 1
+			self.conflict_analysis_seconds += elapsed
+
 	def printRailwayMapold(self):
 		while not utils.exit_flag:
 			time.sleep(5)
@@ -138,20 +251,76 @@ class Server:
 		"""
 		railway_update = TrackNet_pb2.RailwayUpdate()
 		railway_update.timestamp = time.time()
-		railway_update.railway.CopyFrom(RailwayConverter.convert_railway_obj_to_pb(self.railway))
+		railway_update.sequence = self.replication_sequence
+		if self.compact_replication:
+			railway_update.compact_railway.CopyFrom(CompactConverter.convert_railway_obj_to_compact_pb(self.railway))
+		else:
+			railway_update.railway.CopyFrom(RailwayConverter.convert_railway_obj_to_pb(self.railway))
 		
-		for train_id, (client_state_hash, server_response) in self.handled_client_states.items():
-			# Creating a new LastHandledClientState protobuf message
-			last_handled_client_state = TrackNet_pb2.LastHandledClientState()
-			last_handled_client_state.train_id = train_id
-			last_handled_client_state.client_state_hash = client_state_hash
-			last_handled_client_state.serverResponse.CopyFrom(server_response)
-			
-			# Adding the LastHandledClientState to the list in RailwayUpdate
-			railway_update.last_handled_client_states.add().CopyFrom(last_handled_client_state)
+		for train_id in self.response_cache.entries.keys():
+			self.add_last_handled_client_state(railway_update.last_handled_client_states, train_id)
 		
 		return railway_update
 
+	def create_railway_delta_message(self) -> TrackNet_pb2.RailwayDelta:
+		"""Creates and returns a RailwayDelta message containing the trains, tracks, 
+		junctions and last handled client states that changed since the previous 
+		replication message, and advances the replication sequence number.
+
+		:return: A RailwayDelta protobuf message.
+		"""
+		train_ids, track_ids, junction_ids = self.railway.pop_changes()
+		if self.compact_replication:
+			railway_delta = CompactConverter.convert_railway_delta_to_compact_pb(self.railway, train_ids, track_ids, junction_ids)
+		else:
+			railway_delta = RailwayConverter.convert_railway_delta_to_pb(self.railway, train_ids, track_ids, junction_ids)
+		railway_delta.base_sequence = self.replication_sequence
+		self.replication_sequence += 1
+		railway_delta.sequence = self.replication_sequence
+		railway_delta.timestamp = time.time()
+
+		self.add_changed_client_states(railway_delta)
+
+		return railway_delta
+
+	def add_changed_client_states(self, message):
+		"""Adds the response cache entries stored and evicted since the previous 
+		replication message to a RailwayDelta.
+
+		:param message: The RailwayDelta protobuf message to add to.
+		"""
+		changed, evicted = self.response_cache.pop_changes()
+		for train_id in changed:
+			self.add_last_handled_client_state(message.last_handled_client_states, train_id)
+		message.evicted_client_state_train_ids.extend(evicted)
+
+	def add_last_handled_client_state(self, last_handled_client_states, train_id: str):
+		"""Appends the last handled client state of a train to a repeated 
+		LastHandledClientState field.
+
+		:param last_handled_client_states: The repeated protobuf field to append to.
+		:param train_id: The ID of the train whose last handled client state is added.
+		"""
+		entry = self.response_cache.get(train_id)
+		last_handled_client_state = last_handled_client_states.add()
+		last_handled_client_state.train_id = train_id
+		if entry.digest is not None:
+			last_handled_client_state.client_state_digest = entry.digest
+		if entry.sequence:
+			last_handled_client_state.client_state_sequence = entry.sequence
+		last_handled_client_state.serverResponse.CopyFrom(entry.response)
+
+	def create_replication_message(self) -> TrackNet_pb2.InitConnection:
+		"""Creates the RailwayDelta message that replicates the latest batch of changes, 
+		with the response cache entries that changed, to the slaves.
+
+		:return: An InitConnection protobuf message holding a railway delta.
+		"""
+		master_resp = TrackNet_pb2.InitConnection()
+		master_resp.sender = TrackNet_pb2.InitConnection.SERVER_MASTER
+		master_resp.railway_delta.CopyFrom(self.create_railway_delta_message())
+		return master_resp
+
 	def get_train(self, train: TrackNet_pb2.Train, origin_id: str):
 		"""Retrieves or creates a Train object based on the provided protobuf Train message.
 
@@ -176,62 +345,68 @@ class Server:
 			return train
 
 	def computeHash(self, clienstate: Message):
-		"""Computes and returns a SHA256 hash of the given protobuf message.
+		"""Computes the response cache digest of the given protobuf message by serializing 
+		it the way a proxy sends it. Only used for client states queued in this process, 
+		which have no wire bytes; states from proxies are always digested by ``compute_wire_digests``.
 
 		:param clientstate: A protobuf message to hash.
-		:return: A hexadecimal string representing the hash of the message.
+		:return: The digest bytes, see ``ResponseCache.compute_digest``.
+		"""
+		return ResponseCache.compute_digest(clienstate.SerializeToString())
+
+	def compute_wire_digests(self, data, batched: bool, count: int) -> list:
+		"""Computes the response cache digests of the client states in a message from a 
+		proxy from the bytes they were received as, so they are never serialized again. 
+		Runs on the thread receiving from the proxy, before ``data`` is reused.
+
+		:param data: The serialized InitConnection holding a client_state or client_state_batch.
+		:param batched: True if the client states are in a client_state_batch.
+		:param count: The number of client states the parsed message holds.
+		:return: A list of digest bytes, one per client state in the order they were received, 
+			or None if the client states could not be found in the wire bytes.
 		"""
-		serialized_obj = clienstate.SerializeToString()
-		hash_obj = hashlib.sha256(serialized_obj)
-		return hash_obj.hexdigest()
+		try:
+			if not batched:
+				spans = find_length_delimited_fields(data, CLIENT_STATE_FIELD)
+				# a client_state sent more than once is merged by the parser, the same as 
+				# parsing its occurrences joined together, so that is what is digested
+				if len(spans) > 1:
+					return [ResponseCache.compute_digest(b"".join(data[start:end] for (start, end) in spans))]
+			else:
+				spans = []
+				for (start, end) in find_length_delimited_fields(data, CLIENT_STATE_BATCH_FIELD):
+					spans.extend(find_length_delimited_fields(data, CLIENT_STATES_FIELD, start, end))
+		except (ValueError, IndexError) as e:
+			LOGGER.error(f"Could not find the client states in the received bytes: {e}")
+			return None
+
+		if len(spans) != count:
+			LOGGER.error(f"Found {len(spans)} client states in the received bytes, {count} were parsed")
+			return None
+		return [ResponseCache.compute_digest(data[start:end]) for (start, end) in spans]
 	
 	def handle_client_states(self):
-		"""Processes queued client state updates in a background thread. Applies state 
-		updates to the railway simulation and generates server responses."""
+		"""Processes queued client state updates. Blocks on the queue until a client 
+		state arrives, takes the newest pending states of the most urgent trains as a 
+		batch and handles the whole batch at once, so conflict analysis and the slave backup run 
+		once per batch instead of once per message."""
 		LOGGER.debug(F"Handling client states thread has been started")
 		while not utils.exit_flag:
-			if self.client_state_queue.qsize() != 0:
-				(client_state, sock) = self.client_state_queue.get_nowait()
-				clientStateHash = self.computeHash(client_state)
+			batch = self.get_client_state_batch()
+			if not batch:
+				continue
 
-				try:
-					train = self.get_train(client_state.train, client_state.location.front_junction_id)
-					LOGGER.debugv(f" train name: {train.name} \n train location={train.location} \n new location={client_state.location}")
-				except Exception as e:
-					LOGGER.error(f"Error getting train: {e}")
-
-				resp = TrackNet_pb2.ServerResponse()
-				value = self.handled_client_states.get(train.name)
-
-				if value is not None and clientStateHash == value[0]:
-					#last_master_response = value[1]
-					resp.CopyFrom(self.handle_client_state(client_state, train, apply_state=False))
-				else:
-					resp.CopyFrom(self.handle_client_state(client_state, train))
-				
-				master_response = TrackNet_pb2.InitConnection()
-				master_response.sender = TrackNet_pb2.InitConnection.Sender.SERVER_MASTER
-				master_response.server_response.CopyFrom(resp)
-
-				LOGGER.debugv(f"master_response: {master_response}")
-				train_id = resp.train.id
-				self.handled_client_states[train_id] = (clientStateHash,master_response.server_response)
-				
-				# Create a separate thread for talking to slaves
-				threading.Thread(target=self.talk_to_slaves, daemon=True).start()
-
-				if not send(sock, master_response.SerializeToString()):
-					LOGGER.warning(f"ServerResponse message failed to send to proxy.")
-				else:
-					LOGGER.debug("Sent server response to proxy successfully")
-		
-		LOGGER.debug("exit flag was set, will now shutdown")
-		for (slave_socket) in self.socks_for_communicating_to_slaves:
 			try:
-				slave_socket.shutdown(socket.SHUT_RDWR)
-				slave_socket.close()
+				self.handle_client_state_batch(batch)
 			except Exception as e:
-				pass
+				LOGGER.error(f"Error handling batch of {len(batch)} client states: {e}")
+				traceback.print_exc()
+		
+		LOGGER.debug("exit flag was set, will now shutdown")
+		for replicator in self.slave_replicators:
+			replicator.close()
+		if self.persistence is not None:
+			self.persistence.close()
 		
 		for proxy_sock in self.proxy_sockets.values():
 			try:
@@ -240,17 +415,232 @@ class Server:
 			except Exception as e:
 				pass
 
-	def handle_client_state(self, client_state, train, apply_state=True):
-		if apply_state:
-			self.apply_client_state(client_state, train)
-		resp = self.issue_client_command(client_state, train)
-		return resp
+	def get_client_state_batch(self) -> list:
+		"""Blocks for up to ``client_state_queue_timeout`` seconds waiting for a client 
+		state, then takes up to ``max_batch_size`` pending states from the queue, the most 
+		urgent first as scored by the ingest scheduler. States left pending age, so every 
+		train is handled within a few batches however urgent the others are.
+
+		:return: A list of PendingClientState objects. Empty if the wait timed out.
+		"""
+		return self.client_state_queue.take(
+			timeout=self.client_state_queue_timeout, limit=self.max_batch_size, key=self.score_pending_client_state
+		)
+
+	def score_pending_client_state(self, pending, now: float) -> float:
+		"""Returns the ingest scheduler's score of a pending client state. Called by the queue 
+		without ``self.lock``, so the scheduler only reads the railway, and the waiting train 
+		index through ``peek_favored_train``: the conflict analysis thread may be modifying 
+		the railway at the same time, and a class computed from a half updated index only 
+		misorders a state until its train reports again.
+
+		:param pending: A PendingClientState.
+		:param now: The current ``time.monotonic()``.
+		:return: The score, higher to be handled sooner.
+		"""
+		return self.ingest_scheduler.score(self.railway, pending, now)
+
+	def handle_client_state_batch(self, batch: list):
+		"""Applies every client state in the batch to the railway, runs conflict analysis 
+		once for the whole batch and then sends a response for each state. With a data 
+		directory, the batch is logged and a snapshot written when one is due.
+
+		:param batch: A list of PendingClientState objects taken from the client state queue.
+		"""
+		with self.lock:
+			responses, master_resp = self.apply_client_state_batch(batch)
+			# enqueued under the lock so every replicator sees updates in sequence order
+			self.talk_to_slaves(master_resp)
+
+		for (sock, master_response) in responses:
+			if not send(sock, master_response.SerializeToString()):
+				LOGGER.warning(f"ServerResponse message failed to send to proxy.")
+			else:
+				LOGGER.debug("Sent server response to proxy successfully")
+
+		responded = time.monotonic()
+		for pending in batch:
+			if pending.priority_class is not None:
+				self.ingest_scheduler.record_latency(pending.priority_class, responded - pending.received)
+
+		# built once the responses are sent, as a snapshot holds the whole railway
+		if self.persistence is not None and self.persistence.snapshot_due():
+			with self.lock:
+				self.write_snapshot()
+
+	def apply_client_state_batch(self, batch: list):
+		"""Applies a batch of client states to the railway and builds the responses 
+		and the replication message for it. Must be called with ``self.lock`` held 
+		so that slave checkpoints never observe a half applied batch.
+
+		:param batch: A list of PendingClientState objects taken from the client state queue. Every 
+			connection waiting on a state gets a response, and the responses to states that arrived 
+			in a ClientStateBatch are sent back to their proxy in one ServerResponseBatch.
+		:return: A tuple of the (sock, InitConnection) responses to send to the proxies 
+			and the InitConnection message to replicate to the slaves.
+		"""
+		handled = []
+		applied = []
+		responses = []
+		self.response_cache.expire()
+
+		for pending in batch:
+			client_state = pending.client_state
+			try:
+				train = self.get_train(client_state.train, client_state.location.front_junction_id)
+				LOGGER.debugv(f" train name: {train.name} \n train location={train.location} \n new location={client_state.location}")
+			except Exception as e:
+				LOGGER.error(f"Error getting train: {e}")
+				continue
+
+			# numbered states are told apart by their sequence number, others by their digest
+			sequence = client_state.sequence
+			if sequence:
+				digest = None
+				order = self.response_cache.compare_sequence(train.name, sequence)
+				if order < 0:
+					LOGGER.debug(f"Dropping stale client state {sequence} of {train.name}")
+					continue
+				duplicate = order == 0
+			else:
+				digest = pending.digest
+				if digest is None:
+					digest = self.computeHash(client_state)
+				duplicate = self.response_cache.lookup(train.name, digest) is not None
+
+			train_done = False
+			if not duplicate:
+				train_done = self.apply_client_state(client_state, train)
+				applied.append(client_state)
+
+			if train.name not in self.client_commands:
+				self.railway.unanalyzed_trains.add(train.name)
+
+			handled.append((client_state, pending.waiters, train, digest, train_done))
+
+		if self.background_analysis:
+			# answered with the published commands, the batch is analyzed once the lock is released
+			self.conflict_analysis_requested.set()
+		else:
+			# only the trains affected by this batch are analyzed, so this is cheap enough to run every batch
+			self.analyze_conflicts()
+
+		response_batches = {}
+		stored = set()
+		evicted = set()
+		for (client_state, waiters, train, digest, train_done) in handled:
+			server_response = self.issue_client_command(client_state, train)
+			LOGGER.debugv(f"server_response: {server_response}")
+			if train_done:
+				# a train that finished its route sends no more states
+				self.response_cache.evict(train.name)
+				evicted.add(train.name)
+			else:
+				self.response_cache.store(train.name, digest, server_response, client_state.sequence)
+				stored.add(train.name)
+				evicted.discard(train.name)
+
+			for (sock, batched) in waiters:
+				if batched and sock in response_batches:
+					response_batches[sock].server_response_batch.server_responses.append(server_response)
+					continue
+
+				master_response = TrackNet_pb2.InitConnection()
+				master_response.sender = TrackNet_pb2.InitConnection.Sender.SERVER_MASTER
+				if batched:
+					master_response.server_response_batch.server_responses.append(server_response)
+					response_batches[sock] = master_response
+				else:
+					master_response.server_response.CopyFrom(server_response)
+				responses.append((sock, master_response))
+
+		master_resp = self.create_replication_message()
+		# until a requested snapshot is written the log may hold another master's history
+		if self.persistence is not None and not self.persistence.snapshot_requested and (applied or stored or evicted):
+			self.log_client_state_batch(applied, stored - evicted, evicted)
+		return responses, master_resp
+
+	def log_client_state_batch(self, client_states: list, stored: set, evicted: set):
+		"""Appends a batch of applied client states to the write-ahead log, with the 
+		response cache entries stored and evicted for it. Must be called with ``self.lock`` 
+		held, after the replication sequence number was advanced for the batch.
+
+		:param client_states: The client states applied to the railway, in order.
+		:param stored: The ids of the trains whose response cache entry was stored.
+		:param evicted: The ids of the trains whose response cache entry was evicted.
+		"""
+		record = TrackNet_pb2.LogRecord()
+		record.sequence = self.replication_sequence
+		record.client_states.extend(client_states)
+		for train_id in stored:
+			self.add_last_handled_client_state(record.last_handled_client_states, train_id)
+		record.evicted_client_state_train_ids.extend(evicted)
+		self.persistence.append(record)
+
+	def write_snapshot(self):
+		"""Queues a snapshot of the railway and the response cache on the write-ahead log, 
+		as the checkpoint a newly connected slave would receive, with the symbol tables 
+		a compact railway refers to. Must be called with ``self.lock`` held.
+		"""
+		snapshot = TrackNet_pb2.InitConnection()
+		snapshot.sender = TrackNet_pb2.InitConnection.SERVER_MASTER
+		if self.compact_replication:
+			symbols_pb = CompactConverter.create_symbol_table_update(self.railway.get_symbols(), (0, 0, 0))
+			if symbols_pb is not None:
+				snapshot.symbols.CopyFrom(symbols_pb)
+		snapshot.railway_update.CopyFrom(self.create_railway_update_message())
+		self.persistence.write_snapshot(snapshot)
+
+	def recover_from_disk(self):
+		"""Restores the railway and the response cache from the snapshot and write-ahead 
+		log in the data directory, by loading the snapshot and applying the client states 
+		of every later log record again, then analyzes every train and writes a new 
+		snapshot, so the next restart does not replay the same records.
+		"""
+		with self.lock:
+			snapshot_data = self.persistence.load_snapshot()
+			if snapshot_data is not None:
+				snapshot = TrackNet_pb2.InitConnection()
+				snapshot.ParseFromString(snapshot_data)
+				symbols = RailwaySymbols()
+				if snapshot.HasField("symbols"):
+					CompactConverter.apply_symbol_table_update(snapshot.symbols, symbols)
+				self.load_backup_railway(snapshot.railway_update, symbols)
+				self.response_cache.clear()
+				self.store_last_handled_client_states(snapshot.railway_update)
+				self.replication_sequence = snapshot.railway_update.sequence
+
+			replayed = 0
+			record = TrackNet_pb2.LogRecord()
+			for data in self.persistence.replay():
+				record.ParseFromString(data)
+				if record.sequence <= self.replication_sequence:
+					continue
+
+				for client_state in record.client_states:
+					train = self.railway.trains.get(client_state.train.id)
+					if train is None:
+						train = self.railway.create_new_train(client_state.train.length, client_state.location.front_junction_id)
+					self.apply_client_state(client_state, train)
+				self.store_last_handled_client_states(record)
+				self.replication_sequence = record.sequence
+				replayed += 1
+
+			if snapshot_data is None and replayed == 0:
+				return
+
+			self.railway.pop_changes()
+			self.railway.rebuild_waiting_index()
+			self.client_commands = ConflictAnalyzer.resolve_conflicts_incremental(self.railway, self.client_commands)
+			self.write_snapshot()
+			LOGGER.info(f"Recovered {len(self.railway.trains)} trains at sequence {self.replication_sequence}, replaying {replayed} log records")
 
 	def apply_client_state(self, client_state, train):
 		"""Applies the given client state update to the specified train in the railway simulation.
 
 		:param client_state: A protobuf message containing the client's state update.
 		:param train: The TrainMovement object to update.
+		:return: True if the train reached its destination.
 		"""
 		# assume client_state location is set
 		# set train info
@@ -279,45 +669,55 @@ class Server:
 			route,
 		)
 
-		if train_done and (train.name in self.client_commands):
-			del self.client_commands[train.name]
+		# the train's command is recomputed by the next analysis, as update_train marks it unanalyzed
+		if train_done:
+			self.issued_responses.pop(train.name, None)
 
 		#self.railway.print_map()
+		return train_done
 
 	def issue_client_command(self, client_state, train):
 		"""Generates a server response based on the client's current 
-		state and the specified train's needs.
+		state and the specified train's needs. The command is looked up in the 
+		published command table; a train conflict analysis has not seen yet 
+		gets the command computed for it alone, which the next pass publishes. 
+		
+		The response hints how long the client should wait before its next state, 
+		shorter the closer the train is to a junction or another train. 
+
+		The response is only built when the command, the hint, the client or the 
+		sequence number of the client state changed since the previous response to 
+		the train; otherwise that response is returned again. Responses are never 
+		modified once issued, so they can be shared.
 
 		:param client_state: A protobuf message containing the client's state update.
 		:param train: The TrainMovement object to consider in the response.
 		:return: A ServerResponse protobuf message.
 		"""
+		command = self.client_commands.get(train.name)
+		if command is None:
+			self.unanalyzed_command_lookups += 1
+			command = ConflictAnalyzer.get_train_command(self.railway, train.name)
+		LOGGER.debugv(f"command for {train.name}: {command}")
+		report_interval = self.report_scheduler.suggest_interval(self.railway, train, command)
+		# the hint is a float32 in the response, so it is compared as one
+		report_interval = struct.unpack("f", struct.pack("f", report_interval))[0]
+
+		issued = self.issued_responses.get(train.name)
+		if (issued is not None and issued[0] is command and issued[1].sequence == client_state.sequence
+				and issued[1].next_report_interval == report_interval and issued[1].client == client_state.client):
+			return issued[1]
+
 		resp = TrackNet_pb2.ServerResponse()
 		resp.train.id = train.name
 		resp.train.length = train.length
 		resp.client.CopyFrom(client_state.client)
-		#LOGGER.debug(f"trains speed being set to {TrainSpeed.FAST.value}")
-		#resp.speed = TrainSpeed.FAST.value
-		#resp.status = TrackNet_pb2.ServerResponse.UpdateStatus.CLEAR
-
-		if (
-			(datetime.now() - self.previous_conflict_analysis_time > timedelta(seconds=self.conflict_analysis_interval))
-			or (train.name not in self.client_commands)
-		):
-			self.client_commands = ConflictAnalyzer.resolve_conflicts_simple(self.railway, self.client_commands)
-			self.previous_conflict_analysis_time = datetime.now()
-		else:
-			LOGGER.debugv(f"No new commands: {self.previous_conflict_analysis_time} {self.conflict_analysis_interval}")
-		LOGGER.debugv(f"client commands: {self.client_commands}")
-		command = self.client_commands[train.name]
-		resp.status = command.status
-		if command.HasField("new_route"):
-			resp.new_route = command.new_route
-		if command.HasField("speed"):
-			resp.speed = command.speed
-		else:
-			LOGGER.warning("NO SPEED!!!!")
+		if client_state.sequence:
+			resp.sequence = client_state.sequence
+		resp.next_report_interval = report_interval
+		command.fill_pb(resp)
 
+		self.issued_responses[train.name] = (command, resp)
 		return resp
 
 	def set_slave_identification_msg(self, slave_identification_msg: TrackNet_pb2.InitConnection):
@@ -348,6 +748,7 @@ class Server:
 		while (not self.is_master) and (not utils.exit_flag):
 			try:
 				conn, addr = slave_to_master_sock.accept()
+				set_tcp_nodelay(conn)
 				self.connected_to_master = True
 				LOGGER.debug("Master has connected to slave server, listening for updates...")
 				
@@ -379,13 +780,21 @@ class Server:
 
    		:param conn: The socket connection to the master server.
 		"""
+		# a master sends its symbol tables from the start on every new connection
+		with self.lock:
+			self.master_symbols = RailwaySymbols()
+
 		try:
 			while self.connected_to_master and (not self.is_master):
 				try:
-					data = receive(conn)  # Adjust buffer size as needed
+					data = receive(conn, returnException=True, copy=False)
 					if data:
 						master_resp = TrackNet_pb2.InitConnection()
 						master_resp.ParseFromString(data)
+						if master_resp.HasField("symbols"):
+							with self.lock:
+								CompactConverter.apply_symbol_table_update(master_resp.symbols, self.master_symbols)
+
 						# Check if sender is master
 						if (master_resp.sender== TrackNet_pb2.InitConnection.SERVER_MASTER and master_resp.HasField("railway_update")):
 							#LOGGER.debug(f"Slave received a backup form the master: {master_resp.railway_update}")
@@ -395,18 +804,22 @@ class Server:
 							readable_date = dt_obj.strftime('%Y-%m-%d %H:%M:%S') # Format datetime object to string in a readable format
 
 							LOGGER.debug(f"Received railway update from master. Time given by master server: {master_resp.railway_update.timestamp}")
-							LOGGER.debugv(f"Backup Railway: {master_resp.railway_update.railway}")
-
-							self.backup_railway_timestamp = (master_resp.railway_update.timestamp) 
-							self.backup_railway = master_resp.railway_update.railway
-
-							for last_handled_client_state in master_resp.railway_update.last_handled_client_states:
-								# Extract the train_id, client_state_hash, and serverResponse
-								train_id = last_handled_client_state.train_id
-								client_state_hash = last_handled_client_state.client_state_hash
-								server_response = last_handled_client_state.serverResponse  
-
-								self.handled_client_states[train_id] = (client_state_hash, server_response)
+							railway_update = master_resp.railway_update
+							sequence = railway_update.sequence if railway_update.HasField("sequence") else None
+
+							with self.lock:
+								self.backup_railway_timestamp = (master_resp.railway_update.timestamp) 
+								self.load_backup_railway(railway_update)
+								self.has_backup = True
+								self.backup_sequence = sequence
+								self.resync_requested = False
+								self.response_cache.clear()
+								self.store_last_handled_client_states(railway_update)
+								self.analyze_backup_railway()
+
+						elif (master_resp.sender== TrackNet_pb2.InitConnection.SERVER_MASTER and master_resp.HasField("railway_delta")):
+							with self.lock:
+								self.apply_railway_delta(conn, master_resp.railway_delta)
 							
 				except socket.timeout:
 					continue  # No data received within the timeout, continue loop
@@ -419,6 +832,103 @@ class Server:
 			LOGGER.debug("Closing connection to master")
 			conn.close()
 
+	def store_last_handled_client_states(self, message):
+		"""Stores the last handled client states received from the master in the 
+		response cache, and drops those the master evicted, so that duplicate client 
+		states can be recognized after this slave is promoted.
+
+		:param message: The RailwayUpdate or RailwayDelta protobuf message from the master, 
+			or a LogRecord from the write-ahead log.
+		"""
+		for last_handled_client_state in message.last_handled_client_states:
+			digest = None
+			if last_handled_client_state.HasField("client_state_digest"):
+				digest = last_handled_client_state.client_state_digest
+			self.response_cache.load(
+				last_handled_client_state.train_id,
+				digest,
+				last_handled_client_state.serverResponse,
+				last_handled_client_state.client_state_sequence,
+			)
+		for train_id in message.evicted_client_state_train_ids:
+			self.response_cache.unload(train_id)
+
+	def load_backup_railway(self, railway_update: TrackNet_pb2.RailwayUpdate, symbols: RailwaySymbols = None):
+		"""Replaces the railway with the one in a checkpoint from the master or a snapshot 
+		from the data directory, and rebuilds the indexes conflict analysis relies on. The 
+		commands are analyzed afresh, by ``analyze_backup_railway``.
+
+		:param railway_update: The RailwayUpdate protobuf message.
+		:param symbols: The symbol tables a compact railway refers to. Defaults to the master's.
+		"""
+		if symbols is None:
+			symbols = self.master_symbols
+		railway_pb = railway_update.railway
+		if railway_update.HasField("compact_railway"):
+			railway_pb = CompactConverter.expand_railway_pb(railway_update.compact_railway, symbols)
+
+		LOGGER.debug(f"Loading backup railway with {len(railway_pb.trains)} trains")
+		RailwayConverter.update_railway_with_pb(railway_pb, self.railway)
+		self.railway.pop_changes()
+		self.railway.rebuild_waiting_index()
+		self.client_commands = {}
+		self.issued_responses = {}
+
+	def analyze_backup_railway(self):
+		"""Runs conflict analysis on the trains and tracks the master's latest update 
+		changed, so that this slave holds the same commands as the master and does not 
+		have to analyze the whole railway when it is promoted.
+		"""
+		try:
+			self.client_commands = ConflictAnalyzer.resolve_conflicts_incremental(self.railway, self.client_commands)
+		except Exception as e:
+			LOGGER.error(f"Error analyzing backup railway: {e}")
+
+	def apply_railway_delta(self, conn, railway_delta: TrackNet_pb2.RailwayDelta):
+		"""Applies a railway delta from the master to this slave's railway and analyzes 
+		the trains it changed. Deltas that were already covered by a checkpoint are ignored. 
+		If a delta does not follow directly on the backup, a resync is requested from the 
+		master and deltas are ignored until the next checkpoint arrives.
+
+		:param conn: The socket connection to the master server.
+		:param railway_delta: The RailwayDelta protobuf message received from the master.
+		"""
+		if self.backup_sequence is not None and railway_delta.sequence <= self.backup_sequence:
+			LOGGER.debugv(f"Ignoring railway delta {railway_delta.sequence}, backup is at {self.backup_sequence}")
+			return
+
+		if not self.has_backup or railway_delta.base_sequence != self.backup_sequence:
+			if not self.resync_requested:
+				LOGGER.info(f"Gap in railway deltas (backup at {self.backup_sequence}, delta based on {railway_delta.base_sequence}), requesting resync")
+				self.request_resync(conn)
+			return
+
+		LOGGER.debugv(f"Applying railway delta {railway_delta.sequence} to backup railway")
+		# entries that refer to the master's symbol tables are replaced by ones with names, a no-op otherwise
+		CompactConverter.expand_delta_pb(railway_delta, self.master_symbols)
+		RailwayConverter.update_railway_with_delta_pb(railway_delta, self.railway)
+		self.store_last_handled_client_states(railway_delta)
+		self.backup_sequence = railway_delta.sequence
+		self.backup_railway_timestamp = railway_delta.timestamp
+		self.analyze_backup_railway()
+
+	def request_resync(self, conn):
+		"""Asks the master for a full checkpoint of the railway.
+
+		:param conn: The socket connection to the master server.
+		"""
+		resync_message = TrackNet_pb2.InitConnection()
+		resync_message.sender = TrackNet_pb2.InitConnection.SERVER_SLAVE
+		if self.backup_sequence is not None:
+			resync_message.resync_request.last_sequence = self.backup_sequence
+		else:
+			resync_message.resync_request.SetInParent()
+
+		if send(conn, resync_message.SerializeToString()):
+			self.resync_requested = True
+		else:
+			LOGGER.warning("Failed to send resync request to master.")
+
 	def slave_proxy_communication(self, sock, data):
 		global LOGGER
 		"""Handles messages received from a proxy server when operating as a slave server. 
@@ -447,10 +957,15 @@ class Server:
 					self.is_master = True
 					
 					LOGGER = logging.getLogger("MasterServer")
-					if self.backup_railway != None:
-						RailwayConverter.update_railway_with_pb(
-							self.backup_railway, self.railway
-						)
+					if self.has_backup:
+						# the railway and commands were kept up to date with every update from the master
+						with self.lock:
+							self.railway.pop_changes()
+							if self.backup_sequence is not None:
+								self.replication_sequence = self.backup_sequence
+							if self.persistence is not None:
+								# the data directory holds this server's history from before it was a slave
+								self.persistence.request_snapshot()
 						# self.railway.map.print_map()
 						#self.railway.print_map()
 					else:
@@ -535,13 +1050,29 @@ class Server:
 		elif proxy_resp.HasField("client_state"):
 			LOGGER.debug(F"Master server received client state, will put it in queue")
 			try:
-				self.client_state_queue.put((proxy_resp.client_state, sock))
+				digests = None
+				if not proxy_resp.client_state.sequence:
+					digests = self.compute_wire_digests(data, False, 1)
+					if digests is None:
+						# a digest computed another way could let a resent duplicate through
+						return
+				self.client_state_queue.put([proxy_resp.client_state], sock, False, digests)
 				# resp = self.handle_client_state(proxy_resp.client_state)
 			except Exception as e:
 				LOGGER.error(
 					f"Error handling client state: {e} traceback: {traceback.print_exception(e)} "
 				)
 
+		elif proxy_resp.HasField("client_state_batch"):
+			LOGGER.debug(F"Master server received a batch of {len(proxy_resp.client_state_batch.client_states)} client states, will put it in queue")
+			client_states = proxy_resp.client_state_batch.client_states
+			digests = None
+			if not all(client_state.sequence for client_state in client_states):
+				digests = self.compute_wire_digests(data, True, len(client_states))
+				if digests is None:
+					return
+			self.client_state_queue.put(client_states, sock, True, digests)
+
 		# CHECK FOR HEARTBEAT HERE
 		elif proxy_resp.HasField("is_heartbeat"):
 			LOGGER.debugv(f"Received heartbeat from proxy: {proxy_resp.is_heartbeat}")
@@ -566,7 +1097,7 @@ class Server:
 		try:
 			while not utils.exit_flag:
 				try:
-					data = receive(proxy_sock,timeout=5, returnException=True)
+					data = receive(proxy_sock,timeout=5, returnException=True, copy=False)
 				except socket.timeout:
 					data = None
 
@@ -698,13 +1229,17 @@ class Server:
 			if slave_sock is None:
 				LOGGER.warning(f"Could not connect to the given slave server: {slave_host}  {slave_port}")
 			else:
-				self.socks_for_communicating_to_slaves.append(slave_sock)
+				replicator = SlaveReplicator(
+					slave_sock, f"{slave_host}:{slave_port}", self.send_checkpoint_to_slave,
+					symbols=self.railway.get_symbols() if self.compact_replication else None,
+				)
+				# a new slave first needs a full checkpoint, later batches only send deltas
+				with self.lock:
+					self.send_checkpoint_to_slave(replicator)
+					self.slave_replicators.append(replicator)
+				replicator.start()
 				LOGGER.debug(f"Added slave server {slave_host}:{slave_port}")
 
-				# added slave server, will send a backup to all slaves 
-				# Create a separate thread for talking to slaves
-				threading.Thread(target=self.talk_to_slaves, daemon=True).start()
-
 			
 			# Start a new thread dedicated to this slave for communication
 		#            threading.Thread(target=self.handle_slave_communication, args=(slave_sock,), daemon=True).start()
@@ -738,17 +1273,17 @@ class Server:
 		:param location_obj: The location object to serialize.
 		:param location_pb: The protobuf Location message to be populated with the location object's data.
 		"""
-		if location_obj.front_cart["track"]:
-			location_pb.front_track_id = location_obj.front_cart["track"].name
-		if location_obj.front_cart["junction"]:
-			location_pb.front_junction_id = location_obj.front_cart["junction"].name
-		location_pb.front_position = location_obj.front_cart["position"]
-
-		if location_obj.back_cart["track"]:
-			location_pb.back_track_id = location_obj.back_cart["track"].name
-		if location_obj.back_cart["junction"]:
-			location_pb.back_junction_id = location_obj.back_cart["junction"].name
-		location_pb.back_position = location_obj.back_cart["position"]
+		if location_obj.front_cart.track:
+			location_pb.front_track_id = location_obj.front_cart.track.name
+		if location_obj.front_cart.junction:
+			location_pb.front_junction_id = location_obj.front_cart.junction.name
+		location_pb.front_position = location_obj.front_cart.position
+
+		if location_obj.back_cart.track:
+			location_pb.back_track_id = location_obj.back_cart.track.name
+		if location_obj.back_cart.junction:
+			location_pb.back_junction_id = location_obj.back_cart.junction.name
+		location_pb.back_position = location_obj.back_cart.position
 
 	def serialize_route(self, route_obj, route_pb):
 		"""Serializes a route object into a protobuf message, including its sequence 
@@ -764,31 +1299,75 @@ class Server:
 		if route_obj.destination:
 			route_pb.destination.id = route_obj.destination.name
 
-	def talk_to_slaves(self):  # needs to send railway update to slaves
-		"""Sends the latest railway update message to all connected slave servers. 
-		This method is typically invoked after receiving updates from clients or from 
-		the master server to ensure all slave servers have the latest state.
+	def send_checkpoint_to_slave(self, replicator: SlaveReplicator):
+		"""Schedules a full railway update at the current replication sequence number 
+		for a single slave, used when the slave first connects or asks to resync.
 
-   		This method iterates through sockets connected to slave servers, 
-		prepares a railway update message, and sends it to each slave.
+		:param replicator: The replicator of the slave server.
 		"""
-		LOGGER.debug(f"number of slaves: {len(self.socks_for_communicating_to_slaves)}")
-		for slave_socket in self.socks_for_communicating_to_slaves:
-			# Prepare the client state message
+		with self.lock:
 			master_resp = TrackNet_pb2.InitConnection()
 			master_resp.sender = TrackNet_pb2.InitConnection.SERVER_MASTER
 			master_resp.railway_update.CopyFrom(self.create_railway_update_message())
-			LOGGER.debugv("Railway update message created")
-			LOGGER.debugv(f"type of slave socket: {type(slave_socket)}")
-			if slave_socket.fileno() < 0:
-				# slave socket is closed
-				LOGGER.debug(f"Removing an unavailable slave")
-				self.socks_for_communicating_to_slaves.remove(slave_socket)
+			replicator.enqueue(master_resp)
+
+	def talk_to_slaves(self, master_resp: TrackNet_pb2.InitConnection):  # needs to send railway update to slaves
+		"""Schedules a replication message for all connected slave servers. This is invoked 
+		after every batch of client states so that all slave servers have the latest state. 
+		The message is serialized once and sent by each slave's replicator thread, so a 
+		slow slave holds up neither the other slaves nor the client state loop.
+
+		:param master_resp: The InitConnection message holding the railway delta or update.
+		"""
+		LOGGER.debug(f"number of slaves: {len(self.slave_replicators)}")
+		# serialized once, by the first replicator to send it, for every slave
+		broadcast = BroadcastMessage(master_resp)
+		for replicator in list(self.slave_replicators):
+			if replicator.closed:
+				LOGGER.debug(f"Removing an unavailable slave {replicator.name}")
+				self.slave_replicators.remove(replicator)
 			else:
-				if send(slave_socket, master_resp.SerializeToString()):
-					LOGGER.debugv(f"Railway update message sent to slave successfully")
-				else:
-					LOGGER.warning(f"Could not send backup message to: {slave_socket}")
+				replicator.enqueue(broadcast)
+
+	def get_ingest_metrics(self) -> dict:
+		"""Returns the depth of the client state queue, its coalesced and dropped state counters 
+		and the latency percentiles of each priority class, from the arrival of a client state 
+		to the response to it.
+
+		:return: A dictionary of client state queue metrics.
+		"""
+		metrics = self.client_state_queue.get_metrics()
+		metrics["latency"] = self.ingest_scheduler.get_latency_percentiles()
+		return metrics
+
+	def get_conflict_analysis_metrics(self) -> dict:
+		"""Returns the number of conflict analysis passes, their mean duration and the 
+		number of commands computed on the request path for trains not analyzed yet.
+
+		:return: A dictionary of conflict analysis metrics.
+		"""
+		passes = self.conflict_analysis_passes
+		return {
+			"background": self.background_analysis,
+			"passes": passes,
+			"mean_pass_ms": self.conflict_analysis_seconds / passes * 1000 if passes else 0.0,
+			"unanalyzed_command_lookups": self.unanalyzed_command_lookups,
+		}
+
+	def get_response_cache_metrics(self) -> dict:
+		"""Returns the hit, miss and eviction counters of the response cache.
+
+		:return: A dictionary of response cache metrics.
+		"""
+		with self.lock:
+			return self.response_cache.get_metrics()
+
+	def get_replication_metrics(self) -> dict:
+		"""Returns the replication lag metrics of every connected slave server.
+
+		:return: A dictionary mapping slave names to their replicator metrics.
+		"""
+		return {replicator.name: replicator.get_metrics() for replicator in list(self.slave_replicators)}
 
 
 if __name__ == "__main__":
@@ -801,6 +1380,18 @@ if __name__ == "__main__":
 	parser.add_argument(
 		"-listeningPort", type=int, help="Listening port number", default=4444
 	)
+	parser.add_argument(
+		"-columnarTrains", action="store_true", help="Keep trains in columns, for railways with many trains"
+	)
+	parser.add_argument(
+		"-namedReplication", action="store_true", help="Replicate to slaves with names instead of integer ids"
+	)
+	parser.add_argument(
+		"-dataDir", type=str, help="Directory to keep a write-ahead log and snapshots of the railway in, to recover it on restart"
+	)
+	parser.add_argument(
+		"-maxBatchSize", type=int, default=256, help="Most client states handled in one batch, the most urgent first"
+	)
 
 	args = parser.parse_args()
 
@@ -836,5 +1427,8 @@ if __name__ == "__main__":
 		if proxy2_address != None:
 			cmdLineProxyDetails.append((proxy2_address, proxy2_port_num))
 
-	Server(port=listening_port_num)
+	Server(
+		port=listening_port_num, columnar_trains=args.columnarTrains, compact_replication=not args.namedReplication,
+		data_dir=args.dataDir, max_batch_size=args.maxBatchSize,
+	).run()
 
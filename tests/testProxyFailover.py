@@ -0,0 +1,88 @@
+import logging
+import socket
+import threading
+import time
+
+import TrackNet_pb2
+import utils
+from utils import send, receive
+from proxy import Proxy, AsyncProxy
+
+logging.disable(logging.CRITICAL)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeServer:
+    """Connects to the proxy as a server and records the roles the proxy assigns it,
+    answering its heartbeats with a backup timestamp as a slave server does."""
+
+    def __init__(self, proxy_port: int, port: int):
+        self.port = port
+        self.roles = []
+        self.sock = socket.create_connection(("127.0.0.1", proxy_port))
+        message = TrackNet_pb2.InitConnection()
+        message.sender = TrackNet_pb2.InitConnection.Sender.SERVER_SLAVE
+        message.slave_details.host = "127.0.0.1"
+        message.slave_details.port = port
+        send(self.sock, message.SerializeToString())
+        threading.Thread(target=self.receive_loop, daemon=True).start()
+
+    def receive_loop(self):
+        while True:
+            try:
+                data = receive(self.sock, returnException=True, timeout=60)
+            except Exception:
+                return
+            message = TrackNet_pb2.InitConnection()
+            message.ParseFromString(data)
+            if message.HasField("server_assignment"):
+                self.roles.append(message.server_assignment.is_master)
+            elif message.HasField("is_heartbeat"):
+                response = TrackNet_pb2.InitConnection()
+                response.sender = TrackNet_pb2.InitConnection.Sender.SERVER_SLAVE
+                response.slave_backup_timestamp.host = "127.0.0.1"
+                response.slave_backup_timestamp.port = self.port
+                response.slave_backup_timestamp.timestamp = 1
+                send(self.sock, response.SerializeToString())
+
+
+def wait_for(condition, timeout: float=10) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def run(proxy_class):
+    # a main proxy with a master server and one slave server
+    proxy_port = free_port()
+    proxy = proxy_class(proxy_port=free_port(), listening_port=proxy_port, is_main=True, batch_window=0)
+    proxy.host = "127.0.0.1"
+    threading.Thread(target=proxy.run, daemon=True).start()
+    time.sleep(0.5)
+
+    master = FakeServer(proxy_port, 14441)
+    wait_for(lambda: master.roles)
+    slave = FakeServer(proxy_port, 14442)
+    wait_for(lambda: slave.roles)
+    print(f"{proxy_class.__name__} roles before:", master.roles, slave.roles)
+
+    # the master dies, closing its connection to the proxy
+    start = time.monotonic()
+    master.sock.shutdown(socket.SHUT_RDWR)
+    master.sock.close()
+    promoted = wait_for(lambda: slave.roles[-1:] == [True])
+    print(f"{proxy_class.__name__} slave promoted after the master was killed: {promoted} ({time.monotonic() - start:.1f} s)")
+    print(f"{proxy_class.__name__} relays to the promoted slave:", proxy.master_socket is not None and proxy.master_socket.getpeername()[1] == slave.sock.getsockname()[1])
+
+
+run(Proxy)
+run(AsyncProxy)
+utils.exit_flag = True
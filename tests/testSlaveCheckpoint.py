@@ -0,0 +1,82 @@
+import logging
+import socket
+import threading
+import time
+
+import TrackNet_pb2
+import utils
+from server import Server
+from replication import SlaveReplicator
+from bench.bench_client_states import create_client_state
+from converters.railway_converter import RailwayConverter
+
+logging.disable(logging.CRITICAL)
+
+# a master replicating to one slave, which loads the railway from the checkpoint it is sent on connecting
+master = Server(port=1)
+master.is_master = True
+for _ in range(6):
+    master.railway.create_new_train(3, "A")
+
+slave = Server(port=2)
+loads = []
+load_backup_railway = slave.load_backup_railway
+slave.load_backup_railway = lambda *args, **kwargs: (loads.append(1), load_backup_railway(*args, **kwargs))
+
+master_sock, slave_sock = socket.socketpair()
+replicator = SlaveReplicator(master_sock, "slave", master.send_checkpoint_to_slave, symbols=master.railway.get_symbols())
+with master.lock:
+    master.send_checkpoint_to_slave(replicator)
+    master.slave_replicators.append(replicator)
+replicator.start()
+slave.connected_to_master = True
+threading.Thread(target=slave.handle_master_communication, args=(slave_sock,), daemon=True).start()
+
+server_sock, proxy_sock = socket.socketpair()
+threading.Thread(target=lambda: [utils.receive(proxy_sock, timeout=60) for _ in iter(int, 1)], daemon=True).start()
+
+time.sleep(0.5)
+commands_before = slave.client_commands
+
+names = sorted(master.railway.trains)
+for step in range(10):
+    client_states = []
+    for (index, name) in enumerate(names):
+        client_state = create_client_state(name, "127.0.0.1", 1)
+        client_state.sequence = step + 1
+        if index == step % len(names):
+            client_state.train.state = TrackNet_pb2.Train.TrainState.RUNNING
+            client_state.location.front_position = 5
+            client_state.location.back_position = 2
+        client_states.append(client_state)
+    master.client_state_queue.put(client_states, server_sock, True)
+    master.handle_client_state_batch(master.client_state_queue.take(0))
+    # every other batch reaches the slave on its own, the others are coalesced with the next
+    if step % 2:
+        time.sleep(0.1)
+time.sleep(1)
+
+
+def railway_bytes(railway):
+    railway_pb = RailwayConverter.convert_railway_obj_to_pb(railway)
+    return (
+        sorted(train.SerializeToString(deterministic=True) for train in railway_pb.trains),
+        sorted(track.SerializeToString(deterministic=True) for track in railway_pb.map.tracks),
+        sorted(junction.SerializeToString(deterministic=True) for junction in railway_pb.map.junctions),
+    )
+
+
+def command_bytes(server):
+    commands = {}
+    for (train_id, command) in server.client_commands.items():
+        server_response = TrackNet_pb2.ServerResponse()
+        command.fill_pb(server_response)
+        commands[train_id] = server_response.SerializeToString(deterministic=True)
+    return commands
+
+
+print("sequence:", slave.backup_sequence, master.replication_sequence)
+print("railway loaded once, by the first checkpoint:", len(loads) == 1)
+print("analysis kept across batches:", slave.client_commands is commands_before)
+print("railway matches:", railway_bytes(slave.railway) == railway_bytes(master.railway))
+print("commands match:", command_bytes(slave) == command_bytes(master))
@@ -1,7 +1,10 @@
 import socket
 import logging
 import signal
+import struct
 import sys
+import threading
+import weakref
 
 LOGGER = logging.getLogger("utils")
 
@@ -14,6 +17,11 @@ __all__ = [
     "create_server_socket",
     "send",
     "receive",
+    "set_tcp_nodelay",
+    "FrameReader",
+    "FramingError",
+    "find_length_delimited_fields",
+    "MAX_FRAME_SIZE",
     "slave_to_master_port",
     "proxy_details",
     "proxy_port"
@@ -42,6 +50,11 @@ proxy_details = {
 
 exit_flag = False
 
+# Every message is sent as a 4 byte big endian length followed by the payload.
+FRAME_HEADER = struct.Struct("!I")
+# Frames announcing more than this many bytes are rejected instead of allocated.
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
 LOGGER = logging.getLogger("utils")
 
 def exit_gracefully(signum, frame):
@@ -61,7 +74,8 @@ def exit_gracefully(signum, frame):
 DEBUGV= 9 
 def debugv(self, message, *args, **kws):
     # Yes, logger takes its '*args' as 'args'.
-    self._log(DEBUGV, message, args, **kws) 
+    if self.isEnabledFor(DEBUGV):
+        self._log(DEBUGV, message, args, **kws) 
 
 
 def setup_logging():
@@ -121,6 +135,7 @@ def create_client_socket(ip: str, port: int, timeout=1):
            
             sock.connect((ip, port))
             if sock is not None:
+                set_tcp_nodelay(sock)
                 return sock
         except socket.timeout:
             LOGGER.debug(f"the socket connect timed out while trying to connect")
@@ -161,22 +176,209 @@ def create_server_socket(ip: str, port: int):
     return sock
 
 
+def set_tcp_nodelay(sock: socket.socket):
+    """Disables Nagle's algorithm on the socket so that small frames, such as client 
+    states and heartbeats, are sent immediately instead of waiting for an ACK.
+
+    :param sock: A connected TCP socket.
+    """
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError as exc:
+        LOGGER.debug(f"Could not set TCP_NODELAY: {exc}")
+
+
+class FramingError(Exception):
+    """Raised when a frame announces a length above ``MAX_FRAME_SIZE``."""
+
+
+class FrameReader:
+    """Reads length prefixed frames from a socket through a reusable buffer.
+
+    Bytes are read with ``recv_into`` until the whole header and payload arrived, 
+    so short reads never truncate a message, and a single read may pick up several 
+    small frames at once. If the socket times out part way through a frame, the 
+    bytes read so far stay buffered and the next ``read_frame`` carries on.
+    """
+
+    def __init__(self, sock: socket.socket, max_frame_size: int = MAX_FRAME_SIZE, buffer_size: int = 65536):
+        """
+        :param sock: The socket to read frames from. All reads must go through this reader.
+        :param max_frame_size: The largest payload accepted, in bytes.
+        :param buffer_size: The initial size of the buffer, it grows to fit larger frames.
+        """
+        self.sock = sock
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # first buffered byte not returned yet
+        self.end = 0  # end of the buffered bytes
+
+    def read_frame(self) -> memoryview:
+        """Reads the next frame. 
+
+        :returns: A memoryview of the payload. It is only valid until the next call, 
+            copy it with ``bytes()`` if it must be kept.
+        :raises socket.timeout: If the socket timed out, buffered bytes are kept.
+        :raises ConnectionError: If the peer closed the connection.
+        :raises FramingError: If the frame is larger than ``max_frame_size``.
+        """
+        header_size = FRAME_HEADER.size
+        if self.end - self.start < header_size:
+            self.fill(header_size)
+
+        (frame_length,) = FRAME_HEADER.unpack_from(self.buffer, self.start)
+        if frame_length > self.max_frame_size:
+            raise FramingError(f"frame of {frame_length} bytes exceeds the maximum of {self.max_frame_size}")
+
+        if self.end - self.start < header_size + frame_length:
+            self.fill(header_size + frame_length)
+
+        payload_start = self.start + header_size
+        self.start = payload_start + frame_length
+        return self.view[payload_start:self.start]
+
+    def fill(self, length: int):
+        """Reads from the socket until at least ``length`` bytes are buffered after ``start``.
+
+        :param length: The number of bytes needed.
+        """
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.start + length > len(self.buffer):
+            # move the partial frame to the front, into a larger buffer if it does not fit
+            pending = bytes(self.view[self.start:self.end])
+            if length > len(self.buffer):
+                self.buffer = bytearray(max(length, 2 * len(self.buffer)))
+                self.view = memoryview(self.buffer)
+            self.view[:len(pending)] = pending
+            self.start, self.end = 0, len(pending)
+
+        if length > len(self.buffer):
+            self.buffer = bytearray(max(length, 2 * len(self.buffer)))
+            self.view = memoryview(self.buffer)
+
+        while self.end - self.start < length:
+            count = self.sock.recv_into(self.view[self.end:])
+            if count == 0:
+                raise ConnectionError("connection closed by peer")
+            self.end += count
+
+
+def read_varint(data, pos: int) -> tuple:
+    """Reads a protobuf base 128 varint.
+
+    :param data: A bytes-like object.
+    :param pos: The index of the first byte of the varint.
+    :returns: A tuple of the value and the index after the varint.
+    """
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def find_length_delimited_fields(data, field_number: int, start: int = 0, end: int = None) -> list:
+    """Finds the occurrences of a length delimited field (a string, bytes or embedded 
+    message) in a serialized protobuf message, by walking its wire format instead of 
+    parsing it, so the exact bytes a field was received as can be used.
+
+    :param data: A bytes-like object holding the serialized message.
+    :param field_number: The number of the field to find.
+    :param start: The index the message starts at in ``data``.
+    :param end: The index the message ends at, defaults to the end of ``data``.
+    :returns: A list of (start, end) indices of the contents of each occurrence.
+    :raises ValueError: If the message uses a wire type that cannot be skipped.
+    """
+    if end is None:
+        end = len(data)
+    spans = []
+    pos = start
+    while pos < end:
+        # keys and lengths below 128 take one byte, the common case is read inline
+        key = data[pos]
+        pos += 1
+        if key >= 0x80:
+            key, pos = read_varint(data, pos - 1)
+
+        wire_type = key & 0x7
+        if wire_type == 2:
+            length = data[pos]
+            pos += 1
+            if length >= 0x80:
+                length, pos = read_varint(data, pos - 1)
+            if key >> 3 == field_number:
+                spans.append((pos, pos + length))
+            pos += length
+        elif wire_type == 0:
+            while data[pos] >= 0x80:
+                pos += 1
+            pos += 1
+        elif wire_type == 1:
+            pos += 8
+        elif wire_type == 5:
+            pos += 4
+        else:
+            raise ValueError(f"unsupported wire type {wire_type}")
+    return spans
+
+
+# one reader per socket, so a frame interrupted by a timeout is resumed by the next receive
+_frame_readers = weakref.WeakKeyDictionary()
+# one lock per socket, so frames sent from different threads never interleave
+_send_locks = weakref.WeakKeyDictionary()
+_send_locks_lock = threading.Lock()
+
+
+def get_send_lock(sock: socket.socket) -> threading.Lock:
+    lock = _send_locks.get(sock)
+    if lock is None:
+        with _send_locks_lock:
+            lock = _send_locks.setdefault(sock, threading.Lock())
+    return lock
+
+
 def send(sock: socket.socket, msg , returnException=False) -> bool:
-    """ First Sends the number of bytes in msg padded to 4 bytes, then sends
-    provided data across the given socket.
+    """Sends the number of bytes in msg padded to 4 bytes followed by the provided 
+    data across the given socket, as a single ``sendmsg`` call where possible.
 
     :param sock: A socket object to use for sending.
-    :param msg: A string containing the data to send.
+    :param msg: A bytes-like object containing the data to send, or a list of them 
+        sent back to back as one frame without joining them first.
     :returns: True if all data successfully sent over socket, otherwise False
     """
     try:
         assert type(sock) == socket.socket
-        assert type(msg) == bytes
+        if isinstance(msg, list):
+            parts = msg
+        else:
+            parts = [msg]
+        assert all(isinstance(part, (bytes, bytearray, memoryview)) for part in parts)
+
+        length = sum(len(part) for part in parts)
+        if length > MAX_FRAME_SIZE:
+            raise FramingError(f"frame of {length} bytes exceeds the maximum of {MAX_FRAME_SIZE}")
+
+        buffers = [FRAME_HEADER.pack(length)] + parts
 
-        msg_len = int_to_bytes(len(msg), 4)
+        with get_send_lock(sock):
+            if hasattr(sock, "sendmsg"):
+                sent = sock.sendmsg(buffers)
+            else:
+                sent = 0
 
-        sock.sendall(msg_len)
-        sock.sendall(msg)
+            # the kernel may accept only part of the frame when its send buffer is full
+            for buffer in buffers:
+                if sent >= len(buffer):
+                    sent -= len(buffer)
+                    continue
+                sock.sendall(memoryview(buffer)[sent:])
+                sent = 0
 
     except KeyboardInterrupt:
         sock.close()
@@ -192,19 +394,22 @@ def send(sock: socket.socket, msg , returnException=False) -> bool:
     return True
 
 
-def receive(sock: socket.socket, returnException=False, timeout=10) -> bytes:
-    """Receives 4 bytes of data (length of incomming message) then receives message.
+def receive(sock: socket.socket, returnException=False, timeout=10, copy=True) -> bytes:
+    """Receives a length prefixed message from the socket.
 
     :parma sock: A socket object to use for receiving.
-    :returns: A string containing the received data or None if an error occured.
+    :param copy: If False, a memoryview into the socket's reusable buffer is returned 
+        instead of bytes. It is only valid until the next receive on the socket.
+    :returns: The received data or None if an error occured.
     """
     assert type(sock) == socket.socket
-    data = b''
 
     try:
         sock.settimeout(timeout)
-        content_length = sock.recv(4)
-        data = sock.recv(bytes_to_int(content_length))
+        reader = _frame_readers.get(sock)
+        if reader is None:
+            reader = _frame_readers[sock] = FrameReader(sock)
+        data = reader.read_frame()
     except KeyboardInterrupt:
         LOGGER.debug(f"Keyboard interupt detected, will close")
         sys.exit(1)
@@ -214,7 +419,4 @@ def receive(sock: socket.socket, returnException=False, timeout=10) -> bytes:
         else:
             return None
 
-    return data
-
-
-
+    return bytes(data) if copy else data